@@ -272,6 +272,45 @@ class _socketobject(object):
         return self._sock.getsockopt(level, optname, buflen)
     getsockopt.__doc__ = _realsocket.getsockopt.__doc__
 
+    if hasattr(_realsocket, 'sendmsg'):
+        def sendmsg(self, buffers, ancdata=(), flags=0, address=None):
+            return self._sock.sendmsg(buffers, ancdata, flags, address)
+        sendmsg.__doc__ = _realsocket.sendmsg.__doc__
+
+    if hasattr(_realsocket, 'recvmsg'):
+        def recvmsg(self, bufsize, ancbufsize=0, flags=0):
+            return self._sock.recvmsg(bufsize, ancbufsize, flags)
+        recvmsg.__doc__ = _realsocket.recvmsg.__doc__
+
+        def recvmsg_into(self, buffers, ancbufsize=0, flags=0):
+            return self._sock.recvmsg_into(buffers, ancbufsize, flags)
+        recvmsg_into.__doc__ = _realsocket.recvmsg_into.__doc__
+
+    if hasattr(_realsocket, 'sendfile'):
+        def sendfile(self, file, offset=0, count=None):
+            """sendfile(file[, offset[, count]]) -> sent
+
+            Send the content of a regular file, from offset and up to
+            count bytes or to the end of the file, with the sendfile()
+            system call.  The file position is updated to the end of the
+            data sent.  Return the total number of bytes sent.
+            """
+            fd = file.fileno()
+            if count is None:
+                count = os.fstat(fd).st_size - offset
+            total = 0
+            try:
+                while total < count:
+                    sent = self._sock.sendfile(fd, offset + total,
+                                               min(count - total, 0x7ffff000))
+                    if sent == 0:
+                        break     # end of the file
+                    total += sent
+            finally:
+                if total > 0 and hasattr(file, 'seek'):
+                    file.seek(offset + total)
+            return total
+
 socket = SocketType = _socketobject
 
 class _fileobject(object):
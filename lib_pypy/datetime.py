@@ -173,12 +173,43 @@ def _format_time(hh, mm, ss, us):
         result += ".%06d" % us
     return result
 
+def _format_date(y, m, d):
+    return "%04d-%02d-%02d" % (y, m, d)
+
+def _format_datetime(y, m, d, hh, mm, ss, us, sep):
+    return "%04d-%02d-%02d%c" % (y, m, d, sep) + _format_time(hh, mm, ss, us)
+
+# The interp-level versions of some of the helpers above, when available.
+# _fast_strftime() and _fast_strptime() only handle the simple cases and
+# return None for the others.
+_fast_strftime = _fast_strptime = None
+try:
+    from _datetime import ymd2ord as _ymd2ord, ord2ymd as _ord2ymd
+    from _datetime import format_date as _format_date
+    from _datetime import format_time as _format_time
+    from _datetime import format_datetime as _format_datetime
+    from _datetime import strftime as _fast_strftime
+    from _datetime import strptime as _fast_strptime
+except ImportError:
+    pass
+
 # Correctly substitute for %z and %Z escapes in strftime formats.
 def _wrap_strftime(object, format, timetuple):
     year = timetuple[0]
     if year < 1900:
         raise ValueError("year=%d is before 1900; the datetime strftime() "
                          "methods require year >= 1900" % year)
+    if (_fast_strftime is not None and type(format) is str and
+        type(object) in (date, time, datetime) and
+        getattr(object, "_tzinfo", None) is None):
+        if type(object) is date:
+            us = 0
+        else:
+            us = object.microsecond
+        result = _fast_strftime(format, year, timetuple[1], timetuple[2],
+                                timetuple[3], timetuple[4], timetuple[5], us)
+        if result is not None:
+            return result
     # Don't call _utcoffset() or tzname() unless actually needed.
     zreplace = None # the string to use for %z
     Zreplace = None # the string to use for %Z
@@ -436,6 +467,7 @@ class timedelta(object):
     Representation: (days, seconds, microseconds).  Why?  Because I
     felt like it.
     """
+    __slots__ = ('__days', '__seconds', '__microseconds')
 
     def __new__(cls, days=0, seconds=0, microseconds=0,
                 # XXX The following should only be used as keyword args:
@@ -734,6 +766,7 @@ class date(object):
     Properties (readonly):
     year, month, day
     """
+    __slots__ = ('__year', '__month', '__day')
 
     def __new__(cls, year, month=None, day=None):
         """Constructor.
@@ -808,7 +841,7 @@ class date(object):
         - http://www.w3.org/TR/NOTE-datetime
         - http://www.cl.cam.ac.uk/~mgk25/iso-time.html
         """
-        return "%04d-%02d-%02d" % (self.__year, self.__month, self.__day)
+        return _format_date(self.__year, self.__month, self.__day)
 
     __str__ = isoformat
 
@@ -1101,6 +1134,7 @@ class time(object):
     Properties (readonly):
     hour, minute, second, microsecond, tzinfo
     """
+    __slots__ = ('__hour', '__minute', '__second', '__microsecond', '_tzinfo')
 
     def __new__(cls, hour=0, minute=0, second=0, microsecond=0, tzinfo=None):
         """Constructor.
@@ -1381,6 +1415,8 @@ class datetime(date):
 
     # XXX needs docstrings
     # See http://www.zope.org/Members/fdrake/DateTimeWiki/TimeZoneInfo
+    __slots__ = ('__year', '__month', '__day', '__hour', '__minute',
+                 '__second', '__microsecond', '_tzinfo')
 
     def __new__(cls, year, month=None, day=None, hour=0, minute=0, second=0,
                 microsecond=0, tzinfo=None):
@@ -1580,10 +1616,9 @@ class datetime(date):
         Optional argument sep specifies the separator between date and
         time, default 'T'.
         """
-        s = ("%04d-%02d-%02d%c" % (self.__year, self.__month, self.__day,
-                                  sep) +
-                _format_time(self.__hour, self.__minute, self.__second,
-                             self.__microsecond))
+        s = _format_datetime(self.__year, self.__month, self.__day,
+                             self.__hour, self.__minute, self.__second,
+                             self.__microsecond, sep)
         off = self._utcoffset()
         if off is not None:
             if off < 0:
@@ -1617,6 +1652,11 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        if (_fast_strptime is not None and type(date_string) is str and
+            type(format) is str):
+            fields = _fast_strptime(date_string, format)
+            if fields is not None:
+                return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
@@ -20,6 +20,7 @@ from pypy.interpreter.typedef import TypeDef
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.error import OperationError
 from pypy.rlib.objectmodel import compute_hash
+from pypy.rpython.lltypesystem import rffi
 
 
 class Buffer(Wrappable):
@@ -43,6 +44,28 @@ class Buffer(Wrappable):
         # May be overridden.  No bounds checks.
         return ''.join([self.getitem(i) for i in range(start, stop, step)])
 
+    def get_raw_address(self):
+        """Returns a pointer (an rffi.CCHARP) to the raw memory that holds
+        the content of the buffer, which lets other objects use this memory
+        directly instead of copying it.  Raises ValueError if the content
+        is not stored in raw memory.  The pointer is only valid as long as
+        the buffer is alive and the object that owns the memory is not
+        resized or closed."""
+        # May be overridden.
+        raise ValueError("no raw address for this buffer")
+
+    def lock_raw_address(self):
+        """Like get_raw_address(), but until the matching call to
+        unlock_raw_address(), the object that owns the memory refuses to
+        be resized or closed (it raises BufferError instead).  This is
+        needed if the pointer is used while the GIL is released, e.g. by
+        a read() or send() system call."""
+        # May be overridden, together with unlock_raw_address().
+        return self.get_raw_address()
+
+    def unlock_raw_address(self):
+        pass
+
     # __________ app-level support __________
 
     def descr_len(self, space):
@@ -142,6 +165,33 @@ class RWBuffer(Buffer):
         for i in range(len(string)):
             self.setitem(start + i, string[i])
 
+# ____________________________________________________________
+
+class RawBufferMixin(object):
+    """Mixin for buffers whose content is stored in raw memory, which
+    must implement get_raw_address().  No bounds checks."""
+    _mixin_ = True
+
+    def getitem(self, index):
+        return self.get_raw_address()[index]
+
+    def getslice(self, start, stop, step, size):
+        if size == 0:
+            return ''
+        if step == 1:
+            return rffi.charpsize2str(
+                rffi.ptradd(self.get_raw_address(), start), size)
+        data = self.get_raw_address()
+        return ''.join([data[start + i * step] for i in range(size)])
+
+    def setitem(self, index, char):
+        self.get_raw_address()[index] = char
+
+    def setslice(self, start, string):
+        data = self.get_raw_address()
+        for i in range(len(string)):
+            data[start + i] = string[i]
+
 @unwrap_spec(offset=int, size=int)
 def descr_buffer__new__(space, w_subtype, w_object, offset=0, size=-1):
     # w_subtype can only be exactly 'buffer' for now
@@ -293,6 +343,15 @@ class SubBufferMixin(object):
                           # out of bounds
         return self.buffer.getslice(self.offset + start, self.offset + stop, step, size)
 
+    def get_raw_address(self):
+        return rffi.ptradd(self.buffer.get_raw_address(), self.offset)
+
+    def lock_raw_address(self):
+        return rffi.ptradd(self.buffer.lock_raw_address(), self.offset)
+
+    def unlock_raw_address(self):
+        self.buffer.unlock_raw_address()
+
 class SubBuffer(SubBufferMixin, Buffer):
     pass
 
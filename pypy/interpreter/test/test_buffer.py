@@ -21,6 +21,16 @@ class TestBuffer:
         space.raises_w(space.w_TypeError, space.buffer_w, space.wrap(5))
         space.raises_w(space.w_TypeError, space.buffer, space.wrap(5))
 
+    def test_raw_address(self):
+        space = self.space
+        buf = space.buffer_w(space.wrap('hello world'))
+        py.test.raises(ValueError, buf.get_raw_address)
+        w_bytearray = space.call_function(space.w_bytearray,
+                                          space.wrap('abc'))
+        buf = space.buffer_w(w_bytearray)
+        py.test.raises(ValueError, buf.get_raw_address)
+        assert buf.getslice(1, 3, 1, 2) == 'bc'
+
     def test_file_write(self):
         space = self.space
         w_buffer = space.buffer(space.wrap('hello world'))
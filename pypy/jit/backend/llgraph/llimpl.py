@@ -4,12 +4,12 @@ This contains all the code that is directly run
 when executing on top of the llinterpreter.
 """
 
-import weakref
+import weakref, sys
 from pypy.objspace.flow.model import Variable, Constant
 from pypy.annotation import model as annmodel
 from pypy.jit.metainterp.history import (ConstInt, ConstPtr,
                                          BoxInt, BoxPtr, BoxObj, BoxFloat,
-                                         REF, INT, FLOAT)
+                                         REF, INT, FLOAT, VECTOR_SIZE)
 from pypy.jit.codewriter import heaptracker
 from pypy.rpython.lltypesystem import lltype, llmemory, rclass, rstr, rffi
 from pypy.rpython.ootypesystem import ootype
@@ -23,7 +23,7 @@ from pypy.jit.backend.llgraph import symbolic
 from pypy.jit.codewriter import longlong
 
 from pypy.rlib.objectmodel import ComputedIntSymbolic, we_are_translated
-from pypy.rlib.rarithmetic import ovfcheck
+from pypy.rlib.rarithmetic import ovfcheck, intmask
 from pypy.rlib.rarithmetic import r_longlong, r_ulonglong, r_uint
 from pypy.rlib.rtimer import read_timestamp
 
@@ -358,6 +358,9 @@ def compile_add_int_result(loop):
 def compile_add_float_result(loop):
     return compile_add_ref_result(loop, longlong.FLOATSTORAGE)
 
+def compile_add_vector_result(loop):
+    return compile_add_ref_result(loop, VECTORSTORAGE)
+
 def compile_add_ref_result(loop, TYPE):
     loop = _from_opaque(loop)
     v = Variable()
@@ -498,6 +501,9 @@ class Frame(object):
                         x = self.as_object(result)
                     elif RESTYPE is longlong.FLOATSTORAGE:
                         x = self.as_floatstorage(result)
+                    elif RESTYPE is VECTORSTORAGE:
+                        assert len(result) == VECTOR_SIZE
+                        x = result
                     else:
                         raise Exception("op.result.concretetype is %r"
                                         % (RESTYPE,))
@@ -707,6 +713,21 @@ class Frame(object):
         self.overflow_flag = ovf
         return z
 
+    def op_int_sub(self, _, x, y):
+        if (isinstance(x, llmemory.AddressAsInt) and
+            isinstance(y, llmemory.AddressAsInt)):
+            # the alias checks of vectorized loops subtract the addresses
+            # of raw arrays.  We only know that an array is at distance 0
+            # from itself, and far away from the other raw blocks.
+            if x == y:
+                return 0
+            if (x.adr.ptr._obj._normalizedcontainer() is
+                y.adr.ptr._obj._normalizedcontainer()):
+                raise NotImplementedError("int_sub of two addresses "
+                                          "inside the same raw block")
+            return sys.maxint // 2
+        return intmask(x - y)
+
     def op_int_mul_ovf(self, _, x, y):
         try:
             z = ovfcheck(x * y)
@@ -737,14 +758,30 @@ class Frame(object):
         if arraydescr.typeinfo == REF:
             raise NotImplementedError("getarrayitem_raw -> gcref")
         elif arraydescr.typeinfo == INT:
-            return do_getarrayitem_raw_int(array, index)
+            return do_getarrayitem_raw_int(array, index, arraydescr.ofs)
         elif arraydescr.typeinfo == FLOAT:
-            return do_getarrayitem_raw_float(array, index)
+            return do_getarrayitem_raw_float(array, index, arraydescr.ofs)
         else:
             raise NotImplementedError
 
     op_getarrayitem_raw_pure = op_getarrayitem_raw
 
+    def _make_vector_op(opname):
+        from pypy.jit.metainterp.blackhole import BlackholeInterpreter
+        func = BlackholeInterpreter.__dict__['bhimpl_' + opname]
+        def op_vec(self, _, *vectors):
+            return tuple([func(*[vector[i] for vector in vectors])
+                          for i in range(VECTOR_SIZE)])
+        return op_vec
+
+    op_vec_float_add = _make_vector_op('float_add')
+    op_vec_float_sub = _make_vector_op('float_sub')
+    op_vec_float_mul = _make_vector_op('float_mul')
+    op_vec_float_truediv = _make_vector_op('float_truediv')
+    op_vec_float_neg = _make_vector_op('float_neg')
+    op_vec_float_abs = _make_vector_op('float_abs')
+    del _make_vector_op
+
     def op_getfield_gc(self, fielddescr, struct):
         if fielddescr.typeinfo == REF:
             return do_getfield_gc_ptr(struct, fielddescr.ofs)
@@ -794,12 +831,31 @@ class Frame(object):
         if arraydescr.typeinfo == REF:
             raise NotImplementedError("setarrayitem_raw <- gcref")
         elif arraydescr.typeinfo == INT:
-            do_setarrayitem_raw_int(array, index, newvalue)
+            do_setarrayitem_raw_int(array, index, newvalue,
+                                     arraydescr.ofs)
         elif arraydescr.typeinfo == FLOAT:
-            do_setarrayitem_raw_float(array, index, newvalue)
+            do_setarrayitem_raw_float(array, index, newvalue,
+                                     arraydescr.ofs)
         else:
             raise NotImplementedError
 
+    # vectors are tuples of VECTOR_SIZE float storages
+
+    def op_vec_getarrayitem_raw(self, arraydescr, array, index):
+        assert arraydescr.typeinfo == FLOAT
+        return tuple([do_getarrayitem_raw_float(array, index + i,
+                                                arraydescr.ofs)
+                      for i in range(VECTOR_SIZE)])
+
+    def op_vec_setarrayitem_raw(self, arraydescr, array, index, vector):
+        assert arraydescr.typeinfo == FLOAT
+        for i in range(VECTOR_SIZE):
+            do_setarrayitem_raw_float(array, index + i, vector[i],
+                                      arraydescr.ofs)
+
+    def op_vec_float_expand(self, _, value):
+        return (value,) * VECTOR_SIZE
+
     def op_setfield_gc(self, fielddescr, struct, newvalue):
         if fielddescr.typeinfo == REF:
             do_setfield_gc_ptr(struct, fielddescr.ofs, newvalue)
@@ -1320,16 +1376,25 @@ def do_getarrayitem_gc_int(array, index):
     array = array._obj.container
     return cast_to_int(array.getitem(index))
 
-def do_getarrayitem_raw_int(array, index):
-    array = array.adr.ptr._obj
+def _raw_array(array, arraynum):
+    array = array.adr.ptr
+    TYPE = symbolic.Size2Type[arraynum]
+    if lltype.typeOf(array).TO.OF != TYPE.OF:
+        # raw memory accessed as an array of another item type, after
+        # an rffi.cast() that the JIT turned into a no-op
+        array = rffi.cast(lltype.Ptr(TYPE), array)
+    return array
+
+def do_getarrayitem_raw_int(array, index, arraynum):
+    array = _raw_array(array, arraynum)._obj
     return cast_to_int(array.getitem(index))
 
 def do_getarrayitem_gc_float(array, index):
     array = array._obj.container
     return cast_to_floatstorage(array.getitem(index))
 
-def do_getarrayitem_raw_float(array, index):
-    array = array.adr.ptr._obj
+def do_getarrayitem_raw_float(array, index, arraynum):
+    array = _raw_array(array, arraynum)._obj
     return cast_to_floatstorage(array.getitem(index))
 
 def do_getarrayitem_gc_ptr(array, index):
@@ -1380,8 +1445,8 @@ def do_setarrayitem_gc_int(array, index, newvalue):
     newvalue = cast_from_int(ITEMTYPE, newvalue)
     array.setitem(index, newvalue)
 
-def do_setarrayitem_raw_int(array, index, newvalue):
-    array = array.adr.ptr
+def do_setarrayitem_raw_int(array, index, newvalue, arraynum):
+    array = _raw_array(array, arraynum)
     ITEMTYPE = lltype.typeOf(array).TO.OF
     newvalue = cast_from_int(ITEMTYPE, newvalue)
     array._obj.setitem(index, newvalue)
@@ -1392,8 +1457,8 @@ def do_setarrayitem_gc_float(array, index, newvalue):
     newvalue = cast_from_floatstorage(ITEMTYPE, newvalue)
     array.setitem(index, newvalue)
 
-def do_setarrayitem_raw_float(array, index, newvalue):
-    array = array.adr.ptr
+def do_setarrayitem_raw_float(array, index, newvalue, arraynum):
+    array = _raw_array(array, arraynum)
     ITEMTYPE = lltype.typeOf(array).TO.OF
     newvalue = cast_from_floatstorage(ITEMTYPE, newvalue)
     array._obj.setitem(index, newvalue)
@@ -1490,6 +1555,8 @@ def do_call_pushptr(x):
 def do_call_pushfloat(x):
     _call_args_f.append(x)
 
+VECTORSTORAGE = lltype.FixedSizeArray(longlong.FLOATSTORAGE, VECTOR_SIZE)
+
 kind2TYPE = {
     'i': lltype.Signed,
     'f': lltype.Float,
@@ -1696,6 +1763,7 @@ setannotation(compile_add_float_const, annmodel.s_None)
 setannotation(compile_add_int_result, annmodel.SomeInteger())
 setannotation(compile_add_ref_result, annmodel.SomeInteger())
 setannotation(compile_add_float_result, annmodel.SomeInteger())
+setannotation(compile_add_vector_result, annmodel.SomeInteger())
 setannotation(compile_add_jump_target, annmodel.s_None)
 setannotation(compile_add_guard_jump_target, annmodel.s_None)
 setannotation(compile_add_fail, annmodel.SomeInteger())
@@ -92,6 +92,7 @@ class BaseCPU(model.AbstractCPU):
     supports_floats = True
     supports_longlong = llimpl.IS_32_BIT
     supports_singlefloats = True
+    supports_vector_ops = True
 
     def __init__(self, rtyper, stats=None, opts=None,
                  translate_support_code=False,
@@ -219,6 +220,8 @@ class BaseCPU(model.AbstractCPU):
                     var2index[x] = llimpl.compile_add_ref_result(c, self.ts.BASETYPE)
                 elif isinstance(x, history.BoxFloat):
                     var2index[x] = llimpl.compile_add_float_result(c)
+                elif isinstance(x, history.BoxVector):
+                    var2index[x] = llimpl.compile_add_vector_result(c)
                 else:
                     raise Exception("%s.result contain: %r" % (op.getopname(),
                                                                x))
@@ -370,7 +373,8 @@ class LLtypeCPU(BaseCPU):
         return llimpl.do_getarrayitem_gc_int(array, index)
     def bh_getarrayitem_raw_i(self, arraydescr, array, index):
         assert isinstance(arraydescr, Descr)
-        return llimpl.do_getarrayitem_raw_int(array, index)
+        return llimpl.do_getarrayitem_raw_int(array, index,
+                                                 arraydescr.ofs)
     def bh_getarrayitem_gc_r(self, arraydescr, array, index):
         assert isinstance(arraydescr, Descr)
         return llimpl.do_getarrayitem_gc_ptr(array, index)
@@ -379,7 +383,8 @@ class LLtypeCPU(BaseCPU):
         return llimpl.do_getarrayitem_gc_float(array, index)
     def bh_getarrayitem_raw_f(self, arraydescr, array, index):
         assert isinstance(arraydescr, Descr)
-        return llimpl.do_getarrayitem_raw_float(array, index)
+        return llimpl.do_getarrayitem_raw_float(array, index,
+                                                 arraydescr.ofs)
 
     def bh_getfield_gc_i(self, struct, fielddescr):
         assert isinstance(fielddescr, Descr)
@@ -431,7 +436,8 @@ class LLtypeCPU(BaseCPU):
 
     def bh_setarrayitem_raw_i(self, arraydescr, array, index, newvalue):
         assert isinstance(arraydescr, Descr)
-        llimpl.do_setarrayitem_raw_int(array, index, newvalue)
+        llimpl.do_setarrayitem_raw_int(array, index, newvalue,
+                                          arraydescr.ofs)
 
     def bh_setarrayitem_gc_r(self, arraydescr, array, index, newvalue):
         assert isinstance(arraydescr, Descr)
@@ -443,7 +449,8 @@ class LLtypeCPU(BaseCPU):
 
     def bh_setarrayitem_raw_f(self, arraydescr, array, index, newvalue):
         assert isinstance(arraydescr, Descr)
-        llimpl.do_setarrayitem_raw_float(array, index, newvalue)
+        llimpl.do_setarrayitem_raw_float(array, index, newvalue,
+                                          arraydescr.ofs)
 
     def bh_setfield_gc_i(self, struct, fielddescr, newvalue):
         assert isinstance(fielddescr, Descr)
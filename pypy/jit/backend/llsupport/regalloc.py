@@ -1,4 +1,5 @@
 
+import sys
 from pypy.jit.metainterp.history import Const, Box, REF
 from pypy.rlib.objectmodel import we_are_translated
 
@@ -58,14 +59,72 @@ class RegisterManager(object):
     no_lower_byte_regs    = []
     save_around_call_regs = []
     
-    def __init__(self, longevity, frame_manager=None, assembler=None):
+    def __init__(self, longevity, frame_manager=None, assembler=None,
+                 uses=None):
         self.free_regs = self.all_regs[:]
         self.longevity = longevity
+        # 'uses' maps variables to the sorted list of the positions of
+        # the operations that need them as arguments (not counting the
+        # fail arguments of guards), if the caller computed it
+        self.uses = uses
+        self.hints = {}
+        self.hinted_regs = {}
         self.reg_bindings = {}
         self.position = -1
         self.frame_manager = frame_manager
         self.assembler = assembler
 
+    def set_hints(self, hints):
+        """ 'hints' maps variables to the register in which they should
+        preferably be allocated, e.g. the register in which the JUMP at
+        the end of the loop must pass them.  The other variables avoid
+        these registers if they can.
+        """
+        self.hints = hints
+        self.hinted_regs = {}
+        for reg in hints.values():
+            self.hinted_regs[reg] = None
+
+    def next_use(self, v):
+        """ Return the position of the next operation that needs v in
+        a register, or sys.maxint if there is none.
+        """
+        if self.uses is None:
+            return self.longevity[v][1]
+        positions = self.uses.get(v, None)
+        if positions is None:
+            return sys.maxint
+        # binary search for the first position >= self.position
+        lo = 0
+        hi = len(positions)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if positions[mid] < self.position:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(positions):
+            return sys.maxint
+        return positions[lo]
+
+    def _pick_free_reg(self, v):
+        """ Remove a register from 'free_regs' and return it, using the
+        hint of v if there is one.  Note that 'free_regs' must not be empty.
+        """
+        hint = self.hints.get(v, None)
+        if hint is not None:
+            for i in range(len(self.free_regs)):
+                if self.free_regs[i] is hint:
+                    del self.free_regs[i]
+                    return hint
+        if self.hinted_regs:
+            for i in range(len(self.free_regs) - 1, -1, -1):
+                reg = self.free_regs[i]
+                if reg not in self.hinted_regs:
+                    del self.free_regs[i]
+                    return reg
+        return self.free_regs.pop()
+
     def stays_alive(self, v):
         return self.longevity[v][1] > self.position
 
@@ -154,7 +213,7 @@ class RegisterManager(object):
             return self.reg_bindings[v]
         except KeyError:
             if self.free_regs:
-                loc = self.free_regs.pop()
+                loc = self._pick_free_reg(v)
                 self.reg_bindings[v] = loc
                 return loc
 
@@ -171,9 +230,12 @@ class RegisterManager(object):
 
     def _pick_variable_to_spill(self, v, forbidden_vars, selected_reg=None,
                                 need_lower_byte=False):
-        """ Slightly less silly algorithm.
+        """ Spill the variable whose next use is the furthest away.
+        Between two such variables, prefer the one that already has a
+        place in the frame, because spilling it costs no store.
         """
-        cur_max_age = -1
+        cur_next_use = -1
+        cur_clean = False
         candidate = None
         for next in self.reg_bindings:
             reg = self.reg_bindings[next]
@@ -186,9 +248,13 @@ class RegisterManager(object):
                     continue
             if need_lower_byte and reg in self.no_lower_byte_regs:
                 continue
-            max_age = self.longevity[next][1]
-            if cur_max_age < max_age:
-                cur_max_age = max_age
+            next_use = self.next_use(next)
+            clean = (self.frame_manager is not None and
+                     self.frame_manager.get(next) is not None)
+            if cur_next_use < next_use or (cur_next_use == next_use and
+                                           clean and not cur_clean):
+                cur_next_use = next_use
+                cur_clean = clean
                 candidate = next
         if candidate is None:
             raise NoVariableToSpill
@@ -277,15 +343,31 @@ class RegisterManager(object):
         del self.reg_bindings[from_v]
         self.reg_bindings[to_v] = reg
 
-    def _move_variable_away(self, v, prev_loc):
-        reg = None
+    def _move_variable_away(self, v, prev_loc, forbidden_vars=[]):
         if self.free_regs:
-            loc = self.free_regs.pop()
+            loc = self._pick_free_reg(v)
             self.reg_bindings[v] = loc
             self.assembler.regalloc_mov(prev_loc, loc)
-        else:
-            loc = self.frame_manager.loc(v)
-            self.assembler.regalloc_mov(prev_loc, loc)
+            return
+        if self.uses is not None:
+            # no free register: rather than putting v in the frame,
+            # spill the variable that is needed again the latest
+            try:
+                v_to_spill = self._pick_variable_to_spill(v, forbidden_vars)
+            except NoVariableToSpill:
+                v_to_spill = None
+            if (v_to_spill is not None and
+                    self.next_use(v_to_spill) > self.next_use(v)):
+                loc = self.reg_bindings[v_to_spill]
+                del self.reg_bindings[v_to_spill]
+                if self.frame_manager.get(v_to_spill) is None:
+                    newloc = self.frame_manager.loc(v_to_spill)
+                    self.assembler.regalloc_mov(loc, newloc)
+                self.reg_bindings[v] = loc
+                self.assembler.regalloc_mov(prev_loc, loc)
+                return
+        loc = self.frame_manager.loc(v)
+        self.assembler.regalloc_mov(prev_loc, loc)
 
     def force_result_in_reg(self, result_v, v, forbidden_vars=[]):
         """ Make sure that result is in the same register as v.
@@ -313,7 +395,7 @@ class RegisterManager(object):
             loc = self.reg_bindings[v]
             del self.reg_bindings[v]
             if self.frame_manager.get(v) is None:
-                self._move_variable_away(v, loc)
+                self._move_variable_away(v, loc, forbidden_vars)
             self.reg_bindings[result_v] = loc
         else:
             self._reallocate_from_to(v, result_v)
@@ -1,3 +1,4 @@
+import sys
 
 from pypy.jit.metainterp.history import BoxInt, ConstInt, BoxFloat, INT, FLOAT
 from pypy.jit.backend.llsupport.regalloc import FrameManager
@@ -346,3 +347,58 @@ class TestRegalloc(object):
         spilled2 = rm.force_allocate_reg(b5)
         assert spilled2 is loc
         rm._check_invariants()
+
+    def test_spilling_next_use(self):
+        # b3 lives longer than b0, but b0 is needed again later
+        b0, b1, b2, b3, b4 = newboxes(0, 1, 2, 3, 4)
+        longevity = {b0: (0, 8), b1: (0, 2), b2: (0, 2), b3: (0, 9),
+                     b4: (1, 2)}
+        uses = {b0: [8], b1: [2], b2: [2], b3: [3, 9], b4: [2]}
+        fm = TFrameManager()
+        asm = MockAsm()
+        rm = RegisterManager(longevity, frame_manager=fm, assembler=asm,
+                             uses=uses)
+        rm.next_instruction()
+        for b in b0, b1, b2, b3:
+            rm.force_allocate_reg(b)
+        rm.next_instruction()
+        loc = rm.loc(b0)
+        spilled = rm.force_allocate_reg(b4)
+        assert spilled is loc
+        assert rm.next_use(b3) == 3
+        assert rm.next_use(b1) == 2
+        rm._check_invariants()
+        rm.next_instruction()
+        rm.next_instruction()
+        assert rm.next_use(b1) == sys.maxint
+
+    def test_spilling_prefers_clean_vars(self):
+        b0, b1, b2, b3, b4 = newboxes(0, 1, 2, 3, 4)
+        longevity = {b0: (0, 5), b1: (0, 5), b2: (0, 5), b3: (0, 5),
+                     b4: (1, 2)}
+        uses = {b0: [5], b1: [5], b2: [5], b3: [5], b4: [2]}
+        fm = TFrameManager()
+        asm = MockAsm()
+        rm = RegisterManager(longevity, frame_manager=fm, assembler=asm,
+                             uses=uses)
+        rm.next_instruction()
+        for b in b0, b1, b2, b3:
+            rm.force_allocate_reg(b)
+        fm.loc(b2)     # b2 already has a copy in the frame
+        rm.next_instruction()
+        loc = rm.loc(b2)
+        spilled = rm.force_allocate_reg(b4)
+        assert spilled is loc
+        assert len(asm.moves) == 0
+        rm._check_invariants()
+
+    def test_hints(self):
+        b0, b1, b2 = newboxes(0, 1, 2)
+        longevity = {b0: (0, 1), b1: (0, 1), b2: (0, 1)}
+        rm = RegisterManager(longevity)
+        rm.set_hints({b0: r1, b1: r3})
+        rm.next_instruction()
+        assert rm.try_allocate_reg(b2) not in (r1, r3)
+        assert rm.try_allocate_reg(b1) is r3
+        assert rm.try_allocate_reg(b0) is r1
+        rm._check_invariants()
@@ -9,6 +9,9 @@ class AbstractCPU(object):
     # longlongs are supported by the JIT, but stored as doubles.
     # Boxes and Consts are BoxFloats and ConstFloats.
     supports_singlefloats = False
+    supports_vector_ops = False
+    # ^^^ If True, the VEC_xxx operations on BoxVectors are supported;
+    # see optimizeopt/vectorize.py.
 
     done_with_this_frame_void_v = -1
     done_with_this_frame_int_v = -1
@@ -6,7 +6,8 @@ from pypy.jit.metainterp.history import (AbstractFailDescr,
                                          LoopToken,
                                          ConstInt, ConstPtr,
                                          BoxObj, Const,
-                                         ConstObj, BoxFloat, ConstFloat)
+                                         ConstObj, BoxFloat, ConstFloat,
+                                         BoxVector)
 from pypy.jit.metainterp.resoperation import ResOperation, rop
 from pypy.jit.metainterp.typesystem import deref
 from pypy.jit.tool.oparser import parse
@@ -2403,6 +2404,52 @@ class LLtypeBackendTest(BaseBackendTest):
         assert a[5] == 12345
         lltype.free(a, flavor='raw')
 
+    def test_vector_ops(self):
+        if not self.cpu.supports_vector_ops:
+            py.test.skip("requires vector operations")
+        ARRAY = rffi.CArray(lltype.Float)
+        descr = self.cpu.arraydescrof(ARRAY)
+        a = lltype.malloc(ARRAY, 4, flavor='raw')
+        b = lltype.malloc(ARRAY, 8, flavor='raw')
+        for i in range(4):
+            a[i] = 1.5 * i
+        for i in range(8):
+            b[i] = 10.0 - i
+        abox = ConstInt(heaptracker.adr2int(llmemory.cast_ptr_to_adr(a)))
+        bbox = ConstInt(heaptracker.adr2int(llmemory.cast_ptr_to_adr(b)))
+        f0 = BoxFloat()
+        v1, v2, v3, v4, v5, v6, v7, v8, v9 = [BoxVector() for i in range(9)]
+        faildescr = BasicFailDescr(1)
+        operations = [
+            ResOperation(rop.VEC_GETARRAYITEM_RAW, [abox, ConstInt(1)], v1,
+                         descr=descr),
+            ResOperation(rop.VEC_GETARRAYITEM_RAW, [bbox, ConstInt(2)], v2,
+                         descr=descr),
+            ResOperation(rop.VEC_FLOAT_EXPAND, [f0], v3),
+            ResOperation(rop.VEC_FLOAT_EXPAND, [constfloat(0.5)], v4),
+            ResOperation(rop.VEC_FLOAT_ADD, [v1, v2], v5),
+            ResOperation(rop.VEC_FLOAT_MUL, [v5, v3], v6),
+            ResOperation(rop.VEC_FLOAT_SUB, [v6, v4], v7),
+            ResOperation(rop.VEC_FLOAT_NEG, [v7], v8),
+            ResOperation(rop.VEC_FLOAT_TRUEDIV, [v8, v1], v9),
+            ResOperation(rop.VEC_SETARRAYITEM_RAW, [bbox, ConstInt(5), v9],
+                         None, descr=descr),
+            ResOperation(rop.FINISH, [], None, descr=faildescr),
+            ]
+        looptoken = LoopToken()
+        self.cpu.compile_loop([f0], operations, looptoken)
+        self.cpu.set_future_value_float(0, longlong.getfloatstorage(2.0))
+        fail = self.cpu.execute_token(looptoken)
+        assert fail.identifier == 1
+        for i in range(2):
+            x = a[1 + i]
+            expected = -(((x + (8.0 - i)) * 2.0) - 0.5) / x
+            assert b[5 + i] == expected
+        assert b[4] == 6.0
+        assert b[7] == 3.0
+        lltype.free(a, flavor='raw')
+        lltype.free(b, flavor='raw')
+
     def test_redirect_call_assembler(self):
         called = []
         def assembler_helper(failindex, virtualizable):
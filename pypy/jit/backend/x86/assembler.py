@@ -3,7 +3,7 @@ from pypy.jit.backend.llsupport import symbolic
 from pypy.jit.backend.llsupport.asmmemmgr import MachineDataBlockWrapper
 from pypy.jit.metainterp.history import Const, Box, BoxInt, BoxPtr, BoxFloat
 from pypy.jit.metainterp.history import (AbstractFailDescr, INT, REF, FLOAT,
-                                         LoopToken)
+                                         VECTOR, LoopToken)
 from pypy.rpython.lltypesystem import lltype, rffi, rstr, llmemory
 from pypy.rpython.lltypesystem.lloperation import llop
 from pypy.rpython.annlowlevel import llhelper
@@ -178,12 +178,13 @@ class Assembler386(object):
         float_constants = datablockwrapper.malloc_aligned(32, alignment=16)
         datablockwrapper.done()
         addr = rffi.cast(rffi.CArrayPtr(lltype.Char), float_constants)
-        qword_padding = '\x00\x00\x00\x00\x00\x00\x00\x00'
         # 0x8000000000000000
         neg_const = '\x00\x00\x00\x00\x00\x00\x00\x80'
         # 0x7FFFFFFFFFFFFFFF
         abs_const = '\xFF\xFF\xFF\xFF\xFF\xFF\xFF\x7F'
-        data = neg_const + qword_padding + abs_const + qword_padding
+        # the constants are repeated in the upper half for the
+        # packed VEC_FLOAT_NEG and VEC_FLOAT_ABS
+        data = neg_const + neg_const + abs_const + abs_const
         for i in range(len(data)):
             addr[i] = data[i]
         self.float_const_neg_addr = float_constants
@@ -953,7 +954,14 @@ class Assembler386(object):
     # ------------------------------------------------------------
 
     def mov(self, from_loc, to_loc):
-        if (isinstance(from_loc, RegLoc) and from_loc.is_xmm) or (isinstance(to_loc, RegLoc) and to_loc.is_xmm):
+        if _is_vector_stackloc(from_loc) or _is_vector_stackloc(to_loc):
+            # the vectors in the stack are not 16-bytes-aligned
+            self.mc.MOVUPD(to_loc, from_loc)
+        elif (isinstance(from_loc, RegLoc) and from_loc.is_xmm and
+              isinstance(to_loc, RegLoc)):
+            # copy the whole register, which may contain a vector
+            self.mc.MOVAPD(to_loc, from_loc)
+        elif (isinstance(from_loc, RegLoc) and from_loc.is_xmm) or (isinstance(to_loc, RegLoc) and to_loc.is_xmm):
             self.mc.MOVSD(to_loc, from_loc)
         else:
             self.mc.MOV(to_loc, from_loc)
@@ -1325,6 +1333,21 @@ class Assembler386(object):
         # Following what gcc does: res = x & 0x7FFFFFFFFFFFFFFF
         self.mc.ANDPD(arglocs[0], heap(self.float_const_abs_addr))
 
+    genop_vec_float_add = _binaryop('ADDPD', True)
+    genop_vec_float_sub = _binaryop('SUBPD')
+    genop_vec_float_mul = _binaryop('MULPD', True)
+    genop_vec_float_truediv = _binaryop('DIVPD')
+    genop_vec_float_neg = genop_float_neg
+    genop_vec_float_abs = genop_float_abs
+
+    def genop_vec_float_expand(self, op, arglocs, resloc):
+        loc0, loc1 = arglocs
+        if loc1 is None:
+            # copy the low item of the register in the high item
+            self.mc.UNPCKLPD(loc0, loc0)
+        else:
+            self.mc.MOVAPD(loc0, loc1)
+
     def genop_cast_float_to_int(self, op, arglocs, resloc):
         self.mc.CVTTSD2SI(resloc, arglocs[0])
 
@@ -1620,6 +1643,18 @@ class Assembler386(object):
     genop_discard_setfield_raw = genop_discard_setfield_gc
     genop_discard_setarrayitem_raw = genop_discard_setarrayitem_gc
 
+    def genop_vec_getarrayitem_raw(self, op, arglocs, resloc):
+        base_loc, ofs_loc, size_loc, ofs = arglocs
+        scale = _get_scale(size_loc.value)
+        src_addr = addr_add(base_loc, ofs_loc, ofs.value, scale)
+        self.mc.MOVUPD(resloc, src_addr)
+
+    def genop_discard_vec_setarrayitem_raw(self, op, arglocs):
+        base_loc, ofs_loc, value_loc, size_loc, baseofs = arglocs
+        scale = _get_scale(size_loc.value)
+        dest_addr = AddressLoc(base_loc, ofs_loc, scale, baseofs.value)
+        self.mc.MOVUPD(dest_addr, value_loc)
+
     def genop_strlen(self, op, arglocs, resloc):
         base_loc = arglocs[0]
         basesize, itemsize, ofs_length = symbolic.get_array_token(rstr.STR,
@@ -2631,6 +2666,9 @@ def mem(loc, offset):
 def heap(addr):
     return AddressLoc(ImmedLoc(addr), ImmedLoc(0), 0, 0)
 
+def _is_vector_stackloc(loc):
+    return isinstance(loc, StackLoc) and loc.type == VECTOR
+
 def not_implemented(msg):
     os.write(2, '[x86/asm] %s\n' % msg)
     raise NotImplementedError(msg)
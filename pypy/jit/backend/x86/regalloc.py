@@ -5,7 +5,8 @@
 import os
 from pypy.jit.metainterp.history import (Box, Const, ConstInt, ConstPtr,
                                          ResOperation, BoxPtr, ConstFloat,
-                                         BoxFloat, LoopToken, INT, REF, FLOAT)
+                                         BoxFloat, LoopToken, INT, REF, FLOAT,
+                                         VECTOR, VECTOR_SIZE)
 from pypy.jit.backend.x86.regloc import *
 from pypy.rpython.lltypesystem import lltype, ll2ctypes, rffi, rstr
 from pypy.rlib.objectmodel import we_are_translated
@@ -84,7 +85,7 @@ class X86_64_RegisterManager(X86RegisterManager):
 
 class X86XMMRegisterManager(RegisterManager):
 
-    box_types = [FLOAT]
+    box_types = [FLOAT, VECTOR]
     all_regs = [xmm0, xmm1, xmm2, xmm3, xmm4, xmm5, xmm6, xmm7]
     # we never need lower byte I hope
     save_around_call_regs = all_regs
@@ -103,6 +104,14 @@ class X86XMMRegisterManager(RegisterManager):
         rffi.cast(rffi.CArrayPtr(longlong.FLOATSTORAGE), adr)[1] = y
         return ConstFloatLoc(adr)
 
+    def convert_to_imm_vector(self, c):
+        # the constant in all the items of a 16-bytes-aligned vector
+        adr = self.assembler.datablockwrapper.malloc_aligned(16, 16)
+        x = c.getfloatstorage()
+        for i in range(VECTOR_SIZE):
+            rffi.cast(rffi.CArrayPtr(longlong.FLOATSTORAGE), adr)[i] = x
+        return ConstFloatLoc(adr)
+
     def after_call(self, v):
         # the result is stored in st0, but we don't have this around,
         # so genop_call will move it to some frame location immediately
@@ -128,12 +137,17 @@ class X86FrameManager(FrameManager):
     def frame_pos(i, box_type):
         if IS_X86_32 and box_type == FLOAT:
             return StackLoc(i, get_ebp_ofs(i+1), 2, box_type)
+        elif box_type == VECTOR:
+            size = VECTOR_SIZE * 8 // WORD
+            return StackLoc(i, get_ebp_ofs(i+size-1), size, box_type)
         else:
             return StackLoc(i, get_ebp_ofs(i), 1, box_type)
     @staticmethod
     def frame_size(box_type):
         if IS_X86_32 and box_type == FLOAT:
             return 2
+        elif box_type == VECTOR:
+            return VECTOR_SIZE * 8 // WORD
         else:
             return 1
 
@@ -165,13 +179,15 @@ class RegAlloc(object):
         operations = cpu.gc_ll_descr.rewrite_assembler(cpu, operations,
                                                        allgcrefs)
         # compute longevity of variables
-        longevity = self._compute_vars_longevity(inputargs, operations)
+        longevity, uses = self._compute_vars_longevity(inputargs, operations)
         self.longevity = longevity
         self.rm = gpr_reg_mgr_cls(longevity,
                                   frame_manager = self.fm,
-                                  assembler = self.assembler)
+                                  assembler = self.assembler,
+                                  uses = uses)
         self.xrm = xmm_reg_mgr_cls(longevity, frame_manager = self.fm,
-                                   assembler = self.assembler)
+                                   assembler = self.assembler,
+                                   uses = uses)
         return operations
 
     def prepare_loop(self, inputargs, operations, looptoken, allgcrefs):
@@ -179,7 +195,12 @@ class RegAlloc(object):
         jump = operations[-1]
         loop_consts = self._compute_loop_consts(inputargs, jump, looptoken)
         self.loop_consts = loop_consts
-        return self._process_inputargs(inputargs), operations
+        arglocs = self._process_inputargs(inputargs)
+        if jump.getopnum() == rop.JUMP and jump.getdescr() is looptoken:
+            self._compute_jump_hints(jump, arglocs)
+        else:
+            self._compute_jump_hints(jump, None)
+        return arglocs, operations
 
     def prepare_bridge(self, prev_depths, inputargs, arglocs, operations,
                        allgcrefs):
@@ -188,8 +209,37 @@ class RegAlloc(object):
         self._update_bindings(arglocs, inputargs)
         self.fm.frame_depth = prev_depths[0]
         self.param_depth = prev_depths[1]
+        self._compute_jump_hints(operations[-1], None)
         return operations
 
+    def _compute_jump_hints(self, jump, target_arglocs):
+        # Ask the register managers to allocate the variables passed to
+        # the final JUMP directly in the registers where the target loop
+        # expects them, so that consider_jump() has fewer moves to do.
+        if jump.getopnum() != rop.JUMP:
+            return
+        if target_arglocs is None:
+            descr = jump.getdescr()
+            assert isinstance(descr, LoopToken)
+            target_arglocs = self.assembler.target_arglocs(descr)
+        nonfloatlocs, floatlocs = target_arglocs
+        hints = {}
+        xmmhints = {}
+        for i in range(jump.numargs()):
+            arg = jump.getarg(i)
+            if isinstance(arg, Const) or arg in hints or arg in xmmhints:
+                continue
+            if arg.type == FLOAT:
+                loc = floatlocs[i]
+                if isinstance(loc, RegLoc):
+                    xmmhints[arg] = loc
+            else:
+                loc = nonfloatlocs[i]
+                if isinstance(loc, RegLoc):
+                    hints[arg] = loc
+        self.rm.set_hints(hints)
+        self.xrm.set_hints(xmmhints)
+
     def reserve_param(self, n):
         self.param_depth = max(self.param_depth, n)
 
@@ -235,7 +285,7 @@ class RegAlloc(object):
         return nonfloatlocs, floatlocs
 
     def possibly_free_var(self, var):
-        if var.type == FLOAT:
+        if var.type == FLOAT or var.type == VECTOR:
             self.xrm.possibly_free_var(var)
         else:
             self.rm.possibly_free_var(var)
@@ -272,7 +322,7 @@ class RegAlloc(object):
                                               selected_reg, need_lower_byte)
 
     def force_spill_var(self, var):
-        if var.type == FLOAT:
+        if var.type == FLOAT or var.type == VECTOR:
             return self.xrm.force_spill_var(var)
         else:
             return self.rm.force_spill_var(var)
@@ -444,9 +494,12 @@ class RegAlloc(object):
 
     def _compute_vars_longevity(self, inputargs, operations):
         # compute a dictionary that maps variables to index in
-        # operations that is a "last-time-seen"
+        # operations that is a "last-time-seen", and a dictionary
+        # that maps variables to the sorted list of the indexes of
+        # the operations that use them as arguments
         produced = {}
         last_used = {}
+        uses = {}
         for i in range(len(operations)-1, -1, -1):
             op = operations[i]
             if op.result:
@@ -456,8 +509,12 @@ class RegAlloc(object):
                 produced[op.result] = i
             for j in range(op.numargs()):
                 arg = op.getarg(j)
-                if isinstance(arg, Box) and arg not in last_used:
-                    last_used[arg] = i
+                if isinstance(arg, Box):
+                    if arg not in last_used:
+                        last_used[arg] = i
+                    positions = uses.setdefault(arg, [])
+                    if not positions or positions[-1] != i:
+                        positions.append(i)
             if op.is_guard():
                 for arg in op.getfailargs():
                     if arg is None: # hole
@@ -481,12 +538,14 @@ class RegAlloc(object):
                 longevity[arg] = (0, last_used[arg])
                 del last_used[arg]
         assert len(last_used) == 0
-        return longevity
+        for positions in uses.itervalues():
+            positions.reverse()
+        return longevity, uses
 
     def loc(self, v):
         if v is None: # xxx kludgy
             return None
-        if v.type == FLOAT:
+        if v.type == FLOAT or v.type == VECTOR:
             return self.xrm.loc(v)
         return self.rm.loc(v)
 
@@ -693,6 +752,33 @@ class RegAlloc(object):
     consider_float_neg = _consider_float_unary_op
     consider_float_abs = _consider_float_unary_op
 
+    def _consider_vec_float_op(self, op):
+        # packed operations need their memory operands to be aligned,
+        # which the vectors in the stack are not
+        args = op.getarglist()
+        loc1 = self.xrm.make_sure_var_in_reg(op.getarg(1), args)
+        loc0 = self.xrm.force_result_in_reg(op.result, op.getarg(0), args)
+        self.Perform(op, [loc0, loc1], loc0)
+        self.xrm.possibly_free_vars_for_op(op)
+
+    consider_vec_float_add = _consider_vec_float_op
+    consider_vec_float_sub = _consider_vec_float_op
+    consider_vec_float_mul = _consider_vec_float_op
+    consider_vec_float_truediv = _consider_vec_float_op
+    consider_vec_float_neg = _consider_float_unary_op
+    consider_vec_float_abs = _consider_float_unary_op
+
+    def consider_vec_float_expand(self, op):
+        box = op.getarg(0)
+        if isinstance(box, Const):
+            loc1 = self.xrm.convert_to_imm_vector(box)
+            loc0 = self.xrm.force_allocate_reg(op.result)
+        else:
+            loc1 = None
+            loc0 = self.xrm.force_result_in_reg(op.result, box)
+        self.Perform(op, [loc0, loc1], loc0)
+        self.xrm.possibly_free_var(box)
+
     def consider_cast_float_to_int(self, op):
         loc0 = self.xrm.make_sure_var_in_reg(op.getarg(0))
         loc1 = self.rm.force_allocate_reg(op.result)
@@ -1131,6 +1217,26 @@ class RegAlloc(object):
     consider_getarrayitem_raw = consider_getarrayitem_gc
     consider_getarrayitem_gc_pure = consider_getarrayitem_gc
 
+    def consider_vec_getarrayitem_raw(self, op):
+        itemsize, ofs, _, _, _ = self._unpack_arraydescr(op.getdescr())
+        args = op.getarglist()
+        base_loc = self.rm.make_sure_var_in_reg(op.getarg(0), args)
+        ofs_loc = self.rm.make_sure_var_in_reg(op.getarg(1), args)
+        self.rm.possibly_free_vars_for_op(op)
+        result_loc = self.xrm.force_allocate_reg(op.result)
+        self.Perform(op, [base_loc, ofs_loc, imm(itemsize), imm(ofs)],
+                     result_loc)
+
+    def consider_vec_setarrayitem_raw(self, op):
+        itemsize, ofs, _, _, _ = self._unpack_arraydescr(op.getdescr())
+        args = op.getarglist()
+        base_loc = self.rm.make_sure_var_in_reg(op.getarg(0), args)
+        ofs_loc = self.rm.make_sure_var_in_reg(op.getarg(1), args)
+        value_loc = self.xrm.make_sure_var_in_reg(op.getarg(2), args)
+        self.possibly_free_vars(args)
+        self.PerformDiscard(op, [base_loc, ofs_loc, value_loc,
+                                 imm(itemsize), imm(ofs)])
+
     def consider_int_is_true(self, op, guard_op):
         # doesn't need arg to be in a register
         argloc = self.loc(op.getarg(0))
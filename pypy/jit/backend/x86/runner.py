@@ -20,6 +20,7 @@ class AbstractX86CPU(AbstractLLCPU):
     debug = True
     supports_floats = True
     supports_singlefloats = True
+    supports_vector_ops = True
 
     BOOTSTRAP_TP = lltype.FuncType([], lltype.Signed)
     dont_keepalive_stuff = False # for tests
@@ -201,6 +202,7 @@ class CPU386(AbstractX86CPU):
 class CPU386_NO_SSE2(CPU386):
     supports_floats = False
     supports_longlong = False
+    supports_vector_ops = False
 
 class CPU_X86_64(AbstractX86CPU):
     backend_name = 'x86_64'
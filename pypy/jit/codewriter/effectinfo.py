@@ -20,6 +20,7 @@ class EffectInfo(object):
     OS_NONE                     = 0    # normal case, no oopspec
     OS_ARRAYCOPY                = 1    # "list.ll_arraycopy"
     OS_STR2UNICODE              = 2    # "str.str2unicode"
+    OS_LIST_RESIZE_GE           = 3    # "list._resize_ge"
     #
     OS_STR_CONCAT               = 22   # "stroruni.concat"
     OS_STR_SLICE                = 23   # "stroruni.slice"
@@ -75,6 +76,12 @@ class EffectInfo(object):
     OS_LLONG_FROM_UINT          = 93
     #
     OS_MATH_SQRT                = 100
+    #
+    OS_DICT_NEW                 = 110  # "newdict"        (only for the
+    OS_DICT_SETITEM             = 111  # "dict.setitem"    string-key dicts)
+    OS_DICT_GETITEM             = 112  # "dict.getitem"
+    OS_DICT_CONTAINS            = 113  # "dict.contains"
+    OS_DICT_GET                 = 114  # "dict.get"
 
     def __new__(cls, readonly_descrs_fields, readonly_descrs_arrays,
                 write_descrs_fields, write_descrs_arrays,
@@ -339,6 +339,8 @@ class Transformer(object):
         # dispatch to various implementations depending on the oopspec_name
         if oopspec_name.startswith('list.') or oopspec_name == 'newlist':
             prepare = self._handle_list_call
+        elif oopspec_name.startswith('dict.') or oopspec_name == 'newdict':
+            prepare = self._handle_dict_call
         elif oopspec_name.startswith('stroruni.'):
             prepare = self._handle_stroruni_call
         elif oopspec_name == 'str.str2unicode':
@@ -1290,6 +1292,45 @@ class Transformer(object):
     do_resizable_void_list_getitem_foldable = do_resizable_void_list_getitem
     do_resizable_void_list_setitem = do_resizable_void_list_getitem
 
+    def do_resizable_list__resize_ge(self, op, args, arraydescr, lengthdescr,
+                                     itemsdescr, structdescr):
+        # a residual call, but the optimizer can do it on virtual lists
+        return self._handle_oopspec_call(op, args,
+                                         EffectInfo.OS_LIST_RESIZE_GE)
+
+    # ----------
+    # Dicts.
+
+    _dict_oopspecindex = {'newdict':       EffectInfo.OS_DICT_NEW,
+                          'dict.setitem':  EffectInfo.OS_DICT_SETITEM,
+                          'dict.getitem':  EffectInfo.OS_DICT_GETITEM,
+                          'dict.contains': EffectInfo.OS_DICT_CONTAINS,
+                          'dict.get':      EffectInfo.OS_DICT_GET}
+
+    def _handle_dict_call(self, op, oopspec_name, args):
+        """Turn the call to a dict-handling helper into a residual call
+        to the corresponding helper in support.py.  On the dicts with
+        string keys, the most common operations get an oopspecindex,
+        for the optimizer's virtual dicts.
+        """
+        op1 = self.prepare_builtin_call(op, oopspec_name, args)
+        if oopspec_name not in self._dict_oopspecindex:
+            return op1
+        if oopspec_name == 'newdict':
+            DICT = deref(op.result.concretetype)
+        else:
+            DICT = deref(args[0].concretetype)
+        if not self._is_dict_with_string_keys(DICT):
+            return op1
+        return self._handle_oopspec_call(op1, args,
+                                         self._dict_oopspecindex[oopspec_name])
+
+    def _is_dict_with_string_keys(self, DICT):
+        # only plain dicts: r_dicts have their own key equality
+        if not isinstance(DICT, lltype.GcStruct) or hasattr(DICT, 'fnkeyeq'):
+            return False
+        return DICT.entries.TO.OF.key == lltype.Ptr(rstr.STR)
+
     # ----------
     # Strings and Unicodes.
 
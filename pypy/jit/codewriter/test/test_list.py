@@ -216,6 +216,13 @@ def test_resizable_len():
     builtin_test('list.len', [varoftype(VARLIST)], lltype.Signed,
                  """getfield_gc_i %r0, <FieldDescr length> -> %i0""")
 
+def test_resizable_resize_ge():
+    builtin_test('list._resize_ge', [varoftype(VARLIST),
+                                     varoftype(lltype.Signed)],
+                 lltype.Void, """
+                     residual_call_ir_v $'myfunc', <CallDescrOS3>, I[%i0], R[%r0]
+                 """)
+
 def test_resizable_unsupportedop():
     builtin_test('list.foobar', [varoftype(VARLIST)], lltype.Signed,
                  NotSupported)
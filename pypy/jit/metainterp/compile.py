@@ -3,6 +3,7 @@ from pypy.rpython.lltypesystem import lltype
 from pypy.rpython.ootypesystem import ootype
 from pypy.objspace.flow.model import Constant, Variable
 from pypy.rlib.objectmodel import we_are_translated
+from pypy.rlib.rarithmetic import r_int64
 from pypy.rlib.debug import debug_start, debug_stop, debug_print
 from pypy.rlib import rstack
 from pypy.conftest import option
@@ -15,6 +16,7 @@ from pypy.jit.metainterp.history import BoxPtr, BoxObj, BoxFloat, Const
 from pypy.jit.metainterp import history
 from pypy.jit.metainterp.typesystem import llhelper, oohelper
 from pypy.jit.metainterp.optimize import InvalidLoop
+from pypy.jit.metainterp.jitprof import GUARD_FAILURES
 from pypy.jit.metainterp.resume import NUMBERING, PENDINGFIELDSP
 from pypy.jit.codewriter import heaptracker, longlong
 
@@ -94,8 +96,12 @@ def compile_new_loop(metainterp, old_loop_tokens, greenkey, start,
     """Try to compile a new loop by closing the current history back
     to the first operation.
     """
-    from pypy.jit.metainterp.optimize import optimize_loop
+    loop = create_loop_from_history(metainterp, start, start_resumedescr)
+    return optimize_and_compile_loop(metainterp.staticdata,
+                                     metainterp.jitdriver_sd, old_loop_tokens,
+                                     greenkey, loop, full_preamble_needed)
 
+def create_loop_from_history(metainterp, start, start_resumedescr):
     history = metainterp.history
     loop = create_empty_loop(metainterp)
     loop.inputargs = history.inputargs[:]
@@ -104,7 +110,6 @@ def compile_new_loop(metainterp, old_loop_tokens, greenkey, start,
     # make a copy, because optimize_loop can mutate the ops and descrs
     h_ops = history.operations
     loop.operations = [h_ops[i].clone() for i in range(start, len(h_ops))]
-    metainterp_sd = metainterp.staticdata
     jitdriver_sd = metainterp.jitdriver_sd
     loop_token = make_loop_token(len(loop.inputargs), jitdriver_sd)
     loop.token = loop_token
@@ -114,7 +119,13 @@ def compile_new_loop(metainterp, old_loop_tokens, greenkey, start,
     loop.preamble.inputargs = loop.inputargs
     loop.preamble.token = make_loop_token(len(loop.inputargs), jitdriver_sd)
     loop.preamble.start_resumedescr = start_resumedescr
+    return loop
+
+def optimize_and_compile_loop(metainterp_sd, jitdriver_sd, old_loop_tokens,
+                              greenkey, loop, full_preamble_needed=True):
+    from pypy.jit.metainterp.optimize import optimize_loop
 
+    loop_token = loop.token
     try:
         old_loop_token = optimize_loop(metainterp_sd, old_loop_tokens, loop,
                                        jitdriver_sd.warmstate.enable_opts)
@@ -122,7 +133,7 @@ def compile_new_loop(metainterp, old_loop_tokens, greenkey, start,
         debug_print("compile_new_loop: got an InvalidLoop")
         return None
     if old_loop_token is not None:
-        metainterp.staticdata.log("reusing old loop")
+        metainterp_sd.log("reusing old loop")
         return old_loop_token
 
     if loop.preamble.operations is not None:
@@ -151,6 +162,41 @@ def compile_new_loop(metainterp, old_loop_tokens, greenkey, start,
         record_loop_or_bridge(metainterp_sd, loop)
         return loop_token
 
+class DeferredLoop(object):
+    """A loop traced while the 'defer_compile' parameter is set.  It is
+    kept on the JitCell of 'greenkey' and only optimized and sent to the
+    backend if the loop gets hot a second time.  The JitCell only has a
+    weakref to it: it is kept alive by the memory manager until it gets old.
+    """
+    generation = r_int64(0)
+
+    def __init__(self, greenkey, loop):
+        self.greenkey = greenkey
+        self.loop = loop
+
+def defer_new_loop(metainterp, greenkey, start, start_resumedescr):
+    loop = create_loop_from_history(metainterp, start, start_resumedescr)
+    deferred_loop = DeferredLoop(greenkey, loop)
+    metainterp_sd = metainterp.staticdata
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        metainterp_sd.warmrunnerdesc.memory_manager.keep_deferred_loop_alive(
+            deferred_loop)
+    return deferred_loop
+
+def compile_deferred_loop(metainterp_sd, jitdriver_sd, deferred_loop):
+    greenkey = deferred_loop.greenkey
+    cell = jitdriver_sd.warmstate.jit_cell_at_key(greenkey)
+    old_loop_tokens = cell.get_compiled_merge_points()
+    debug_start("jit-deferred-compile")
+    try:
+        loop_token = optimize_and_compile_loop(metainterp_sd, jitdriver_sd,
+                                               old_loop_tokens, greenkey,
+                                               deferred_loop.loop)
+    finally:
+        debug_stop("jit-deferred-compile")
+    if loop_token is not None:
+        cell.set_compiled_merge_points(old_loop_tokens)
+
 def insert_loop_token(old_loop_tokens, loop_token):
     # Find where in old_loop_tokens we should insert this new loop_token.
     # The following algo means "as late as possible, but before another
@@ -295,11 +341,22 @@ def make_done_loop_tokens():
             }
 
 class ResumeDescr(AbstractFailDescr):
-    pass
+    wref_original_loop_token = None
+
+    def may_retrace(self):
+        return True
+
+# a guard must cause at least 1/RETRACE_MIN_SHARE of the failures of its
+# loop for a bridge starting from it to be allowed to retrace the loop
+RETRACE_MIN_SHARE = 4
 
 class ResumeGuardDescr(ResumeDescr):
     _counter = 0        # if < 0, there is one counter per value;
     _counters = None    # they get stored in _counters then.
+    # number of failures since the counters were last reset, and value of
+    # the 'guard_failures' of the loop at the first of them
+    _failures = 0
+    _loop_failures_start = 0
 
     # this class also gets the following attributes stored by resume.py code
     rd_snapshot = None
@@ -358,6 +415,7 @@ class ResumeGuardDescr(ResumeDescr):
     _trace_and_compile_from_bridge._dont_inline_ = True
 
     def must_compile(self, metainterp_sd, jitdriver_sd):
+        self.count_failure(metainterp_sd)
         trace_eagerness = jitdriver_sd.warmstate.trace_eagerness
         if self._counter >= 0:
             self._counter += 1
@@ -391,10 +449,40 @@ class ResumeGuardDescr(ResumeDescr):
                 assert 0, typetag
             return counter >= trace_eagerness
 
+    def count_failure(self, metainterp_sd):
+        metainterp_sd.profiler.count(GUARD_FAILURES)
+        looptoken = self.get_original_loop_token()
+        if looptoken is None:
+            return
+        if self._failures == 0:
+            self._loop_failures_start = looptoken.guard_failures
+        self._failures += 1
+        looptoken.guard_failures += 1
+
+    def get_original_loop_token(self):
+        if self.wref_original_loop_token is None:
+            return None
+        return self.wref_original_loop_token()
+
+    def may_retrace(self):
+        # Only give a new version of the loop to the guards that cause a
+        # fair share of the failures of the loop (and its bridges) since
+        # they started failing.  A loop whose shape flips between two
+        # states has its failures concentrated on a few guards; a guard
+        # that reaches 'trace_eagerness' slowly, while the other guards
+        # of the loop fail much more often, is a cold path that should
+        # not use up the 'retrace_limit' of the loop.
+        looptoken = self.get_original_loop_token()
+        if looptoken is None:
+            return True
+        loop_failures = looptoken.guard_failures - self._loop_failures_start
+        return self._failures * RETRACE_MIN_SHARE >= loop_failures
+
     def reset_counter_from_failure(self):
         if self._counter >= 0:
             self._counter = 0
         self._counters = None
+        self._failures = 0
 
     def compile_and_attach(self, metainterp, new_loop):
         # We managed to create a bridge.  Attach the new operations
@@ -633,6 +721,12 @@ def compile_new_bridge(metainterp, old_loop_tokens, resumekey, retraced=False):
         inline_short_preamble = False
     else:
         inline_short_preamble = True
+    if not retraced and not resumekey.may_retrace():
+        # a cold guard: if the virtual state at the end of the bridge does
+        # not match any version of the loop, jump to the preamble instead
+        # of retracing
+        debug_print("cold guard, retracing disabled for this bridge")
+        retraced = True
     try:
         target_loop_token = optimize_bridge(metainterp_sd, old_loop_tokens,
                                             new_loop, state.enable_opts,
@@ -324,6 +324,8 @@ def _make_execute_list():
                          rop.QUASIIMMUT_FIELD,
                          ):      # list of opcodes never executed by pyjitpl
                 continue
+            if key.startswith('VEC_'):
+                continue         # only produced by optimizeopt/vectorize
             raise AssertionError("missing %r" % (key,))
     return execute_by_num_args
 
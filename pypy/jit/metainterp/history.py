@@ -17,6 +17,9 @@ REF   = 'r'
 FLOAT = 'f'
 HOLE  = '_'
 VOID  = 'v'
+VECTOR = 'x'     # VECTOR_SIZE floats packed together, see BoxVector
+
+VECTOR_SIZE = 2
 
 FAILARGS_LIMIT = 1000
 
@@ -502,6 +505,8 @@ class Box(AbstractValue):
                     t = 'i'
                 elif self.type == FLOAT:
                     t = 'f'
+                elif self.type == VECTOR:
+                    t = 'v'
                 else:
                     t = 'p'
             except AttributeError:
@@ -682,6 +687,33 @@ class BoxObj(Box):
     _getrepr_ = repr_object
 
 
+class BoxVector(Box):
+    """VECTOR_SIZE floats, packed together in a single register.  Only the
+    vectorizer of the optimizer creates them, and it never puts them in
+    the inputargs, the jump arguments or the fail arguments of a loop:
+    so they never carry a value outside the backend."""
+    type = VECTOR
+    _attrs_ = ()
+
+    def forget_value(self):
+        pass
+
+    def clonebox(self):
+        return BoxVector()
+
+    def nonnull(self):
+        return True
+
+    def _get_hash_(self):
+        return 0
+
+    def _getrepr_(self):
+        return 'vector'
+
+    def repr_rpython(self):
+        return repr_rpython(self, 'bv')
+
+
 def set_future_values(cpu, boxes):
     for j in range(len(boxes)):
         boxes[j].set_future_value(cpu, j)
@@ -771,6 +803,7 @@ class LoopToken(AbstractDescr):
     short_preamble = None
     failed_states = None
     retraced_count = 0
+    guard_failures = 0  # failures of the guards of the loop and its bridges
     terminating = False # see TerminatingLoopToken in compile.py
     outermost_jitdriver_sd = None
     # and more data specified by the backend when the loop is compiled
@@ -23,6 +23,9 @@ ABORT_BRIDGE
 ABORT_ESCAPE
 ABORT_BAD_LOOP
 ABORT_FORCE_QUASIIMMUT
+DEFERRED_LOOPS
+GUARD_FAILURES
+RETRACES
 NVIRTUALS
 NVHOLES
 NVREUSED
@@ -182,6 +185,9 @@ class Profiler(BaseProfiler):
         self._print_intline("abort: bad loop", cnt[ABORT_BAD_LOOP])
         self._print_intline("abort: force quasi-immut",
                                                cnt[ABORT_FORCE_QUASIIMMUT])
+        self._print_intline("deferred loops", cnt[DEFERRED_LOOPS])
+        self._print_intline("guard failures", cnt[GUARD_FAILURES])
+        self._print_intline("retraces", cnt[RETRACES])
         self._print_intline("nvirtuals", cnt[NVIRTUALS])
         self._print_intline("nvholes", cnt[NVHOLES])
         self._print_intline("nvreused", cnt[NVREUSED])
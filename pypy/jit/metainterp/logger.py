@@ -5,7 +5,7 @@ from pypy.rlib.objectmodel import we_are_translated
 from pypy.rpython.lltypesystem import lltype, llmemory, rffi
 from pypy.jit.metainterp.resoperation import rop
 from pypy.jit.metainterp.history import Const, ConstInt, Box, \
-     BoxInt, ConstFloat, BoxFloat, AbstractFailDescr
+     BoxInt, ConstFloat, BoxFloat, BoxVector, AbstractFailDescr
 
 class Logger(object):
 
@@ -94,6 +94,8 @@ class LogOperations(object):
             return str(arg.getfloat())
         elif isinstance(arg, BoxFloat):
             return 'f' + str(mv)
+        elif isinstance(arg, BoxVector):
+            return 'v' + str(mv)
         elif arg is None:
             return 'None'
         else:
@@ -19,6 +19,11 @@ from pypy.rlib.objectmodel import we_are_translated
 # 'generation' field is much smaller than the current generation, and
 # removed from the set.
 #
+# The loops traced with the 'defer_compile' parameter but not compiled
+# yet are handled in the same way: the JitCell only has a weakref to its
+# DeferredLoop, and 'alive_deferred_loops' throws it away if the loop did
+# not get hot again before it became old.
+#
 
 class MemoryManager(object):
 
@@ -38,6 +43,7 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.alive_deferred_loops = {}
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -60,6 +66,14 @@ class MemoryManager(object):
             looptoken.generation = self.current_generation
             self.alive_loops[looptoken] = None
 
+    def keep_deferred_loop_alive(self, deferred_loop):
+        deferred_loop.generation = self.current_generation
+        self.alive_deferred_loops[deferred_loop] = None
+
+    def forget_deferred_loop(self, deferred_loop):
+        if deferred_loop in self.alive_deferred_loops:
+            del self.alive_deferred_loops[deferred_loop]
+
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
         oldtotal = len(self.alive_loops)
@@ -73,8 +87,15 @@ class MemoryManager(object):
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
+        olddeferred = len(self.alive_deferred_loops)
+        for deferred_loop in self.alive_deferred_loops.keys():
+            if 0 <= deferred_loop.generation < max_generation:
+                del self.alive_deferred_loops[deferred_loop]
+        newdeferred = len(self.alive_deferred_loops)
+        debug_print("Deferred loops freed: ", olddeferred - newdeferred)
         #print self.alive_loops.keys()
-        if not we_are_translated() and oldtotal != newtotal:
+        if not we_are_translated() and (oldtotal != newtotal or
+                                         olddeferred != newdeferred):
             looptoken = None
             from pypy.rlib import rgc
             # a single one is not enough for all tests :-(
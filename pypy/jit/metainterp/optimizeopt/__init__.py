@@ -24,6 +24,10 @@ ALL_OPTS_DICT = dict.fromkeys([name for name, _ in ALL_OPTS])
 ALL_OPTS_LIST = [name for name, _ in ALL_OPTS]
 ALL_OPTS_NAMES = ':'.join([name for name, _ in ALL_OPTS])
 
+# optimizations that are not part of 'all', and must be enabled explicitly,
+# e.g. with enable_opts=all:vectorize
+EXTRA_OPTS_DICT = dict.fromkeys(['vectorize'])
+
 def build_opt_chain(metainterp_sd, enable_opts,
                     inline_short_preamble=True, retraced=False):
     config = metainterp_sd.config
@@ -58,7 +62,9 @@ def optimize_loop_1(metainterp_sd, loop, enable_opts,
     optimizations, unroll = build_opt_chain(metainterp_sd, enable_opts,
                                             inline_short_preamble, retraced)
     if unroll:
-        optimize_unroll(metainterp_sd, loop, optimizations)
+        vectorize = ('vectorize' in enable_opts and
+                     metainterp_sd.cpu.supports_vector_ops)
+        optimize_unroll(metainterp_sd, loop, optimizations, vectorize)
     else:
         optimizer = Optimizer(metainterp_sd, loop, optimizations, bridge)
         optimizer.propagate_all_forward()
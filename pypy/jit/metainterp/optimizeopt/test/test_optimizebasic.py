@@ -3154,6 +3154,176 @@ class BaseTestOptimizeBasic(BaseTestBasic):
         '''
         self.optimize_loop(ops, expected)
 
+    def test_list_resize_ge_virtual(self):
+        ops = '''
+        [i0]
+        p0 = new(descr=listsize)
+        p1 = new_array(0, descr=arraydescr)
+        setfield_gc(p0, 0, descr=listlengthdescr)
+        setfield_gc(p0, p1, descr=listitemsdescr)
+        call(0, p0, 1, descr=listresizegedescr)
+        guard_no_exception() []
+        p2 = getfield_gc(p0, descr=listitemsdescr)
+        setarrayitem_gc(p2, 0, i0, descr=arraydescr)
+        call(0, p0, 2, descr=listresizegedescr)
+        guard_no_exception() []
+        p3 = getfield_gc(p0, descr=listitemsdescr)
+        setarrayitem_gc(p3, 1, 5, descr=arraydescr)
+        i1 = getarrayitem_gc(p3, 0, descr=arraydescr)
+        i2 = getfield_gc(p0, descr=listlengthdescr)
+        i3 = int_add(i1, i2)
+        jump(i3)
+        '''
+        expected = '''
+        [i0]
+        i3 = int_add(i0, 2)
+        jump(i3)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_list_resize_ge_escape(self):
+        ops = '''
+        [i0]
+        p0 = new(descr=listsize)
+        p1 = new_array(0, descr=arraydescr)
+        setfield_gc(p0, 0, descr=listlengthdescr)
+        setfield_gc(p0, p1, descr=listitemsdescr)
+        call(0, p0, 1, descr=listresizegedescr)
+        guard_no_exception() []
+        p2 = getfield_gc(p0, descr=listitemsdescr)
+        setarrayitem_gc(p2, 0, i0, descr=arraydescr)
+        escape(p0)
+        jump(i0)
+        '''
+        expected = '''
+        [i0]
+        p0 = new(descr=listsize)
+        setfield_gc(p0, 1, descr=listlengthdescr)
+        p2 = new_array(4, descr=arraydescr)
+        setarrayitem_gc(p2, 0, i0, descr=arraydescr)
+        setfield_gc(p0, p2, descr=listitemsdescr)
+        escape(p0)
+        jump(i0)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_list_resize_ge_not_virtual(self):
+        ops = '''
+        [p0, i0]
+        call(0, p0, i0, descr=listresizegedescr)
+        guard_no_exception() []
+        jump(p0, i0)
+        '''
+        self.optimize_loop(ops, ops)
+
+    def test_dict_virtual(self):
+        ops = '''
+        [i0]
+        p0 = call(0, descr=dictnewdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        guard_no_exception() []
+        i1 = call(0, p0, s"abc", descr=dictgetitemdescr)
+        guard_no_exception() []
+        i2 = call(0, p0, s"abc", descr=dictcontainsdescr)
+        i3 = call(0, p0, s"xyz", descr=dictcontainsdescr)
+        i4 = call(0, p0, s"xyz", 5, descr=dictgetdescr)
+        i5 = int_add(i1, i2)
+        i6 = int_add(i5, i3)
+        i7 = int_add(i6, i4)
+        jump(i7)
+        '''
+        expected = '''
+        [i0]
+        i5 = int_add(i0, 1)
+        i7 = int_add(i5, 5)
+        jump(i7)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_dict_virtual_fail_args(self):
+        ops = '''
+        [i0, i1]
+        p0 = call(0, descr=dictnewdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        guard_no_exception() []
+        guard_true(i1) [p0]
+        jump(i0, i1)
+        '''
+        expected = '''
+        [i0, i1]
+        guard_true(i1) [i0]
+        jump(i0, 1)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_dict_escape(self):
+        ops = '''
+        [i0]
+        p0 = call(0, descr=dictnewdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        guard_no_exception() []
+        call(0, p0, s"def", 7, descr=dictsetitemdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", 8, descr=dictsetitemdescr)
+        guard_no_exception() []
+        escape(p0)
+        jump(i0)
+        '''
+        expected = '''
+        [i0]
+        p0 = call(0, descr=dictnewdescr)
+        call(0, p0, s"abc", 8, descr=dictsetitemdescr)
+        call(0, p0, s"def", 7, descr=dictsetitemdescr)
+        escape(p0)
+        jump(i0)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_dict_nonconstant_key(self):
+        ops = '''
+        [p1, i0]
+        p0 = call(0, descr=dictnewdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        guard_no_exception() []
+        i1 = call(0, p0, p1, descr=dictgetitemdescr)
+        guard_no_exception() []
+        jump(p1, i1)
+        '''
+        expected = '''
+        [p1, i0]
+        p0 = call(0, descr=dictnewdescr)
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        i1 = call(0, p0, p1, descr=dictgetitemdescr)
+        guard_no_exception() []
+        jump(p1, i1)
+        '''
+        self.optimize_loop(ops, expected)
+
+    def test_dict_getitem_missing_key(self):
+        ops = '''
+        [i0]
+        p0 = call(0, descr=dictnewdescr)
+        guard_no_exception() []
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        guard_no_exception() []
+        i1 = call(0, p0, s"xyz", descr=dictgetitemdescr)
+        guard_exception(ConstClass(node_vtable)) []
+        jump(i0)
+        '''
+        expected = '''
+        [i0]
+        p0 = call(0, descr=dictnewdescr)
+        call(0, p0, s"abc", i0, descr=dictsetitemdescr)
+        i1 = call(0, p0, s"xyz", descr=dictgetitemdescr)
+        guard_exception(ConstClass(node_vtable)) []
+        jump(i0)
+        '''
+        self.optimize_loop(ops, expected)
+
     def test_bound_lt(self):
         ops = """
         [i0]
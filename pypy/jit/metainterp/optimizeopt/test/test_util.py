@@ -183,6 +183,27 @@ class LLtypeMixin(object):
     arraycopydescr = cpu.calldescrof(FUNC, FUNC.ARGS, FUNC.RESULT,
              EffectInfo([], [], [], [], oopspecindex=EffectInfo.OS_ARRAYCOPY))
 
+    # a resizable list of Signed, as in rpython/lltypesystem/rlist.py
+    LIST = lltype.GcStruct('LIST', ('length', lltype.Signed),
+                           ('items', lltype.Ptr(lltype.GcArray(lltype.Signed))))
+    listsize = cpu.sizeof(LIST)
+    listlengthdescr = cpu.fielddescrof(LIST, 'length')
+    listitemsdescr = cpu.fielddescrof(LIST, 'items')
+    listresizegedescr = cpu.calldescrof(FUNC, FUNC.ARGS, FUNC.RESULT,
+        EffectInfo([], [], [], [], oopspecindex=EffectInfo.OS_LIST_RESIZE_GE))
+
+    for _name, _os in [
+        ('dictnewdescr',        'OS_DICT_NEW'),
+        ('dictsetitemdescr',    'OS_DICT_SETITEM'),
+        ('dictgetitemdescr',    'OS_DICT_GETITEM'),
+        ('dictcontainsdescr',   'OS_DICT_CONTAINS'),
+        ('dictgetdescr',        'OS_DICT_GET'),
+        ]:
+        locals()[_name] = \
+            cpu.calldescrof(FUNC, FUNC.ARGS, FUNC.RESULT,
+                EffectInfo([], [], [], [],
+                           oopspecindex=getattr(EffectInfo, _os)))
+
     for _name, _os in [
         ('strconcatdescr',               'OS_STR_CONCAT'),
         ('strslicedescr',                'OS_STR_SLICE'),
@@ -0,0 +1,149 @@
+from pypy.jit.metainterp.optimizeopt.test.test_util import LLtypeMixin
+from pypy.jit.metainterp.optimizeopt.test.test_optimizeopt import (
+    BaseTestWithUnroll)
+from pypy.jit.metainterp.optimizeopt.vectorize import VECTOR_BYTES
+
+
+class BaseTestVectorize(BaseTestWithUnroll):
+
+    enable_opts = "intbounds:rewrite:virtualize:string:heap:unroll:vectorize"
+
+    def test_add_arrays(self):
+        ops = """
+        [i0, i1, i2, i3, i4]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        f6 = getarrayitem_raw(i2, i0, descr=floatarraydescr)
+        f7 = float_add(f5, f6)
+        setarrayitem_raw(i3, i0, f7, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i1, i2, i3, i4]
+        jump(i8, i1, i2, i3, i4)
+        """
+        expected = """
+        [i0, i1, i2, i3, i4]
+        i10 = int_add(i0, 1)
+        i11 = int_lt(i10, i4)
+        guard_true(i11) []
+        i12 = int_sub(i3, i1)
+        i13 = int_add(i12, %(shift)d)
+        i14 = uint_lt(i13, %(limit)d)
+        i15 = int_ne(i12, 0)
+        i16 = int_and(i14, i15)
+        guard_false(i16) []
+        i17 = int_sub(i3, i2)
+        i18 = int_add(i17, %(shift)d)
+        i19 = uint_lt(i18, %(limit)d)
+        i20 = int_ne(i17, 0)
+        i21 = int_and(i19, i20)
+        guard_false(i21) []
+        v5 = vec_getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        v6 = vec_getarrayitem_raw(i2, i0, descr=floatarraydescr)
+        v7 = vec_float_add(v5, v6)
+        vec_setarrayitem_raw(i3, i0, v7, descr=floatarraydescr)
+        i8 = int_add(i0, 2)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i1, i2, i3, i4]
+        jump(i8, i1, i2, i3, i4)
+        """ % {'shift': VECTOR_BYTES - 1, 'limit': 2 * VECTOR_BYTES - 1}
+        self.optimize_loop(ops, expected)
+
+    def test_invariant_operand(self):
+        ops = """
+        [i0, i1, i3, i4, f2]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        f6 = float_mul(f5, f2)
+        f7 = float_neg(f6)
+        setarrayitem_raw(i1, i0, f7, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i1, i3, i4, f2]
+        jump(i8, i1, i3, i4, f2)
+        """
+        expected = """
+        [i0, i1, i3, i4, f2]
+        i10 = int_add(i0, 1)
+        i11 = int_lt(i10, i4)
+        guard_true(i11) []
+        v5 = vec_getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        v2 = vec_float_expand(f2)
+        v6 = vec_float_mul(v5, v2)
+        v7 = vec_float_neg(v6)
+        vec_setarrayitem_raw(i1, i0, v7, descr=floatarraydescr)
+        i8 = int_add(i0, 2)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i1, i3, i4, f2]
+        jump(i8, i1, i3, i4, f2)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_scalar_result_escapes(self):
+        ops = """
+        [i0, i1, i2, i4]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        f6 = float_abs(f5)
+        setarrayitem_raw(i2, i0, f6, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, f6]
+        jump(i8, i1, i2, i4)
+        """
+        expected = """
+        [i0, i1, i2, i4]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        f6 = float_abs(f5)
+        setarrayitem_raw(i2, i0, f6, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, f6]
+        jump(i8, i1, i2, i4)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_overlapping_constant_arrays(self):
+        ops = """
+        [i0, i4]
+        f5 = getarrayitem_raw(1000, i0, descr=floatarraydescr)
+        setarrayitem_raw(1008, i0, f5, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i4]
+        jump(i8, i4)
+        """
+        expected = """
+        [i0, i4]
+        f5 = getarrayitem_raw(1000, i0, descr=floatarraydescr)
+        setarrayitem_raw(1008, i0, f5, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i4]
+        jump(i8, i4)
+        """
+        self.optimize_loop(ops, expected)
+
+    def test_not_a_simple_loop(self):
+        ops = """
+        [i0, i1, i2, i4]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        setarrayitem_raw(i2, i0, f5, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i6 = int_add(i1, 8)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i6]
+        jump(i8, i6, i2, i4)
+        """
+        expected = """
+        [i0, i1, i2, i4]
+        f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+        setarrayitem_raw(i2, i0, f5, descr=floatarraydescr)
+        i8 = int_add(i0, 1)
+        i6 = int_add(i1, 8)
+        i9 = int_lt(i8, i4)
+        guard_true(i9) [i8, i6]
+        jump(i8, i6, i2, i4)
+        """
+        self.optimize_loop(ops, expected)
+
+
+class TestLLtype(BaseTestVectorize, LLtypeMixin):
+    pass
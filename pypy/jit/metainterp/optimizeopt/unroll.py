@@ -6,6 +6,7 @@ from pypy.jit.metainterp.jitexc import JitException
 from pypy.jit.metainterp.optimize import InvalidLoop, RetraceLoop
 from pypy.jit.metainterp.optimizeopt.optimizer import *
 from pypy.jit.metainterp.optimizeopt.generalize import KillHugeIntBounds
+from pypy.jit.metainterp.optimizeopt.vectorize import LoopVectorizer
 from pypy.jit.metainterp.resoperation import rop, ResOperation
 from pypy.jit.metainterp.resume import Snapshot
 from pypy.rlib.debug import debug_print
@@ -13,8 +14,8 @@ import sys, os
 
 # FIXME: Introduce some VirtualOptimizer super class instead
 
-def optimize_unroll(metainterp_sd, loop, optimizations):
-    opt = UnrollOptimizer(metainterp_sd, loop, optimizations)
+def optimize_unroll(metainterp_sd, loop, optimizations, vectorize=False):
+    opt = UnrollOptimizer(metainterp_sd, loop, optimizations, vectorize)
     opt.propagate_all_forward()
 
 class Inliner(object):
@@ -76,8 +77,9 @@ class UnrollOptimizer(Optimization):
     become the preamble or entry bridge (don't think there is a
     distinction anymore)"""
 
-    def __init__(self, metainterp_sd, loop, optimizations):
+    def __init__(self, metainterp_sd, loop, optimizations, vectorize=False):
         self.optimizer = Optimizer(metainterp_sd, loop, optimizations)
+        self.vectorize = vectorize
         self.cloned_operations = []
         for op in self.optimizer.loop.operations:
             newop = op.clone()
@@ -214,6 +216,11 @@ class UnrollOptimizer(Optimization):
             loop.preamble.operations.append(jmp)
 
             loop.operations = self.optimizer.newoperations
+            if self.vectorize:
+                vectorizer = LoopVectorizer(self.optimizer,
+                                            self.start_resumedescr)
+                if vectorizer.vectorize(loop):
+                    debug_print('vectorized loop')
             maxguards = self.optimizer.metainterp_sd.warmrunnerdesc.memory_manager.max_retrace_guards
             
             if self.optimizer.emitted_guards > maxguards:
@@ -0,0 +1,286 @@
+from pypy.jit.metainterp.history import BoxInt, BoxVector, Const, ConstInt
+from pypy.jit.metainterp.history import FLOAT, VECTOR_SIZE
+from pypy.jit.metainterp.resoperation import rop, ResOperation
+from pypy.rpython.lltypesystem import lltype, rffi
+
+# Turns the loops that compute, item by item, an elementwise expression
+# over raw arrays of floats into loops that compute VECTOR_SIZE items
+# per iteration with VEC_xxx operations.  This is the shape of the loops
+# produced by micronumpy:
+#
+#    [i0, i1, i2, i3, i4]
+#    f5 = getarrayitem_raw(i1, i0, descr=floatarraydescr)
+#    f6 = getarrayitem_raw(i2, i0, descr=floatarraydescr)
+#    f7 = float_add(f5, f6)
+#    setarrayitem_raw(i3, i0, f7, descr=floatarraydescr)
+#    i8 = int_add(i0, 1)
+#    i9 = int_lt(i8, i4)
+#    guard_true(i9) [...]
+#    jump(i8, i1, i2, i3, i4)
+#
+# The vectorized loop starts with guards checking that there are at least
+# VECTOR_SIZE items left, and that no array is stored into less than
+# VECTOR_SIZE items away from another one.  These guards use the resume
+# data of the start of the loop: when they fail, nothing has been done
+# yet in the current iteration, and the interpreter (or, later, a bridge)
+# computes the remaining items one by one.
+
+FLOAT_SIZE = rffi.sizeof(lltype.Float)
+VECTOR_BYTES = VECTOR_SIZE * FLOAT_SIZE
+
+vector_opnum = {rop.FLOAT_ADD:      rop.VEC_FLOAT_ADD,
+                rop.FLOAT_SUB:      rop.VEC_FLOAT_SUB,
+                rop.FLOAT_MUL:      rop.VEC_FLOAT_MUL,
+                rop.FLOAT_TRUEDIV:  rop.VEC_FLOAT_TRUEDIV,
+                rop.FLOAT_NEG:      rop.VEC_FLOAT_NEG,
+                rop.FLOAT_ABS:      rop.VEC_FLOAT_ABS}
+
+
+class NotVectorizable(Exception):
+    pass
+
+
+class LoopVectorizer(object):
+    """Vectorizes the peeled loop built by the UnrollOptimizer, in place.
+    'start_resumedescr' is the resume data of the start of the loop."""
+
+    def __init__(self, optimizer, start_resumedescr):
+        self.optimizer = optimizer
+        self.start_resumedescr = start_resumedescr
+
+    def vectorize(self, loop):
+        try:
+            self.analyze(loop)
+        except NotVectorizable:
+            return False
+        loop.operations = self.rewrite(loop)
+        return True
+
+    # ----------
+
+    def analyze(self, loop):
+        operations = loop.operations
+        jumpop = operations[-1]
+        if (jumpop.getopnum() != rop.JUMP or
+            jumpop.numargs() != len(loop.inputargs)):
+            raise NotVectorizable
+        # the loop must have a single index variable, incremented by 1;
+        # all the other inputargs are loop invariants
+        self.invariants = {}
+        self.index = None
+        self.nextindex = None
+        for i in range(len(loop.inputargs)):
+            box = loop.inputargs[i]
+            if jumpop.getarg(i) is box:
+                self.invariants[box] = None
+            elif self.index is None:
+                self.index = box
+                self.nextindex = jumpop.getarg(i)
+            else:
+                raise NotVectorizable
+        if self.index is None or self.index in self.invariants:
+            raise NotVectorizable
+        self.check_start_resumedescr()
+        #
+        self.vectors = {}     # float results of the loop -> None
+        self.load_bases = []
+        self.store_bases = []
+        self.arraydescr = None
+        self.incrop = None
+        self.exitguard = None
+        self.lengthbox = None
+        for i in range(len(operations) - 1):
+            op = operations[i]
+            opnum = op.getopnum()
+            if opnum == rop.DEBUG_MERGE_POINT:
+                continue
+            elif opnum == rop.GETARRAYITEM_RAW:
+                self.check_array_access(op, self.load_bases)
+                self.vectors[op.result] = None
+            elif opnum == rop.SETARRAYITEM_RAW:
+                self.check_array_access(op, self.store_bases)
+                self.check_float_arg(op.getarg(2))
+            elif opnum in vector_opnum:
+                for j in range(op.numargs()):
+                    self.check_float_arg(op.getarg(j))
+                self.vectors[op.result] = None
+            elif opnum == rop.INT_ADD and op.result is self.nextindex:
+                if (self.incrop is not None or
+                    op.getarg(0) is not self.index or
+                    not self.is_constint(op.getarg(1), 1)):
+                    raise NotVectorizable
+                self.incrop = op
+            elif opnum == rop.INT_LT and i + 1 < len(operations) - 1:
+                guard = operations[i + 1]
+                if (self.exitguard is not None or
+                    guard.getopnum() != rop.GUARD_TRUE or
+                    guard.getarg(0) is not op.result or
+                    op.getarg(0) is not self.nextindex or
+                    not self.is_invariant(op.getarg(1))):
+                    raise NotVectorizable
+                self.lengthbox = op.getarg(1)
+                self.exitguard = guard
+            elif op.is_guard() and op is self.exitguard:
+                continue
+            else:
+                raise NotVectorizable
+        if (self.incrop is None or self.exitguard is None or
+            len(self.store_bases) == 0):
+            raise NotVectorizable
+        # the scalar values computed by the loop do not exist any more
+        # after vectorization, and the old index is not the one of the
+        # last item computed
+        for box in self.exitguard.getfailargs():
+            if box is self.index or box in self.vectors:
+                raise NotVectorizable
+        # the pairs of arrays that must not overlap
+        self.overlap_checks = []
+        bases = self.store_bases[:]
+        for base in self.load_bases:
+            if base not in bases:
+                bases.append(base)
+        for i in range(len(self.store_bases)):
+            base = self.store_bases[i]
+            for otherbase in bases[i + 1:]:
+                if isinstance(base, Const) and isinstance(otherbase, Const):
+                    if self.overlap(base.getint() - otherbase.getint()):
+                        raise NotVectorizable
+                else:
+                    self.overlap_checks.append((base, otherbase))
+
+    def check_start_resumedescr(self):
+        snapshot = self.start_resumedescr.rd_snapshot
+        while snapshot is not None:
+            for box in snapshot.boxes:
+                if (not isinstance(box, Const) and
+                    box not in self.invariants and box is not self.index):
+                    raise NotVectorizable
+            snapshot = snapshot.prev
+
+    def check_array_access(self, op, bases):
+        descr = op.getdescr()
+        if not descr.is_array_of_floats():
+            raise NotVectorizable
+        if self.arraydescr is None:
+            self.arraydescr = descr
+        elif descr is not self.arraydescr:
+            raise NotVectorizable
+        base = op.getarg(0)
+        if op.getarg(1) is not self.index or not self.is_invariant(base):
+            raise NotVectorizable
+        for otherbase in bases:
+            if otherbase is base:
+                return
+        bases.append(base)
+
+    def check_float_arg(self, box):
+        if box.type != FLOAT:
+            raise NotVectorizable
+        if box not in self.vectors and not self.is_invariant(box):
+            raise NotVectorizable
+
+    def is_invariant(self, box):
+        return isinstance(box, Const) or box in self.invariants
+
+    def is_constint(self, box, value):
+        return isinstance(box, ConstInt) and box.getint() == value
+
+    # ----------
+
+    def rewrite(self, loop):
+        self.newops = []
+        self.vectormap = {}
+        prologue_done = False
+        operations = loop.operations
+        for i in range(len(operations)):
+            op = operations[i]
+            opnum = op.getopnum()
+            if opnum == rop.DEBUG_MERGE_POINT:
+                self.newops.append(op)
+                continue
+            if not prologue_done:
+                self.emit_prologue()
+                prologue_done = True
+            if opnum == rop.GETARRAYITEM_RAW:
+                vbox = BoxVector()
+                self.vectormap[op.result] = vbox
+                self.newops.append(ResOperation(rop.VEC_GETARRAYITEM_RAW,
+                                                op.getarglist(), vbox,
+                                                op.getdescr()))
+            elif opnum == rop.SETARRAYITEM_RAW:
+                args = [op.getarg(0), op.getarg(1),
+                        self.get_vector(op.getarg(2))]
+                self.newops.append(ResOperation(rop.VEC_SETARRAYITEM_RAW,
+                                                args, None, op.getdescr()))
+            elif opnum in vector_opnum:
+                args = [self.get_vector(op.getarg(j))
+                        for j in range(op.numargs())]
+                vbox = BoxVector()
+                self.vectormap[op.result] = vbox
+                self.newops.append(ResOperation(vector_opnum[opnum], args,
+                                                vbox))
+            elif op is self.incrop:
+                self.newops.append(ResOperation(rop.INT_ADD,
+                                                [self.index,
+                                                 ConstInt(VECTOR_SIZE)],
+                                                op.result))
+            else:
+                self.newops.append(op)
+        return self.newops
+
+    def emit_prologue(self):
+        # enough items left?
+        lastindex = BoxInt()
+        self.newops.append(ResOperation(rop.INT_ADD,
+                                        [self.index,
+                                         ConstInt(VECTOR_SIZE - 1)],
+                                        lastindex))
+        cond = BoxInt()
+        self.newops.append(ResOperation(rop.INT_LT,
+                                        [lastindex, self.lengthbox], cond))
+        self.emit_guard(rop.GUARD_TRUE, cond)
+        for base1, base2 in self.overlap_checks:
+            self.emit_overlap_check(base1, base2)
+
+    def overlap(self, diff):
+        # the arrays may start at the same address, or at least
+        # VECTOR_BYTES away from each other
+        return diff != 0 and -VECTOR_BYTES < diff < VECTOR_BYTES
+
+    def emit_overlap_check(self, base1, base2):
+        # the same as overlap(), computed at runtime
+        diff = BoxInt()
+        self.newops.append(ResOperation(rop.INT_SUB, [base1, base2], diff))
+        shifted = BoxInt()
+        self.newops.append(ResOperation(rop.INT_ADD,
+                                        [diff, ConstInt(VECTOR_BYTES - 1)],
+                                        shifted))
+        close = BoxInt()
+        self.newops.append(ResOperation(rop.UINT_LT,
+                                        [shifted,
+                                         ConstInt(2 * VECTOR_BYTES - 1)],
+                                        close))
+        distinct = BoxInt()
+        self.newops.append(ResOperation(rop.INT_NE, [diff, ConstInt(0)],
+                                        distinct))
+        overlap = BoxInt()
+        self.newops.append(ResOperation(rop.INT_AND, [close, distinct],
+                                        overlap))
+        self.emit_guard(rop.GUARD_FALSE, overlap)
+
+    def emit_guard(self, opnum, box):
+        descr = self.start_resumedescr.clone_if_mutable()
+        op = ResOperation(opnum, [box], None, descr)
+        op = self.optimizer.store_final_boxes_in_guard(op)
+        self.newops.append(op)
+
+    def get_vector(self, box):
+        try:
+            return self.vectormap[box]
+        except KeyError:
+            pass
+        # a loop invariant: put it in all the items of a vector
+        vbox = BoxVector()
+        self.newops.append(ResOperation(rop.VEC_FLOAT_EXPAND, [box], vbox))
+        self.vectormap[box] = vbox
+        return vbox
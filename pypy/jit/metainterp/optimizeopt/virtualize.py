@@ -1,11 +1,15 @@
+from pypy.jit.codewriter.effectinfo import EffectInfo
 from pypy.jit.codewriter.heaptracker import vtable2descr
 from pypy.jit.metainterp.executor import execute
-from pypy.jit.metainterp.history import Const, ConstInt, BoxInt
+from pypy.jit.metainterp.history import Const, ConstInt, BoxInt, BoxPtr
+from pypy.jit.metainterp.history import REF, VOID
 from pypy.jit.metainterp.optimizeopt import optimizer
 from pypy.jit.metainterp.optimizeopt.util import (make_dispatcher_method,
     descrlist_dict, sort_descrs)
 from pypy.jit.metainterp.resoperation import rop, ResOperation
 from pypy.rlib.objectmodel import we_are_translated
+from pypy.rpython.annlowlevel import hlstr
+from pypy.rpython.lltypesystem import lltype, rstr
 from pypy.jit.metainterp.optimizeopt.optimizer import OptValue
 
 
@@ -269,6 +273,94 @@ class VArrayValue(AbstractVirtualValue):
     def _make_virtual(self, modifier):
         return modifier.make_varray(self.arraydescr)
 
+class VDictValue(AbstractVirtualValue):
+    """A dict with string keys, built by the 'newdict' call 'source_op',
+    in which all the items so far were stored with constant keys.  Any
+    other operation on it forces it."""
+
+    def __init__(self, optimizer, keybox, source_op=None):
+        AbstractVirtualValue.__init__(self, optimizer, keybox, source_op)
+        self._keys = []       # the constant keys, in insertion order
+        self._values = []     # the OptValues stored with these keys,
+                              # or None if the values are Void
+        self._index = {}      # {key string: position in self._keys}
+        self.setitem_func = None
+        self.setitem_calldescr = None
+        self.valuetype = REF
+
+    def getdictindex(self, keybox):
+        """Returns the position of the constant 'keybox' in the dict,
+        or -1 if the key is not in the dict."""
+        return self._index.get(self._keystr(keybox), -1)
+
+    def getdictitem(self, index):
+        return self._values[index]
+
+    def setdictitem(self, keybox, itemvalue, setitem_op):
+        # 'itemvalue' is None if the dict has Void values: the codewriter
+        # removes the Void argument from the 'setitem' call
+        assert itemvalue is None or isinstance(itemvalue, optimizer.OptValue)
+        s = self._keystr(keybox)
+        index = self._index.get(s, -1)
+        if index >= 0:
+            self._values[index] = itemvalue
+        else:
+            self._index[s] = len(self._keys)
+            self._keys.append(keybox)
+            self._values.append(itemvalue)
+        self.setitem_func = setitem_op.getarg(0)
+        self.setitem_calldescr = setitem_op.getdescr()
+        if itemvalue is None:
+            self.valuetype = VOID
+        else:
+            self.valuetype = setitem_op.getarg(3).type
+
+    def _keystr(self, keybox):
+        return hlstr(keybox.getref(lltype.Ptr(rstr.STR)))
+
+    def _really_force(self):
+        assert self.source_op is not None
+        if not we_are_translated():
+            self.source_op.name = 'FORCE ' + self.source_op.name
+        # the 'newdict' and 'setitem' calls can only raise MemoryError,
+        # like a NEW, so they are emitted without guard_no_exception
+        newoperations = self.optimizer.newoperations
+        newoperations.append(self.source_op)
+        self.box = box = self.source_op.result
+        for index in range(len(self._keys)):
+            args = [self.setitem_func, box, self._keys[index]]
+            itemvalue = self._values[index]
+            if itemvalue is not None:
+                args.append(itemvalue.force_box())
+            op = ResOperation(rop.CALL, args, None,
+                              descr=self.setitem_calldescr)
+            newoperations.append(op)
+
+    def get_args_for_fail(self, modifier):
+        if self.box is None and not modifier.already_seen_virtual(self.keybox):
+            # checks for recursion: it is False unless
+            # we have already seen the very same keybox
+            itemboxes = []
+            for index in range(len(self._keys)):
+                itemboxes.append(self._keys[index])
+                itemvalue = self._values[index]
+                if itemvalue is not None:
+                    itemboxes.append(itemvalue.get_key_box())
+            modifier.register_virtual_fields(self.keybox, itemboxes)
+            for itemvalue in self._values:
+                if itemvalue is not None:
+                    itemvalue.get_args_for_fail(modifier)
+
+    def _make_virtual(self, modifier):
+        if self.setitem_func is None:
+            setitem_func = 0
+        else:
+            setitem_func = self.setitem_func.getint()
+        return modifier.make_vdict(self.source_op.getarg(0).getint(),
+                                   self.source_op.getdescr(),
+                                   setitem_func, self.setitem_calldescr,
+                                   self.valuetype)
+
 class OptVirtualize(optimizer.Optimization):
     "Virtualize objects until they escape."
 
@@ -290,6 +382,11 @@ class OptVirtualize(optimizer.Optimization):
         self.make_equal_to(box, vvalue)
         return vvalue
 
+    def make_vdict(self, box, source_op=None):
+        vvalue = VDictValue(self.optimizer, box, source_op)
+        self.make_equal_to(box, vvalue)
+        return vvalue
+
     def optimize_VIRTUAL_REF(self, op):
         indexbox = op.getarg(1)
         #
@@ -343,6 +440,10 @@ class OptVirtualize(optimizer.Optimization):
 
     def optimize_GETFIELD_GC(self, op):
         value = self.getvalue(op.getarg(0))
+        if isinstance(value, VDictValue):
+            # the fields of a virtual dict are only set when it is forced
+            self.emit_operation(op)
+            return
         # If this is an immutable field (as indicated by op.is_always_pure())
         # then it's safe to reuse the virtual's field, even if it has been
         # forced, because it should never be written to again.
@@ -369,7 +470,7 @@ class OptVirtualize(optimizer.Optimization):
     def optimize_SETFIELD_GC(self, op):
         value = self.getvalue(op.getarg(0))
 
-        if value.is_virtual():
+        if value.is_virtual() and not isinstance(value, VDictValue):
             fieldvalue = self.getvalue(op.getarg(1))
             value.setfield(op.getdescr(), fieldvalue)
         else:
@@ -432,6 +533,138 @@ class OptVirtualize(optimizer.Optimization):
         ###self.heap_op_optimizer.optimize_SETARRAYITEM_GC(op, value, fieldvalue)
         self.emit_operation(op)
 
+    def optimize_CALL(self, op):
+        # dispatch based on 'oopspecindex' to a method that handles
+        # specifically the given oopspec call.  For non-oopspec calls,
+        # oopspecindex is just zero.
+        effectinfo = op.getdescr().get_extra_info()
+        if effectinfo is not None:
+            oopspecindex = effectinfo.oopspecindex
+            if oopspecindex == EffectInfo.OS_LIST_RESIZE_GE:
+                if self._optimize_CALL_LIST_RESIZE_GE(op):
+                    return
+            elif oopspecindex == EffectInfo.OS_DICT_NEW:
+                self.make_vdict(op.result, op)
+                return
+            elif oopspecindex == EffectInfo.OS_DICT_SETITEM:
+                if self._optimize_CALL_DICT_SETITEM(op):
+                    return
+            elif oopspecindex == EffectInfo.OS_DICT_GETITEM:
+                if self._optimize_CALL_DICT_GETITEM(op):
+                    return
+            elif oopspecindex == EffectInfo.OS_DICT_CONTAINS:
+                if self._optimize_CALL_DICT_CONTAINS(op):
+                    return
+            elif oopspecindex == EffectInfo.OS_DICT_GET:
+                if self._optimize_CALL_DICT_GET(op):
+                    return
+        self.emit_operation(op)
+
+    def _optimize_CALL_LIST_RESIZE_GE(self, op):
+        # _ll_list_resize_ge(l, newsize) on a virtual list whose items
+        # array is virtual too: do it on the virtuals, reallocating the
+        # items array with the same over-allocation as rlist.py
+        listvalue = self.getvalue(op.getarg(1))
+        newsizebox = self.get_constant_box(op.getarg(2))
+        if (not isinstance(listvalue, AbstractVirtualStructValue) or
+                not listvalue.is_virtual() or newsizebox is None):
+            return False
+        fielddescrs = listvalue._get_field_descr_list()
+        if len(fielddescrs) != 2:
+            return False
+        if fielddescrs[0].is_pointer_field():
+            itemsdescr, lengthdescr = fielddescrs
+        else:
+            lengthdescr, itemsdescr = fielddescrs
+        itemsvalue = listvalue.getfield(itemsdescr, None)
+        lengthvalue = listvalue.getfield(lengthdescr, None)
+        if (not isinstance(itemsvalue, VArrayValue) or
+                not itemsvalue.is_virtual() or
+                not lengthvalue.is_constant()):
+            return False
+        newsize = newsizebox.getint()
+        if newsize <= 0:
+            return False
+        if itemsvalue.getlength() < newsize:
+            if newsize < 9:
+                some = 3
+            else:
+                some = 6
+            some += newsize >> 3
+            new_allocated = newsize + some
+            arraydescr = itemsvalue.arraydescr
+            newbox = BoxPtr()
+            newop = ResOperation(rop.NEW_ARRAY, [ConstInt(new_allocated)],
+                                 newbox, descr=arraydescr)
+            newitemsvalue = self.make_varray(arraydescr, new_allocated,
+                                             newbox, newop)
+            for i in range(min(lengthvalue.box.getint(), newsize)):
+                newitemsvalue.setitem(i, itemsvalue.getitem(i))
+            listvalue.setfield(itemsdescr, newitemsvalue)
+        listvalue.setfield(lengthdescr,
+                           optimizer.ConstantValue(ConstInt(newsize)))
+        return True
+
+    def _get_constant_dict_key(self, box):
+        keybox = self.get_constant_box(box)
+        if keybox is None or not keybox.nonnull():
+            return None
+        return keybox
+
+    def _get_virtual_dict(self, box):
+        value = self.getvalue(box)
+        if isinstance(value, VDictValue) and value.is_virtual():
+            return value
+        return None
+
+    def _optimize_CALL_DICT_SETITEM(self, op):
+        dictvalue = self._get_virtual_dict(op.getarg(1))
+        keybox = self._get_constant_dict_key(op.getarg(2))
+        if dictvalue is None or keybox is None:
+            return False
+        if op.numargs() > 3:
+            itemvalue = self.getvalue(op.getarg(3))
+        else:
+            itemvalue = None     # Void value
+        dictvalue.setdictitem(keybox, itemvalue, op)
+        return True
+
+    def _optimize_CALL_DICT_GETITEM(self, op):
+        dictvalue = self._get_virtual_dict(op.getarg(1))
+        keybox = self._get_constant_dict_key(op.getarg(2))
+        if dictvalue is None or keybox is None:
+            return False
+        index = dictvalue.getdictindex(keybox)
+        if index < 0:
+            return False     # raises KeyError: force the dict
+        if op.result is not None:
+            self.make_equal_to(op.result, dictvalue.getdictitem(index))
+        return True
+
+    def _optimize_CALL_DICT_CONTAINS(self, op):
+        dictvalue = self._get_virtual_dict(op.getarg(1))
+        keybox = self._get_constant_dict_key(op.getarg(2))
+        if dictvalue is None or keybox is None:
+            return False
+        index = dictvalue.getdictindex(keybox)
+        self.make_constant_int(op.result, int(index >= 0))
+        return True
+
+    def _optimize_CALL_DICT_GET(self, op):
+        dictvalue = self._get_virtual_dict(op.getarg(1))
+        keybox = self._get_constant_dict_key(op.getarg(2))
+        if dictvalue is None or keybox is None:
+            return False
+        if op.result is None:
+            return True          # Void value and default
+        index = dictvalue.getdictindex(keybox)
+        if index >= 0:
+            itemvalue = dictvalue.getdictitem(index)
+        else:
+            itemvalue = self.getvalue(op.getarg(3))
+        self.make_equal_to(op.result, itemvalue)
+        return True
+
 
 dispatch_opt = make_dispatcher_method(OptVirtualize, 'optimize_',
         default=OptVirtualize.emit_operation)
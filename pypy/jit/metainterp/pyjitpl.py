@@ -16,6 +16,7 @@ from pypy.jit.metainterp.jitprof import EmptyProfiler
 from pypy.jit.metainterp.jitprof import GUARDS, RECORDED_OPS, ABORT_ESCAPE
 from pypy.jit.metainterp.jitprof import ABORT_TOO_LONG, ABORT_BRIDGE, \
                                         ABORT_FORCE_QUASIIMMUT, ABORT_BAD_LOOP
+from pypy.jit.metainterp.jitprof import DEFERRED_LOOPS, RETRACES
 from pypy.jit.metainterp.jitexc import JitException, get_llexception
 from pypy.rlib.objectmodel import specialize
 from pypy.jit.codewriter.jitcode import JitCode, SwitchDictDescr
@@ -1849,7 +1850,11 @@ class MetaInterp(object):
         # a stack of blackhole interpreters filled with the same values, and
         # run it.
         from pypy.jit.metainterp.blackhole import convert_and_run_from_pyjitpl
-        self.aborted_tracing(stb.reason)
+        if stb.reason == DEFERRED_LOOPS:
+            self.staticdata.profiler.count(DEFERRED_LOOPS)
+            debug_print('~~~ LOOP DEFERRED')
+        else:
+            self.aborted_tracing(stb.reason)
         convert_and_run_from_pyjitpl(self, stb.raising_exception)
         assert False    # ^^^ must raise
 
@@ -1894,6 +1899,7 @@ class MetaInterp(object):
             try:
                 self.compile_bridge(live_arg_boxes)
             except RetraceLoop:
+                self.staticdata.profiler.count(RETRACES)
                 start = len(self.history.operations)
                 self.current_merge_points.append((live_arg_boxes, start))
                 self.retracing_loop_from = RetraceState(self, live_arg_boxes)
@@ -2000,6 +2006,10 @@ class MetaInterp(object):
         greenkey = original_boxes[:num_green_args]
         old_loop_tokens = self.get_compiled_merge_points(greenkey)
         self.history.record(rop.JUMP, live_arg_boxes[num_green_args:], None)
+        if (self.jitdriver_sd.warmstate.defer_compile and
+                len(old_loop_tokens) == 0 and
+                isinstance(self.resumekey, compile.ResumeFromInterpDescr)):
+            self.defer_compile(greenkey, start, start_resumedescr)
         loop_token = compile.compile_new_loop(self, old_loop_tokens,
                                               greenkey, start, start_resumedescr)
         if loop_token is not None: # raise if it *worked* correctly
@@ -2011,6 +2021,18 @@ class MetaInterp(object):
         self.history.inputargs = original_inputargs
         self.history.operations.pop()     # remove the JUMP
 
+    def defer_compile(self, greenkey, start, start_resumedescr):
+        # Keep the loop on its JitCell instead of optimizing it and
+        # sending it to the backend now, and finish the current iteration
+        # in the blackhole interpreter.  The loop is compiled only if its
+        # counter reaches the threshold again, so that loops that are hot
+        # only for a short while never cost more than their tracing.
+        deferred_loop = compile.defer_new_loop(self, greenkey, start,
+                                               start_resumedescr)
+        cell = self.jitdriver_sd.warmstate.jit_cell_at_key(greenkey)
+        cell.set_deferred_loop(deferred_loop)
+        raise SwitchToBlackhole(DEFERRED_LOOPS)
+
     def compile_bridge(self, live_arg_boxes):
         num_green_args = self.jitdriver_sd.num_green_args
         greenkey = live_arg_boxes[:num_green_args]
@@ -410,6 +410,13 @@ _oplist = [
     'CAST_INT_TO_FLOAT/1',
     'CAST_FLOAT_TO_SINGLEFLOAT/1',
     'CAST_SINGLEFLOAT_TO_FLOAT/1',
+    'VEC_FLOAT_ADD/2',       # the VEC_xxx operations work on BoxVectors,
+    'VEC_FLOAT_SUB/2',       # and are only produced by optimizeopt/vectorize
+    'VEC_FLOAT_MUL/2',
+    'VEC_FLOAT_TRUEDIV/2',
+    'VEC_FLOAT_NEG/1',
+    'VEC_FLOAT_ABS/1',
+    'VEC_FLOAT_EXPAND/1',    # float -> vector with all items equal to it
     #
     'INT_LT/2b',
     'INT_LE/2b',
@@ -456,6 +463,7 @@ _oplist = [
 
     'GETARRAYITEM_GC/2d',
     'GETARRAYITEM_RAW/2d',
+    'VEC_GETARRAYITEM_RAW/2d',   # items index to index+VECTOR_SIZE-1
     'GETFIELD_GC/1d',
     'GETFIELD_RAW/1d',
     '_MALLOC_FIRST',
@@ -472,6 +480,7 @@ _oplist = [
 
     'SETARRAYITEM_GC/3d',
     'SETARRAYITEM_RAW/3d',
+    'VEC_SETARRAYITEM_RAW/3d',
     'SETFIELD_GC/2d',
     'SETFIELD_RAW/2d',
     'STRSETITEM/3',
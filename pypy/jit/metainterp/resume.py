@@ -1,7 +1,7 @@
 import sys, os
 from pypy.jit.metainterp.history import Box, Const, ConstInt, getkind
 from pypy.jit.metainterp.history import BoxInt, BoxPtr, BoxFloat
-from pypy.jit.metainterp.history import INT, REF, FLOAT, HOLE
+from pypy.jit.metainterp.history import INT, REF, FLOAT, HOLE, VOID
 from pypy.jit.metainterp.history import AbstractDescr
 from pypy.jit.metainterp.resoperation import rop
 from pypy.jit.metainterp import jitprof
@@ -288,6 +288,11 @@ class ResumeDataVirtualAdder(object):
             return VUniSliceInfo()
         return VStrSliceInfo()
 
+    def make_vdict(self, newdict_func, newdict_calldescr,
+                   setitem_func, setitem_calldescr, valuetype):
+        return VDictInfo(newdict_func, newdict_calldescr,
+                         setitem_func, setitem_calldescr, valuetype)
+
     def register_virtual_fields(self, virtualbox, fieldboxes):
         tagged = self.liveboxes_from_env.get(virtualbox, UNASSIGNEDVIRTUAL)
         self.liveboxes[virtualbox] = tagged
@@ -642,6 +647,42 @@ class VUniSliceInfo(AbstractVirtualInfo):
         for i in self.fieldnums:
             debug_print("\t\t", str(untag(i)))
 
+
+class VDictInfo(AbstractVirtualInfo):
+    """Stands for a dict with string keys, built by calling the 'newdict'
+    function and then the 'setitem' function for each pair (key, value)
+    in the fieldnums.  If the dict has Void values, the fieldnums only
+    contain the keys."""
+
+    def __init__(self, newdict_func, newdict_calldescr,
+                 setitem_func, setitem_calldescr, valuetype):
+        self.newdict_func = newdict_func
+        self.newdict_calldescr = newdict_calldescr
+        self.setitem_func = setitem_func
+        self.setitem_calldescr = setitem_calldescr
+        self.valuetype = valuetype
+        #self.fieldnums = ...
+
+    @specialize.argtype(1)
+    def allocate(self, decoder, index):
+        d = decoder.allocate_dict(self.newdict_func, self.newdict_calldescr)
+        decoder.virtuals_cache[index] = d
+        if self.valuetype == VOID:
+            for i in range(len(self.fieldnums)):
+                decoder.dict_setitem(self.setitem_func, self.setitem_calldescr,
+                                     d, self.fieldnums[i], NULLREF, VOID)
+        else:
+            for i in range(0, len(self.fieldnums), 2):
+                decoder.dict_setitem(self.setitem_func, self.setitem_calldescr,
+                                     d, self.fieldnums[i],
+                                     self.fieldnums[i + 1], self.valuetype)
+        return d
+
+    def debug_prints(self):
+        debug_print("\tvdictinfo")
+        for i in self.fieldnums:
+            debug_print("\t\t", str(untag(i)))
+
 # ____________________________________________________________
 
 class AbstractResumeDataReader(object):
@@ -873,6 +914,18 @@ class ResumeDataBoxReader(AbstractResumeDataReader):
         return self.metainterp.execute_and_record_varargs(
             rop.CALL, [ConstInt(func), strbox, startbox, stopbox], calldescr)
 
+    def allocate_dict(self, func, calldescr):
+        return self.metainterp.execute_and_record_varargs(
+            rop.CALL, [ConstInt(func)], calldescr)
+
+    def dict_setitem(self, func, calldescr, dictbox, keynum, valuenum,
+                     valuetype):
+        keybox = self.decode_box(keynum, REF)
+        args = [ConstInt(func), dictbox, keybox]
+        if valuetype != VOID:
+            args.append(self.decode_box(valuenum, valuetype))
+        self.metainterp.execute_and_record_varargs(rop.CALL, args, calldescr)
+
     def setfield(self, descr, structbox, fieldnum):
         if descr.is_pointer_field():
             kind = REF
@@ -1153,6 +1206,24 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
         result = funcptr(str, start, start + length)
         return lltype.cast_opaque_ptr(llmemory.GCREF, result)
 
+    def allocate_dict(self, func, calldescr):
+        return self.cpu.bh_call_r(func, calldescr, None, None, None)
+
+    def dict_setitem(self, func, calldescr, d, keynum, valuenum, valuetype):
+        key = self.decode_ref(keynum)
+        if valuetype == REF:
+            value = self.decode_ref(valuenum)
+            self.cpu.bh_call_v(func, calldescr, None, [d, key, value],
+                               None)
+        elif valuetype == FLOAT:
+            value = self.decode_float(valuenum)
+            self.cpu.bh_call_v(func, calldescr, None, [d, key], [value])
+        elif valuetype == VOID:
+            self.cpu.bh_call_v(func, calldescr, None, [d, key], None)
+        else:
+            value = self.decode_int(valuenum)
+            self.cpu.bh_call_v(func, calldescr, [value], [d, key], None)
+
     def setfield(self, descr, struct, fieldnum):
         if descr.is_pointer_field():
             newvalue = self.decode_ref(fieldnum)
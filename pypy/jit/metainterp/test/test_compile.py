@@ -171,6 +171,40 @@ def test_resume_guard_counters():
     assert rgc.counters == [1, 1, 7, 6, 1]
 
 
+def test_resume_guard_may_retrace():
+    import weakref
+    class FakeJitDriverSD:
+        class warmstate:
+            trace_eagerness = 3
+    sd = FakeMetaInterpStaticData()
+    looptoken = LoopToken()
+    wref = weakref.ref(looptoken)
+    hot = ResumeGuardDescr()
+    cold = ResumeGuardDescr()
+    hot.wref_original_loop_token = wref
+    cold.wref_original_loop_token = wref
+    assert not hot.must_compile(sd, FakeJitDriverSD)
+    assert not cold.must_compile(sd, FakeJitDriverSD)
+    assert not hot.must_compile(sd, FakeJitDriverSD)
+    assert looptoken.guard_failures == 3
+    assert hot.may_retrace()
+    assert cold.may_retrace()
+    for i in range(10):
+        hot.reset_counter_from_failure()
+        hot.must_compile(sd, FakeJitDriverSD)
+    assert looptoken.guard_failures == 13
+    # 'cold' failed once and the loop 11 times since then
+    assert not cold.must_compile(sd, FakeJitDriverSD)
+    assert cold.must_compile(sd, FakeJitDriverSD)
+    assert not cold.may_retrace()
+    # counting starts again after the counters are reset
+    cold.reset_counter_from_failure()
+    cold.must_compile(sd, FakeJitDriverSD)
+    assert cold.may_retrace()
+    # no loop token: always allowed
+    assert ResumeGuardDescr().may_retrace()
+
+
 def test_compile_tmp_callback():
     from pypy.jit.codewriter import heaptracker
     from pypy.jit.backend.llgraph import runner
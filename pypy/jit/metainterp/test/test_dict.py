@@ -167,4 +167,60 @@ class TestOOtype(DictTests, OOJitMixin):
     pass
 
 class TestLLtype(DictTests, LLJitMixin):
-    pass
+
+    def test_dict_virtual_string_keys(self):
+        myjitdriver = JitDriver(greens = [], reds = ['n', 'total'])
+        def f(n):
+            total = 0
+            while n > 0:
+                myjitdriver.jit_merge_point(n=n, total=total)
+                d = {}
+                d['abc'] = n
+                d['def'] = n + 1
+                total += d['abc'] + d.get('def', 0) + d.get('xyz', 5)
+                total += 'xyz' in d
+                n -= 1
+            return total
+        res = self.meta_interp(f, [10], listops=True)
+        assert res == f(10)
+        self.check_loops(call=0)
+
+    def test_dict_virtual_string_keys_resume(self):
+        myjitdriver = JitDriver(greens = [], reds = ['n', 'total'])
+        def f(n):
+            total = 0
+            while n > 0:
+                myjitdriver.jit_merge_point(n=n, total=total)
+                d = {}
+                d['abc'] = n
+                d['def'] = n * 2
+                if n % 7 == 0:
+                    total += len(d) * 100 + d['def']
+                total += d['abc']
+                n -= 1
+            return total
+        res = self.meta_interp(f, [50], listops=True)
+        assert res == f(50)
+        # only in the bridge, where len(d) forces the dict: newdict,
+        # two setitems and the two getitems
+        self.check_loops(call=5)
+
+    def test_dict_virtual_string_keys_void_values(self):
+        myjitdriver = JitDriver(greens = [], reds = ['n', 'total'])
+        def f(n):
+            total = 0
+            while n > 0:
+                myjitdriver.jit_merge_point(n=n, total=total)
+                d = {}
+                d['abc'] = None
+                d['def'] = None
+                total += ('abc' in d) + ('xyz' in d) * 10
+                if n % 7 == 0:
+                    total += len(d) * 100
+                n -= 1
+            return total
+        res = self.meta_interp(f, [50], listops=True)
+        assert res == f(50)
+        # only in the bridge, where len(d) forces the dict: newdict
+        # and the two setitems
+        self.check_loops(call=3)
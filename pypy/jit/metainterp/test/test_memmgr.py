@@ -19,6 +19,9 @@ from pypy.rlib.jit import JitDriver, dont_look_inside
 class FakeLoopToken:
     generation = 0
 
+class FakeDeferredLoop:
+    generation = 0
+
 
 class _TestMemoryManager:
     # We spawn a fresh process below to lower the time it takes to do
@@ -75,6 +78,19 @@ class _TestMemoryManager:
             else:
                 assert tokens[i] in memmgr.alive_loops
 
+    def test_deferred_loops(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(4, 1)
+        deferred = [FakeDeferredLoop() for i in range(10)]
+        for d in deferred:
+            memmgr.keep_deferred_loop_alive(d)
+            memmgr.next_generation()
+        assert memmgr.alive_deferred_loops == dict.fromkeys(deferred[7:])
+        memmgr.forget_deferred_loop(deferred[8])
+        memmgr.forget_deferred_loop(deferred[0])
+        assert memmgr.alive_deferred_loops == {deferred[7]: None,
+                                               deferred[9]: None}
+
 
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
@@ -199,6 +215,33 @@ class _TestIntegration(LLJitMixin):
         assert res == 42
         self.check_tree_loop_count(12)
 
+    def test_throw_away_old_deferred_loops(self):
+        from pypy.jit.metainterp import pyjitpl
+        myjitdriver = JitDriver(greens=['m'], reds=['n'])
+        def g(m, n):
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, m=m)
+                myjitdriver.jit_merge_point(n=n, m=m)
+                n = n - 1
+            return 21
+        def f(k):
+            myjitdriver.set_param('threshold', 5)
+            myjitdriver.set_param('defer_compile', 1)
+            g(1, 8)            # traced, but the loop is only deferred
+            for i in range(2, k):
+                g(i, 30)       # compiled: the deferred loop of g(1) gets old
+            return 42
+
+        res = self.meta_interp(f, [2], loop_longevity=3)
+        assert res == 42
+        memmgr = pyjitpl._warmrunnerdesc.memory_manager
+        assert len(memmgr.alive_deferred_loops) == 1
+        #
+        res = self.meta_interp(f, [10], loop_longevity=3)
+        assert res == 42
+        memmgr = pyjitpl._warmrunnerdesc.memory_manager
+        assert memmgr.alive_deferred_loops == {}
+
 # ____________________________________________________________
 
 def test_all():
@@ -261,6 +261,10 @@ class FakeResumeDataReader(AbstractResumeDataReader):
         return FakeBuiltObject(uniconcat=[left, right])
     def slice_unicode(self, str, start, length):
         return FakeBuiltObject(unislice=[str, start, length])
+    def allocate_dict(self, func, calldescr):
+        return FakeBuiltObject(newdict=(func, calldescr), items=[])
+    def dict_setitem(self, func, calldescr, d, keynum, valuenum, valuetype):
+        d.items.append((func, calldescr, keynum, valuenum, valuetype))
 
 class FakeBuiltObject(object):
     def __init__(self, **kwds):
@@ -349,6 +353,27 @@ def test_vunisliceinfo():
     assert reader.force_all_virtuals() == [
         FakeBuiltObject(unislice=info.fieldnums)]
 
+def test_vdictinfo():
+    info = VDictInfo(101, "newdictdescr", 102, "setitemdescr", INT)
+    info.fieldnums = [tag(1, TAGCONST), tag(20, TAGBOX),
+                      tag(2, TAGCONST), tag(30, TAGINT)]
+    reader = FakeResumeDataReader()
+    reader._prepare_virtuals([info])
+    assert reader.force_all_virtuals() == [
+        FakeBuiltObject(newdict=(101, "newdictdescr"), items=[
+            (102, "setitemdescr", tag(1, TAGCONST), tag(20, TAGBOX), INT),
+            (102, "setitemdescr", tag(2, TAGCONST), tag(30, TAGINT), INT)])]
+
+def test_vdictinfo_void_values():
+    info = VDictInfo(101, "newdictdescr", 102, "setitemdescr", VOID)
+    info.fieldnums = [tag(1, TAGCONST), tag(2, TAGCONST)]
+    reader = FakeResumeDataReader()
+    reader._prepare_virtuals([info])
+    assert reader.force_all_virtuals() == [
+        FakeBuiltObject(newdict=(101, "newdictdescr"), items=[
+            (102, "setitemdescr", tag(1, TAGCONST), NULLREF, VOID),
+            (102, "setitemdescr", tag(2, TAGCONST), NULLREF, VOID)])]
+
 # ____________________________________________________________
 
 
@@ -257,6 +257,65 @@ class TestLLWarmspot(WarmspotTests, LLJitMixin):
     CPUClass = runner.LLtypeCPU
     type_system = 'lltype'
 
+    def test_set_param_warmup_cache(self):
+        from pypy.rpython.annlowlevel import llstr, hlstr
+        from pypy.tool.udir import udir
+        filename = str(udir.join('test_set_param_warmup_cache'))
+
+        def get_printable_location(m):
+            return 'loop %d' % m
+        myjitdriver = JitDriver(greens = ['m'], reds = ['n'],
+                                get_printable_location=get_printable_location)
+        def g(m, n):
+            while n > 0:
+                myjitdriver.can_enter_jit(m=m, n=n)
+                myjitdriver.jit_merge_point(m=m, n=n)
+                n -= 1
+            return n
+        def f(m, n, filename):
+            myjitdriver.set_param('threshold', 50)
+            myjitdriver.set_param('warmup_cache', hlstr(filename))
+            return g(m, n)
+
+        res = self.meta_interp(f, [1, 100, llstr(filename)])
+        assert res == 0
+        self.check_loop_count(1)
+        assert open(filename).read() == 'loop 1\n'
+        # too few iterations to reach the threshold, but the loop was
+        # hot in the previous run
+        res = self.meta_interp(f, [1, 20, llstr(filename)])
+        assert res == 0
+        self.check_loop_count(1)
+        res = self.meta_interp(f, [1, 20, llstr('')])
+        self.check_loop_count(0)
+
+    def test_set_param_defer_compile(self):
+        myjitdriver = JitDriver(greens = [], reds = ['n', 'x'])
+        def f(n, defer):
+            myjitdriver.set_param('threshold', 10)
+            myjitdriver.set_param('defer_compile', defer)
+            x = 0
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, x=x)
+                myjitdriver.jit_merge_point(n=n, x=x)
+                x += n
+                n -= 1
+            return x
+
+        res = self.meta_interp(f, [100, 1])
+        assert res == 5050
+        self.check_loop_count(1)
+        self.check_enter_count(1)
+        self.check_aborted_count(0)
+        # traced once, but not hot for long enough to be compiled
+        res = self.meta_interp(f, [15, 1])
+        assert res == 120
+        self.check_loop_count(0)
+        self.check_enter_count(1)
+        res = self.meta_interp(f, [15, 0])
+        assert res == 120
+        self.check_loop_count(1)
+
 class TestOOWarmspot(WarmspotTests, OOJitMixin):
     ##CPUClass = runner.OOtypeCPU
     type_system = 'ootype'
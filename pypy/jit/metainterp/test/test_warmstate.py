@@ -294,3 +294,51 @@ def test_make_jitdriver_callbacks_5():
     state.make_jitdriver_callbacks()
     res = state.can_never_inline(5, 42.5)
     assert res is True
+
+def test_warmup_cache():
+    from pypy.tool.udir import udir
+    filename = str(udir.join('test_warmup_cache'))
+    def get_location(x, y):
+        return "loc %d" % x    # abuse the return type, but nobody checks it
+    GET_LOCATION = lltype.Ptr(lltype.FuncType([lltype.Signed, lltype.Float],
+                                              lltype.Ptr(rstr.STR)))
+    class FakeWarmRunnerDesc:
+        rtyper = None
+        cpu = None
+        memory_manager = None
+    class FakeJitDriverSD:
+        jitdriver = None
+        _green_args_spec = [lltype.Signed, lltype.Float]
+        _get_printable_location_ptr = llhelper(GET_LOCATION, get_location)
+        _confirm_enter_jit_ptr = None
+        _can_never_inline_ptr = None
+        _get_jitcell_at_ptr = None
+        _should_unroll_one_iteration_ptr = None
+    class FakeLoopToken(object):
+        pass
+    #
+    state = WarmEnterState(FakeWarmRunnerDesc(), FakeJitDriverSD())
+    state.set_param_warmup_cache(filename)
+    get_jitcell = state.make_jitcell_getter()
+    state.make_jitdriver_callbacks()
+    assert get_jitcell(True, 5, 2.25).counter == 0
+    state.attach_unoptimized_bridge_from_interp([ConstInt(5),
+                                                 constfloat(2.25)],
+                                                FakeLoopToken())
+    state.attach_unoptimized_bridge_from_interp([ConstInt(5),
+                                                 constfloat(2.25)],
+                                                FakeLoopToken())
+    assert open(filename).read() == "loc 5\n"
+    #
+    # another process using the same cache starts the counter of
+    # "loc 5" close to the threshold
+    state = WarmEnterState(FakeWarmRunnerDesc(), FakeJitDriverSD())
+    state.set_param_threshold(1000)
+    state.set_param_warmup_cache(filename)
+    get_jitcell = state.make_jitcell_getter()
+    cell = get_jitcell(True, 5, 2.25)
+    assert cell.counter == (state.THRESHOLD_LIMIT -
+                            2 * state.increment_threshold)
+    assert get_jitcell(True, 6, 2.25).counter == 0
+    state.set_param_warmup_cache('')
+    assert get_jitcell(True, 7, 2.25).counter == 0
@@ -10,6 +10,7 @@ from pypy.objspace.flow.model import checkgraph, Link, copygraph
 from pypy.rlib.objectmodel import we_are_translated
 from pypy.rlib.unroll import unrolling_iterable
 from pypy.rlib.debug import fatalerror
+from pypy.rlib.jit import is_string_parameter
 from pypy.rlib.rstackovf import StackOverflow
 from pypy.translator.simplify import get_functype
 from pypy.translator.unsimplify import call_final_function
@@ -856,7 +857,7 @@ class WarmRunnerDesc(object):
             key = jd, funcname
             if key not in closures:
                 closures[key] = make_closure(jd, 'set_param_' + funcname,
-                                             funcname == 'enable_opts')
+                                             is_string_parameter(funcname))
             op.opname = 'direct_call'
             op.args[:3] = [closures[key]]
 
@@ -168,10 +168,14 @@ class JitCell(BaseJitCell):
     #     counter >=  0: not yet traced, wait till threshold is reached
     #     counter == -1: there is an entry bridge for this cell
     #     counter == -2: tracing is currently going on for this cell
+    # if there is a deferred loop, the counter is >= 0: when it reaches the
+    # threshold again, the deferred loop is compiled instead of tracing.
     counter = 0
     compiled_merge_points_wref = None    # list of weakrefs to LoopToken
     dont_trace_here = False
     wref_entry_loop_token = None         # (possibly) one weakref to LoopToken
+    wref_deferred_loop = None            # (possibly) one weakref to a
+                                         # compile.DeferredLoop
 
     def get_compiled_merge_points(self):
         result = []
@@ -194,6 +198,17 @@ class JitCell(BaseJitCell):
     def set_entry_loop_token(self, looptoken):
         self.wref_entry_loop_token = self._makeref(looptoken)
 
+    def get_deferred_loop(self):
+        if self.wref_deferred_loop is not None:
+            return self.wref_deferred_loop()
+        return None
+
+    def set_deferred_loop(self, deferred_loop):
+        if deferred_loop is None:
+            self.wref_deferred_loop = None
+        else:
+            self.wref_deferred_loop = weakref.ref(deferred_loop)
+
     def _makeref(self, looptoken):
         assert looptoken is not None
         return weakref.ref(looptoken)
@@ -246,6 +261,7 @@ class WarmEnterState(object):
 
     def set_param_enable_opts(self, value):
         from pypy.jit.metainterp.optimizeopt import ALL_OPTS_DICT, ALL_OPTS_NAMES
+        from pypy.jit.metainterp.optimizeopt import EXTRA_OPTS_DICT
 
         d = {}
         if NonConstant(False):
@@ -253,12 +269,18 @@ class WarmEnterState(object):
         if value is None or value == 'all':
             value = ALL_OPTS_NAMES
         for name in value.split(":"):
-            if name:
-                if name not in ALL_OPTS_DICT:
+            if name == 'all':
+                for name in ALL_OPTS_NAMES.split(":"):
+                    d[name] = None
+            elif name:
+                if name not in ALL_OPTS_DICT and name not in EXTRA_OPTS_DICT:
                     raise ValueError('Unknown optimization ' + name)
                 d[name] = None
         self.enable_opts = d
 
+    def set_param_defer_compile(self, value):
+        self.defer_compile = value
+
     def set_param_loop_longevity(self, value):
         # note: it's a global parameter, not a per-jitdriver one
         if (self.warmrunnerdesc is not None and
@@ -275,6 +297,37 @@ class WarmEnterState(object):
             if self.warmrunnerdesc.memory_manager:
                 self.warmrunnerdesc.memory_manager.max_retrace_guards = value
 
+    def set_param_warmup_cache(self, value):
+        from pypy.jit.metainterp.warmupcache import WarmupCache
+        if NonConstant(False):
+            value = 'blah' # not a constant ''
+        if value:
+            self.warmup_cache = WarmupCache(value)
+        else:
+            self.warmup_cache = None
+
+    def compile_deferred_loop(self, cell):
+        """Compile the loop that was traced for 'cell' while the
+        'defer_compile' parameter was set.  Returns the entry loop token,
+        or None if the loop could not be compiled.
+        """
+        from pypy.jit.metainterp.compile import compile_deferred_loop
+        deferred_loop = cell.get_deferred_loop()
+        assert deferred_loop is not None
+        self.forget_deferred_loop(cell)
+        metainterp_sd = self.warmrunnerdesc.metainterp_sd
+        compile_deferred_loop(metainterp_sd, self.jitdriver_sd, deferred_loop)
+        if cell.counter != -1:
+            return None
+        return cell.get_entry_loop_token()
+
+    def forget_deferred_loop(self, cell):
+        deferred_loop = cell.get_deferred_loop()
+        if deferred_loop is not None:
+            cell.set_deferred_loop(None)
+            self.warmrunnerdesc.memory_manager.forget_deferred_loop(
+                deferred_loop)
+
     def disable_noninlinable_function(self, greenkey):
         cell = self.jit_cell_at_key(greenkey)
         cell.dont_trace_here = True
@@ -289,6 +342,9 @@ class WarmEnterState(object):
         old_token = cell.get_entry_loop_token()
         cell.set_entry_loop_token(entry_loop_token)
         cell.counter = -1       # valid entry bridge attached
+        self.forget_deferred_loop(cell)
+        if self.warmup_cache is not None:
+            self.warmup_cache.record(self.get_location_str(greenkey))
         if old_token is not None:
             self.cpu.redirect_call_assembler(old_token, entry_loop_token)
             # entry_loop_token is also kept alive by any loop that used
@@ -337,17 +393,26 @@ class WarmEnterState(object):
                 if not confirm_enter_jit(*args):
                     cell.counter = 0
                     return
-                # bound reached; start tracing
-                from pypy.jit.metainterp.pyjitpl import MetaInterp
-                metainterp = MetaInterp(metainterp_sd, jitdriver_sd)
-                # set counter to -2, to mean "tracing in effect"
-                cell.counter = -2
-                try:
-                    loop_token = metainterp.compile_and_run_once(jitdriver_sd,
-                                                                 *args)
-                finally:
-                    if cell.counter == -2:
+                if cell.get_deferred_loop() is not None:
+                    # bound reached again on a loop that was traced but
+                    # not compiled; compile it now
+                    loop_token = self.compile_deferred_loop(cell)
+                    if loop_token is None:
                         cell.counter = 0
+                        return
+                    set_future_values(*args[num_green_args:])
+                else:
+                    # bound reached; start tracing
+                    from pypy.jit.metainterp.pyjitpl import MetaInterp
+                    metainterp = MetaInterp(metainterp_sd, jitdriver_sd)
+                    # set counter to -2, to mean "tracing in effect"
+                    cell.counter = -2
+                    try:
+                        loop_token = metainterp.compile_and_run_once(
+                            jitdriver_sd, *args)
+                    finally:
+                        if cell.counter == -2:
+                            cell.counter = 0
             else:
                 if cell.counter == -2:
                     # tracing already happening in some outer invocation of
@@ -428,6 +493,37 @@ class WarmEnterState(object):
         #
         return jit_getter
 
+    def _make_preheat(self):
+        """NOT_RPYTHON: build the function called with every new JitCell,
+        which starts the counter close to the threshold if the location
+        was compiled by an earlier process using the same warmup cache."""
+        try:
+            get_location_ptr = self.jitdriver_sd._get_printable_location_ptr
+        except AttributeError:     # for tests
+            get_location_ptr = None
+        if get_location_ptr is None:
+            def preheat(cell, *greenargs):
+                pass
+            return preheat
+        rtyper = self.warmrunnerdesc.rtyper
+        #
+        def preheat(cell, *greenargs):
+            cache = self.warmup_cache
+            if cache is None:
+                return
+            fn = support.maybe_on_top_of_llinterp(rtyper, get_location_ptr)
+            llres = fn(*greenargs)
+            if not we_are_translated() and isinstance(llres, str):
+                location = llres
+            else:
+                location = hlstr(llres)
+            if cache.is_hot(location):
+                # a couple of iterations are left, to not trace the
+                # first one, which is often not representative
+                cell.counter = (self.THRESHOLD_LIMIT -
+                                2 * self.increment_threshold)
+        return preheat
+
     def _make_jitcell_getter_default(self):
         "NOT_RPYTHON"
         jitdriver_sd = self.jitdriver_sd
@@ -452,6 +548,7 @@ class WarmEnterState(object):
             return x
         #
         jitcell_dict = r_dict(comparekey, hashkey)
+        preheat = self._make_preheat()
         #
         def get_jitcell(build, *greenargs):
             try:
@@ -460,6 +557,7 @@ class WarmEnterState(object):
                 if not build:
                     return None
                 cell = JitCell()
+                preheat(cell, *greenargs)
                 jitcell_dict[greenargs] = cell
             return cell
         return get_jitcell
@@ -470,6 +568,7 @@ class WarmEnterState(object):
         get_jitcell_at_ptr = self.jitdriver_sd._get_jitcell_at_ptr
         set_jitcell_at_ptr = self.jitdriver_sd._set_jitcell_at_ptr
         lltohlhack = {}
+        preheat = self._make_preheat()
         #
         def get_jitcell(build, *greenargs):
             fn = support.maybe_on_top_of_llinterp(rtyper, get_jitcell_at_ptr)
@@ -492,6 +591,7 @@ class WarmEnterState(object):
                 return cell
             if cell is None:
                 cell = JitCell()
+                preheat(cell, *greenargs)
                 # <hacks>
                 if we_are_translated():
                     cellref = cast_object_to_ptr(BASEJITCELL, cell)
@@ -0,0 +1,63 @@
+import os
+from pypy.rlib.debug import debug_start, debug_print, debug_stop
+
+#
+# Logic to remember across processes which loops were hot.
+#
+# When the 'warmup_cache' JIT parameter names a file, the printable
+# location of every loop that gets compiled is appended to it.  A later
+# process reading the same file starts with the counters of these
+# locations close to the threshold, so that they are traced almost
+# immediately instead of only after the usual ~1000 iterations.  The
+# traces themselves are not stored: they contain the addresses of
+# objects of the process that produced them.  The loops are simply traced
+# again, so there is nothing to validate.
+#
+
+class WarmupCache(object):
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.locations = {}
+        self.load()
+
+    def load(self):
+        try:
+            fd = os.open(self.filename, os.O_RDONLY, 0)
+        except OSError:
+            return     # no cache yet
+        chunks = []
+        try:
+            while True:
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                chunks.append(data)
+        except OSError:
+            pass
+        os.close(fd)
+        for line in ''.join(chunks).split('\n'):
+            if line:
+                self.locations[line] = None
+        debug_start("jit-warmupcache")
+        debug_print("loaded", len(self.locations), "locations from",
+                    self.filename)
+        debug_stop("jit-warmupcache")
+
+    def is_hot(self, location):
+        return location in self.locations
+
+    def record(self, location):
+        if not location or '\n' in location or location in self.locations:
+            return
+        self.locations[location] = None
+        try:
+            fd = os.open(self.filename,
+                         os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0666)
+        except OSError:
+            return     # the cache is only an optimization
+        try:
+            os.write(fd, location + '\n')
+        except OSError:
+            pass
+        os.close(fd)
@@ -26,6 +26,9 @@ REGEXES = [
     (('abort.vable_escape',), '^abort: vable escape:\s+(\d+)$'),
     (('abort.bad_loop',), '^abort: bad loop:\s+(\d+)$'),
     (('abort.force_quasiimmut',), '^abort: force quasi-immut:\s+(\d+)$'),
+    (('deferred_loops',), '^deferred loops:\s+(\d+)$'),
+    (('guard_failures',), '^guard failures:\s+(\d+)$'),
+    (('retraces',), '^retraces:\s+(\d+)$'),
     (('nvirtuals',), '^nvirtuals:\s+(\d+)$'),
     (('nvholes',), '^nvholes:\s+(\d+)$'),
     (('nvreused',), '^nvreused:\s+(\d+)$'),
@@ -57,6 +60,9 @@ class OutputInfo(object):
     opt_ops = 0
     opt_guards = 0
     forcings = 0
+    deferred_loops = 0
+    guard_failures = 0
+    retraces = 0
     nvirtuals = 0
     nvholes = 0
     nvreused = 0
@@ -5,6 +5,7 @@ def get_real_model():
     class LoopModel(object):
         from pypy.jit.metainterp.history import TreeLoop, LoopToken
         from pypy.jit.metainterp.history import Box, BoxInt, BoxFloat
+        from pypy.jit.metainterp.history import BoxVector
         from pypy.jit.metainterp.history import ConstInt, ConstObj, ConstPtr, ConstFloat
         from pypy.jit.metainterp.history import BasicFailDescr
         from pypy.jit.metainterp.typesystem import llhelper
@@ -72,6 +73,9 @@ def get_mock_model():
         class BoxRef(Box):
             type = 'p'
 
+        class BoxVector(Box):
+            type = 'v'
+
         class Const(object):
             def __init__(self, value=None):
                 self.value = value
@@ -0,0 +1,579 @@
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec, NoneNotWrapped
+from pypy.interpreter.typedef import TypeDef, interp_attrproperty
+from pypy.interpreter.typedef import interp_attrproperty_w
+from pypy.rlib.rstring import StringBuilder
+
+QUOTE_MINIMAL, QUOTE_ALL, QUOTE_NONNUMERIC, QUOTE_NONE = range(4)
+
+(START_RECORD, START_FIELD, ESCAPED_CHAR, IN_FIELD,
+ IN_QUOTED_FIELD, ESCAPE_IN_QUOTED_FIELD, QUOTE_IN_QUOTED_FIELD,
+ EAT_CRNL) = range(8)
+
+
+class State:
+    def __init__(self, space):
+        self.field_limit = 128 * 1024     # max parsed field size
+
+def csv_error(space, msg):
+    w_module = space.getbuiltinmodule('_csv')
+    w_error = space.getattr(w_module, space.wrap('Error'))
+    return OperationError(w_error, space.wrap(msg))
+
+
+def _get_char(space, w_dialect, name):
+    # returns '\0' if the attribute is None or the empty string
+    w_value = space.getattr(w_dialect, space.wrap(name))
+    if space.is_w(w_value, space.w_None):
+        return '\0'
+    value = space.str_w(w_value)
+    if not value:
+        return '\0'
+    return value[0]
+
+def _get_bool(space, w_dialect, name):
+    return space.is_true(space.getattr(w_dialect, space.wrap(name)))
+
+
+class Dialect(object):
+    """The settings of an app-level Dialect instance, read once when the
+    reader or writer is created."""
+
+    def __init__(self, space, w_dialect):
+        self.w_dialect = w_dialect
+        self.delimiter = _get_char(space, w_dialect, 'delimiter')
+        self.quotechar = _get_char(space, w_dialect, 'quotechar')
+        self.escapechar = _get_char(space, w_dialect, 'escapechar')
+        self.lineterminator = space.str_w(
+            space.getattr(w_dialect, space.wrap('lineterminator')))
+        self.quoting = space.int_w(
+            space.getattr(w_dialect, space.wrap('quoting')))
+        self.doublequote = _get_bool(space, w_dialect, 'doublequote')
+        self.skipinitialspace = _get_bool(space, w_dialect,
+                                          'skipinitialspace')
+        self.strict = _get_bool(space, w_dialect, 'strict')
+        self.has_quotechar = self.quotechar != '\0'
+        self.has_escapechar = self.escapechar != '\0'
+        # the characters that make the writer quote or escape a field
+        special = [False] * 256
+        special[ord(self.delimiter)] = True
+        if self.has_quotechar:
+            special[ord(self.quotechar)] = True
+        if self.has_escapechar:
+            special[ord(self.escapechar)] = True
+        for c in self.lineterminator:
+            special[ord(c)] = True
+        self.special = special
+
+def get_dialect(space, __args__):
+    w_module = space.getbuiltinmodule('_csv')
+    w_call_dialect = space.getattr(w_module, space.wrap('_call_dialect'))
+    return Dialect(space, space.call_args(w_call_dialect, __args__))
+
+# ____________________________________________________________
+
+class W_Reader(Wrappable):
+
+    def __init__(self, space, dialect, w_iter):
+        self.space = space
+        self.dialect = dialect
+        self.w_dialect = dialect.w_dialect
+        self.w_iter = w_iter
+        self.line_num = 0
+        # the quotechar, or '\0' if quoting is disabled: input lines
+        # cannot contain '\0'
+        if dialect.quoting == QUOTE_NONE:
+            self.quotechar = '\0'
+        else:
+            self.quotechar = dialect.quotechar
+        self.parse_reset()
+
+    def parse_reset(self):
+        self.fields_w = []
+        self.state = START_RECORD
+        self.numeric_field = False
+        self.reset_field()
+
+    def reset_field(self):
+        # The field being parsed.  As long as it is a single slice of one
+        # line, we only remember where it is; otherwise it is in the
+        # StringBuilder.
+        self.field_builder = None
+        self.field_line = None
+        self.field_start = 0
+        self.field_end = 0
+        self.field_len = 0
+
+    def descr_iter(self):
+        return self.space.wrap(self)
+
+    def descr_next(self):
+        w_fields = self.read_row()
+        if w_fields is None:
+            raise OperationError(self.space.w_StopIteration,
+                                 self.space.w_None)
+        return w_fields
+
+    @unwrap_spec(n=int)
+    def descr_read_rows(self, n):
+        """read_rows(n) -> list of at most n rows.
+The list is shorter than n only at the end of the input.  If n is
+negative, all the remaining rows are read."""
+        rows_w = []
+        while n != 0:
+            w_fields = self.read_row()
+            if w_fields is None:
+                break
+            rows_w.append(w_fields)
+            n -= 1
+        return self.space.newlist(rows_w)
+
+    def read_row(self):
+        """Returns the next row as a wrapped list, or None at the end of
+        the input."""
+        space = self.space
+        self.parse_reset()
+        while True:
+            try:
+                w_line = space.next(self.w_iter)
+            except OperationError, e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                if self.field_len > 0:
+                    raise csv_error(space, "newline inside string")
+                return None
+            self.line_num += 1
+            line = self.get_line(w_line)
+            if line.find('\0') >= 0:
+                raise csv_error(space, "line contains NULL byte")
+            self.parse_line(line)
+            if self.state == START_RECORD:
+                break
+        fields_w = self.fields_w
+        self.fields_w = None
+        return space.newlist(fields_w)
+
+    def get_line(self, w_line):
+        space = self.space
+        if space.is_true(space.isinstance(w_line, space.w_str)):
+            return space.str_w(w_line)
+        if space.is_true(space.isinstance(w_line, space.w_unicode)):
+            return space.str_w(space.call_method(w_line, 'encode'))
+        raise csv_error(space, "expected string or Unicode object, %s found"
+                        % space.type(w_line).getname(space, '?'))
+
+    def parse_line(self, line):
+        """The state machine over one input line.  The runs of ordinary
+        characters in a field are added in one go."""
+        delimiter = self.dialect.delimiter
+        escapechar = self.dialect.escapechar
+        quotechar = self.quotechar
+        pos = 0
+        end = len(line)
+        while pos < end:
+            state = self.state
+            if state == IN_FIELD:
+                start = pos
+                while pos < end:
+                    c = line[pos]
+                    if (c == delimiter or c == '\n' or c == '\r' or
+                        c == escapechar):
+                        break
+                    pos += 1
+                if pos > start:
+                    self.add_slice(line, start, pos)
+                if pos == end:
+                    break
+            elif state == IN_QUOTED_FIELD:
+                start = pos
+                while pos < end:
+                    c = line[pos]
+                    if c == quotechar or c == escapechar:
+                        break
+                    pos += 1
+                if pos > start:
+                    self.add_slice(line, start, pos)
+                if pos == end:
+                    break
+            pos = self.process_char(line, pos)
+        self.process_char(line, end)      # end of line
+
+    def process_char(self, line, pos):
+        """Process the character at 'pos', or the end of the line if 'pos'
+        is len(line).  Returns the position of the next character to
+        process."""
+        if pos == len(line):
+            c = '\0'
+        else:
+            c = line[pos]
+        dialect = self.dialect
+        state = self.state
+        if state == START_RECORD:
+            if c == '\0':
+                pass                      # empty line - return []
+            elif c == '\n' or c == '\r':
+                self.state = EAT_CRNL
+            else:
+                self.state = START_FIELD
+                return pos                # restart process
+        elif state == START_FIELD:
+            if c == '\n' or c == '\r' or c == '\0':
+                # save empty field - return [fields]
+                self.save_field()
+                self.end_of_record(c)
+            elif c == self.quotechar:
+                self.state = IN_QUOTED_FIELD
+            elif c == dialect.escapechar:
+                self.state = ESCAPED_CHAR
+            elif c == ' ' and dialect.skipinitialspace:
+                pass                      # ignore space at start of field
+            elif c == dialect.delimiter:
+                self.save_field()         # save empty field
+            else:
+                # begin new unquoted field
+                if dialect.quoting == QUOTE_NONNUMERIC:
+                    self.numeric_field = True
+                self.state = IN_FIELD
+                return pos
+        elif state == ESCAPED_CHAR:
+            if c == '\0':
+                self.add_char('\n')
+            else:
+                self.add_slice(line, pos, pos + 1)
+            self.state = IN_FIELD
+        elif state == IN_FIELD:
+            if c == '\n' or c == '\r' or c == '\0':
+                # end of line - return [fields]
+                self.save_field()
+                self.end_of_record(c)
+            elif c == dialect.escapechar:
+                self.state = ESCAPED_CHAR
+            elif c == dialect.delimiter:
+                self.save_field()
+                self.state = START_FIELD
+            else:
+                self.add_slice(line, pos, pos + 1)
+        elif state == IN_QUOTED_FIELD:
+            if c == '\0':
+                pass
+            elif c == dialect.escapechar:
+                self.state = ESCAPE_IN_QUOTED_FIELD
+            elif c == self.quotechar:
+                if dialect.doublequote:
+                    # doublequote; " represented by ""
+                    self.state = QUOTE_IN_QUOTED_FIELD
+                else:
+                    # end of quote part of field
+                    self.state = IN_FIELD
+            else:
+                self.add_slice(line, pos, pos + 1)
+        elif state == ESCAPE_IN_QUOTED_FIELD:
+            if c == '\0':
+                self.add_char('\n')
+            else:
+                self.add_slice(line, pos, pos + 1)
+            self.state = IN_QUOTED_FIELD
+        elif state == QUOTE_IN_QUOTED_FIELD:
+            # doublequote - seen a quote in a quoted field
+            if c == '\0' or c == '\n' or c == '\r':
+                # end of line - return [fields]
+                self.save_field()
+                self.end_of_record(c)
+            elif c == self.quotechar:
+                # save "" as "
+                self.add_slice(line, pos, pos + 1)
+                self.state = IN_QUOTED_FIELD
+            elif c == dialect.delimiter:
+                # save field - wait for new field
+                self.save_field()
+                self.state = START_FIELD
+            elif not dialect.strict:
+                self.add_slice(line, pos, pos + 1)
+                self.state = IN_FIELD
+            else:
+                raise csv_error(self.space, "'%s' expected after '%s'" %
+                                (dialect.delimiter, dialect.quotechar))
+        elif state == EAT_CRNL:
+            if c == '\n' or c == '\r':
+                pass
+            elif c == '\0':
+                self.state = START_RECORD
+            else:
+                raise csv_error(self.space,
+                                "new-line character seen in unquoted field - "
+                                "do you need to open the file "
+                                "in universal-newline mode?")
+        return pos + 1
+
+    def end_of_record(self, c):
+        if c == '\0':
+            self.state = START_RECORD
+        else:
+            self.state = EAT_CRNL
+
+    def check_field_limit(self, length):
+        field_limit = self.space.fromcache(State).field_limit
+        if self.field_len + length > field_limit:
+            raise csv_error(self.space, "field larger than field limit (%d)"
+                            % field_limit)
+        self.field_len += length
+
+    def get_field_builder(self):
+        builder = self.field_builder
+        if builder is None:
+            builder = StringBuilder()
+            if self.field_line is not None:
+                builder.append_slice(self.field_line, self.field_start,
+                                     self.field_end)
+                self.field_line = None
+            self.field_builder = builder
+        return builder
+
+    def add_slice(self, line, start, end):
+        self.check_field_limit(end - start)
+        if self.field_builder is None and self.field_line is None:
+            self.field_line = line
+            self.field_start = start
+            self.field_end = end
+        else:
+            self.get_field_builder().append_slice(line, start, end)
+
+    def add_char(self, c):
+        self.check_field_limit(1)
+        self.get_field_builder().append(c)
+
+    def save_field(self):
+        space = self.space
+        if self.field_builder is not None:
+            field = self.field_builder.build()
+        elif self.field_line is not None:
+            start = self.field_start
+            end = self.field_end
+            assert start >= 0
+            assert end >= start
+            field = self.field_line[start:end]
+        else:
+            field = ''
+        self.reset_field()
+        w_field = space.wrap(field)
+        if self.numeric_field:
+            self.numeric_field = False
+            w_field = space.call_function(space.w_float, w_field)
+        self.fields_w.append(w_field)
+
+
+W_Reader.typedef = TypeDef(
+    '_csv.reader',
+    __doc__ = """CSV reader
+
+Reader objects are responsible for reading and parsing tabular data
+in CSV format.""",
+    __iter__ = interp2app(W_Reader.descr_iter),
+    next = interp2app(W_Reader.descr_next),
+    read_rows = interp2app(W_Reader.descr_read_rows),
+    dialect = interp_attrproperty_w('w_dialect', W_Reader),
+    line_num = interp_attrproperty('line_num', W_Reader),
+    )
+W_Reader.typedef.acceptable_as_base_class = False
+
+def csv_reader(space, w_iterable, __args__):
+    """
+    csv_reader = reader(iterable [, dialect='excel']
+                       [optional keyword args])
+    for row in csv_reader:
+        process(row)
+
+    The "iterable" argument can be any object that returns a line
+    of input for each iteration, such as a file object or a list.  The
+    optional \"dialect\" parameter is discussed below.  The function
+    also accepts optional keyword arguments which override settings
+    provided by the dialect.
+
+    The returned object is an iterator.  Each iteration returns a row
+    of the CSV file (which can span multiple input lines)"""
+    dialect = get_dialect(space, __args__)
+    w_iter = space.iter(w_iterable)
+    return space.wrap(W_Reader(space, dialect, w_iter))
+
+# ____________________________________________________________
+
+class W_Writer(Wrappable):
+
+    def __init__(self, space, dialect, w_filewrite):
+        self.space = space
+        self.dialect = dialect
+        self.w_dialect = dialect.w_dialect
+        self.w_filewrite = w_filewrite
+
+    def descr_writerow(self, w_row):
+        """writerow(sequence)
+
+Construct and write a CSV record from a sequence of fields.  Non-string
+elements will be converted to string."""
+        space = self.space
+        dialect = self.dialect
+        try:
+            rowlen = space.len_w(w_row)
+        except OperationError, e:
+            if not e.match(space, space.w_TypeError):
+                raise
+            raise csv_error(space, "sequence expected")
+
+        # join all fields in internal buffer
+        rec = StringBuilder()
+        num_fields = 0
+        w_iter = space.iter(w_row)
+        while True:
+            try:
+                w_field = space.next(w_iter)
+            except OperationError, e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            quoted = False
+            if dialect.quoting == QUOTE_NONNUMERIC:
+                try:
+                    space.call_function(space.w_float, w_field)
+                except OperationError:
+                    quoted = True
+            elif dialect.quoting == QUOTE_ALL:
+                quoted = True
+
+            if space.is_w(w_field, space.w_None):
+                field = ''
+            elif space.is_w(space.type(w_field), space.w_str):
+                field = space.str_w(w_field)
+            else:
+                field = space.str_w(space.str(w_field))
+            # If this is not the first field we need a field separator
+            if num_fields > 0:
+                rec.append(dialect.delimiter)
+            self.join_append(rec, field, quoted, rowlen == 1)
+            num_fields += 1
+
+        # add line terminator
+        rec.append(dialect.lineterminator)
+        space.call_function(self.w_filewrite, space.wrap(rec.build()))
+
+    def join_append(self, rec, field, quoted, quote_empty):
+        dialect = self.dialect
+        special = dialect.special
+        need_quoting = False
+        for c in field:
+            if special[ord(c)]:
+                need_quoting = True
+                break
+        if not need_quoting:
+            # If field is empty check if it needs to be quoted
+            if not field and quote_empty:
+                if dialect.quoting == QUOTE_NONE:
+                    raise csv_error(self.space,
+                                    "single empty field record must be quoted")
+                quoted = True
+            if quoted:
+                rec.append(dialect.quotechar)
+                rec.append(field)
+                rec.append(dialect.quotechar)
+            else:
+                rec.append(field)
+            return
+
+        # the field contains special characters: first find out if it
+        # must be quoted, then copy it, escaping or doubling as needed
+        if dialect.quoting != QUOTE_NONE and not quoted:
+            for c in field:
+                if special[ord(c)] and not (c == dialect.quotechar and
+                                            not dialect.doublequote):
+                    quoted = True
+                    break
+        if quoted:
+            rec.append(dialect.quotechar)
+        for c in field:
+            if special[ord(c)]:
+                if dialect.quoting == QUOTE_NONE:
+                    want_escape = True
+                elif dialect.has_quotechar and c == dialect.quotechar:
+                    if dialect.doublequote:
+                        rec.append(dialect.quotechar)
+                        want_escape = False
+                    else:
+                        want_escape = True
+                else:
+                    want_escape = False
+                if want_escape:
+                    if not dialect.has_escapechar:
+                        raise csv_error(self.space,
+                                        "need to escape, but no escapechar set")
+                    rec.append(dialect.escapechar)
+            rec.append(c)
+        if quoted:
+            rec.append(dialect.quotechar)
+
+    def descr_writerows(self, w_rows):
+        """writerows(sequence of sequences)
+
+Construct and write a series of sequences to a csv file.  Non-string
+elements will be converted to string."""
+        space = self.space
+        w_iter = space.iter(w_rows)
+        while True:
+            try:
+                w_row = space.next(w_iter)
+            except OperationError, e:
+                if not e.match(space, space.w_StopIteration):
+                    raise
+                break
+            self.descr_writerow(w_row)
+
+
+W_Writer.typedef = TypeDef(
+    '_csv.writer',
+    __doc__ = """CSV writer
+
+Writer objects are responsible for generating tabular data
+in CSV format from sequence input.""",
+    writerow = interp2app(W_Writer.descr_writerow),
+    writerows = interp2app(W_Writer.descr_writerows),
+    dialect = interp_attrproperty_w('w_dialect', W_Writer),
+    )
+W_Writer.typedef.acceptable_as_base_class = False
+
+def csv_writer(space, w_fileobj, __args__):
+    """
+    csv_writer = csv.writer(fileobj [, dialect='excel']
+                            [optional keyword args])
+    for row in sequence:
+        csv_writer.writerow(row)
+
+    [or]
+
+    csv_writer = csv.writer(fileobj [, dialect='excel']
+                            [optional keyword args])
+    csv_writer.writerows(rows)
+
+    The \"fileobj\" argument can be any object that supports the file API."""
+    w_filewrite = space.findattr(w_fileobj, space.wrap('write'))
+    if w_filewrite is None or not space.is_true(space.callable(w_filewrite)):
+        raise OperationError(space.w_TypeError, space.wrap(
+            "argument 1 must have a 'write' method"))
+    dialect = get_dialect(space, __args__)
+    return space.wrap(W_Writer(space, dialect, w_filewrite))
+
+# ____________________________________________________________
+
+def field_size_limit(space, w_limit=NoneNotWrapped):
+    """Sets an upper limit on parsed fields.
+    csv.field_size_limit([limit])
+
+    Returns old limit. If limit is not given, no new limit is set and
+    the old limit is returned"""
+    state = space.fromcache(State)
+    old_limit = state.field_limit
+    if w_limit is not None:
+        if not (space.is_true(space.isinstance(w_limit, space.w_int)) or
+                space.is_true(space.isinstance(w_limit, space.w_long))):
+            raise operationerrfmt(space.w_TypeError, "int expected, got %s",
+                                  space.type(w_limit).getname(space, '?'))
+        state.field_limit = space.int_w(w_limit)
+    return space.wrap(old_limit)
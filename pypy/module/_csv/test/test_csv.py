@@ -0,0 +1,210 @@
+from pypy.conftest import gettestobjspace
+
+
+class AppTestReader:
+
+    def setup_class(cls):
+        cls.space = gettestobjspace(usemodules=['_csv'])
+
+    def w_read(self, input, **kwargs):
+        import _csv
+        return list(_csv.reader(input, **kwargs))
+
+    def test_simple(self):
+        assert self.read([]) == []
+        assert self.read(['']) == [[]]
+        assert self.read(['a,b,c\r\n', 'd,,f\n', '\n', 'g']) == [
+            ['a', 'b', 'c'], ['d', '', 'f'], [], ['g']]
+        assert self.read([',']) == [['', '']]
+        assert self.read(['a;b c'], delimiter=';') == [['a', 'b c']]
+
+    def test_quoted(self):
+        assert self.read(['1,",3,",5']) == [['1', ',3,', '5']]
+        assert self.read(['"a""b",""""']) == [['a"b', '"']]
+        assert self.read(['"a\n', 'b", 7']) == [['a\nb', ' 7']]
+        assert self.read(['"ab"c']) == [['abc']]
+        assert self.read(['"ab"c'], doublequote=False) == [['abc']]
+        assert self.read(['1,",3,",5'], quotechar=None, escapechar='\\') == [
+            ['1', '"', '3', '"', '5']]
+        assert self.read(['a, "b"'], skipinitialspace=True) == [['a', 'b']]
+
+    def test_escape(self):
+        assert self.read(['a,\\b,c'], escapechar='\\') == [['a', 'b', 'c']]
+        assert self.read(['a,b\\,c'], escapechar='\\') == [['a', 'b,c']]
+        assert self.read(['a,"b,\\c"'], escapechar='\\') == [['a', 'b,c']]
+        assert self.read(['a,"b,c\\""'], escapechar='\\') == [['a', 'b,c"']]
+        assert self.read(['a,"b,c"\\'], escapechar='\\') == [['a', 'b,c\\']]
+        assert self.read(['a\\', 'b'], escapechar='\\') == [['a\nb']]
+
+    def test_nonnumeric(self):
+        import _csv
+        assert self.read([',3,"5",7.3, 9'],
+                         quoting=_csv.QUOTE_NONNUMERIC) == [
+            ['', 3, '5', 7.3, 9]]
+        raises(ValueError, self.read, ['abc,3'],
+               quoting=_csv.QUOTE_NONNUMERIC)
+
+    def test_errors(self):
+        import _csv
+        raises(_csv.Error, self.read, ['"ab"c'], strict=True)
+        raises(_csv.Error, self.read, ['ab\0c'])
+        raises(_csv.Error, self.read, ['a,b\rc,d'])
+        raises(_csv.Error, self.read, ['a,b\nc,d'])
+        raises(_csv.Error, self.read, ['"abc'])
+        raises(_csv.Error, self.read, [42])
+        assert self.read([u'a,b']) == [['a', 'b']]
+
+    def test_field_size_limit(self):
+        import _csv
+        limit = _csv.field_size_limit()
+        try:
+            big = 'X' * 1000
+            line = '%s,"%s"' % (big, big)
+            assert _csv.field_size_limit(1000) == limit
+            assert self.read([line]) == [[big, big]]
+            _csv.field_size_limit(999)
+            raises(_csv.Error, self.read, [line])
+            raises(_csv.Error, self.read, ['"' + big[1:], 'XX"'])
+            raises(TypeError, _csv.field_size_limit, None)
+            raises(TypeError, _csv.field_size_limit, 1, None)
+        finally:
+            _csv.field_size_limit(limit)
+
+    def test_line_num_and_dialect(self):
+        import _csv
+        r = _csv.reader(['line,1', '"line', '2"', 'line,3'], delimiter=';')
+        assert r.line_num == 0
+        assert r.dialect.delimiter == ';'
+        assert r.dialect.quotechar == '"'
+        assert r.next() == ['line,1']
+        assert r.line_num == 1
+        assert r.next() == ['line2']
+        assert r.line_num == 3
+        assert list(r) == [['line,3']]
+        raises(StopIteration, r.next)
+        assert r.line_num == 4
+
+    def test_read_rows(self):
+        import _csv
+        r = _csv.reader(['%d,x' % i for i in range(10)])
+        assert r.read_rows(3) == [['0', 'x'], ['1', 'x'], ['2', 'x']]
+        assert r.read_rows(0) == []
+        assert r.next() == ['3', 'x']
+        assert len(r.read_rows(5)) == 5
+        assert r.read_rows(5) == [['9', 'x']]
+        assert r.read_rows(5) == []
+        r = _csv.reader(['a', 'b', 'c'])
+        assert r.read_rows(-1) == [['a'], ['b'], ['c']]
+
+    def test_dialects(self):
+        import _csv
+        class dialect:
+            delimiter = '-'
+            doublequote = False
+            escapechar = '^'
+            lineterminator = '$'
+            quotechar = '#'
+            quoting = _csv.QUOTE_ALL
+            skipinitialspace = True
+            strict = False
+        _csv.register_dialect('testdialect', dialect)
+        try:
+            assert 'testdialect' in _csv.list_dialects()
+            assert self.read(['#a-b#-c^-d'], dialect='testdialect') == [
+                ['a-b', 'c-d']]
+        finally:
+            _csv.unregister_dialect('testdialect')
+        raises(_csv.Error, _csv.get_dialect, 'testdialect')
+        raises(_csv.Error, _csv.reader, [], 'testdialect')
+        raises(TypeError, _csv.reader, [], bad_attr=0)
+        raises(TypeError, _csv.reader, [], delimiter='XX')
+        raises(TypeError, _csv.reader)
+        raises(TypeError, _csv.reader, None)
+
+
+class AppTestWriter:
+
+    def setup_class(cls):
+        cls.space = gettestobjspace(usemodules=['_csv'])
+
+    def w_write(self, fields, **kwargs):
+        import _csv
+        class Output:
+            def __init__(self):
+                self.data = []
+            def write(self, s):
+                self.data.append(s)
+        output = Output()
+        writer = _csv.writer(output, **kwargs)
+        writer.writerow(fields)
+        assert len(output.data) == 1
+        return output.data[0]
+
+    def test_simple(self):
+        assert self.write(()) == '\r\n'
+        assert self.write([None]) == '""\r\n'
+        assert self.write(['a', 1, 2.5, None, '']) == 'a,1,2.5,,\r\n'
+        assert self.write(['a', 'b'], delimiter=';',
+                          lineterminator='\n') == 'a;b\n'
+        assert self.write(['X' * 5000, 'Y']) == 'X' * 5000 + ',Y\r\n'
+
+    def test_quoting(self):
+        import _csv
+        assert self.write(['a', 1, 'p,q']) == 'a,1,"p,q"\r\n'
+        assert self.write(['a"b']) == '"a""b"\r\n'
+        assert self.write(['a\nb']) == '"a\nb"\r\n'
+        assert self.write(['a', 1, 'p,q'],
+                          quoting=_csv.QUOTE_NONNUMERIC) == '"a",1,"p,q"\r\n'
+        assert self.write(['a', 1, 'p,q'],
+                          quoting=_csv.QUOTE_ALL) == '"a","1","p,q"\r\n'
+        raises(_csv.Error, self.write, ['a', 1, 'p,q'],
+               quoting=_csv.QUOTE_NONE)
+        raises(_csv.Error, self.write, [None], quoting=_csv.QUOTE_NONE)
+
+    def test_escape(self):
+        import _csv
+        assert self.write(['a', 1, 'p,q'], escapechar='\\') == (
+            'a,1,"p,q"\r\n')
+        assert self.write(['a', 1, 'p,"q"'], escapechar='\\',
+                          doublequote=False) == 'a,1,"p,\\"q\\""\r\n'
+        assert self.write(['"'], escapechar='\\') == '""""\r\n'
+        assert self.write(['"'], escapechar='\\', doublequote=False) == (
+            '\\"\r\n')
+        assert self.write(['"'], escapechar='\\',
+                          quoting=_csv.QUOTE_NONE) == '\\"\r\n'
+        assert self.write(['a', 1, 'p,q\n'], escapechar='\\',
+                          quoting=_csv.QUOTE_NONE) == 'a,1,p\\,q\\\n\r\n'
+        raises(_csv.Error, self.write, ['a"b'], doublequote=False)
+
+    def test_errors(self):
+        import _csv
+        raises(_csv.Error, self.write, None)
+        raises(TypeError, _csv.writer, None)
+        class BadList:
+            def __len__(self):
+                return 10
+            def __getitem__(self, i):
+                if i > 2:
+                    raise IOError
+        raises(IOError, self.write, BadList())
+        class BadItem:
+            def __str__(self):
+                raise IOError
+        raises(IOError, self.write, [BadItem()])
+
+    def test_writerows(self):
+        import _csv
+        data = []
+        class Output:
+            def write(self, s):
+                data.append(s)
+        writer = _csv.writer(Output())
+        assert writer.dialect.lineterminator == '\r\n'
+        writer.writerows([['a', 'b'], ['c', 'd']])
+        assert data == ['a,b\r\n', 'c,d\r\n']
+        raises(TypeError, writer.writerows, None)
+        rows = [['a\nb', 'b'], ['c', 'x\r\nd']]
+        del data[:]
+        writer.writerows(rows)
+        lines = ''.join(data).splitlines(True)
+        assert list(_csv.reader(lines)) == rows
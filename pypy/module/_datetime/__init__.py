@@ -0,0 +1,25 @@
+"""
+Mixed-module definition for the _datetime module.
+This is an optional module; if not present, datetime.py uses the
+pure Python version of these functions.
+"""
+
+from pypy.interpreter.mixedmodule import MixedModule
+
+
+class Module(MixedModule):
+    """Fast paths for the pure Python datetime module: calendar
+arithmetic, isoformat(), and strftime()/strptime() for the formats that
+do not depend on the locale."""
+
+    appleveldefs = {}
+
+    interpleveldefs = {
+        'ymd2ord':          'interp_datetime.ymd2ord',
+        'ord2ymd':          'interp_datetime.ord2ymd',
+        'format_date':      'interp_datetime.format_date',
+        'format_time':      'interp_datetime.format_time',
+        'format_datetime':  'interp_datetime.format_datetime',
+        'strftime':         'interp_datetime.strftime',
+        'strptime':         'interp_datetime.strptime',
+        }
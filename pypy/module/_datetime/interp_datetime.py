@@ -0,0 +1,427 @@
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.rlib.rstring import StringBuilder
+
+MINYEAR = 1
+MAXYEAR = 9999
+
+# the calendar arithmetic below is done with machine-sized integers;
+# datetime.py never gets anywhere close to this
+YEAR_LIMIT = 1000000
+
+DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+DAYS_BEFORE_MONTH = [-1]
+_dbm = 0
+for _dim in DAYS_IN_MONTH[1:]:
+    DAYS_BEFORE_MONTH.append(_dbm)
+    _dbm += _dim
+del _dbm, _dim
+assert DAYS_BEFORE_MONTH[3] == 59 and DAYS_BEFORE_MONTH[12] == 334
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def days_before_year(year):
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
+
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+def days_before_month(year, month):
+    result = DAYS_BEFORE_MONTH[month]
+    if month > 2 and is_leap(year):
+        result += 1
+    return result
+
+def _ymd2ord(year, month, day):
+    return days_before_year(year) + days_before_month(year, month) + day
+
+DI400Y = days_before_year(401)    # number of days in 400 years
+DI100Y = days_before_year(101)    #    "    "   "   " 100   "
+DI4Y   = days_before_year(5)      #    "    "   "   "   4   "
+
+def _ord2ymd(n):
+    # see the comments in lib_pypy/datetime.py
+    n -= 1
+    n400 = n // DI400Y
+    n = n % DI400Y
+    year = n400 * 400 + 1
+    n100 = n // DI100Y
+    n = n % DI100Y
+    n4 = n // DI4Y
+    n = n % DI4Y
+    n1 = n // 365
+    n = n % 365
+    year += n100 * 100 + n4 * 4 + n1
+    if n1 == 4 or n100 == 4:
+        return year - 1, 12, 31
+    leapyear = n1 == 3 and (n4 != 24 or n100 == 3)
+    month = (n + 50) >> 5
+    preceding = DAYS_BEFORE_MONTH[month]
+    if month > 2 and leapyear:
+        preceding += 1
+    if preceding > n:  # estimate is too large
+        month -= 1
+        preceding -= DAYS_IN_MONTH[month]
+        if month == 2 and leapyear:
+            preceding -= 1
+    return year, month, n - preceding + 1
+
+def check_year_limit(space, year):
+    if not -YEAR_LIMIT < year < YEAR_LIMIT:
+        raise OperationError(space.w_OverflowError,
+                             space.wrap("year is out of range"))
+
+@unwrap_spec(year=int, month=int, day=int)
+def ymd2ord(space, year, month, day):
+    "year, month, day -> ordinal, considering 01-Jan-0001 as day 1."
+    check_year_limit(space, year)
+    if not 1 <= month <= 12:
+        raise OperationError(space.w_ValueError, space.newtuple([
+            space.wrap('month must be in 1..12'), space.wrap(month)]))
+    dim = days_in_month(year, month)
+    if not 1 <= day <= dim:
+        raise OperationError(space.w_ValueError, space.newtuple([
+            space.wrap('day must be in 1..%d' % dim), space.wrap(day)]))
+    return space.wrap(_ymd2ord(year, month, day))
+
+@unwrap_spec(n=int)
+def ord2ymd(space, n):
+    "ordinal -> (year, month, day), considering 01-Jan-0001 as day 1."
+    year, month, day = _ord2ymd(n)
+    return space.newtuple([space.wrap(year), space.wrap(month),
+                           space.wrap(day)])
+
+# ____________________________________________________________
+# formatting
+
+def append_padded(builder, value, width):
+    s = str(value)
+    if value >= 0:
+        for i in range(width - len(s)):
+            builder.append('0')
+    builder.append(s)
+
+def append_date(builder, year, month, day):
+    append_padded(builder, year, 4)
+    builder.append('-')
+    append_padded(builder, month, 2)
+    builder.append('-')
+    append_padded(builder, day, 2)
+
+def append_time(builder, hour, minute, second, microsecond):
+    # Skip trailing microseconds when microsecond==0.
+    append_padded(builder, hour, 2)
+    builder.append(':')
+    append_padded(builder, minute, 2)
+    builder.append(':')
+    append_padded(builder, second, 2)
+    if microsecond:
+        builder.append('.')
+        append_padded(builder, microsecond, 6)
+
+@unwrap_spec(year=int, month=int, day=int)
+def format_date(space, year, month, day):
+    "Format as 'YYYY-MM-DD'."
+    builder = StringBuilder(10)
+    append_date(builder, year, month, day)
+    return space.wrap(builder.build())
+
+@unwrap_spec(hour=int, minute=int, second=int, microsecond=int)
+def format_time(space, hour, minute, second, microsecond):
+    "Format as 'HH:MM:SS.mmmmmm', or 'HH:MM:SS' if microsecond == 0."
+    builder = StringBuilder(15)
+    append_time(builder, hour, minute, second, microsecond)
+    return space.wrap(builder.build())
+
+@unwrap_spec(year=int, month=int, day=int, hour=int, minute=int, second=int,
+             microsecond=int)
+def format_datetime(space, year, month, day, hour, minute, second,
+                    microsecond, w_sep):
+    """Format as 'YYYY-MM-DD<sep>HH:MM:SS.mmmmmm', leaving out the
+    microseconds if they are zero."""
+    if space.is_w(space.type(w_sep), space.w_str):
+        sep = space.str_w(w_sep)
+        if len(sep) == 1:
+            builder = StringBuilder(26)
+            append_date(builder, year, month, day)
+            builder.append(sep[0])
+            append_time(builder, hour, minute, second, microsecond)
+            return space.wrap(builder.build())
+    # let string formatting produce the error or the unicode result
+    w_date = space.mod(space.wrap("%04d-%02d-%02d%c"), space.newtuple([
+        space.wrap(year), space.wrap(month), space.wrap(day), w_sep]))
+    return space.add(w_date, format_time(space, hour, minute, second,
+                                         microsecond))
+
+@unwrap_spec(format=str, year=int, month=int, day=int, hour=int, minute=int,
+             second=int, microsecond=int)
+def strftime(space, format, year, month, day, hour, minute, second,
+             microsecond):
+    """Format a naive date or time, with year >= 1900, if 'format' only
+    contains directives that do not depend on the locale.  Returns None
+    otherwise, and the caller must then use time.strftime()."""
+    check_year_limit(space, year)
+    if not 1 <= month <= 12:
+        return space.w_None
+    builder = StringBuilder(len(format) + 16)
+    i = 0
+    end = len(format)
+    while i < end:
+        c = format[i]
+        i += 1
+        if c != '%':
+            builder.append(c)
+            continue
+        if i == end:
+            return space.w_None
+        c = format[i]
+        i += 1
+        if c == 'd':
+            append_padded(builder, day, 2)
+        elif c == 'm':
+            append_padded(builder, month, 2)
+        elif c == 'Y':
+            builder.append(str(year))
+        elif c == 'y':
+            append_padded(builder, year % 100, 2)
+        elif c == 'H':
+            append_padded(builder, hour, 2)
+        elif c == 'I':
+            hour12 = hour % 12
+            if hour12 == 0:
+                hour12 = 12
+            append_padded(builder, hour12, 2)
+        elif c == 'M':
+            append_padded(builder, minute, 2)
+        elif c == 'S':
+            append_padded(builder, second, 2)
+        elif c == 'f':
+            append_padded(builder, microsecond, 6)
+        elif c == 'j':
+            append_padded(builder, days_before_month(year, month) + day, 3)
+        elif c == 'w':
+            # 0 is Sunday
+            builder.append(str(_ymd2ord(year, month, day) % 7))
+        elif c == 'z' or c == 'Z':
+            pass      # empty for naive objects
+        elif c == '%':
+            builder.append('%')
+        else:
+            return space.w_None
+    return space.wrap(builder.build())
+
+# ____________________________________________________________
+# parsing
+
+def _compile_directive(pattern):
+    """NOT_RPYTHON: turn one of the regular expressions of _strptime.py
+    into a list of alternatives, each being a list of (lo, hi) ranges
+    of characters."""
+    alternatives = []
+    for alternative in pattern.split('|'):
+        ranges = []
+        i = 0
+        while i < len(alternative):
+            c = alternative[i]
+            if c == '[':
+                assert alternative[i + 2] == '-' and alternative[i + 4] == ']'
+                ranges.append((alternative[i + 1], alternative[i + 3]))
+                i += 5
+            elif c == '\\':
+                assert alternative[i + 1] == 'd'
+                ranges.append(('0', '9'))
+                i += 2
+            else:
+                ranges.append((c, c))
+                i += 1
+        alternatives.append(ranges)
+    return alternatives
+
+# The numeric directives of TimeRE in _strptime.py, with the same
+# alternatives in the same order, so that the backtracking finds the same
+# match as the regular expression would.
+DIRECTIVES = {
+    'd': _compile_directive(r"3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9]"),
+    'f': [[('0', '9')] * _n for _n in range(6, 0, -1)],
+    'H': _compile_directive(r"2[0-3]|[0-1]\d|\d"),
+    'I': _compile_directive(r"1[0-2]|0[1-9]|[1-9]"),
+    'j': _compile_directive(r"36[0-6]|3[0-5]\d|[1-2]\d\d|0[1-9]\d|00[1-9]|"
+                            r"[1-9]\d|0[1-9]|[1-9]"),
+    'm': _compile_directive(r"1[0-2]|0[1-9]|[1-9]"),
+    'M': _compile_directive(r"[0-5]\d|\d"),
+    'S': _compile_directive(r"6[0-1]|[0-5]\d|\d"),
+    'w': _compile_directive(r"[0-6]"),
+    'y': _compile_directive(r"\d\d"),
+    'Y': _compile_directive(r"\d\d\d\d"),
+    '%': _compile_directive(r"%"),
+    }
+
+ITEM_LITERAL = 0      # one character, compared case-insensitively
+ITEM_SPACE = 1        # one or more whitespace characters
+ITEM_DIRECTIVE = 2    # one of the DIRECTIVES
+
+
+def match_alternative(s, pos, ranges):
+    if pos + len(ranges) > len(s):
+        return -1
+    for lo, hi in ranges:
+        c = s[pos]
+        if not lo <= c <= hi:
+            return -1
+        pos += 1
+    return pos
+
+
+class StrptimeMatcher(object):
+    """Matches the compiled format against the string the way the regular
+    expression built by _strptime.py would, remembering where each
+    directive matched."""
+
+    def __init__(self, s, kinds, chars):
+        self.s = s
+        self.kinds = kinds
+        self.chars = chars
+        self.starts = [0] * len(kinds)
+        self.ends = [0] * len(kinds)
+        self.end = 0
+
+    def match(self, index, pos):
+        if index == len(self.kinds):
+            self.end = pos
+            return True
+        s = self.s
+        kind = self.kinds[index]
+        if kind == ITEM_LITERAL:
+            if pos < len(s) and s[pos].lower() == self.chars[index]:
+                return self.match(index + 1, pos + 1)
+            return False
+        elif kind == ITEM_SPACE:
+            end = pos
+            while end < len(s) and s[end].isspace():
+                end += 1
+            while end > pos:      # greedy
+                if self.match(index + 1, end):
+                    return True
+                end -= 1
+            return False
+        else:
+            for ranges in DIRECTIVES[self.chars[index]]:
+                end = match_alternative(s, pos, ranges)
+                if end >= 0:
+                    self.starts[index] = pos
+                    self.ends[index] = end
+                    if self.match(index + 1, end):
+                        return True
+            return False
+
+    def getvalue(self, index):
+        result = 0
+        for i in range(self.starts[index], self.ends[index]):
+            c = self.s[i]
+            if c != ' ':
+                result = result * 10 + (ord(c) - ord('0'))
+        return result
+
+
+def compile_format(format):
+    kinds = []
+    chars = []
+    seen = {}
+    i = 0
+    end = len(format)
+    while i < end:
+        c = format[i]
+        if c == '%':
+            if i + 1 == end:
+                return None, None
+            c = format[i + 1]
+            if c not in DIRECTIVES:
+                return None, None
+            if c != '%':
+                if c in seen:
+                    return None, None     # a regex error in _strptime.py
+                seen[c] = None
+            kinds.append(ITEM_DIRECTIVE)
+            chars.append(c)
+            i += 2
+        elif c.isspace():
+            while i < end and format[i].isspace():
+                i += 1
+            kinds.append(ITEM_SPACE)
+            chars.append(' ')
+        else:
+            kinds.append(ITEM_LITERAL)
+            chars.append(c.lower())
+            i += 1
+    # these would depend on the order of the groups in a dictionary
+    if ('y' in seen and 'Y' in seen) or ('H' in seen and 'I' in seen):
+        return None, None
+    return kinds, chars
+
+@unwrap_spec(string=str, format=str)
+def strptime(space, string, format):
+    """Parse 'string' according to 'format' like datetime.strptime() and
+    return the tuple (year, month, day, hour, minute, second, microsecond).
+    Returns None if the format uses other directives than %d %f %H %I %j %m
+    %M %S %w %y %Y and %%, or if the string is invalid; the caller must then
+    use _strptime.py, which also produces the proper error message."""
+    kinds, chars = compile_format(format)
+    if kinds is None:
+        return space.w_None
+    matcher = StrptimeMatcher(string, kinds, chars)
+    if not matcher.match(0, 0) or matcher.end != len(string):
+        return space.w_None
+    year = 1900
+    month = day = 1
+    hour = minute = second = microsecond = 0
+    julian = -1
+    for index in range(len(kinds)):
+        if kinds[index] != ITEM_DIRECTIVE:
+            continue
+        c = chars[index]
+        value = matcher.getvalue(index)
+        if c == 'y':
+            if value <= 68:
+                year = value + 2000
+            else:
+                year = value + 1900
+        elif c == 'Y':
+            year = value
+        elif c == 'm':
+            month = value
+        elif c == 'd':
+            day = value
+        elif c == 'H':
+            hour = value
+        elif c == 'I':
+            # no AM/PM indicator: 12 is midnight
+            hour = value % 12
+        elif c == 'M':
+            minute = value
+        elif c == 'S':
+            second = value
+        elif c == 'f':
+            for i in range(6 - (matcher.ends[index] - matcher.starts[index])):
+                value *= 10
+            microsecond = value
+        elif c == 'j':
+            julian = value
+    if not MINYEAR <= year <= MAXYEAR:
+        return space.w_None
+    if julian != -1:
+        year, month, day = _ord2ymd(_ymd2ord(year, 1, 1) + julian - 1)
+        if year > MAXYEAR:
+            return space.w_None
+    elif not 1 <= month <= 12 or not 1 <= day <= days_in_month(year, month):
+        return space.w_None
+    if second > 59:
+        return space.w_None
+    return space.newtuple([space.wrap(year), space.wrap(month),
+                           space.wrap(day), space.wrap(hour),
+                           space.wrap(minute), space.wrap(second),
+                           space.wrap(microsecond)])
@@ -0,0 +1,98 @@
+from pypy.conftest import gettestobjspace
+
+
+class AppTestDatetime:
+
+    def setup_class(cls):
+        cls.space = gettestobjspace(usemodules=['_datetime', 'rctime'])
+
+    def test_ymd2ord(self):
+        from _datetime import ymd2ord, ord2ymd
+        assert ymd2ord(1, 1, 1) == 1
+        assert ymd2ord(1970, 1, 1) == 719163
+        assert ymd2ord(2000, 2, 29) == 730179
+        assert ymd2ord(9999, 12, 31) == 3652059
+        for year in (1, 3, 4, 100, 399, 400, 1900, 2000, 2011, 9999):
+            for month, day in ((1, 1), (2, 28), (3, 1), (12, 31)):
+                n = ymd2ord(year, month, day)
+                assert ord2ymd(n) == (year, month, day)
+                assert ord2ymd(n + 1) != (year, month, day)
+        assert ord2ymd(ymd2ord(2004, 3, 1) - 1) == (2004, 2, 29)
+        assert ord2ymd(ymd2ord(2100, 3, 1) - 1) == (2100, 2, 28)
+        assert ord2ymd(0) == (0, 12, 31)
+        exc = raises(ValueError, ymd2ord, 2011, 13, 1)
+        assert exc.value.args == ('month must be in 1..12', 13)
+        exc = raises(ValueError, ymd2ord, 2011, 2, 29)
+        assert exc.value.args == ('day must be in 1..28', 29)
+
+    def test_format(self):
+        from _datetime import format_date, format_time, format_datetime
+        assert format_date(33, 2, 3) == '0033-02-03'
+        assert format_time(1, 2, 3, 0) == '01:02:03'
+        assert format_time(1, 2, 3, 4) == '01:02:03.000004'
+        assert (format_datetime(2011, 12, 13, 14, 15, 16, 0, 'T') ==
+                '2011-12-13T14:15:16')
+        assert (format_datetime(2011, 12, 13, 14, 15, 16, 123456, ' ') ==
+                '2011-12-13 14:15:16.123456')
+        s = format_datetime(2011, 12, 13, 14, 15, 16, 0, u'x')
+        assert s == u'2011-12-13x14:15:16'
+        assert type(s) is unicode
+        raises(TypeError, format_datetime, 2011, 12, 13, 0, 0, 0, 0, 'ab')
+
+    def test_strftime(self):
+        from _datetime import strftime
+        import time
+        fields = (2011, 3, 6, 17, 5, 9, 12)
+        tt = (2011, 3, 6, 17, 5, 9, 6, 65, -1)
+        for format in ['%Y-%m-%d %H:%M:%S', '%d/%m/%y %I.%M', '%j %w',
+                       'x%%y %%%%', '']:
+            assert strftime(format, *fields) == time.strftime(format, tt)
+        assert strftime('%S.%f%z%Z', *fields) == '09.000012'
+        assert strftime('%I', 2011, 3, 6, 0, 0, 0, 0) == '12'
+        assert strftime('%H:%M', 1900, 1, 1, 0, 0, 0, 0) == '00:00'
+        assert strftime('%a %Y', *fields) is None
+        assert strftime('%c', *fields) is None
+        assert strftime('%Y%', *fields) is None
+
+    def test_strptime(self):
+        from _datetime import strptime
+        assert (strptime('2011-03-06 17:05:09', '%Y-%m-%d %H:%M:%S') ==
+                (2011, 3, 6, 17, 5, 9, 0))
+        assert (strptime('6/3/11  5.09.3', '%d/%m/%y %I.%M.%S') ==
+                (2011, 3, 6, 5, 9, 3, 0))
+        assert strptime('99', '%y') == (1999, 1, 1, 0, 0, 0, 0)
+        assert strptime('12', '%I') == (1900, 1, 1, 0, 0, 0, 0)
+        assert strptime('1.5', '%S.%f') == (1900, 1, 1, 0, 0, 1, 500000)
+        assert strptime('2012 060', '%Y %j') == (2012, 2, 29, 0, 0, 0, 0)
+        assert strptime('T 1X', 't%dx') == (1900, 1, 1, 0, 0, 0, 0)
+        assert strptime('%5', '%%%M') == (1900, 1, 1, 0, 5, 0, 0)
+        assert strptime('2011\t12', '%Y %m') == (2011, 12, 1, 0, 0, 0, 0)
+        # backtracking into the alternatives: '1' then '12', not '11'
+        assert strptime('1112', '%m%d') == (1900, 11, 12, 0, 0, 0, 0)
+        assert strptime('1231', '%m%d') == (1900, 12, 31, 0, 0, 0, 0)
+        # the cases left to _strptime.py
+        assert strptime('2011-02-30', '%Y-%m-%d') is None
+        assert strptime('2011-02-03x', '%Y-%m-%d') is None
+        assert strptime('2011-02', '%Y-%m-%d') is None
+        assert strptime('61', '%S') is None
+        assert strptime('0000', '%Y') is None
+        assert strptime('Mar 2011', '%b %Y') is None
+        assert strptime('11 11', '%m %m') is None
+        assert strptime('11', '%') is None
+        assert strptime('11', '% ') is None
+
+    def test_datetime_module(self):
+        import datetime
+        d = datetime.datetime(2011, 3, 6, 17, 5, 9, 12)
+        assert d.isoformat() == '2011-03-06T17:05:09.000012'
+        assert str(d.date()) == '2011-03-06'
+        assert d.strftime('%Y-%m-%d %H:%M:%S.%f') == '2011-03-06 17:05:09.000012'
+        assert d.time().strftime('%H %f %Y') == '17 000012 1900'
+        assert d.date().strftime('%f %Y') == '000000 2011'
+        assert d.strftime('%b') == 'Mar'
+        d2 = datetime.datetime.strptime('2011-03-06 17:05:09.000012',
+                                        '%Y-%m-%d %H:%M:%S.%f')
+        assert d2 == d
+        raises(ValueError, datetime.datetime.strptime, '2011-02-30',
+               '%Y-%m-%d')
+        raises(AttributeError, setattr, d, 'extra', 42)
@@ -11,6 +11,7 @@ from pypy.module._io.interp_iobase import (
     W_IOBase, DEFAULT_BUFFER_SIZE, convert_size,
     check_readable_w, check_writable_w, check_seekable_w)
 from pypy.module._io.interp_io import W_BlockingIOError
+from pypy.module._io.interp_fileio import W_FileIO
 
 STATE_ZERO, STATE_OK, STATE_DETACHED = range(3)
 
@@ -76,6 +77,10 @@ class RawBuffer(RWBuffer):
     def setitem(self, index, char):
         self.buf[self.start + index] = char
 
+    def setslice(self, start, string):
+        for i in range(len(string)):
+            self.buf[self.start + start + i] = string[i]
+
 class BufferedMixin:
     _mixin_ = True
 
@@ -138,6 +143,16 @@ class BufferedMixin:
         self._check_init(space)
         W_IOBase._check_closed(self, space, message)
 
+    def _raw_fileio(self):
+        # Returns the raw stream if it is exactly a FileIO (not an
+        # app-level subclass), which lets the methods below read and
+        # write its file descriptor directly instead of calling its
+        # app-level methods.  Otherwise, returns None.
+        w_raw = self.w_raw
+        if isinstance(w_raw, W_FileIO) and not w_raw.user_overridden_class:
+            return w_raw
+        return None
+
     def _raw_tell(self, space):
         w_pos = space.call_method(self.w_raw, "tell")
         pos = space.r_longlong_w(w_pos)
@@ -314,9 +329,13 @@ class BufferedMixin:
         self._writer_reset_buf()
 
     def _write(self, space, data):
-        w_data = space.wrap(data)
-        w_written = space.call_method(self.w_raw, "write", w_data)
-        written = space.getindex_w(w_written, space.w_IOError)
+        w_fileio = self._raw_fileio()
+        if w_fileio is not None:
+            written = w_fileio.write_str(space, data)
+        else:
+            w_data = space.wrap(data)
+            w_written = space.call_method(self.w_raw, "write", w_data)
+            written = space.getindex_w(w_written, space.w_IOError)
         if not 0 <= written <= len(data):
             raise OperationError(space.w_IOError, space.wrap(
                 "raw write() returned invalid length"))
@@ -325,11 +344,8 @@ class BufferedMixin:
         return written
 
     def _raw_write(self, space, start, end):
-        # XXX inefficient
-        l = []
-        for i in range(start, end):
-            l.append(self.buffer[i])
-        return self._write(space, ''.join(l))
+        assert 0 <= start <= end
+        return self._write(space, ''.join(self.buffer[start:end]))
 
     def detach_w(self, space):
         self._check_init(space)
@@ -461,9 +477,13 @@ class BufferedMixin:
         if self.writable:
             self._writer_flush_unlocked(space, restore_pos=True)
 
+        w_fileio = self._raw_fileio()
         while True:
             # Read until EOF or until read() would block
-            w_data = space.call_method(self.w_raw, "read")
+            if w_fileio is not None:
+                w_data = w_fileio.readall_w(space)
+            else:
+                w_data = space.call_method(self.w_raw, "read")
             if space.is_w(w_data, space.w_None):
                 if current_size == 0:
                     return w_data
@@ -480,11 +500,15 @@ class BufferedMixin:
 
     def _raw_read(self, space, buffer, start, length):
         length = intmask(length)
-        w_buf = space.wrap(RawBuffer(buffer, start, length))
-        w_size = space.call_method(self.w_raw, "readinto", w_buf)
-        if space.is_w(w_size, space.w_None):
-            raise BlockingIOError()
-        size = space.int_w(w_size)
+        w_fileio = self._raw_fileio()
+        if w_fileio is not None:
+            size = w_fileio.read_into_list(space, buffer, start, length)
+        else:
+            w_buf = space.wrap(RawBuffer(buffer, start, length))
+            w_size = space.call_method(self.w_raw, "readinto", w_buf)
+            if space.is_w(w_size, space.w_None):
+                raise BlockingIOError()
+            size = space.int_w(w_size)
         if size < 0 or size > length:
             raise OperationError(space.w_IOError, space.wrap(
                 "raw readinto() returned invalid length %d "
@@ -3,6 +3,10 @@ from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.error import OperationError, wrap_oserror, wrap_oserror2
 from pypy.rlib.rarithmetic import r_longlong
 from pypy.rlib.rstring import StringBuilder
+from pypy.rlib.objectmodel import keepalive_until_here
+from pypy.rlib import rposix
+from pypy.rpython.lltypesystem import lltype, rffi
+from pypy.translator.tool.cbuild import ExternalCompilationInfo
 from os import O_RDONLY, O_WRONLY, O_RDWR, O_CREAT, O_TRUNC
 import sys, os, stat, errno
 from pypy.module._io.interp_iobase import W_RawIOBase, convert_size
@@ -120,6 +124,17 @@ def new_buffersize(fd, currentsize):
 def verify_fd(fd):
     return
 
+if sys.platform == 'win32':
+    _eci = ExternalCompilationInfo(includes=['io.h'])
+    _c_read_name = '_read'
+else:
+    _eci = ExternalCompilationInfo(includes=['unistd.h'])
+    _c_read_name = 'read'
+
+# read() directly into raw memory; like os.read(), it releases the GIL
+c_read = rffi.llexternal(_c_read_name, [rffi.INT, rffi.VOIDP, rffi.SIZE_T],
+                         rffi.SSIZE_T, compilation_info=_eci)
+
 class W_FileIO(W_RawIOBase):
     def __init__(self, space):
         W_RawIOBase.__init__(self, space)
@@ -329,15 +344,18 @@ class W_FileIO(W_RawIOBase):
         self._check_closed(space)
         self._check_writable(space)
         data = space.bufferstr_w(w_data)
+        return space.wrap(self.write_str(space, data))
 
+    def write_str(self, space, data):
+        # also called directly by the buffered layer
+        self._check_closed(space)
+        self._check_writable(space)
         try:
-            n = os.write(self.fd, data)
+            return os.write(self.fd, data)
         except OSError, e:
             raise wrap_oserror(space, e,
                                exception_name='w_IOError')
 
-        return space.wrap(n)
-
     def read_w(self, space, w_size=None):
         self._check_closed(space)
         self._check_readable(space)
@@ -360,12 +378,44 @@ class W_FileIO(W_RawIOBase):
         rwbuffer = space.rwbuffer_w(w_buffer)
         length = rwbuffer.getlength()
         try:
-            buf = os.read(self.fd, length)
+            # the GIL is released during the read: the array or mmap that
+            # owns the memory must not be resized or closed meanwhile
+            rawbuf = rwbuffer.lock_raw_address()
+        except ValueError:
+            # the buffer is not in raw memory: read a string and copy it
+            try:
+                buf = os.read(self.fd, length)
+            except OSError, e:
+                raise wrap_oserror(space, e,
+                                   exception_name='w_IOError')
+            rwbuffer.setslice(0, buf)
+            return space.wrap(len(buf))
+        # read directly into the buffer, e.g. the memory of an array
+        try:
+            got = rffi.cast(lltype.Signed, c_read(
+                rffi.cast(rffi.INT, self.fd), rffi.cast(rffi.VOIDP, rawbuf),
+                rffi.cast(rffi.SIZE_T, length)))
+        finally:
+            rwbuffer.unlock_raw_address()
+        keepalive_until_here(rwbuffer)
+        if got < 0:
+            raise wrap_oserror(space, OSError(rposix.get_errno(), "read"),
+                               exception_name='w_IOError')
+        return space.wrap(got)
+
+    def read_into_list(self, space, buffer, start, length):
+        # Like readinto(), but into a list of chars.  Called directly by
+        # the buffered layer, instead of readinto(), to fill its buffer.
+        self._check_closed(space)
+        self._check_readable(space)
+        try:
+            data = os.read(self.fd, length)
         except OSError, e:
             raise wrap_oserror(space, e,
                                exception_name='w_IOError')
-        rwbuffer.setslice(0, buf)
-        return space.wrap(len(buf))
+        for i in range(len(data)):
+            buffer[start + i] = data[i]
+        return len(data)
 
     def readall_w(self, space):
         self._check_closed(space)
@@ -139,6 +139,19 @@ class AppTestBufferedReader:
         f.close()
         assert a == 'a\nb\ncxxxxx'
 
+    def test_fileio_subclass(self):
+        import _io
+        class MyFileIO(_io.FileIO):
+            nbreads = 0
+            def readinto(self, buf):
+                MyFileIO.nbreads += 1
+                return _io.FileIO.readinto(self, buf)
+        raw = MyFileIO(self.tmpfile)
+        f = _io.BufferedReader(raw)
+        assert f.read(3) == "a\nb"
+        assert MyFileIO.nbreads == 1
+        f.close()
+
     def test_seek(self):
         import _io
         raw = _io.FileIO(self.tmpfile)
@@ -223,6 +236,21 @@ class AppTestBufferedWriter:
         f.close()
         assert self.readfile() == "abcd" * 5000
 
+    def test_fileio_subclass(self):
+        import _io
+        class MyFileIO(_io.FileIO):
+            written = []
+            def write(self, data):
+                MyFileIO.written.append(str(data))
+                return _io.FileIO.write(self, data)
+        raw = MyFileIO(self.tmpfile, 'w')
+        f = _io.BufferedWriter(raw, 4)
+        f.write("ab")
+        f.write("cdefgh")
+        f.close()
+        assert self.readfile() == "abcdefgh"
+        assert ''.join(MyFileIO.written) == "abcdefgh"
+
     def test_incomplete(self):
         import _io
         raw = _io.FileIO(self.tmpfile)
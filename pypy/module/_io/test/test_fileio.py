@@ -4,7 +4,7 @@ import os
 
 class AppTestFileIO:
     def setup_class(cls):
-        cls.space = gettestobjspace(usemodules=['_io'])
+        cls.space = gettestobjspace(usemodules=['_io', 'array'])
         tmpfile = udir.join('tmpfile')
         tmpfile.write("a\nb\nc", mode='wb')
         cls.w_tmpfile = cls.space.wrap(str(tmpfile))
@@ -133,6 +133,21 @@ class AppTestFileIO:
         f.close()
         assert a == 'a\nbxxxxxxx'
 
+    def test_readinto_array(self):
+        import _io, array
+        a = array.array('c', 'x' * 10)
+        f = _io.FileIO(self.tmpfile, 'w+')
+        f.write('abcde')
+        f.seek(0)
+        assert f.readinto(a) == 5
+        assert a.tostring() == 'abcdexxxxx'
+        assert f.readinto(a) == 0
+        f.close()
+        raises(ValueError, f.readinto, a)
+        f = _io.FileIO(self.tmpfile, 'w')
+        raises(ValueError, f.readinto, a)
+        f.close()
+
     def test_repr(self):
         import _io
         f = _io.FileIO(self.tmpfile, 'r')
@@ -2,12 +2,15 @@ from pypy.interpreter.baseobjspace import Wrappable
 from pypy.interpreter.typedef import TypeDef, make_weakref_descr,\
      interp_attrproperty
 from pypy.interpreter.gateway import NoneNotWrapped, interp2app, unwrap_spec
-from pypy.rlib.rarithmetic import intmask
+from pypy.rlib.rarithmetic import intmask, r_longlong
+from pypy.rlib.objectmodel import keepalive_until_here
 from pypy.rlib import rsocket
 from pypy.rlib.rsocket import RSocket, AF_INET, SOCK_STREAM
 from pypy.rlib.rsocket import SocketError, SocketErrorWithErrno
 from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter import gateway
+from pypy.rpython.lltypesystem import lltype, rffi
+import errno
 
 class SignalChecker:
     def __init__(self, space):
@@ -200,22 +203,33 @@ class W_RSocket(Wrappable, RSocket):
         except SocketError, e:
             raise converted_error(space, e)
 
-    @unwrap_spec(data='bufferstr', flags=int)
-    def send_w(self, space, data, flags=0):
+    @unwrap_spec(flags=int)
+    def send_w(self, space, w_data, flags=0):
         """send(data[, flags]) -> count
 
         Send a data string to the socket.  For the optional flags
         argument, see the Unix manual.  Return the number of bytes
         sent; this may be less than len(data) if the network is busy.
         """
+        buf = raw_buffer_w(space, w_data)
         try:
-            count = self.send(data, flags)
+            if buf is not None:
+                # the GIL is released during the send: the object owning
+                # the memory must not be resized or closed meanwhile
+                rawbuf = buf.lock_raw_address()
+                try:
+                    count = self.send_raw(rawbuf, buf.getlength(), flags)
+                finally:
+                    buf.unlock_raw_address()
+                keepalive_until_here(buf)
+            else:
+                count = self.send(space.bufferstr_w(w_data), flags)
         except SocketError, e:
             raise converted_error(space, e)
         return space.wrap(count)
 
-    @unwrap_spec(data='bufferstr', flags=int)
-    def sendall_w(self, space, data, flags=0):
+    @unwrap_spec(flags=int)
+    def sendall_w(self, space, w_data, flags=0):
         """sendall(data[, flags])
 
         Send a data string to the socket.  For the optional flags
@@ -223,11 +237,37 @@ class W_RSocket(Wrappable, RSocket):
         until all data is sent.  If an error occurs, it's impossible
         to tell how much data has been sent.
         """
+        buf = raw_buffer_w(space, w_data)
         try:
-            count = self.sendall(data, flags, SignalChecker(space))
+            if buf is not None:
+                self._sendall_buffer(space, buf, flags)
+            else:
+                self.sendall(space.bufferstr_w(w_data), flags,
+                             SignalChecker(space))
         except SocketError, e:
             raise converted_error(space, e)
 
+    def _sendall_buffer(self, space, buf, flags):
+        # like sendall_raw(), but the signal handlers that run between two
+        # calls to send() may resize the object owning the buffer (e.g. an
+        # array.array): so get the address and the length of the buffer
+        # again after each of them.  During a send() the GIL is released,
+        # so the buffer is locked against resizing only for that time.
+        offset = 0
+        while offset < buf.getlength():
+            rawbuf = buf.lock_raw_address()
+            try:
+                try:
+                    offset += self.send_raw(rffi.ptradd(rawbuf, offset),
+                                            buf.getlength() - offset, flags)
+                except SocketErrorWithErrno, e:
+                    if e.errno != errno.EINTR:
+                        raise
+            finally:
+                buf.unlock_raw_address()
+            space.getexecutioncontext().checksignals()
+        keepalive_until_here(buf)
+
     @unwrap_spec(data='bufferstr')
     def sendto_w(self, space, data, w_param2, w_param3=NoneNotWrapped):
         """sendto(data[, flags], address) -> count
@@ -325,6 +365,104 @@ class W_RSocket(Wrappable, RSocket):
         except SocketError, e:
             raise converted_error(space, e)        
 
+    @unwrap_spec(flags=int)
+    def sendmsg_w(self, space, w_buffers, w_ancdata=NoneNotWrapped, flags=0,
+                  w_address=NoneNotWrapped):
+        """sendmsg(buffers[, ancdata[, flags[, address]]]) -> count
+
+        Send the data of a sequence of buffers with a single system call,
+        without concatenating them first.  Strings and buffers that live
+        in raw memory (array, mmap) are not copied.  Return the number of
+        bytes sent.  Ancillary data is not supported; ancdata must be
+        empty.
+        """
+        if w_ancdata is not None and space.is_true(w_ancdata):
+            raise OperationError(space.w_NotImplementedError,
+                space.wrap("sendmsg() does not support ancillary data"))
+        address = None
+        if w_address is not None and not space.is_w(w_address, space.w_None):
+            try:
+                address = self.addr_from_object(space, w_address)
+            except SocketError, e:
+                raise converted_error(space, e)
+        buffers = BufferList(space, w_buffers)
+        try:
+            try:
+                count = self.sendmsg_raw(buffers.dataptrs, buffers.lengths,
+                                         flags, address)
+            except SocketError, e:
+                raise converted_error(space, e)
+        finally:
+            buffers.free()
+        return space.wrap(count)
+
+    def _check_ancbufsize(self, space, ancbufsize):
+        if ancbufsize != 0:
+            raise OperationError(space.w_NotImplementedError,
+                space.wrap("recvmsg() does not support ancillary data"))
+
+    def _recvmsg_result(self, space, w_data, msg_flags, addr):
+        if addr:
+            w_addr = addr.as_object(self.fd, space)
+        else:
+            w_addr = space.w_None
+        return space.newtuple([w_data, space.newlist([]),
+                               space.wrap(msg_flags), w_addr])
+
+    @unwrap_spec(buffersize='nonnegint', ancbufsize=int, flags=int)
+    def recvmsg_w(self, space, buffersize, ancbufsize=0, flags=0):
+        """recvmsg(bufsize[, ancbufsize[, flags]]) -> (data, ancdata, msg_flags, address)
+
+        Receive up to bufsize bytes from the socket with recvmsg().
+        Ancillary data is not supported: ancbufsize must be 0 and ancdata
+        is always an empty list.
+        """
+        self._check_ancbufsize(space, ancbufsize)
+        try:
+            data, msg_flags, addr = self.recvmsg(buffersize, flags)
+        except SocketError, e:
+            raise converted_error(space, e)
+        return self._recvmsg_result(space, space.wrap(data), msg_flags, addr)
+
+    @unwrap_spec(ancbufsize=int, flags=int)
+    def recvmsg_into_w(self, space, w_buffers, ancbufsize=0, flags=0):
+        """recvmsg_into(buffers[, ancbufsize[, flags]]) -> (nbytes, ancdata, msg_flags, address)
+
+        Like recvmsg(), but scatter the data received into a sequence of
+        writable buffers, filled in order.  Buffers that live in raw
+        memory (array, mmap) receive the data directly.
+        """
+        self._check_ancbufsize(space, ancbufsize)
+        buffers = RWBufferList(space, w_buffers)
+        try:
+            try:
+                nbytes, msg_flags, addr = self.recvmsg_raw(
+                    buffers.dataptrs, buffers.lengths, flags)
+            except SocketError, e:
+                raise converted_error(space, e)
+            buffers.copy_back(nbytes)
+        finally:
+            buffers.free()
+        return self._recvmsg_result(space, space.wrap(nbytes), msg_flags,
+                                    addr)
+
+    @unwrap_spec(offset=r_longlong, count='nonnegint')
+    def sendfile_w(self, space, w_file, offset, count):
+        """sendfile(file, offset, count) -> sent
+
+        Send up to count bytes of a regular file, starting at offset,
+        with a single sendfile() system call: the data is not copied
+        through user space.  The file is an object with a fileno() method
+        or a file descriptor; its position is not changed.  Return the
+        number of bytes sent, 0 at the end of the file.
+        """
+        in_fd = space.c_filedescriptor_w(w_file)
+        try:
+            count = self.sendfile(in_fd, offset, count)
+        except SocketError, e:
+            raise converted_error(space, e)
+        return space.wrap(count)
+
     @unwrap_spec(cmd=int)
     def ioctl_w(self, space, cmd, w_option):
         from pypy.rpython.lltypesystem import rffi, lltype
@@ -402,6 +540,115 @@ class W_RSocket(Wrappable, RSocket):
             return
         self.close_w(space)
 
+def raw_buffer_w(space, w_data):
+    """Return the buffer of w_data if its content lives in raw memory,
+    which send() can use without copying it, or None."""
+    if space.isinstance_w(w_data, space.w_str):
+        return None
+    try:
+        buf = space.buffer_w(w_data)
+    except OperationError, e:
+        if not e.match(space, space.w_TypeError):
+            raise
+        return None
+    try:
+        buf.get_raw_address()
+    except ValueError:
+        return None
+    return buf
+
+class BufferList(object):
+    """The data pointers of a sequence of buffers, for sendmsg().
+    Strings are pinned, buffers in raw memory are used directly (and
+    locked against resizing until free()) and other buffers are copied
+    into a string."""
+
+    def __init__(self, space, w_buffers):
+        buffers_w = space.unpackiterable(w_buffers)
+        n = len(buffers_w)
+        self.dataptrs = [lltype.nullptr(rffi.CCHARP.TO)] * n
+        self.lengths = [0] * n
+        self.strings = [None] * n
+        self.buffers = [None] * n
+        try:
+            for i in range(n):
+                w_data = buffers_w[i]
+                buf = raw_buffer_w(space, w_data)
+                if buf is not None:
+                    self.dataptrs[i] = buf.lock_raw_address()
+                    self.buffers[i] = buf
+                    self.lengths[i] = buf.getlength()
+                else:
+                    data = space.bufferstr_w(w_data)
+                    self.dataptrs[i] = rffi.get_nonmovingbuffer(data)
+                    self.strings[i] = data
+                    self.lengths[i] = len(data)
+        except:
+            self.free()
+            raise
+
+    def free(self):
+        for i in range(len(self.strings)):
+            data = self.strings[i]
+            if data is not None:
+                rffi.free_nonmovingbuffer(data, self.dataptrs[i])
+            buf = self.buffers[i]
+            if buf is not None:
+                buf.unlock_raw_address()
+        keepalive_until_here(self.buffers)
+
+class RWBufferList(object):
+    """The data pointers of a sequence of writable buffers, for
+    recvmsg_into().  Buffers in raw memory are locked against resizing
+    until free(); the other ones get a temporary raw buffer, copied into
+    them by copy_back()."""
+
+    def __init__(self, space, w_buffers):
+        buffers_w = space.unpackiterable(w_buffers)
+        n = len(buffers_w)
+        self.dataptrs = [lltype.nullptr(rffi.CCHARP.TO)] * n
+        self.lengths = [0] * n
+        self.temporary = [False] * n
+        self.buffers = [None] * n
+        try:
+            for i in range(n):
+                buf = space.rwbuffer_w(buffers_w[i])
+                length = buf.getlength()
+                try:
+                    self.dataptrs[i] = buf.lock_raw_address()
+                except ValueError:
+                    self.dataptrs[i] = lltype.malloc(rffi.CCHARP.TO, length,
+                                                     flavor='raw')
+                    self.temporary[i] = True
+                self.buffers[i] = buf
+                self.lengths[i] = length
+        except:
+            self.free()
+            raise
+
+    def copy_back(self, nbytes):
+        for i in range(len(self.buffers)):
+            if nbytes <= 0:
+                break
+            length = self.lengths[i]
+            if length > nbytes:
+                length = nbytes
+            if self.temporary[i]:
+                data = rffi.charpsize2str(self.dataptrs[i], length)
+                self.buffers[i].setslice(0, data)
+            nbytes -= length
+
+    def free(self):
+        for i in range(len(self.buffers)):
+            buf = self.buffers[i]
+            if buf is None:
+                continue
+            if self.temporary[i]:
+                lltype.free(self.dataptrs[i], flavor='raw')
+            else:
+                buf.unlock_raw_address()
+        keepalive_until_here(self.buffers)
+
 app_makefile = gateway.applevel(r'''
 def makefile(self, mode="r", buffersize=-1):
     """makefile([mode[, buffersize]]) -> file object
@@ -473,6 +720,12 @@ getpeername getsockname getsockopt gettimeout listen makefile
 recv recvfrom send sendall sendto setblocking
 setsockopt settimeout shutdown _reuse _drop recv_into recvfrom_into
 """.split()
+if hasattr(RSocket, 'sendmsg_raw'):
+    socketmethodnames.append('sendmsg')
+if hasattr(RSocket, 'recvmsg_raw'):
+    socketmethodnames.extend(['recvmsg', 'recvmsg_into'])
+if hasattr(RSocket, 'sendfile'):
+    socketmethodnames.append('sendfile')
 # Remove non-implemented methods
 for name in ('dup',):
     if not hasattr(RSocket, name):
@@ -517,6 +770,10 @@ recvfrom(buflen[, flags]) -- receive data and sender's address
 sendall(data[, flags]) -- send all data
 send(data[, flags]) -- send data, may not send all of it
 sendto(data[, flags], addr) -- send data to a given address
+sendmsg(buffers[, ancdata[, flags[, addr]]]) -- send a sequence of buffers [*]
+recvmsg(buflen[, ancbufsize[, flags]]) -- receive data with recvmsg() [*]
+recvmsg_into(buffers[, ancbufsize[, flags]]) -- receive data into buffers [*]
+sendfile(file, offset, count) -- send data from a file [*]
 setblocking(0 | 1) -- set or clear the blocking I/O flag
 setsockopt(level, optname, value) -- set socket options
 settimeout(None | float) -- set or clear the timeout
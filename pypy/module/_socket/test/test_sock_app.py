@@ -554,6 +554,7 @@ class AppTestSocket:
 class AppTestSocketTCP:
     def setup_class(cls):
         cls.space = space
+        cls.w_tempfile = space.wrap(str(udir.join('socket_sendfile')))
 
     HOST = 'localhost'
         
@@ -653,6 +654,93 @@ class AppTestSocketTCP:
         cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         assert cli.family == socket.AF_INET
 
+    def test_send_raw_buffers(self):
+        import socket
+        import array
+        cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cli.connect(self.serv.getsockname())
+        conn, addr = self.serv.accept()
+        assert conn.send(array.array('c', 'abc')) == 3
+        conn.sendall(array.array('c', 'def' * 1000))
+        conn.sendall(buffer('ghi', 1))
+        data = ''
+        while len(data) < 3005:
+            data += cli.recv(10000)
+        assert data == 'abc' + 'def' * 1000 + 'hi'
+
+    def test_sendmsg_recvmsg(self):
+        import socket
+        import array
+        if not hasattr(socket.socket, 'sendmsg'):
+            skip("no sendmsg")
+        cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cli.connect(self.serv.getsockname())
+        conn, addr = self.serv.accept()
+        count = conn.sendmsg(['abc', buffer('xdef', 1), array.array('c', 'gh')])
+        assert count == 8
+        data, ancdata, flags, addr = cli.recvmsg(100)
+        assert data == 'abcdefgh'
+        assert ancdata == []
+        assert flags == 0
+        assert cli.sendmsg([]) == 0
+        raises(NotImplementedError, cli.sendmsg, ['a'], [(1, 2, 'x')])
+        raises(NotImplementedError, cli.recvmsg, 100, 10)
+        raises(TypeError, cli.sendmsg, [42])
+        raises(TypeError, cli.sendmsg, 42)
+        a = array.array('c', 'xy')
+        raises(TypeError, cli.sendmsg, [a, 42])
+        a.append('z')     # the failed sendmsg() released the buffer
+        conn.close()
+        cli.close()
+
+    def test_recvmsg_into(self):
+        import socket
+        import array
+        if not hasattr(socket.socket, 'recvmsg_into'):
+            skip("no recvmsg_into")
+        cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cli.connect(self.serv.getsockname())
+        conn, addr = self.serv.accept()
+        conn.sendall('0123456789')
+        a = array.array('c', ' ' * 4)
+        b = bytearray(3)
+        c = array.array('c', ' ' * 10)
+        nbytes, ancdata, flags, addr = cli.recvmsg_into([a, b, c])
+        assert nbytes == 10
+        assert a.tostring() == '0123'
+        assert str(b) == '456'
+        assert c.tostring() == '789       '
+        raises(TypeError, cli.recvmsg_into, ['abc'])
+        raises(TypeError, cli.recvmsg_into, [a, 'abc'])
+        a.append('x')     # the failed recvmsg_into() released the buffer
+        conn.close()
+        cli.close()
+
+    def test_sendfile(self):
+        import socket
+        if not hasattr(socket.socket, 'sendfile'):
+            skip("no sendfile")
+        cli = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        cli.connect(self.serv.getsockname())
+        conn, addr = self.serv.accept()
+        f = open(self.tempfile, 'w+')
+        f.write('0123456789' * 100)
+        f.flush()
+        assert conn._sock.sendfile(f.fileno(), 10, 5) == 5
+        assert cli.recv(100) == '01234'
+        assert conn._sock.sendfile(f, 1000, 5) == 0
+        f.seek(0)
+        assert conn.sendfile(f, 995) == 5
+        assert f.tell() == 1000
+        assert conn.sendfile(f) == 1000
+        data = ''
+        while len(data) < 1005:
+            data += cli.recv(10000)
+        assert data == '56789' + '0123456789' * 100
+        f.close()
+        conn.close()
+        cli.close()
+
 class AppTestErrno:
     def setup_class(cls):
         cls.space = space
@@ -1,6 +1,6 @@
 from __future__ import with_statement
 
-from pypy.interpreter.buffer import RWBuffer
+from pypy.interpreter.buffer import RWBuffer, RawBufferMixin
 from pypy.interpreter.error import OperationError
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.typedef import GetSetProperty, make_weakref_descr
@@ -84,10 +84,15 @@ def descr_typecode(space, self):
 
 
 class W_ArrayBase(W_Object):
+    exports = 0      # number of raw addresses locked by ArrayBuffers
+
     @staticmethod
     def register(typeorder):
         typeorder[W_ArrayBase] = []
 
+    def charbuf(self):
+        raise NotImplementedError
+
 W_ArrayBase.typedef = StdTypeDef(
     'array',
     __new__ = interp2app(w_array),
@@ -143,19 +148,24 @@ for k, v in types.items():
     v.typecode = k
 unroll_typecodes = unrolling_iterable(types.keys())
 
-class ArrayBuffer(RWBuffer):
-    def __init__(self, data, bytes):
-        self.data = data
-        self.len = bytes
+class ArrayBuffer(RawBufferMixin, RWBuffer):
+    # the array may be resized while the buffer is alive, so its length
+    # and address are read again at every access
+    def __init__(self, array):
+        self.array = array
 
     def getlength(self):
-        return self.len
+        return self.array.len * self.array.itemsize
+
+    def get_raw_address(self):
+        return self.array.charbuf()
 
-    def getitem(self, index):
-        return self.data[index]
+    def lock_raw_address(self):
+        self.array.exports += 1
+        return self.array.charbuf()
 
-    def setitem(self, index, char):
-        self.data[index] = char
+    def unlock_raw_address(self):
+        self.array.exports -= 1
 
 
 def make_array(mytype):
@@ -215,6 +225,10 @@ def make_array(mytype):
             self.setlen(0)
 
         def setlen(self, size):
+            if self.exports > 0 and size != self.len:
+                raise OperationError(self.space.w_BufferError,
+                    self.space.wrap("cannot resize an array that is "
+                                    "exporting buffers"))
             if size > 0:
                 if size > self.allocated or size < self.allocated / 2:
                     if size < 9:
@@ -592,7 +606,7 @@ def make_array(mytype):
     # Misc methods
 
     def buffer__Array(space, self):
-        b = ArrayBuffer(self.charbuf(), self.len * mytype.bytes)
+        b = ArrayBuffer(self)
         return space.wrap(b)
 
     def array_buffer_info__Array(space, self):
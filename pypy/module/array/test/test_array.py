@@ -844,6 +844,13 @@ class AppTestArray(BaseArrayTests):
         cls.w_tempfile = cls.space.wrap(
             str(py.test.ensuretemp('array').join('tmpfile')))
         cls.w_maxint = cls.space.wrap(sys.maxint)
+        from pypy.interpreter.gateway import interp2app
+        def lock_buffer(space, w_obj):
+            space.buffer_w(w_obj).lock_raw_address()
+        def unlock_buffer(space, w_obj):
+            space.buffer_w(w_obj).unlock_raw_address()
+        cls.w_lock_buffer = cls.space.wrap(interp2app(lock_buffer))
+        cls.w_unlock_buffer = cls.space.wrap(interp2app(unlock_buffer))
 
 
 
@@ -858,6 +865,18 @@ class AppTestArray(BaseArrayTests):
         data = _rawffi.charp2string(bi[0])
         assert data[0:3] == 'Hi!'
 
+    def test_locked_buffer_prevents_resize(self):
+        a = self.array('i', [1, 2, 3])
+        self.lock_buffer(a)
+        raises(BufferError, a.append, 4)
+        raises(BufferError, a.pop)
+        raises(BufferError, "del a[0]")
+        a[0] = 5       # no resize
+        assert a == self.array('i', [5, 2, 3])
+        self.unlock_buffer(a)
+        a.append(4)
+        assert len(a) == 4
+
     def test_array_reverse_slice_assign_self(self):
         a = self.array('b', range(4))
         a[::-1] = a
@@ -0,0 +1,25 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """C implementation and optimization of the Python pickle module."""
+
+    appleveldefs = {
+        'PickleError':        'app_cpickle.PickleError',
+        'PicklingError':      'app_cpickle.PicklingError',
+        'UnpicklingError':    'app_cpickle.UnpicklingError',
+        'UnpickleableError':  'app_cpickle.PicklingError',
+        'BadPickleGet':       'app_cpickle.BadPickleGet',
+        'compatible_formats': 'app_cpickle.compatible_formats',
+        }
+
+    interpleveldefs = {
+        'Pickler':          'interp_pickle.W_Pickler',
+        'Unpickler':        'interp_pickle.W_Unpickler',
+        'dump':             'interp_pickle.dump',
+        'dumps':            'interp_pickle.dumps',
+        'load':             'interp_pickle.load',
+        'loads':            'interp_pickle.loads',
+        'HIGHEST_PROTOCOL': 'space.wrap(2)',
+        'format_version':   'space.wrap("2.0")',
+        '__version__':      'space.wrap("1.71")',
+        }
@@ -0,0 +1,8 @@
+# The exceptions are the ones of the pure Python pickle module, so that
+# code catching pickle.PicklingError also works with cPickle (as it did
+# with the lib_pypy version of this module).
+from pickle import PickleError, PicklingError, UnpicklingError
+
+BadPickleGet = KeyError
+
+compatible_formats = ['1.0', '1.1', '1.2', '1.3', '2.0']
@@ -0,0 +1,1617 @@
+"""
+Interp-level implementation of the pickle protocols 0, 1 and 2.
+
+The Pickler writes into a StringBuilder that is only handed to the file
+every FLUSH_SIZE bytes and at the end of dump(); the Unpickler is a stack
+machine dispatching directly on the opcode characters.  Real files and
+cStringIO objects are read and written without going through their
+app-level methods.  The few parts of the protocol that are about calling
+out to app-level conventions (copy_reg, __reduce_ex__, looking up
+globals, old-style class instantiation, long encoding) are done by the
+app-level helpers at the end of this file, which mirror pickle.py.
+"""
+
+from pypy.interpreter import gateway
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.function import Function
+from pypy.interpreter.gateway import (interp2app, unwrap_spec,
+                                      NoneNotWrapped)
+from pypy.interpreter.module import Module
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter import unicodehelper
+from pypy.module.__builtin__.interp_classobj import W_ClassObject
+from pypy.module._file.interp_file import W_File
+from pypy.module._file.interp_stream import wrap_streamerror
+from pypy.module.cStringIO.interp_stringio import (W_InputOutputType,
+                                                   W_OutputType)
+from pypy.objspace.std.dictmultiobject import W_DictMultiObject
+from pypy.objspace.std.listobject import W_ListObject
+from pypy.objspace.std.strutil import (string_to_int, string_to_float,
+    ParseStringError, ParseStringOverflowError)
+from pypy.rlib import rstackovf, runicode
+from pypy.rlib.rstring import StringBuilder, UnicodeBuilder
+from pypy.rlib.rstruct import ieee
+from pypy.rlib.streamio import StreamErrors
+
+
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+PERSID          = 'P'
+BINPERSID       = 'Q'
+REDUCE          = 'R'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+BUILD           = 'b'
+GLOBAL          = 'c'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+INST            = 'i'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+OBJ             = 'o'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+TRUE            = 'I01\n'
+FALSE           = 'I00\n'
+
+PROTO           = '\x80'
+NEWOBJ          = '\x81'
+EXT1            = '\x82'
+EXT2            = '\x83'
+EXT4            = '\x84'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+HIGHEST_PROTOCOL = 2
+
+# same as in pickle.py and in CPython's cPickle
+BATCHSIZE = 1000
+
+# the Pickler hands its output to the file in chunks of about this size
+FLUSH_SIZE = 64 * 1024
+
+
+class PickleState:
+    def __init__(self, space):
+        self.w_FunctionType = space.gettypeobject(Function.typedef)
+        self.w_BuiltinFunctionType = space.type(space.builtin.get('len'))
+        self.w_ClassType = space.gettypeobject(W_ClassObject.typedef)
+
+def get_error(space, name):
+    w_module = space.getbuiltinmodule('cPickle')
+    return space.getattr(w_module, space.wrap(name))
+
+def pickling_error(space, msg):
+    return OperationError(get_error(space, 'PicklingError'), space.wrap(msg))
+
+def unpickling_error(space, msg):
+    return OperationError(get_error(space, 'UnpicklingError'),
+                          space.wrap(msg))
+
+def check_protocol(space, w_protocol):
+    if space.is_w(w_protocol, space.w_None):
+        return 0
+    proto = space.int_w(w_protocol)
+    if proto < 0:
+        return HIGHEST_PROTOCOL
+    if proto > HIGHEST_PROTOCOL:
+        raise operationerrfmt(space.w_ValueError,
+            "pickle protocol %d asked for; the highest available "
+            "protocol is %d", proto, HIGHEST_PROTOCOL)
+    return proto
+
+def append_int4(builder, x):
+    builder.append(chr(x & 0xff))
+    builder.append(chr((x >> 8) & 0xff))
+    builder.append(chr((x >> 16) & 0xff))
+    builder.append(chr((x >> 24) & 0xff))
+
+def decode_int4(s):
+    top = ord(s[3])
+    if top >= 0x80:
+        top -= 0x100
+    return (ord(s[0]) | (ord(s[1]) << 8) | (ord(s[2]) << 16) |
+            (top << 24))
+
+def unicode_escape_for_pickle(u):
+    # like pickle.py, escape the backslashes and newlines by hand before
+    # using the raw-unicode-escape codec, which does neither
+    builder = UnicodeBuilder(len(u))
+    for c in u:
+        if c == u'\\':
+            builder.append(u'\\u005c')
+        elif c == u'\n':
+            builder.append(u'\\u000a')
+        else:
+            builder.append(c)
+    u = builder.build()
+    return runicode.unicode_encode_raw_unicode_escape(u, len(u), 'strict')
+
+# ____________________________________________________________
+# Writers: where a Pickler sends its output when it is flushed
+
+class Writer(object):
+    def write(self, data):
+        raise NotImplementedError("abstract base class")
+
+class DirectFileWriter(Writer):
+    def __init__(self, space, file):
+        self.space = space
+        self.file = file
+
+    def write(self, data):
+        file = self.file
+        file.lock()
+        try:
+            try:
+                file.do_direct_write(data)
+            except StreamErrors, e:
+                raise wrap_streamerror(self.space, e, file.w_name)
+        finally:
+            file.unlock()
+
+class StringIOWriter(Writer):
+    def __init__(self, space, output):
+        self.space = space
+        self.output = output
+
+    def write(self, data):
+        self.output.check_closed()
+        self.output.write(data)
+
+class FileWriter(Writer):
+    def __init__(self, space, w_write):
+        self.space = space
+        self.w_write = w_write
+
+    def write(self, data):
+        space = self.space
+        space.call_function(self.w_write, space.wrap(data))
+
+class ListWriter(Writer):
+    # used by the Pickler(protocol) form, which has no file and
+    # returns its output with getvalue()
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(data)
+
+def make_writer(space, w_file):
+    file = space.interpclass_w(w_file)
+    if isinstance(file, W_File):
+        return DirectFileWriter(space, file)
+    if isinstance(file, W_OutputType):
+        return StringIOWriter(space, file)
+    w_write = space.findattr(w_file, space.wrap('write'))
+    if w_write is None:
+        raise OperationError(space.w_TypeError, space.wrap(
+            "argument must have 'write' attribute"))
+    return FileWriter(space, w_write)
+
+# ____________________________________________________________
+# Readers: where an Unpickler gets its input from
+
+class Reader(object):
+    def raise_eof(self):
+        raise OperationError(self.space.w_EOFError, self.space.w_None)
+
+    def read(self, n):
+        """Read exactly n bytes, or raise EOFError."""
+        raise NotImplementedError("abstract base class")
+
+    def readline(self):
+        """Read a line and return it without its final newline."""
+        raise NotImplementedError("abstract base class")
+
+    def readchar(self):
+        return self.read(1)[0]
+
+    def _check_line(self, line):
+        if not line.endswith('\n'):
+            self.raise_eof()
+        end = len(line) - 1
+        assert end >= 0
+        return line[:end]
+
+class StringReader(Reader):
+    def __init__(self, space, data):
+        self.space = space
+        self.data = data
+        self.pos = 0
+
+    def read(self, n):
+        start = self.pos
+        end = start + n
+        if n < 0 or end > len(self.data):
+            self.raise_eof()
+        self.pos = end
+        return self.data[start:end]
+
+    def readline(self):
+        start = self.pos
+        end = self.data.find('\n', start)
+        if end < 0:
+            self.raise_eof()
+        self.pos = end + 1
+        return self.data[start:end]
+
+    def readchar(self):
+        pos = self.pos
+        if pos >= len(self.data):
+            self.raise_eof()
+        self.pos = pos + 1
+        return self.data[pos]
+
+class DirectFileReader(Reader):
+    def __init__(self, space, file):
+        self.space = space
+        self.file = file
+
+    def read(self, n):
+        file = self.file
+        file.lock()
+        try:
+            try:
+                data = file.direct_read(n)
+            except StreamErrors, e:
+                raise wrap_streamerror(self.space, e, file.w_name)
+        finally:
+            file.unlock()
+        if len(data) != n:
+            self.raise_eof()
+        return data
+
+    def readline(self):
+        file = self.file
+        file.lock()
+        try:
+            try:
+                line = file.direct_readline()
+            except StreamErrors, e:
+                raise wrap_streamerror(self.space, e, file.w_name)
+        finally:
+            file.unlock()
+        return self._check_line(line)
+
+class StringIOReader(Reader):
+    def __init__(self, space, input):
+        self.space = space
+        self.input = input
+
+    def read(self, n):
+        self.input.check_closed()
+        data = self.input.read(n)
+        if len(data) != n:
+            self.raise_eof()
+        return data
+
+    def readline(self):
+        self.input.check_closed()
+        return self._check_line(self.input.readline())
+
+class FileReader(Reader):
+    def __init__(self, space, w_read, w_readline):
+        self.space = space
+        self.w_read = w_read
+        self.w_readline = w_readline
+
+    def read(self, n):
+        space = self.space
+        data = space.str_w(space.call_function(self.w_read, space.wrap(n)))
+        if len(data) != n:
+            self.raise_eof()
+        return data
+
+    def readline(self):
+        space = self.space
+        return self._check_line(space.str_w(
+            space.call_function(self.w_readline)))
+
+def make_reader(space, w_file):
+    file = space.interpclass_w(w_file)
+    if isinstance(file, W_File):
+        return DirectFileReader(space, file)
+    if isinstance(file, W_InputOutputType):
+        return StringIOReader(space, file)
+    w_read = space.findattr(w_file, space.wrap('read'))
+    w_readline = space.findattr(w_file, space.wrap('readline'))
+    if w_read is None or w_readline is None:
+        raise OperationError(space.w_TypeError, space.wrap(
+            "argument must have 'read' and 'readline' attributes"))
+    return FileReader(space, w_read, w_readline)
+
+# ____________________________________________________________
+
+def _make_batch_appends(save_item):
+    "NOT_RPYTHON: one copy per kind of list, see W_Pickler.save_list()"
+    def batch_appends(self, items):
+        save = getattr(self, save_item)
+        if not self.bin:
+            for item in items:
+                save(item)
+                self.write(APPEND)
+            return
+        start = 0
+        length = len(items)
+        while start < length:
+            end = min(start + BATCHSIZE, length)
+            if end - start > 1:
+                self.write(MARK)
+                for i in range(start, end):
+                    save(items[i])
+                self.write(APPENDS)
+            else:
+                save(items[start])
+                self.write(APPEND)
+            start = end
+    return batch_appends
+
+class W_Pickler(Wrappable):
+    writer = None
+    w_persistent_id = None
+    w_pers_func = None
+
+    def __init__(self, space):
+        self.space = space
+        self.proto = 0
+        self.bin = False
+        self.fast = False
+        # The memo maps the objects already pickled to their memo index.
+        # Like the IdentityDictStrategy, it is a plain RPython dict keyed
+        # by the wrapped objects, i.e. by identity; this also keeps the
+        # objects alive while pickling, so no _keep_alive() is needed.
+        self.memo = {}
+        self.memo_next = 1     # cPickle starts counting at one
+        self.builder = StringBuilder()
+        self.can_flush = True
+
+    def init(self, space, w_file, w_protocol):
+        if (w_protocol is None and w_file is not None and
+                space.isinstance_w(w_file, space.w_int)):
+            # Pickler(protocol): no file, get the result with getvalue()
+            w_protocol = w_file
+            w_file = None
+        if w_protocol is None:
+            w_protocol = space.w_None
+        self.proto = check_protocol(space, w_protocol)
+        self.bin = self.proto >= 1
+        if w_file is None:
+            self.writer = ListWriter()
+        else:
+            self.writer = make_writer(space, w_file)
+        self.clear_memo()
+
+    def descr_init(self, space, w_file=NoneNotWrapped,
+                   w_protocol=NoneNotWrapped):
+        self.init(space, w_file, w_protocol)
+
+    def clear_memo(self):
+        self.memo.clear()
+        self.memo_next = 1
+
+    def descr_clear_memo(self, space):
+        """Clears the pickler's "memo"."""
+        self.clear_memo()
+
+    def descr_dump(self, space, w_obj):
+        """Write a pickled representation of obj to the open file."""
+        if self.writer is None:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "Pickler.__init__() was not called"))
+        self.dump(w_obj)
+        return space.wrap(self)
+
+    @unwrap_spec(clear=int)
+    def descr_getvalue(self, space, clear=1):
+        """Return the pickles made by a Pickler created without a file."""
+        writer = self.writer
+        if not isinstance(writer, ListWriter):
+            raise OperationError(space.w_TypeError, space.wrap(
+                "getvalue() is only available on picklers created "
+                "without a file"))
+        self.flush()
+        result = ''.join(writer.pieces)
+        if clear:
+            writer.pieces = []
+            self.clear_memo()
+        return space.wrap(result)
+
+    def descr_get_persistent_id(self, space):
+        if self.w_persistent_id is None:
+            return space.w_None
+        return self.w_persistent_id
+
+    def descr_set_persistent_id(self, space, w_value):
+        self.w_persistent_id = w_value
+
+    def descr_get_fast(self, space):
+        return space.newbool(self.fast)
+
+    def descr_set_fast(self, space, w_value):
+        self.fast = space.is_true(w_value)
+
+    def descr_get_binary(self, space):
+        return space.newbool(self.bin)
+
+    # ------------------------------------------------------------
+
+    def dump(self, w_obj):
+        space = self.space
+        w_pers_func = self.w_persistent_id
+        if self.user_overridden_class:
+            # a subclass may define a persistent_id() method
+            w_pers_func = space.findattr(space.wrap(self),
+                                         space.wrap('persistent_id'))
+        if w_pers_func is not None and space.is_w(w_pers_func, space.w_None):
+            w_pers_func = None
+        self.w_pers_func = w_pers_func
+        try:
+            if self.proto >= 2:
+                self.builder.append(PROTO)
+                self.builder.append(chr(self.proto))
+            try:
+                self.save(w_obj)
+            except rstackovf.StackOverflow:
+                rstackovf.check_stack_overflow()
+                raise OperationError(space.w_RuntimeError, space.wrap(
+                    "maximum recursion depth exceeded while pickling"))
+            self.builder.append(STOP)
+        finally:
+            self.w_pers_func = None
+            if self.can_flush:
+                self.flush()
+
+    def flush(self):
+        if self.builder.getlength() > 0:
+            data = self.builder.build()
+            self.builder = StringBuilder()
+            self.writer.write(data)
+
+    def write(self, s):
+        self.builder.append(s)
+
+    def memoize(self, w_obj):
+        if self.fast:
+            return
+        index = self.memo_next
+        self.memo_next = index + 1
+        self.memo[w_obj] = index
+        self.write_put(index)
+
+    def write_put(self, index):
+        b = self.builder
+        if self.bin:
+            if index < 256:
+                b.append(BINPUT)
+                b.append(chr(index))
+            else:
+                b.append(LONG_BINPUT)
+                append_int4(b, index)
+        else:
+            b.append(PUT)
+            b.append(str(index))
+            b.append('\n')
+
+    def write_get(self, index):
+        b = self.builder
+        if self.bin:
+            if index < 256:
+                b.append(BINGET)
+                b.append(chr(index))
+            else:
+                b.append(LONG_BINGET)
+                append_int4(b, index)
+        else:
+            b.append(GET)
+            b.append(str(index))
+            b.append('\n')
+
+    def save(self, w_obj, pers_save=False):
+        space = self.space
+        if (self.can_flush and
+                self.builder.getlength() > FLUSH_SIZE):
+            self.flush()
+
+        if self.w_pers_func is not None and not pers_save:
+            w_pid = space.call_function(self.w_pers_func, w_obj)
+            if not space.is_w(w_pid, space.w_None):
+                self.save_pers(w_pid)
+                return
+
+        # the atomic types are never memoized
+        w_type = space.type(w_obj)
+        if space.is_w(w_obj, space.w_None):
+            self.write(NONE)
+            return
+        if space.is_w(w_type, space.w_bool):
+            if space.is_true(w_obj):
+                self.write(NEWTRUE if self.proto >= 2 else TRUE)
+            else:
+                self.write(NEWFALSE if self.proto >= 2 else FALSE)
+            return
+        if space.is_w(w_type, space.w_int):
+            self.save_int(space.int_w(w_obj))
+            return
+        if space.is_w(w_type, space.w_float):
+            self.save_float(w_obj)
+            return
+
+        if not self.fast:
+            index = self.memo.get(w_obj, 0)
+            if index:
+                self.write_get(index)
+                return
+
+        if space.is_w(w_type, space.w_str):
+            self.save_str(space.str_w(w_obj), w_obj)
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list):
+            self.save_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.save_dict(w_obj)
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_unicode(w_obj)
+        elif space.is_w(w_type, space.w_long):
+            self.save_long(w_obj)
+        else:
+            self.save_other(w_obj, w_type)
+
+    def save_pers(self, w_pid):
+        space = self.space
+        if self.bin:
+            self.save(w_pid, pers_save=True)
+            self.write(BINPERSID)
+        else:
+            self.write(PERSID)
+            self.write(space.str_w(space.str(w_pid)))
+            self.write('\n')
+
+    def save_int(self, x):
+        b = self.builder
+        if self.bin:
+            if 0 <= x <= 0xff:
+                b.append(BININT1)
+                b.append(chr(x))
+                return
+            if 0 <= x <= 0xffff:
+                b.append(BININT2)
+                b.append(chr(x & 0xff))
+                b.append(chr(x >> 8))
+                return
+            high_bits = x >> 31
+            if high_bits == 0 or high_bits == -1:
+                b.append(BININT)
+                append_int4(b, x)
+                return
+        b.append(INT)
+        b.append(str(x))
+        b.append('\n')
+
+    def save_float(self, w_obj):
+        space = self.space
+        if self.bin:
+            result = []
+            ieee.pack_float(result, space.float_w(w_obj), 8, True)
+            self.write(BINFLOAT)
+            self.write(''.join(result))
+        else:
+            self.write(FLOAT)
+            self.write(space.str_w(space.repr(w_obj)))
+            self.write('\n')
+
+    def save_str(self, s, w_obj):
+        # 'w_obj' is None for the items of the lists of unwrapped strings:
+        # they have no identity of their own, so they are not memoized
+        b = self.builder
+        if self.bin:
+            n = len(s)
+            if n < 256:
+                b.append(SHORT_BINSTRING)
+                b.append(chr(n))
+            else:
+                b.append(BINSTRING)
+                append_int4(b, n)
+            b.append(s)
+        else:
+            space = self.space
+            if w_obj is None:
+                w_repr = space.repr(space.wrap(s))
+            else:
+                w_repr = space.repr(w_obj)
+            b.append(STRING)
+            b.append(space.str_w(w_repr))
+            b.append('\n')
+        if w_obj is not None:
+            self.memoize(w_obj)
+
+    def save_unicode(self, w_obj):
+        space = self.space
+        u = space.unicode_w(w_obj)
+        b = self.builder
+        if self.bin:
+            encoded = unicodehelper.PyUnicode_EncodeUTF8(space, u)
+            b.append(BINUNICODE)
+            append_int4(b, len(encoded))
+            b.append(encoded)
+        else:
+            b.append(UNICODE)
+            b.append(unicode_escape_for_pickle(u))
+            b.append('\n')
+        self.memoize(w_obj)
+
+    def save_long(self, w_obj):
+        space = self.space
+        b = self.builder
+        if self.proto >= 2:
+            data = space.str_w(encode_long(space, w_obj))
+            n = len(data)
+            if n < 256:
+                b.append(LONG1)
+                b.append(chr(n))
+            else:
+                b.append(LONG4)
+                append_int4(b, n)
+            b.append(data)
+        else:
+            b.append(LONG)
+            b.append(space.str_w(space.repr(w_obj)))
+            b.append('\n')
+
+    def save_tuple(self, w_obj):
+        space = self.space
+        items_w = space.fixedview(w_obj)
+        n = len(items_w)
+        if n == 0:
+            if self.proto:
+                self.write(EMPTY_TUPLE)
+            else:
+                self.write(MARK)
+                self.write(TUPLE)
+            return
+
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            # Subtle: see the comment in pickle.py
+            index = self.memo.get(w_obj, 0)
+            if index:
+                for i in range(n):
+                    self.write(POP)
+                self.write_get(index)
+            else:
+                if n == 1:
+                    self.write(TUPLE1)
+                elif n == 2:
+                    self.write(TUPLE2)
+                else:
+                    self.write(TUPLE3)
+                self.memoize(w_obj)
+            return
+
+        self.write(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        index = self.memo.get(w_obj, 0)
+        if index:
+            # the tuple is recursive: throw away what we put on the stack
+            # and simply GET the tuple, which is already constructed
+            if self.proto:
+                self.write(POP_MARK)
+            else:
+                for i in range(n + 1):
+                    self.write(POP)
+            self.write_get(index)
+            return
+        self.write(TUPLE)
+        self.memoize(w_obj)
+
+    def save_list(self, w_obj):
+        space = self.space
+        if self.bin:
+            self.write(EMPTY_LIST)
+        else:
+            self.write(MARK)
+            self.write(LIST)
+        self.memoize(w_obj)
+        if self.w_pers_func is None:
+            # saving ints and strings does not call app-level code, so
+            # the unwrapped storage of the list cannot change meanwhile
+            ints = space.listview_int(w_obj)
+            if ints is not None:
+                self.batch_appends_int(ints)
+                return
+            strs = space.listview_str(w_obj)
+            if strs is not None:
+                self.batch_appends_str(strs)
+                return
+        self.batch_appends(space.fixedview(w_obj))
+
+    def save_str_item(self, s):
+        self.save_str(s, None)
+
+    batch_appends = _make_batch_appends('save')
+    batch_appends_int = _make_batch_appends('save_int')
+    batch_appends_str = _make_batch_appends('save_str_item')
+    batch_appends_iter_items = _make_batch_appends('save')
+
+    def batch_appends_iter(self, w_iter):
+        # like pickle.py's _batch_appends(), for the listitems of reduce()
+        space = self.space
+        while True:
+            items_w = []
+            while len(items_w) < BATCHSIZE:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError, e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                items_w.append(w_item)
+            if not items_w:
+                return
+            self.batch_appends_iter_items(items_w)
+            if len(items_w) < BATCHSIZE:
+                return
+
+    def save_dict(self, w_obj):
+        space = self.space
+        w_module = self.owning_module(w_obj)
+        if w_module is not None:
+            # save a module's dict as getattr(module, '__dict__')
+            self.save_reduce(space.builtin.get('getattr'),
+                             space.newtuple([w_module,
+                                             space.wrap('__dict__')]),
+                             None, None, None, None)
+            return
+        if self.bin:
+            self.write(EMPTY_DICT)
+        else:
+            self.write(MARK)
+            self.write(DICT)
+        self.memoize(w_obj)
+        assert isinstance(w_obj, W_DictMultiObject)
+        iterator = w_obj.iter()
+        while True:
+            keys_w = []
+            values_w = []
+            while len(keys_w) < BATCHSIZE:
+                w_key, w_value = iterator.next()
+                if w_key is None:
+                    break
+                keys_w.append(w_key)
+                values_w.append(w_value)
+            self.batch_setitems(keys_w, values_w)
+            if len(keys_w) < BATCHSIZE:
+                return
+
+    def batch_setitems(self, keys_w, values_w):
+        n = len(keys_w)
+        if not self.bin:
+            for i in range(n):
+                self.save(keys_w[i])
+                self.save(values_w[i])
+                self.write(SETITEM)
+        elif n > 1:
+            self.write(MARK)
+            for i in range(n):
+                self.save(keys_w[i])
+                self.save(values_w[i])
+            self.write(SETITEMS)
+        elif n == 1:
+            self.save(keys_w[0])
+            self.save(values_w[0])
+            self.write(SETITEM)
+
+    def batch_setitems_iter(self, w_iter):
+        # like pickle.py's _batch_setitems(), for the dictitems of reduce()
+        space = self.space
+        while True:
+            keys_w = []
+            values_w = []
+            while len(keys_w) < BATCHSIZE:
+                try:
+                    w_item = space.next(w_iter)
+                except OperationError, e:
+                    if not e.match(space, space.w_StopIteration):
+                        raise
+                    break
+                w_key, w_value = space.fixedview(w_item, 2)
+                keys_w.append(w_key)
+                values_w.append(w_value)
+            self.batch_setitems(keys_w, values_w)
+            if len(keys_w) < BATCHSIZE:
+                return
+
+    def owning_module(self, w_dict):
+        """Return the module whose __dict__ is w_dict, or None."""
+        space = self.space
+        w_name = space.finditem_str(w_dict, '__name__')
+        if w_name is None or not space.isinstance_w(w_name, space.w_str):
+            return None
+        w_module = space.finditem(space.sys.get('modules'), w_name)
+        if w_module is None:
+            return None
+        module = space.interpclass_w(w_module)
+        if isinstance(module, Module) and module.w_dict is w_dict:
+            return w_module
+        return None
+
+    def save_other(self, w_obj, w_type):
+        space = self.space
+        state = space.fromcache(PickleState)
+        if space.is_oldstyle_instance(w_obj):
+            self.save_inst(w_obj)
+            return
+        if (space.is_w(w_type, state.w_ClassType) or
+                space.is_w(w_type, state.w_BuiltinFunctionType) or
+                space.is_true(space.issubtype(w_type, space.w_type))):
+            self.save_global(w_obj, None)
+            return
+        if space.is_w(w_type, state.w_FunctionType):
+            try:
+                self.save_global(w_obj, None)
+                return
+            except OperationError, e:
+                if not e.match(space, get_error(space, 'PicklingError')):
+                    raise
+                # fall back to reduce(), like PyPy's pickle.py
+        w_rv = reduce_object(space, w_obj, space.wrap(self.proto))
+        if space.isinstance_w(w_rv, space.w_str):
+            self.save_global(w_obj, w_rv)
+            return
+        w_func, w_args, w_state, w_listitems, w_dictitems = (
+            space.fixedview(w_rv, 5))
+        self.save_reduce(w_func, w_args, w_state, w_listitems, w_dictitems,
+                         w_obj)
+
+    def save_reduce(self, w_func, w_args, w_state, w_listitems, w_dictitems,
+                    w_obj):
+        space = self.space
+        if not space.isinstance_w(w_args, space.w_tuple):
+            raise pickling_error(space,
+                                 "args from reduce() should be a tuple")
+        if not space.is_true(space.callable(w_func)):
+            raise pickling_error(space,
+                                 "func from reduce should be callable")
+
+        w_name = space.findattr(w_func, space.wrap('__name__'))
+        if (self.proto >= 2 and w_name is not None and
+                space.isinstance_w(w_name, space.w_str) and
+                space.str_w(w_name) == '__newobj__'):
+            args_w = space.fixedview(w_args)
+            if len(args_w) == 0:
+                raise pickling_error(space,
+                    "__newobj__ arglist is empty")
+            w_cls = args_w[0]
+            if space.findattr(w_cls, space.wrap('__new__')) is None:
+                raise pickling_error(space,
+                    "args[0] from __newobj__ args has no __new__")
+            if w_obj is not None and not space.is_w(
+                    w_cls, space.getattr(w_obj, space.wrap('__class__'))):
+                raise pickling_error(space,
+                    "args[0] from __newobj__ args has the wrong class")
+            self.save(w_cls)
+            self.save(space.newtuple(args_w[1:]))
+            self.write(NEWOBJ)
+        else:
+            self.save(w_func)
+            self.save(w_args)
+            self.write(REDUCE)
+
+        if w_obj is not None:
+            self.memoize(w_obj)
+
+        if w_listitems is not None and not space.is_w(w_listitems,
+                                                      space.w_None):
+            self.batch_appends_iter(space.iter(w_listitems))
+        if w_dictitems is not None and not space.is_w(w_dictitems,
+                                                      space.w_None):
+            self.batch_setitems_iter(space.iter(w_dictitems))
+        if w_state is not None and not space.is_w(w_state, space.w_None):
+            self.save(w_state)
+            self.write(BUILD)
+
+    def save_inst(self, w_obj):
+        space = self.space
+        w_cls = space.getattr(w_obj, space.wrap('__class__'))
+        w_getinitargs = space.findattr(w_obj, space.wrap('__getinitargs__'))
+        if w_getinitargs is not None:
+            args_w = space.fixedview(space.call_function(w_getinitargs))
+        else:
+            args_w = []
+
+        self.write(MARK)
+        if self.bin:
+            self.save(w_cls)
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(OBJ)
+        else:
+            for w_arg in args_w:
+                self.save(w_arg)
+            self.write(INST)
+            self.write(space.str_w(space.getattr(w_cls,
+                                                 space.wrap('__module__'))))
+            self.write('\n')
+            self.write(space.str_w(space.getattr(w_cls,
+                                                 space.wrap('__name__'))))
+            self.write('\n')
+        self.memoize(w_obj)
+
+        w_getstate = space.findattr(w_obj, space.wrap('__getstate__'))
+        if w_getstate is not None:
+            w_state = space.call_function(w_getstate)
+        else:
+            w_state = space.getattr(w_obj, space.wrap('__dict__'))
+        self.save(w_state)
+        self.write(BUILD)
+
+    def save_global(self, w_obj, w_name):
+        space = self.space
+        if w_name is None:
+            w_name = space.w_None
+        w_module, w_name, w_code = space.fixedview(
+            lookup_global(space, w_obj, w_name), 3)
+        if self.proto >= 2:
+            code = space.int_w(w_code)
+            if code:
+                assert code > 0
+                b = self.builder
+                if code <= 0xff:
+                    b.append(EXT1)
+                    b.append(chr(code))
+                elif code <= 0xffff:
+                    b.append(EXT2)
+                    b.append(chr(code & 0xff))
+                    b.append(chr(code >> 8))
+                else:
+                    b.append(EXT4)
+                    append_int4(b, code)
+                return
+        self.write(GLOBAL)
+        self.write(space.str_w(w_module))
+        self.write('\n')
+        self.write(space.str_w(w_name))
+        self.write('\n')
+        self.memoize(w_obj)
+
+
+def descr_new_pickler(space, w_subtype, __args__):
+    w_self = space.allocate_instance(W_Pickler, w_subtype)
+    W_Pickler.__init__(space.interp_w(W_Pickler, w_self), space)
+    return w_self
+
+W_Pickler.typedef = TypeDef("Pickler",
+    __doc__ = """Pickler(file, protocol=0) -- Create a pickler.
+
+This takes a file-like object for writing a pickle data stream.
+The optional proto argument tells the pickler to use the given
+protocol; supported protocols are 0, 1, 2.  A negative protocol
+selects the highest protocol version supported.  Pickler(protocol)
+creates a pickler without a file, whose output is returned by
+getvalue().""",
+    __module__ = 'cPickle',
+    __new__ = interp2app(descr_new_pickler),
+    __init__ = interp2app(W_Pickler.descr_init),
+    dump = interp2app(W_Pickler.descr_dump),
+    clear_memo = interp2app(W_Pickler.descr_clear_memo),
+    getvalue = interp2app(W_Pickler.descr_getvalue),
+    persistent_id = GetSetProperty(W_Pickler.descr_get_persistent_id,
+                                   W_Pickler.descr_set_persistent_id),
+    fast = GetSetProperty(W_Pickler.descr_get_fast,
+                          W_Pickler.descr_set_fast),
+    binary = GetSetProperty(W_Pickler.descr_get_binary),
+)
+
+# ____________________________________________________________
+
+class W_Unpickler(Wrappable):
+    reader = None
+    w_persistent_load = None
+    w_find_global = None
+    w_find_func = None
+
+    def __init__(self, space):
+        self.space = space
+        self.stack_w = []
+        self.marks = []
+        self.memo_w = {}
+
+    def descr_init(self, space, w_file):
+        self.reader = make_reader(space, w_file)
+
+    def descr_load(self, space):
+        """Read a pickled object representation from the open file."""
+        if self.reader is None:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "Unpickler.__init__() was not called"))
+        return self.load()
+
+    @unwrap_spec(module=str, name=str)
+    def descr_find_class(self, space, module, name):
+        return self.find_class_default(module, name)
+
+    def descr_get_persistent_load(self, space):
+        if self.w_persistent_load is None:
+            return space.w_None
+        return self.w_persistent_load
+
+    def descr_set_persistent_load(self, space, w_value):
+        self.w_persistent_load = w_value
+
+    def descr_get_find_global(self, space):
+        if self.w_find_global is None:
+            return space.w_None
+        return self.w_find_global
+
+    def descr_set_find_global(self, space, w_value):
+        self.w_find_global = w_value
+
+    def descr_get_memo(self, space):
+        w_memo = space.newdict()
+        for index, w_value in self.memo_w.items():
+            space.setitem(w_memo, space.wrap(str(index)), w_value)
+        return w_memo
+
+    # ------------------------------------------------------------
+
+    def load(self):
+        space = self.space
+        w_find_func = self.w_find_global
+        if w_find_func is None and self.user_overridden_class:
+            # a subclass may define a find_class() method, like with
+            # pickle.py.  The base find_class is not looked up, to keep
+            # GLOBAL fast in the common case.
+            w_find_func = space.findattr(space.wrap(self),
+                                         space.wrap('find_class'))
+        if w_find_func is not None and space.is_w(w_find_func, space.w_None):
+            w_find_func = None
+        self.w_find_func = w_find_func
+        self.stack_w = []
+        self.marks = []
+        try:
+            return self.dispatch_loop()
+        finally:
+            self.w_find_func = None
+            self.stack_w = []
+            self.marks = []
+
+    def dispatch_loop(self):
+        space = self.space
+        reader = self.reader
+        while True:
+            key = reader.readchar()
+            if key == STOP:
+                return self.pop()
+            self.dispatch(key)
+
+    def dispatch(self, key):
+        space = self.space
+        reader = self.reader
+        if key == MARK:
+            self.marks.append(len(self.stack_w))
+        elif key == NONE:
+            self.push(space.w_None)
+        elif key == NEWTRUE:
+            self.push(space.w_True)
+        elif key == NEWFALSE:
+            self.push(space.w_False)
+        elif key == BININT:
+            self.push(space.wrap(decode_int4(reader.read(4))))
+        elif key == BININT1:
+            self.push(space.wrap(ord(reader.readchar())))
+        elif key == BININT2:
+            data = reader.read(2)
+            self.push(space.wrap(ord(data[0]) | (ord(data[1]) << 8)))
+        elif key == INT:
+            self.load_int(reader.readline())
+        elif key == LONG:
+            self.push(space.call_function(space.w_long,
+                                          space.wrap(reader.readline()),
+                                          space.wrap(0)))
+        elif key == LONG1:
+            n = ord(reader.readchar())
+            self.push(decode_long(space, space.wrap(reader.read(n))))
+        elif key == LONG4:
+            n = decode_int4(reader.read(4))
+            if n < 0:
+                raise unpickling_error(space, "LONG pickle has negative "
+                                              "byte count")
+            self.push(decode_long(space, space.wrap(reader.read(n))))
+        elif key == BINFLOAT:
+            self.push(space.wrap(ieee.unpack_float(reader.read(8), True)))
+        elif key == FLOAT:
+            self.load_float(reader.readline())
+        elif key == SHORT_BINSTRING:
+            n = ord(reader.readchar())
+            self.push(space.wrap(reader.read(n)))
+        elif key == BINSTRING:
+            n = decode_int4(reader.read(4))
+            if n < 0:
+                raise unpickling_error(space, "BINSTRING pickle has "
+                                              "negative byte count")
+            self.push(space.wrap(reader.read(n)))
+        elif key == STRING:
+            self.load_string(reader.readline())
+        elif key == BINUNICODE:
+            n = decode_int4(reader.read(4))
+            if n < 0:
+                raise unpickling_error(space, "BINUNICODE pickle has "
+                                              "negative byte count")
+            self.push(space.wrap(unicodehelper.PyUnicode_DecodeUTF8(
+                space, reader.read(n))))
+        elif key == UNICODE:
+            self.push(space.wrap(unicodehelper.PyUnicode_DecodeRawUnicodeEscape(
+                space, reader.readline())))
+        elif key == EMPTY_TUPLE:
+            self.push(space.newtuple([]))
+        elif key == TUPLE1:
+            w_1 = self.pop()
+            self.push(space.newtuple([w_1]))
+        elif key == TUPLE2:
+            w_2 = self.pop()
+            w_1 = self.pop()
+            self.push(space.newtuple([w_1, w_2]))
+        elif key == TUPLE3:
+            w_3 = self.pop()
+            w_2 = self.pop()
+            w_1 = self.pop()
+            self.push(space.newtuple([w_1, w_2, w_3]))
+        elif key == TUPLE:
+            self.push(space.newtuple(self.pop_mark_fixed()))
+        elif key == EMPTY_LIST:
+            self.push(space.newlist([]))
+        elif key == LIST:
+            self.push(space.newlist(self.pop_mark()))
+        elif key == EMPTY_DICT:
+            self.push(space.newdict())
+        elif key == DICT:
+            items_w = self.pop_mark()
+            w_dict = space.newdict()
+            self.setitems(w_dict, items_w)
+            self.push(w_dict)
+        elif key == APPEND:
+            w_item = self.pop()
+            self.append_items(self.top(), [w_item])
+        elif key == APPENDS:
+            items_w = self.pop_mark()
+            self.append_items(self.top(), items_w)
+        elif key == SETITEM:
+            w_value = self.pop()
+            w_key = self.pop()
+            space.setitem(self.top(), w_key, w_value)
+        elif key == SETITEMS:
+            items_w = self.pop_mark()
+            self.setitems(self.top(), items_w)
+        elif key == BINPUT:
+            self.memo_w[ord(reader.readchar())] = self.top()
+        elif key == LONG_BINPUT:
+            index = decode_int4(reader.read(4))
+            if index < 0:
+                raise OperationError(space.w_ValueError, space.wrap(
+                    "negative LONG_BINPUT argument"))
+            self.memo_w[index] = self.top()
+        elif key == PUT:
+            self.memo_w[self.parse_index(reader.readline())] = self.top()
+        elif key == BINGET:
+            self.load_get(ord(reader.readchar()))
+        elif key == LONG_BINGET:
+            self.load_get(decode_int4(reader.read(4)))
+        elif key == GET:
+            self.load_get(self.parse_index(reader.readline()))
+        elif key == POP:
+            if self.marks and self.marks[-1] == len(self.stack_w):
+                self.marks.pop()
+            else:
+                self.pop()
+        elif key == POP_MARK:
+            self.pop_mark()
+        elif key == DUP:
+            self.push(self.top())
+        elif key == GLOBAL:
+            module = reader.readline()
+            name = reader.readline()
+            self.push(self.find_class(module, name))
+        elif key == EXT1:
+            self.load_extension(ord(reader.readchar()))
+        elif key == EXT2:
+            data = reader.read(2)
+            self.load_extension(ord(data[0]) | (ord(data[1]) << 8))
+        elif key == EXT4:
+            self.load_extension(decode_int4(reader.read(4)))
+        elif key == REDUCE:
+            w_args = self.pop()
+            w_func = self.pop()
+            self.push(space.call(w_func, w_args))
+        elif key == NEWOBJ:
+            w_args = self.pop()
+            w_cls = self.pop()
+            args_w = [w_cls] + space.fixedview(w_args)
+            w_new = space.getattr(w_cls, space.wrap('__new__'))
+            self.push(space.call(w_new, space.newtuple(args_w)))
+        elif key == BUILD:
+            w_state = self.pop()
+            self.load_build(self.top(), w_state)
+        elif key == INST:
+            module = reader.readline()
+            name = reader.readline()
+            w_cls = self.find_class(module, name)
+            w_args = space.newtuple(self.pop_mark_fixed())
+            self.push(instantiate(space, w_cls, w_args))
+        elif key == OBJ:
+            args_w = self.pop_mark_fixed()
+            if len(args_w) == 0:
+                raise unpickling_error(space, "unpickling stack underflow")
+            w_cls = args_w[0]
+            w_args = space.newtuple(args_w[1:])
+            self.push(instantiate(space, w_cls, w_args))
+        elif key == PERSID:
+            self.push(self.persistent_load(space.wrap(reader.readline())))
+        elif key == BINPERSID:
+            self.push(self.persistent_load(self.pop()))
+        elif key == PROTO:
+            proto = ord(reader.readchar())
+            if proto > HIGHEST_PROTOCOL:
+                raise operationerrfmt(space.w_ValueError,
+                    "unsupported pickle protocol: %d", proto)
+        else:
+            raise operationerrfmt(get_error(space, 'UnpicklingError'),
+                                  "invalid load key, '%s'.", key)
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) <= self.stack_bottom():
+            raise unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w.pop()
+
+    def top(self):
+        if len(self.stack_w) <= self.stack_bottom():
+            raise unpickling_error(self.space, "unpickling stack underflow")
+        return self.stack_w[-1]
+
+    def stack_bottom(self):
+        if self.marks:
+            return self.marks[-1]
+        return 0
+
+    def get_mark(self):
+        if not self.marks:
+            raise unpickling_error(self.space, "could not find MARK")
+        k = self.marks.pop()
+        assert k >= 0
+        return k
+
+    def pop_mark(self):
+        """Pop the objects above the topmost mark, and the mark."""
+        k = self.get_mark()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    def pop_mark_fixed(self):
+        # same as pop_mark(), but returns a list that can be used
+        # directly as the items of a tuple
+        k = self.get_mark()
+        items_w = [None] * (len(self.stack_w) - k)
+        for i in range(len(items_w)):
+            items_w[i] = self.stack_w[k + i]
+        del self.stack_w[k:]
+        return items_w
+
+    def append_items(self, w_list, items_w):
+        space = self.space
+        if isinstance(w_list, W_ListObject) and space.is_w(
+                space.type(w_list), space.w_list):
+            if len(items_w) == 1:
+                w_list.append(items_w[0])
+            else:
+                w_list.extend(space.newlist(items_w))
+        else:
+            for w_item in items_w:
+                space.call_method(w_list, 'append', w_item)
+
+    def setitems(self, w_dict, items_w):
+        space = self.space
+        if len(items_w) & 1:
+            raise unpickling_error(space, "odd number of items for "
+                                          "SETITEMS")
+        for i in range(0, len(items_w), 2):
+            space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+    def parse_index(self, line):
+        try:
+            return string_to_int(line)
+        except (ParseStringError, ParseStringOverflowError):
+            return self.space.int_w(self.space.call_function(
+                self.space.w_int, self.space.wrap(line)))
+
+    def load_get(self, index):
+        try:
+            w_obj = self.memo_w[index]
+        except KeyError:
+            space = self.space
+            raise OperationError(space.w_KeyError, space.wrap(str(index)))
+        self.push(w_obj)
+
+    def load_int(self, line):
+        space = self.space
+        if line == '00':
+            self.push(space.w_False)
+        elif line == '01':
+            self.push(space.w_True)
+        else:
+            try:
+                self.push(space.wrap(string_to_int(line)))
+            except (ParseStringError, ParseStringOverflowError):
+                # too large for an int, or invalid
+                self.push(space.call_function(space.w_int,
+                                              space.wrap(line)))
+
+    def load_float(self, line):
+        space = self.space
+        try:
+            self.push(space.wrap(string_to_float(line)))
+        except ParseStringError:
+            self.push(space.call_function(space.w_float, space.wrap(line)))
+
+    def load_string(self, line):
+        from pypy.interpreter.pyparser.parsestring import PyString_DecodeEscape
+        space = self.space
+        if (len(line) < 2 or line[0] not in '"\'' or
+                line[-1] != line[0]):
+            raise OperationError(space.w_ValueError, space.wrap(
+                "insecure string pickle"))
+        end = len(line) - 1
+        assert end >= 1
+        self.push(space.wrap(PyString_DecodeEscape(space, line[1:end],
+                                                   None)))
+
+    def load_build(self, w_inst, w_state):
+        space = self.space
+        w_setstate = space.findattr(w_inst, space.wrap('__setstate__'))
+        if w_setstate is not None:
+            space.call_function(w_setstate, w_state)
+            return
+        w_slotstate = None
+        if (space.isinstance_w(w_state, space.w_tuple) and
+                space.len_w(w_state) == 2):
+            w_state, w_slotstate = space.fixedview(w_state, 2)
+        if space.is_true(w_state):
+            w_dict = space.getattr(w_inst, space.wrap('__dict__'))
+            space.call_method(w_dict, 'update', w_state)
+        if w_slotstate is not None and space.is_true(w_slotstate):
+            w_items = space.call_method(w_slotstate, 'items')
+            for w_item in space.listview(w_items):
+                w_key, w_value = space.fixedview(w_item, 2)
+                space.setattr(w_inst, w_key, w_value)
+
+    def find_class(self, module, name):
+        space = self.space
+        if self.w_find_func is not None:
+            return space.call_function(self.w_find_func, space.wrap(module),
+                                       space.wrap(name))
+        return self.find_class_default(module, name)
+
+    def find_class_default(self, module, name):
+        space = self.space
+        w_module = space.wrap(module)
+        space.call_function(space.builtin.get('__import__'), w_module)
+        w_module = space.getitem(space.sys.get('modules'), w_module)
+        return space.getattr(w_module, space.wrap(name))
+
+    def load_extension(self, code):
+        space = self.space
+        if self.w_find_func is not None:
+            w_find_func = self.w_find_func
+        else:
+            w_find_func = space.getattr(space.wrap(self),
+                                        space.wrap('find_class'))
+        self.push(get_extension(space, w_find_func, space.wrap(code)))
+
+    def persistent_load(self, w_pid):
+        space = self.space
+        w_func = self.w_persistent_load
+        if w_func is None and self.user_overridden_class:
+            w_func = space.findattr(space.wrap(self),
+                                    space.wrap('persistent_load'))
+        if w_func is None or space.is_w(w_func, space.w_None):
+            raise unpickling_error(space, "A load persistent id "
+                                   "instruction was encountered,\n"
+                                   "but no persistent_load function "
+                                   "was specified.")
+        return space.call_function(w_func, w_pid)
+
+
+def descr_new_unpickler(space, w_subtype, __args__):
+    w_self = space.allocate_instance(W_Unpickler, w_subtype)
+    W_Unpickler.__init__(space.interp_w(W_Unpickler, w_self), space)
+    return w_self
+
+W_Unpickler.typedef = TypeDef("Unpickler",
+    __doc__ = """Unpickler(file) -- Create an unpickler.
+
+This takes a file-like object for reading a pickle data stream.
+The protocol version of the pickle is detected automatically.""",
+    __module__ = 'cPickle',
+    __new__ = interp2app(descr_new_unpickler),
+    __init__ = interp2app(W_Unpickler.descr_init),
+    load = interp2app(W_Unpickler.descr_load),
+    find_class = interp2app(W_Unpickler.descr_find_class),
+    persistent_load = GetSetProperty(W_Unpickler.descr_get_persistent_load,
+                                     W_Unpickler.descr_set_persistent_load),
+    find_global = GetSetProperty(W_Unpickler.descr_get_find_global,
+                                 W_Unpickler.descr_set_find_global),
+    memo = GetSetProperty(W_Unpickler.descr_get_memo),
+)
+
+# ____________________________________________________________
+
+def dump(space, w_obj, w_file, w_protocol=None):
+    """dump(obj, file, protocol=0) -- Write an object in pickle format
+to the given file."""
+    pickler = W_Pickler(space)
+    pickler.init(space, w_file, w_protocol or space.w_None)
+    pickler.dump(w_obj)
+
+def dumps(space, w_obj, w_protocol=None):
+    """dumps(obj, protocol=0) -- Return a string containing an object in
+pickle format."""
+    pickler = W_Pickler(space)
+    pickler.proto = check_protocol(space, w_protocol or space.w_None)
+    pickler.bin = pickler.proto >= 1
+    pickler.can_flush = False
+    pickler.dump(w_obj)
+    return space.wrap(pickler.builder.build())
+
+def load(space, w_file):
+    """load(file) -- Load a pickle from the given file"""
+    unpickler = W_Unpickler(space)
+    unpickler.reader = make_reader(space, w_file)
+    return unpickler.load()
+
+@unwrap_spec(data='bufferstr')
+def loads(space, data):
+    """loads(string) -- Load a pickle from the given string"""
+    unpickler = W_Unpickler(space)
+    unpickler.reader = StringReader(space, data)
+    return unpickler.load()
+
+# ____________________________________________________________
+
+app = gateway.applevel(r'''
+    def reduce_object(obj, proto):
+        "The part of pickle.py's Pickler.save() about reduce()."
+        from copy_reg import dispatch_table
+        from pickle import PicklingError
+        t = type(obj)
+        reduce = dispatch_table.get(t)
+        if reduce:
+            rv = reduce(obj)
+        else:
+            # Check for a __reduce_ex__ method, fall back to __reduce__
+            reduce = getattr(obj, "__reduce_ex__", None)
+            if reduce:
+                rv = reduce(proto)
+            else:
+                reduce = getattr(obj, "__reduce__", None)
+                if reduce:
+                    rv = reduce()
+                else:
+                    raise PicklingError("Can't pickle %r object: %r" %
+                                        (t.__name__, obj))
+        if type(rv) is str:
+            return rv
+        if type(rv) is not tuple:
+            raise PicklingError("%s must return string or tuple" % reduce)
+        l = len(rv)
+        if not (2 <= l <= 5):
+            raise PicklingError("Tuple returned by %s must have "
+                                "two to five elements" % reduce)
+        return rv + (None,) * (5 - l)
+
+    def lookup_global(obj, name):
+        """Check that obj can be pickled as a global; return its module,
+        its name and its extension code (0 if none)."""
+        import sys
+        from copy_reg import _extension_registry
+        from pickle import PicklingError, whichmodule
+        if name is None:
+            name = obj.__name__
+        module = getattr(obj, "__module__", None)
+        if module is None:
+            module = whichmodule(obj, name)
+        try:
+            __import__(module)
+            mod = sys.modules[module]
+            klass = getattr(mod, name)
+        except (ImportError, KeyError, AttributeError):
+            raise PicklingError(
+                "Can't pickle %r: it's not found as %s.%s" %
+                (obj, module, name))
+        else:
+            if klass is not obj:
+                raise PicklingError(
+                    "Can't pickle %r: it's not the same object as %s.%s" %
+                    (obj, module, name))
+        return module, name, _extension_registry.get((module, name), 0)
+
+    def get_extension(find_class, code):
+        from copy_reg import _extension_cache, _inverted_registry
+        nil = []
+        obj = _extension_cache.get(code, nil)
+        if obj is not nil:
+            return obj
+        key = _inverted_registry.get(code)
+        if not key:
+            raise ValueError("unregistered extension code %d" % code)
+        obj = find_class(*key)
+        _extension_cache[code] = obj
+        return obj
+
+    class _EmptyClass:
+        pass
+
+    def instantiate(klass, args):
+        "The part of pickle.py's INST and OBJ opcodes creating the object."
+        from types import ClassType
+        if (not args and type(klass) is ClassType and
+                not hasattr(klass, "__getinitargs__")):
+            value = _EmptyClass()
+            value.__class__ = klass
+            return value
+        try:
+            return klass(*args)
+        except TypeError, err:
+            import sys
+            raise TypeError, "in constructor for %s: %s" % (
+                klass.__name__, str(err)), sys.exc_info()[2]
+
+    def encode_long(x):
+        from pickle import encode_long
+        return encode_long(x)
+
+    def decode_long(data):
+        from pickle import decode_long
+        return decode_long(data)
+''', filename=__file__)
+
+reduce_object = app.interphook('reduce_object')
+lookup_global = app.interphook('lookup_global')
+get_extension = app.interphook('get_extension')
+instantiate = app.interphook('instantiate')
+encode_long = app.interphook('encode_long')
+decode_long = app.interphook('decode_long')
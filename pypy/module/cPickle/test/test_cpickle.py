@@ -0,0 +1,358 @@
+from pypy.conftest import gettestobjspace
+from pypy.tool.udir import udir
+from pypy.module.cPickle import interp_pickle
+
+
+class AppTestCPickle:
+    def setup_class(cls):
+        space = gettestobjspace(usemodules=('cPickle', 'cStringIO',
+                                            'struct', 'binascii'))
+        cls.space = space
+        cls.w_tmpfile = space.wrap(str(udir.join('test_cpickle.dat')))
+        # flush after a few hundred items, not after 64KB, which would take
+        # minutes to pickle and unpickle through app-level files
+        cls.saved_flush_size = interp_pickle.FLUSH_SIZE
+        interp_pickle.FLUSH_SIZE = 1024
+        # a module for the classes and functions that must be found
+        # by name when unpickling
+        helpers = udir.join('cpickle_helpers.py')
+        helpers.write('''
+class Old:
+    def __init__(self, x=None):
+        self.x = x
+    def __eq__(self, other):
+        return other.__class__ is Old and self.__dict__ == other.__dict__
+
+class OldInitArgs:
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+    def __getinitargs__(self):
+        return (self.a, self.b)
+
+class New(object):
+    def __init__(self, x=None):
+        self.x = x
+    def __eq__(self, other):
+        return type(other) is New and self.__dict__ == other.__dict__
+
+class Slots(object):
+    __slots__ = ('a', 'b')
+
+class WithState(object):
+    def __getstate__(self):
+        return {'state': 42}
+    def __setstate__(self, state):
+        self.restored = state
+
+class Reduced(object):
+    def __reduce__(self):
+        return (Reduced.make, (5, 6))
+    @staticmethod
+    def make(a, b):
+        return ('made', a, b)
+
+class MyList(list):
+    pass
+
+class MyDict(dict):
+    pass
+
+def function():
+    pass
+''')
+        space.appexec([space.wrap(str(udir))], """(path):
+            import sys
+            sys.path.insert(0, path)
+        """)
+
+    def teardown_class(cls):
+        interp_pickle.FLUSH_SIZE = cls.saved_flush_size
+
+    def w_roundtrip(self, obj, check_pickle=True):
+        import cPickle, pickle
+        for proto in range(3):
+            s = cPickle.dumps(obj, proto)
+            yield cPickle.loads(s)
+            if check_pickle:
+                # the pickles are readable by pickle.py, and the other way
+                yield pickle.loads(s)
+                yield cPickle.loads(pickle.dumps(obj, proto))
+
+    def test_module(self):
+        import cPickle, pickle
+        assert cPickle.HIGHEST_PROTOCOL == 2
+        assert cPickle.format_version == '2.0'
+        assert cPickle.PicklingError is pickle.PicklingError
+        assert cPickle.UnpicklingError is pickle.UnpicklingError
+        assert cPickle.BadPickleGet is KeyError
+        assert type(cPickle.Pickler) is type
+
+    def test_atoms(self):
+        import sys
+        for obj in [None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                    2**31 - 1, -2**31, sys.maxint, -sys.maxint - 1,
+                    0.0, -1.5, 1e300, float('inf'), 2**100, -2**100, 0L,
+                    '', 'abc', 'x' * 300, '\x00\n\'"\\\xff',
+                    u'', u'abc\u1234\n\\', u'\U00012345']:
+            for res in self.roundtrip(obj):
+                assert res == obj
+                assert type(res) is type(obj)
+
+    def test_nan(self):
+        import cPickle
+        for proto in range(3):
+            x = cPickle.loads(cPickle.dumps(float('nan'), proto))
+            assert x != x
+
+    def test_containers(self):
+        for obj in [(), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4),
+                    [], [1, 2, 3], ['a', 'b'], [1.5, 'a', None],
+                    {}, {1: 2}, {'a': [1, 2], 'b': (3, 4)},
+                    range(2500), [str(i) for i in range(2500)],
+                    dict.fromkeys(range(2500))]:
+            for res in self.roundtrip(obj):
+                assert res == obj
+                assert type(res) is type(obj)
+
+    def test_shared_and_recursive(self):
+        import cPickle
+        l = [1, 2]
+        obj = [l, l, (l,), {'x': l}]
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(obj, proto))
+            assert res == obj
+            assert res[0] is res[1] is res[2][0] is res[3]['x']
+        rec = []
+        rec.append(rec)
+        d = {}
+        d['self'] = d
+        t = (rec,)
+        rec.append(t)
+        for proto in range(3):
+            res = cPickle.loads(cPickle.dumps(rec, proto))
+            assert res[0] is res
+            assert res[1][0] is res
+            res = cPickle.loads(cPickle.dumps(d, proto))
+            assert res['self'] is res
+
+    def test_memo_starts_at_one(self):
+        import cPickle
+        assert cPickle.dumps([u'a'], 1) == (
+            ']q\x01X\x01\x00\x00\x00aq\x02a.')
+        s = 'abc'
+        assert cPickle.dumps((s, s), 2) == (
+            '\x80\x02U\x03abcq\x01h\x01\x86q\x02.')
+
+    def test_unwrapped_lists_not_memoized(self):
+        import cPickle
+        # the strings of a list of strings have no identity of their own
+        s = cPickle.dumps(['ab', 'cd'], 2)
+        assert s == '\x80\x02]q\x01(U\x02abU\x02cde.'
+        assert cPickle.loads(s) == ['ab', 'cd']
+
+    def test_instances(self):
+        import cpickle_helpers as h
+        for obj in [h.Old(5), h.New([1, 2]), h.Old(h.New('x'))]:
+            for res in self.roundtrip(obj):
+                assert res == obj
+        for res in self.roundtrip(h.OldInitArgs(1, 'b')):
+            assert res.__class__ is h.OldInitArgs
+            assert (res.a, res.b) == (1, 'b')
+        for res in self.roundtrip(h.WithState()):
+            assert res.restored == {'state': 42}
+        for res in self.roundtrip(h.Reduced()):
+            assert res == ('made', 5, 6)
+
+    def test_slots(self):
+        import cpickle_helpers as h
+        import cPickle
+        obj = h.Slots()
+        obj.a = 1
+        obj.b = [2]
+        res = cPickle.loads(cPickle.dumps(obj, 2))
+        assert type(res) is h.Slots
+        assert (res.a, res.b) == (1, [2])
+
+    def test_subclasses(self):
+        import cpickle_helpers as h
+        l = h.MyList([1, 2, 3])
+        l.attr = 'x'
+        d = h.MyDict(a=1)
+        for proto in (2,):
+            for res in self.roundtrip(l):
+                assert type(res) is h.MyList
+                assert res == [1, 2, 3]
+                assert res.attr == 'x'
+            for res in self.roundtrip(d):
+                assert type(res) is h.MyDict
+                assert res == {'a': 1}
+
+    def test_globals(self):
+        import cpickle_helpers as h
+        import cPickle
+        for obj in [h.Old, h.New, h.function, len, cPickle.Pickler, type,
+                    object]:
+            for res in self.roundtrip(obj):
+                assert res is obj
+        s = cPickle.dumps(h.New, 0)
+        assert s == 'ccpickle_helpers\nNew\np1\n.'
+
+    def test_module_dict(self):
+        import cPickle, cpickle_helpers
+        d = cPickle.loads(cPickle.dumps(cpickle_helpers.__dict__, 2))
+        assert d is cpickle_helpers.__dict__
+
+    def test_unpicklable(self):
+        import cPickle
+        class Local:
+            pass
+        raises(cPickle.PicklingError, cPickle.dumps, Local)
+        class C(object):
+            def __reduce__(self):
+                return 42
+        raises(cPickle.PicklingError, cPickle.dumps, C())
+        raises(ValueError, cPickle.dumps, 1, 3)
+
+    def test_extension_registry(self):
+        import cPickle, copy_reg
+        import cpickle_helpers as h
+        copy_reg.add_extension('cpickle_helpers', 'New', 0x1234)
+        try:
+            s = cPickle.dumps(h.New, 2)
+            assert s == '\x80\x02\x834\x12.'
+            assert cPickle.loads(s) is h.New
+            assert cPickle.dumps(h.New, 1) == 'ccpickle_helpers\nNew\nq\x01.'
+        finally:
+            copy_reg.remove_extension('cpickle_helpers', 'New', 0x1234)
+
+    def test_persistent_id(self):
+        import cPickle, cStringIO
+        f = cStringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        p.persistent_id = lambda obj: 'ext' if obj == 'x' else None
+        p.dump(['x', 'y'])
+        u = cPickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        u.persistent_load = lambda pid: 'loaded ' + pid
+        assert u.load() == ['loaded ext', 'y']
+        u = cPickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        raises(cPickle.UnpicklingError, u.load)
+
+    def test_subclass_hooks(self):
+        import cPickle, cStringIO
+        class P(cPickle.Pickler):
+            def persistent_id(self, obj):
+                if isinstance(obj, int) and obj > 100:
+                    return str(obj)
+        class U(cPickle.Unpickler):
+            def persistent_load(self, pid):
+                return -int(pid)
+            def find_class(self, module, name):
+                return (module, name)
+        for proto in range(3):
+            f = cStringIO.StringIO()
+            P(f, proto).dump([1, 200, len])
+            f.seek(0)
+            res = U(f).load()
+            assert res == [1, -200, ('__builtin__', 'len')]
+
+    def test_find_global(self):
+        import cPickle, cStringIO
+        u = cPickle.Unpickler(cStringIO.StringIO(cPickle.dumps(len)))
+        u.find_global = lambda module, name: 'forbidden'
+        assert u.load() == 'forbidden'
+
+    def test_pickler_without_file(self):
+        import cPickle
+        p = cPickle.Pickler(1)
+        p.dump([1, 2])
+        s = p.getvalue()
+        assert cPickle.loads(s) == [1, 2]
+        assert p.getvalue() == ''
+
+    def test_pickler_reuse_memo(self):
+        import cPickle, cStringIO
+        f = cStringIO.StringIO()
+        p = cPickle.Pickler(f, 2)
+        l = [1]
+        p.dump(l)
+        p.dump(l)
+        p.clear_memo()
+        p.dump(l)
+        u = cPickle.Unpickler(cStringIO.StringIO(f.getvalue()))
+        a = u.load()
+        b = u.load()
+        assert a is b
+        assert u.load() is not a
+
+    def test_file(self):
+        import cPickle
+        data = [dict.fromkeys(range(100), 'x' * 1000), u'\xe9', 1.5]
+        for proto in range(3):
+            f = open(self.tmpfile, 'wb')
+            cPickle.dump(data, f, proto)
+            cPickle.dump('second', f, proto)
+            f.close()
+            f = open(self.tmpfile, 'rb')
+            assert cPickle.load(f) == data
+            assert cPickle.load(f) == 'second'
+            raises(EOFError, cPickle.load, f)
+            f.close()
+
+    def test_file_like(self):
+        import cPickle
+        class Writer(object):
+            def __init__(self):
+                self.chunks = []
+            def write(self, data):
+                self.chunks.append(data)
+        class Reader(object):
+            def __init__(self, data):
+                self.data = data
+            def read(self, n):
+                result = self.data[:n]
+                self.data = self.data[n:]
+                return result
+            def readline(self):
+                i = self.data.index('\n') + 1
+                result = self.data[:i]
+                self.data = self.data[i:]
+                return result
+        obj = [range(500), 'abc', (1.5, None)]
+        for proto in range(3):
+            w = Writer()
+            cPickle.dump(obj, w, proto)
+            # the output is written in big chunks, not once per opcode
+            assert 1 <= len(w.chunks) < 10
+            assert cPickle.load(Reader(''.join(w.chunks))) == obj
+        raises(TypeError, cPickle.Pickler, object())
+        raises(TypeError, cPickle.Unpickler, object())
+
+    def test_loads_errors(self):
+        import cPickle
+        raises(EOFError, cPickle.loads, '')
+        raises(EOFError, cPickle.loads, 'I12')
+        raises(cPickle.UnpicklingError, cPickle.loads, 'z.')
+        raises(cPickle.UnpicklingError, cPickle.loads, 't.')
+        raises(KeyError, cPickle.loads, 'h\x05.')
+        raises(ValueError, cPickle.loads, "S'abc\n.")
+        raises(ValueError, cPickle.loads, '\x80\x03N.')
+
+    def test_loads_text_opcodes(self):
+        import cPickle
+        assert cPickle.loads('I12\n.') == 12
+        assert cPickle.loads('I99999999999999999999\n.') == 99999999999999999999
+        assert cPickle.loads('I01\n.') is True
+        assert cPickle.loads('L12L\n.') == 12L
+        assert cPickle.loads('F1.25\n.') == 1.25
+        assert cPickle.loads("S'a\\nb'\np1\ng1\n.") == 'a\nb'
+        assert cPickle.loads('Vab\\u1234\n.') == u'ab\u1234'
+        assert cPickle.loads('(I1\nI2\n0t.') == (1,)
+        assert cPickle.loads('(I1\n(I2\n1t.') == (1,)
+
+    def test_deep_recursion(self):
+        import cPickle
+        l = []
+        for i in range(100000):
+            l = [l]
+        raises(RuntimeError, cPickle.dumps, l)
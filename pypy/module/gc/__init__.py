@@ -8,6 +8,7 @@ class Module(MixedModule):
     }
     interpleveldefs = {
         'collect': 'interp_gc.collect',
+        'freeze': 'interp_gc.freeze',
         'enable_finalizers': 'interp_gc.enable_finalizers',
         'disable_finalizers': 'interp_gc.disable_finalizers',
         'garbage' : 'space.newlist([])',
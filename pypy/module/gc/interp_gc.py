@@ -3,9 +3,8 @@ from pypy.interpreter.error import OperationError
 from pypy.rlib import rgc
 from pypy.rlib.streamio import open_file_as_stream
 
-def collect(space):
-    "Run a full collection."
-    # First clear the method cache.  See test_gc for an example of why.
+def _clear_caches(space):
+    # Clear the method cache.  See test_gc for an example of why.
     if space.config.objspace.std.withmethodcache:
         from pypy.objspace.std.typeobject import MethodCache
         cache = space.fromcache(MethodCache)
@@ -14,9 +13,21 @@ def collect(space):
             from pypy.objspace.std.mapdict import IndexCache
             cache = space.fromcache(IndexCache)
             cache.clear()
+
+def collect(space):
+    "Run a full collection."
+    _clear_caches(space)
     rgc.collect()
     return space.wrap(0)
 
+def freeze(space):
+    """Run a full collection, and then make all the objects that are still
+    alive immortal.  The GC does not write to them any more unless they
+    are modified, so the memory they use stays shared with the processes
+    forked afterwards.  Their __del__ methods will never be called."""
+    _clear_caches(space)
+    rgc.freeze()
+
 def enable_finalizers(space):
     if space.user_del_action.finalizers_lock_count == 0:
         raise OperationError(space.w_ValueError,
@@ -6,6 +6,14 @@ class AppTestGC(object):
         import gc
         gc.collect() # mostly a "does not crash" kind of test
 
+    def test_freeze(self):
+        import gc
+        lst = [[i] for i in range(10)]
+        gc.freeze()
+        lst.append([10])
+        gc.collect()
+        assert lst == [[i] for i in range(11)]
+
     def test_disable_finalizers(self):
         import gc
 
@@ -6,11 +6,15 @@ class Module(MixedModule):
     applevel_name = 'numpy'
 
     interpleveldefs = {
-        'array': 'interp_numarray.SingleDimArray',
+        'array': 'interp_numarray.BaseArray',
+        'ndarray': 'interp_numarray.BaseArray',
+        'dtype': 'interp_dtype.W_Dtype',
         'zeros': 'interp_numarray.zeros',
         'empty': 'interp_numarray.zeros',
         'ones': 'interp_numarray.ones',
         'fromstring': 'interp_support.fromstring',
+        'frombuffer': 'interp_support.frombuffer',
+        'ufunc': 'interp_ufuncs.W_Ufunc',
 
         # ufuncs
         'abs': 'interp_ufuncs.absolute',
@@ -34,6 +38,26 @@ class Module(MixedModule):
         'arcsin': 'interp_ufuncs.arcsin',
         'arccos': 'interp_ufuncs.arccos',
         'arctan': 'interp_ufuncs.arctan',
+        'arctan2': 'interp_ufuncs.arctan2',
+        'hypot': 'interp_ufuncs.hypot',
+        'sqrt': 'interp_ufuncs.sqrt',
+        'log': 'interp_ufuncs.log',
+        'log10': 'interp_ufuncs.log10',
+        'log2': 'interp_ufuncs.log2',
+        'log1p': 'interp_ufuncs.log1p',
+        'expm1': 'interp_ufuncs.expm1',
+        'sinh': 'interp_ufuncs.sinh',
+        'cosh': 'interp_ufuncs.cosh',
+        'tanh': 'interp_ufuncs.tanh',
+        'arcsinh': 'interp_ufuncs.arcsinh',
+        'arccosh': 'interp_ufuncs.arccosh',
+        'arctanh': 'interp_ufuncs.arctanh',
+        'equal': 'interp_ufuncs.equal',
+        'not_equal': 'interp_ufuncs.not_equal',
+        'less': 'interp_ufuncs.less',
+        'less_equal': 'interp_ufuncs.less_equal',
+        'greater': 'interp_ufuncs.greater',
+        'greater_equal': 'interp_ufuncs.greater_equal',
     }
 
     appleveldefs = {
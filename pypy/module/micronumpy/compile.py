@@ -3,18 +3,21 @@
 It should not be imported by the module itself
 """
 
-from pypy.module.micronumpy.interp_numarray import FloatWrapper, SingleDimArray, BaseArray
+from pypy.module.micronumpy.interp_dtype import float64_dtype
+from pypy.module.micronumpy.interp_numarray import FloatWrapper, NDimArray, BaseArray
 
 class BogusBytecode(Exception):
     pass
 
 def create_array(size):
-    a = SingleDimArray(size)
+    a = NDimArray([size], float64_dtype)
     for i in range(size):
-        a.storage[i] = float(i % 10)
+        a._setitem(i, float(i % 10))
     return a
 
 class TrivialSpace(object):
+    w_ValueError = None
+
     def wrap(self, x):
         return x
 
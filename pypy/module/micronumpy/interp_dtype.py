@@ -0,0 +1,295 @@
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.gateway import interp2app
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.module.micronumpy.interp_support import Signature
+from pypy.objspace.std.floatobject import float2string as float2string_orig
+from pypy.rlib.rarithmetic import LONG_BIT, ovfcheck_float_to_int
+from pypy.rlib.rfloat import DTSF_STR_PRECISION
+from pypy.rpython.lltypesystem import lltype, rffi
+
+
+BOOLLTR = "b"
+SIGNEDLTR = "i"
+FLOATINGLTR = "f"
+
+def float2string(x):
+    return float2string_orig(x, 'g', DTSF_STR_PRECISION)
+
+def float_to_int(value):
+    """Truncate a float to store it in an array of integers.  Raises
+    OverflowError if it does not fit in a Signed (infinities and NaNs
+    included), instead of the undefined behavior of the C cast."""
+    return ovfcheck_float_to_int(value)
+
+
+class W_Dtype(Wrappable):
+    """The type of the items of an array, and how to store them in the raw
+    storage of an array and read them back.  The items of the float types
+    are read and written as floats, those of the integer types and of bool
+    as Signed integers: the expressions on integer arrays never go through
+    doubles.  The methods that take the other kind of value convert it.
+    """
+    _immutable_fields_ = ["num", "kind", "name", "char", "signature"]
+
+    # the size of one item, set by each subclass.  It must stay a class
+    # attribute: the 'itemsize' property of array.array reads it on any
+    # W_Root, which the annotator only accepts for class attributes.
+    itemsize = 0
+
+    def __init__(self, num, kind, name, char, aliases):
+        self.num = num
+        self.kind = kind
+        self.name = name
+        self.char = char
+        self.aliases = aliases
+        self.signature = Signature()
+
+    def malloc(self, size):
+        return lltype.malloc(rffi.CCHARP.TO, size * self.itemsize,
+                             zero=True, flavor='raw',
+                             track_allocation=False,
+                             add_memory_pressure=True)
+        # XXX find out why test_zjit explodes with tracking of allocations
+
+    def getitem(self, storage, i):
+        raise NotImplementedError
+
+    def getitem_int(self, storage, i):
+        raise NotImplementedError
+
+    def setitem(self, storage, i, value):
+        raise NotImplementedError
+
+    def setitem_int(self, storage, i, value):
+        raise NotImplementedError
+
+    def coerce_int(self, value):
+        """The integer 'value' truncated to the range of this integer or
+        bool dtype, like C does when storing it."""
+        raise NotImplementedError
+
+    def wrap(self, space, value):
+        raise NotImplementedError
+
+    def wrap_int(self, space, value):
+        raise NotImplementedError
+
+    def str_format(self, value):
+        raise NotImplementedError
+
+    def str_format_int(self, value):
+        raise NotImplementedError
+
+    def is_bool_type(self):
+        return self.kind == BOOLLTR
+
+    def is_int_type(self):
+        return self.kind == SIGNEDLTR
+
+    def is_float_type(self):
+        return self.kind == FLOATINGLTR
+
+    def descr_repr(self, space):
+        return space.wrap("dtype('%s')" % self.name)
+
+    def descr_str(self, space):
+        return space.wrap(self.name)
+
+    def descr_get_name(self, space):
+        return space.wrap(self.name)
+
+    def descr_get_kind(self, space):
+        return space.wrap(self.kind)
+
+    def descr_get_char(self, space):
+        return space.wrap(self.char)
+
+    def descr_get_num(self, space):
+        return space.wrap(self.num)
+
+    def descr_get_itemsize(self, space):
+        return space.wrap(self.itemsize)
+
+    def descr_eq(self, space, w_other):
+        return space.wrap(self is get_dtype(space, w_other))
+
+    def descr_ne(self, space, w_other):
+        return space.wrap(self is not get_dtype(space, w_other))
+
+
+def make_dtype(T, num, kind, name, char, aliases=[]):
+    TP = lltype.Ptr(lltype.Array(T, hints={'nolength': True}))
+
+    class W_LowLevelDtype(W_Dtype):
+        itemsize = rffi.sizeof(T)
+
+        if kind == FLOATINGLTR:
+            def getitem(self, storage, i):
+                return float(rffi.cast(TP, storage)[i])
+
+            def getitem_int(self, storage, i):
+                return float_to_int(self.getitem(storage, i))
+
+            def setitem(self, storage, i, value):
+                rffi.cast(TP, storage)[i] = rffi.cast(T, value)
+
+            def setitem_int(self, storage, i, value):
+                self.setitem(storage, i, float(value))
+
+            def wrap(self, space, value):
+                return space.wrap(value)
+
+            def wrap_int(self, space, value):
+                return space.wrap(float(value))
+
+            def str_format(self, value):
+                return float2string(value)
+
+        else:
+            def getitem(self, storage, i):
+                return float(self.getitem_int(storage, i))
+
+            def getitem_int(self, storage, i):
+                return rffi.cast(lltype.Signed, rffi.cast(TP, storage)[i])
+
+            def setitem_int(self, storage, i, value):
+                rffi.cast(TP, storage)[i] = rffi.cast(T, self.coerce_int(value))
+
+        if kind == BOOLLTR:
+            def coerce_int(self, value):
+                return int(value != 0)
+
+            def setitem(self, storage, i, value):
+                rffi.cast(TP, storage)[i] = rffi.cast(T, value != 0.0)
+
+            def wrap(self, space, value):
+                return space.newbool(value != 0.0)
+
+            def wrap_int(self, space, value):
+                return space.newbool(value != 0)
+
+            def str_format_int(self, value):
+                if value != 0:
+                    return "True"
+                return "False"
+
+        elif kind == SIGNEDLTR:
+            def coerce_int(self, value):
+                return rffi.cast(lltype.Signed, rffi.cast(T, value))
+
+            def setitem_int(self, storage, i, value):
+                # the cast to T already truncates
+                rffi.cast(TP, storage)[i] = rffi.cast(T, value)
+
+            def setitem(self, storage, i, value):
+                self.setitem_int(storage, i, float_to_int(value))
+
+            def wrap(self, space, value):
+                return self.wrap_int(space, float_to_int(value))
+
+            def wrap_int(self, space, value):
+                return space.wrap(self.coerce_int(value))
+
+            def str_format_int(self, value):
+                return str(value)
+
+    W_LowLevelDtype.__name__ = "W_%sDtype" % name.capitalize()
+    return W_LowLevelDtype(num, kind, name, char, aliases)
+
+# booleans are stored as one byte holding 0 or 1, like in C
+bool_dtype = make_dtype(rffi.UCHAR, 0, BOOLLTR, "bool", "?", ["bool8"])
+int8_dtype = make_dtype(rffi.SIGNEDCHAR, 1, SIGNEDLTR, "int8", "b")
+int16_dtype = make_dtype(rffi.SHORT, 3, SIGNEDLTR, "int16", "h")
+int32_dtype = make_dtype(rffi.INT, 5, SIGNEDLTR, "int32", "i")
+long_dtype = make_dtype(lltype.Signed, 7, SIGNEDLTR, "int%d" % LONG_BIT, "l",
+                        ["int"])
+float32_dtype = make_dtype(rffi.FLOAT, 11, FLOATINGLTR, "float32", "f")
+float64_dtype = make_dtype(lltype.Float, 12, FLOATINGLTR, "float64", "d",
+                           ["float"])
+
+ALL_DTYPES = [bool_dtype, int8_dtype, int16_dtype, int32_dtype, long_dtype,
+              float32_dtype, float64_dtype]
+
+dtypes_by_name = {}
+for _dtype in ALL_DTYPES:
+    dtypes_by_name[_dtype.name] = _dtype
+    dtypes_by_name[_dtype.char] = _dtype
+    for _alias in _dtype.aliases:
+        dtypes_by_name[_alias] = _dtype
+del _dtype, _alias
+
+def get_dtype(space, w_dtype):
+    """Convert the 'dtype' argument of the numpy functions: a dtype, the
+    name or the character code of one, or one of the builtin types bool,
+    int and float."""
+    if w_dtype is None or space.is_w(w_dtype, space.w_None):
+        return float64_dtype
+    if isinstance(w_dtype, W_Dtype):
+        return w_dtype
+    if space.is_w(w_dtype, space.w_bool):
+        return bool_dtype
+    if space.is_w(w_dtype, space.w_int):
+        return long_dtype
+    if space.is_w(w_dtype, space.w_float):
+        return float64_dtype
+    if space.isinstance_w(w_dtype, space.w_str):
+        name = space.str_w(w_dtype)
+        try:
+            return dtypes_by_name[name]
+        except KeyError:
+            pass
+    raise OperationError(space.w_TypeError,
+                         space.wrap("data type not understood"))
+
+def descr_new_dtype(space, w_subtype, w_dtype):
+    return space.wrap(get_dtype(space, w_dtype))
+
+def find_binop_result_dtype(dt1, dt2):
+    """The dtype of the result of a binary operation between arrays of
+    dtypes 'dt1' and 'dt2'."""
+    if dt1.num > dt2.num:
+        dt1, dt2 = dt2, dt1
+    if dt1 is dt2:
+        return dt1
+    # float32 cannot hold all the values of the larger integer types
+    if (dt2 is float32_dtype and dt1.is_int_type() and
+        dt1.itemsize >= dt2.itemsize):
+        return float64_dtype
+    return dt2
+
+def find_scalar_result_dtype(arr_dtype, scalar_dtype):
+    """The dtype of the result of a binary operation between an array and
+    a Python scalar: the scalar only matters if it is of a higher kind."""
+    if kind_order(scalar_dtype) <= kind_order(arr_dtype):
+        return arr_dtype
+    return find_binop_result_dtype(arr_dtype, scalar_dtype)
+
+def find_unaryop_result_dtype(dt, promote_to_float=False):
+    if promote_to_float and not dt.is_float_type():
+        return float64_dtype
+    return dt
+
+def kind_order(dt):
+    if dt.is_bool_type():
+        return 0
+    if dt.is_int_type():
+        return 1
+    return 2
+
+W_Dtype.typedef = TypeDef("dtype",
+    __module__ = "numpy",
+    __new__ = interp2app(descr_new_dtype),
+
+    __repr__ = interp2app(W_Dtype.descr_repr),
+    __str__ = interp2app(W_Dtype.descr_str),
+    __eq__ = interp2app(W_Dtype.descr_eq),
+    __ne__ = interp2app(W_Dtype.descr_ne),
+
+    name = GetSetProperty(W_Dtype.descr_get_name),
+    kind = GetSetProperty(W_Dtype.descr_get_kind),
+    char = GetSetProperty(W_Dtype.descr_get_char),
+    num = GetSetProperty(W_Dtype.descr_get_num),
+    itemsize = GetSetProperty(W_Dtype.descr_get_itemsize),
+)
+W_Dtype.typedef.acceptable_as_base_class = False
@@ -1,40 +1,111 @@
 from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.buffer import RWBuffer, SubBuffer, RawBufferMixin
 from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.typedef import TypeDef, GetSetProperty
 from pypy.module.micronumpy.interp_support import Signature
-from pypy.module.micronumpy import interp_ufuncs
-from pypy.objspace.std.floatobject import float2string as float2string_orig
+from pypy.module.micronumpy import interp_dtype, interp_ufuncs
+from pypy.module.micronumpy.interp_dtype import bool_dtype, long_dtype, \
+     float64_dtype, float_to_int
 from pypy.rlib import jit
-from pypy.rlib.rfloat import DTSF_STR_PRECISION
-from pypy.rpython.lltypesystem import lltype
+from pypy.rlib.objectmodel import specialize
+from pypy.rpython.lltypesystem import lltype, rffi
 from pypy.tool.sourcetools import func_with_new_name
 import math
 
-TP = lltype.Array(lltype.Float, hints={'nolength': True})
-
 numpy_driver = jit.JitDriver(greens = ['signature'],
                              reds = ['result_size', 'i', 'self', 'result'])
 all_driver = jit.JitDriver(greens=['signature'], reds=['i', 'size', 'self'])
 any_driver = jit.JitDriver(greens=['signature'], reds=['i', 'size', 'self'])
 slice_driver1 = jit.JitDriver(greens=['signature'], reds=['i', 'j', 'step', 'stop', 'source', 'dest'])
 slice_driver2 = jit.JitDriver(greens=['signature'], reds=['i', 'j', 'step', 'stop', 'source', 'dest'])
-
-def add(v1, v2):
-    return v1 + v2
-def mul(v1, v2):
-    return v1 * v2
-def maximum(v1, v2):
-    return max(v1, v2)
-def minimum(v1, v2):
-    return min(v1, v2)
-
-def float2string(x):
-    return float2string_orig(x, 'g', DTSF_STR_PRECISION)
+view_driver = jit.JitDriver(greens=['signature'], reds=['i', 'size', 'source', 'view', 'dest'])
+axis_reduce_driver = jit.JitDriver(greens=['signature'],
+        reds=['i', 'size', 'dim', 'inner', 'self', 'values', 'result'])
+accumulate_driver = jit.JitDriver(greens=['signature'],
+        reds=['i', 'size', 'dim', 'inner', 'self', 'values', 'result'])
+flat_reduce_driver = jit.JitDriver(greens=['signature'],
+        reds=['i', 'size', 'function', 'values', 'result'])
+flat_int_reduce_driver = jit.JitDriver(greens=['signature'],
+        reds=['i', 'size', 'function', 'values', 'dtype', 'result'])
+
+def calc_size(shape):
+    size = 1
+    for dim in shape:
+        size *= dim
+    return size
+
+def calc_strides(shape):
+    """The strides, in items, of a C-contiguous array of the given shape."""
+    strides = [0] * len(shape)
+    stride = 1
+    for i in range(len(shape) - 1, -1, -1):
+        strides[i] = stride
+        stride *= shape[i]
+    return strides
+
+def shape_agreement(space, shape1, shape2):
+    """The shape of the result of an operation between arrays of shapes
+    'shape1' and 'shape2', following the numpy broadcasting rules."""
+    if len(shape1) < len(shape2):
+        shape1, shape2 = shape2, shape1
+    shape = shape1[:]
+    offset = len(shape1) - len(shape2)
+    for i in range(len(shape2)):
+        dim1 = shape1[offset + i]
+        dim2 = shape2[i]
+        if dim1 == dim2 or dim2 == 1:
+            continue
+        if dim1 == 1:
+            shape[offset + i] = dim2
+            continue
+        raise broadcast_error(space)
+    return shape
+
+def broadcast_error(space):
+    return OperationError(space.w_ValueError, space.wrap(
+        "shape mismatch: objects cannot be broadcast to a single shape"))
+
+def broadcast(space, arr, shape):
+    """Return 'arr' seen as an array of the (larger) shape 'shape'.  The
+    broadcast dimensions get a stride of 0 in a view of the original data."""
+    if not arr.shape or shape_equal(arr.shape, shape):
+        # scalars evaluate to the same value for every index
+        return arr
+    if len(arr.shape) > len(shape):
+        raise broadcast_error(space)
+    root, start, root_strides = arr.get_root_info()
+    strides = [0] * len(shape)
+    offset = len(shape) - len(arr.shape)
+    for i in range(len(arr.shape)):
+        dim = arr.shape[i]
+        if dim == shape[offset + i]:
+            strides[offset + i] = root_strides[i]
+        elif dim != 1:
+            raise broadcast_error(space)
+    return create_slice(root, start, strides, shape)
+
+def shape_equal(shape1, shape2):
+    if len(shape1) != len(shape2):
+        return False
+    for i in range(len(shape1)):
+        if shape1[i] != shape2[i]:
+            return False
+    return True
 
 class BaseArray(Wrappable):
-    def __init__(self):
+    """The items are computed as floats if 'calc_dtype' is a float type
+    and as Signed integers otherwise: it is the dtype of the array, except
+    for the comparisons of floats, which are computed on floats but give
+    bools."""
+    def __init__(self, shape, dtype, calc_dtype=None):
         self.invalidates = []
+        self.shape = shape
+        self.size = calc_size(shape)
+        self.dtype = dtype
+        if calc_dtype is None:
+            calc_dtype = dtype
+        self.calc_dtype = calc_dtype
 
     def invalidated(self):
         if self.invalidates:
@@ -47,8 +118,8 @@ class BaseArray(Wrappable):
 
     def _unaryop_impl(w_ufunc):
         def impl(self, space):
-            return w_ufunc(space, self)
-        return func_with_new_name(impl, "unaryop_%s_impl" % w_ufunc.__name__)
+            return w_ufunc.call(space, self)
+        return func_with_new_name(impl, "unaryop_%s_impl" % w_ufunc.name)
 
     descr_pos = _unaryop_impl(interp_ufuncs.positive)
     descr_neg = _unaryop_impl(interp_ufuncs.negative)
@@ -56,8 +127,8 @@ class BaseArray(Wrappable):
 
     def _binop_impl(w_ufunc):
         def impl(self, space, w_other):
-            return w_ufunc(space, self, w_other)
-        return func_with_new_name(impl, "binop_%s_impl" % w_ufunc.__name__)
+            return w_ufunc.call(space, self, w_other)
+        return func_with_new_name(impl, "binop_%s_impl" % w_ufunc.name)
 
     descr_add = _binop_impl(interp_ufuncs.add)
     descr_sub = _binop_impl(interp_ufuncs.subtract)
@@ -66,11 +137,18 @@ class BaseArray(Wrappable):
     descr_pow = _binop_impl(interp_ufuncs.power)
     descr_mod = _binop_impl(interp_ufuncs.mod)
 
+    descr_eq = _binop_impl(interp_ufuncs.equal)
+    descr_ne = _binop_impl(interp_ufuncs.not_equal)
+    descr_lt = _binop_impl(interp_ufuncs.less)
+    descr_le = _binop_impl(interp_ufuncs.less_equal)
+    descr_gt = _binop_impl(interp_ufuncs.greater)
+    descr_ge = _binop_impl(interp_ufuncs.greater_equal)
+
     def _binop_right_impl(w_ufunc):
         def impl(self, space, w_other):
-            w_other = FloatWrapper(space.float_w(w_other))
-            return w_ufunc(space, w_other, self)
-        return func_with_new_name(impl, "binop_right_%s_impl" % w_ufunc.__name__)
+            w_other = convert_to_array(space, w_other)
+            return w_ufunc.call(space, w_other, self)
+        return func_with_new_name(impl, "binop_right_%s_impl" % w_ufunc.name)
 
     descr_radd = _binop_right_impl(interp_ufuncs.add)
     descr_rsub = _binop_right_impl(interp_ufuncs.subtract)
@@ -79,9 +157,17 @@ class BaseArray(Wrappable):
     descr_rpow = _binop_right_impl(interp_ufuncs.power)
     descr_rmod = _binop_right_impl(interp_ufuncs.mod)
 
-    def _reduce_sum_prod_impl(function, init):
+    # the reductions over all the items have one loop for floats and one
+    # for integers, as the value they carry from one item to the next has
+    # a different type
+
+    def _reduce_sum_prod_impl(w_ufunc, init):
         reduce_driver = jit.JitDriver(greens=['signature'],
                          reds = ['i', 'size', 'self', 'result'])
+        int_reduce_driver = jit.JitDriver(greens=['signature'],
+                         reds = ['i', 'size', 'self', 'result'])
+        function = w_ufunc.func
+        int_function = w_ufunc.int_func
 
         def loop(self, result, size):
             i = 0
@@ -93,13 +179,38 @@ class BaseArray(Wrappable):
                 i += 1
             return result
 
-        def impl(self, space):
-            return space.wrap(loop(self, init, self.find_size()))
-        return func_with_new_name(impl, "reduce_%s_impl" % function.__name__)
+        def int_loop(self, result, size):
+            i = 0
+            while i < size:
+                int_reduce_driver.jit_merge_point(signature=self.signature,
+                                                  self=self, size=size, i=i,
+                                                  result=result)
+                result = int_function(result, self.eval_int(i))
+                i += 1
+            return result
+
+        def impl(self, space, w_axis=None):
+            if w_axis is not None and not space.is_w(w_axis, space.w_None):
+                return w_ufunc.reduce(space, self, w_axis, False)
+            self.update_storage()
+            # like numpy, booleans are summed as integers
+            dtype = self.dtype
+            if dtype.is_bool_type():
+                dtype = long_dtype
+            size = self.find_size()
+            if dtype.is_float_type():
+                return dtype.wrap(space, loop(self, float(init), size))
+            return dtype.wrap_int(space, int_loop(self, init, size))
+        return func_with_new_name(impl, "reduce_%s_impl" % w_ufunc.name)
 
-    def _reduce_max_min_impl(function):
+    def _reduce_max_min_impl(w_ufunc):
         reduce_driver = jit.JitDriver(greens=['signature'],
                          reds = ['i', 'size', 'self', 'result'])
+        int_reduce_driver = jit.JitDriver(greens=['signature'],
+                         reds = ['i', 'size', 'self', 'result'])
+        function = w_ufunc.func
+        int_function = w_ufunc.int_func
+
         def loop(self, result, size):
             i = 1
             while i < size:
@@ -110,18 +221,39 @@ class BaseArray(Wrappable):
                 i += 1
             return result
 
-        def impl(self, space):
+        def int_loop(self, result, size):
+            i = 1
+            while i < size:
+                int_reduce_driver.jit_merge_point(signature=self.signature,
+                                                  self=self, size=size, i=i,
+                                                  result=result)
+                result = int_function(result, self.eval_int(i))
+                i += 1
+            return result
+
+        def impl(self, space, w_axis=None):
+            if w_axis is not None and not space.is_w(w_axis, space.w_None):
+                return w_ufunc.reduce(space, self, w_axis, False)
             size = self.find_size()
             if size == 0:
                 raise OperationError(space.w_ValueError,
                     space.wrap("Can't call %s on zero-size arrays" \
-                            % function.__name__))
-            return space.wrap(loop(self, self.eval(0), size))
-        return func_with_new_name(impl, "reduce_%s_impl" % function.__name__)
-
-    def _reduce_argmax_argmin_impl(function):
+                            % w_ufunc.name))
+            self.update_storage()
+            if self.calc_dtype.is_float_type():
+                return self.dtype.wrap(space, loop(self, self.eval(0), size))
+            return self.dtype.wrap_int(space,
+                                       int_loop(self, self.eval_int(0), size))
+        return func_with_new_name(impl, "reduce_%s_impl" % w_ufunc.name)
+
+    def _reduce_argmax_argmin_impl(w_ufunc):
         reduce_driver = jit.JitDriver(greens=['signature'],
                          reds = ['i', 'size', 'result', 'self', 'cur_best'])
+        int_reduce_driver = jit.JitDriver(greens=['signature'],
+                         reds = ['i', 'size', 'result', 'self', 'cur_best'])
+        function = w_ufunc.func
+        int_function = w_ufunc.int_func
+
         def loop(self, size):
             result = 0
             cur_best = self.eval(0)
@@ -136,25 +268,51 @@ class BaseArray(Wrappable):
                     cur_best = new_best
                 i += 1
             return result
+
+        def int_loop(self, size):
+            result = 0
+            cur_best = self.eval_int(0)
+            i = 1
+            while i < size:
+                int_reduce_driver.jit_merge_point(signature=self.signature,
+                                                  self=self, size=size, i=i,
+                                                  result=result,
+                                                  cur_best=cur_best)
+                new_best = int_function(cur_best, self.eval_int(i))
+                if new_best != cur_best:
+                    result = i
+                    cur_best = new_best
+                i += 1
+            return result
+
         def impl(self, space):
             size = self.find_size()
             if size == 0:
                 raise OperationError(space.w_ValueError,
                     space.wrap("Can't call %s on zero-size arrays" \
-                            % function.__name__))
-            return space.wrap(loop(self, size))
-        return func_with_new_name(impl, "reduce_arg%s_impl" % function.__name__)
+                            % w_ufunc.name))
+            self.update_storage()
+            if self.calc_dtype.is_float_type():
+                return space.wrap(loop(self, size))
+            return space.wrap(int_loop(self, size))
+        return func_with_new_name(impl, "reduce_arg%s_impl" % w_ufunc.name)
+
+    def _item_is_true(self, i):
+        if self.calc_dtype.is_float_type():
+            return self.eval(i) != 0.0
+        return self.eval_int(i) != 0
 
     def _all(self):
         size = self.find_size()
         i = 0
         while i < size:
             all_driver.jit_merge_point(signature=self.signature, self=self, size=size, i=i)
-            if not self.eval(i):
+            if not self._item_is_true(i):
                 return False
             i += 1
         return True
     def descr_all(self, space):
+        self.update_storage()
         return space.wrap(self._all())
 
     def _any(self):
@@ -162,43 +320,87 @@ class BaseArray(Wrappable):
         i = 0
         while i < size:
             any_driver.jit_merge_point(signature=self.signature, self=self, size=size, i=i)
-            if self.eval(i):
+            if self._item_is_true(i):
                 return True
             i += 1
         return False
     def descr_any(self, space):
+        self.update_storage()
         return space.wrap(self._any())
 
-    descr_sum = _reduce_sum_prod_impl(add, 0.0)
-    descr_prod = _reduce_sum_prod_impl(mul, 1.0)
-    descr_max = _reduce_max_min_impl(maximum)
-    descr_min = _reduce_max_min_impl(minimum)
-    descr_argmax = _reduce_argmax_argmin_impl(maximum)
-    descr_argmin = _reduce_argmax_argmin_impl(minimum)
+    descr_sum = _reduce_sum_prod_impl(interp_ufuncs.add, 0)
+    descr_prod = _reduce_sum_prod_impl(interp_ufuncs.multiply, 1)
+    descr_max = _reduce_max_min_impl(interp_ufuncs.maximum)
+    descr_min = _reduce_max_min_impl(interp_ufuncs.minimum)
+
+    def _accumulate_impl(w_ufunc):
+        def impl(self, space, w_axis=None):
+            if w_axis is None:
+                w_axis = space.w_None
+            return w_ufunc.reduce(space, self, w_axis, True)
+        return func_with_new_name(impl, "accumulate_%s_impl" % w_ufunc.name)
+
+    descr_cumsum = _accumulate_impl(interp_ufuncs.add)
+    descr_cumprod = _accumulate_impl(interp_ufuncs.multiply)
+    descr_argmax = _reduce_argmax_argmin_impl(interp_ufuncs.maximum)
+    descr_argmin = _reduce_argmax_argmin_impl(interp_ufuncs.minimum)
 
     def descr_sort(self, space):
-        size = self.find_size()
-	stack = [(0,size-1)]
-	first=0; last=size-1; splitpoint=first;
+        # sorts along the last axis, each row independently
+        concrete = self.get_concrete()
+        if concrete.is_readonly():
+            raise readonly_error(space)
+        if not self.shape:
+            return
+        concrete.update_storage()
+        length = self.shape[-1]
+        offset = 0
+        while offset < self.size:
+            if self.dtype.is_float_type():
+                concrete._sort_range(offset, offset + length - 1, False)
+            else:
+                concrete._sort_range(offset, offset + length - 1, True)
+            offset += length
+
+    @specialize.arg(2)
+    def _eval_kind(self, i, ints):
+        if ints:
+            return self.eval_int(i)
+        return self.eval(i)
+
+    @specialize.arg(3)
+    def _setitem_kind(self, i, value, ints):
+        if ints:
+            self.setitem_int(i, value)
+        else:
+            self.setitem(i, value)
+
+    @specialize.arg(3)
+    def _sort_range(self, first, last, ints):
+        # 'ints' tells if the items are compared and moved as integers
+        stack = [(first, last)]
         while (len(stack) > 0):
             first, last = stack.pop()
             while last>first:
                 #splitpoint = split(first,last)
-                x = self.eval(first)
+                x = self._eval_kind(first, ints)
                 splitpoint = first
                 unknown = first+1
                 while (unknown<=last):
-                    if (self.eval(unknown)<x):
+                    if (self._eval_kind(unknown, ints)<x):
                         splitpoint = splitpoint + 1
                         #interchange(splitpoint,unknown)
-                        temp = self.eval(splitpoint)
-                        self.storage[splitpoint] = self.eval(unknown)
-                        self.storage[unknown] = temp
+                        temp = self._eval_kind(splitpoint, ints)
+                        self._setitem_kind(splitpoint,
+                                           self._eval_kind(unknown, ints),
+                                           ints)
+                        self._setitem_kind(unknown, temp, ints)
                     unknown = unknown + 1
                 #interchange(first,splitpoint)
-                temp = self.eval(splitpoint)
-                self.storage[splitpoint] = self.eval(first)
-                self.storage[first] = temp
+                temp = self._eval_kind(splitpoint, ints)
+                self._setitem_kind(splitpoint, self._eval_kind(first, ints),
+                                   ints)
+                self._setitem_kind(first, temp, ints)
 
                 if (last-splitpoint<splitpoint-first):
                     stack.append((first,splitpoint-1));
@@ -208,88 +410,245 @@ class BaseArray(Wrappable):
                     last = splitpoint - 1
 
     def descr_dot(self, space, w_other):
-        if isinstance(w_other, BaseArray):
+        if not isinstance(w_other, BaseArray) or not w_other.shape:
+            return self.descr_mul(space, w_other)
+        ndim1 = len(self.shape)
+        ndim2 = len(w_other.shape)
+        if ndim1 > 2 or ndim2 > 2:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "dot() is only supported for arrays of one or two "
+                "dimensions"))
+        if self.shape[-1] != w_other.shape[0]:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "objects are not aligned"))
+        if ndim1 == 1 and ndim2 == 1:
             w_res = self.descr_mul(space, w_other)
             assert isinstance(w_res, BaseArray)
             return w_res.descr_sum(space)
-        else:
-            return self.descr_mul(space, w_other)
-
-    def _getnums(self, comma):
-        if self.find_size() > 1000:
+        return self._matrix_dot(w_other)
+
+    def _matrix_dot(self, other):
+        # a 1-dimensional 'self' is used as a row, and a 1-dimensional
+        # 'other' as a column; the result drops these dimensions again
+        left = self.get_concrete()
+        right = other.get_concrete()
+        left.update_storage()
+        right.update_storage()
+        length = self.shape[-1]
+        shape = []
+        rows = 1
+        if len(self.shape) == 2:
+            rows = self.shape[0]
+            shape.append(rows)
+        columns = 1
+        if len(other.shape) == 2:
+            columns = other.shape[1]
+            shape.append(columns)
+        dtype = interp_dtype.find_binop_result_dtype(self.dtype, other.dtype)
+        res = NDimArray(shape, dtype)
+        for i in range(rows):
+            for j in range(columns):
+                if dtype.is_float_type():
+                    value = 0.0
+                    for k in range(length):
+                        value += (left.eval(i * length + k) *
+                                  right.eval(k * columns + j))
+                    res._setitem(i * columns + j, value)
+                else:
+                    int_value = 0
+                    for k in range(length):
+                        int_value += (left.eval_int(i * length + k) *
+                                      right.eval_int(k * columns + j))
+                    res._setitem_int(i * columns + j, int_value)
+        return res
+
+    def _getnums(self, offset, length, comma):
+        if length > 1000:
             nums = [
-                float2string(self.eval(index))
+                self.format_item(offset + index)
                 for index in range(3)
             ]
             nums.append("..." + "," * comma)
             nums.extend([
-                float2string(self.eval(index))
-                for index in range(self.find_size() - 3, self.find_size())
+                self.format_item(offset + index)
+                for index in range(length - 3, length)
             ])
         else:
             nums = [
-                float2string(self.eval(index))
-                for index in range(self.find_size())
+                self.format_item(offset + index)
+                for index in range(length)
             ]
         return nums
 
+    def _format(self, dim, offset, comma, indent):
+        """The text of the items of the sub-array starting at the flat index
+        'offset' along dimension 'dim', as shown by repr() and str()."""
+        if dim == len(self.shape) - 1:
+            nums = self._getnums(offset, self.shape[dim], not comma)
+            # two constant separators: " " alone would be annotated as a char
+            if comma:
+                return "[" + ", ".join(nums) + "]"
+            return "[" + " ".join(nums) + "]"
+        step = calc_size(self.shape[dim + 1:])
+        sep = "\n" * (len(self.shape) - dim - 1) + indent + " "
+        if comma:
+            sep = "," + sep
+        parts = [self._format(dim + 1, offset + i * step, comma, indent + " ")
+                 for i in range(self.shape[dim])]
+        return "[" + sep.join(parts) + "]"
+
+    def update_storage(self):
+        """Fetch again the address of the memory of the arrays made by
+        frombuffer() whose items are used by this array, which can move or
+        go away between two operations.  Every operation calls it once
+        before it accesses the items, and after anything that can run
+        app-level code."""
+
+    def eval(self, i):
+        """The item 'i', in C order, as a float."""
+        raise NotImplementedError
+
+    def eval_int(self, i):
+        """The item 'i' as a Signed.  Float items are truncated, which
+        raises OverflowError if they do not fit."""
+        raise NotImplementedError
+
+    def wrap_item(self, space, i):
+        if self.calc_dtype.is_float_type():
+            return self.dtype.wrap(space, self.eval(i))
+        return self.dtype.wrap_int(space, self.eval_int(i))
+
+    def format_item(self, i):
+        if self.calc_dtype.is_float_type():
+            return self.dtype.str_format(self.eval(i))
+        return self.dtype.str_format_int(self.eval_int(i))
+
     def get_concrete(self):
         raise NotImplementedError
 
+    def get_root_info(self):
+        """Return (root, start, strides): the array whose flat indexes are
+        used for the items of this array, the index of the first item and
+        the strides of each dimension, in items of the root array."""
+        return self, 0, calc_strides(self.shape)
+
     def descr_copy(self, space):
-        return new_numarray(space, self)
+        return copy_array(self)
 
     def descr_get_shape(self, space):
-        return space.newtuple([self.descr_len(space)])
+        return space.newtuple([space.wrap(dim) for dim in self.shape])
+
+    def descr_get_ndim(self, space):
+        return space.wrap(len(self.shape))
+
+    def descr_get_size(self, space):
+        return space.wrap(self.size)
+
+    def descr_get_dtype(self, space):
+        return space.wrap(self.dtype)
 
     def descr_len(self, space):
-        return self.get_concrete().descr_len(space)
+        if not self.shape:
+            raise OperationError(space.w_TypeError,
+                                 space.wrap("len() of unsized object"))
+        return space.wrap(self.shape[0])
 
     def descr_repr(self, space):
-        # Simple implementation so that we can see the array. Needs work.
         concrete = self.get_concrete()
-        return space.wrap("array([" + ", ".join(concrete._getnums(False)) + "])")
+        concrete.update_storage()
+        res = "array(" + concrete._format(0, 0, True, " " * len("array("))
+        dtype = concrete.dtype
+        # the dtypes that numpy infers from python objects are only shown
+        # when there are no items to infer them from
+        if (dtype is not float64_dtype and
+            (not self.size or (dtype is not long_dtype and
+                               dtype is not bool_dtype))):
+            res += ", dtype=" + dtype.name
+        return space.wrap(res + ")")
 
     def descr_str(self, space):
-        # Simple implementation so that we can see the array. Needs work.
         concrete = self.get_concrete()
-        return space.wrap("[" + " ".join(concrete._getnums(True)) + "]")
+        concrete.update_storage()
+        return space.wrap(concrete._format(0, 0, False, ""))
+
+    def _index_w(self, space, w_idx):
+        """Decode an index made of integers and slices, one per dimension.
+        Returns (root, start, strides, shape) of the selected items, with
+        an empty shape for a single item."""
+        root, start, strides = self.get_root_info()
+        if space.isinstance_w(w_idx, space.w_tuple):
+            idx_w = space.fixedview(w_idx)
+        else:
+            idx_w = [w_idx]
+        if len(idx_w) > len(self.shape):
+            raise OperationError(space.w_IndexError,
+                                 space.wrap("invalid index"))
+        new_strides = []
+        new_shape = []
+        for i in range(len(self.shape)):
+            if i < len(idx_w):
+                item_start, stop, step, length = space.decode_index4(
+                    idx_w[i], self.shape[i])
+                start += item_start * strides[i]
+                if step != 0:
+                    new_strides.append(step * strides[i])
+                    new_shape.append(length)
+            else:
+                new_strides.append(strides[i])
+                new_shape.append(self.shape[i])
+        return root, start, new_strides, new_shape
 
     def descr_getitem(self, space, w_idx):
-        # TODO: indexing by tuples
-        start, stop, step, slice_length = space.decode_index4(w_idx, self.find_size())
-        if step == 0:
-            # Single index
-            return space.wrap(self.get_concrete().eval(start))
-        else:
-            # Slice
-            res = SingleDimSlice(start, stop, step, slice_length, self, self.signature.transition(SingleDimSlice.static_signature))
-            return space.wrap(res)
+        root, start, strides, shape = self._index_w(space, w_idx)
+        if not shape:
+            # Single item
+            concrete = root.get_concrete()
+            concrete.update_storage()
+            return concrete.wrap_item(space, start)
+        return space.wrap(create_slice(root, start, strides, shape))
 
     def descr_setitem(self, space, w_idx, w_value):
-        # TODO: indexing by tuples and lists
         self.invalidated()
-        start, stop, step, slice_length = space.decode_index4(w_idx,
-                                                              self.find_size())
-        if step == 0:
-            # Single index
-            self.get_concrete().setitem(start, space.float_w(w_value))
+        root, start, strides, shape = self._index_w(space, w_idx)
+        concrete = root.get_concrete()
+        if concrete.is_readonly():
+            raise readonly_error(space)
+        if not shape:
+            # Single item
+            concrete.setitem_w(space, start, w_value)
+            return
+        if isinstance(w_value, BaseArray):
+            # for now we just copy if setting part of an array from
+            # memory that overlaps with it. can be improved.
+            source = w_value.get_root_info()[0].get_concrete()
+            concrete.update_storage()
+            source.update_storage()
+            if concrete.overlaps(source):
+                w_value = copy_array(w_value)
         else:
-            concrete = self.get_concrete()
-            if isinstance(w_value, BaseArray):
-                # for now we just copy if setting part of an array from 
-                # part of itself. can be improved.
-                if (concrete.get_root_storage() ==
-                    w_value.get_concrete().get_root_storage()):
-                    w_value = new_numarray(space, w_value)
-            else:
-                w_value = convert_to_array(space, w_value)
-            concrete.setslice(space, start, stop, step, 
-                                               slice_length, w_value)
+            w_value = convert_to_array(space, w_value)
+        concrete.setslice(space, start, strides, shape, w_value)
+
+    def is_readonly(self):
+        return False
+
+    def descr_buffer(self, space):
+        concrete = self.get_concrete()
+        if not isinstance(concrete, NDimArray):
+            raise OperationError(space.w_ValueError, space.wrap(
+                "only arrays that own their items support the buffer "
+                "interface"))
+        buf = NDimArrayBuffer(concrete)
+        if concrete.is_readonly():
+            return space.wrap(SubBuffer(buf, 0, -1))
+        return space.wrap(buf)
 
     def descr_mean(self, space):
         return space.wrap(space.float_w(self.descr_sum(space))/self.find_size())
 
+    def find_size(self):
+        return self.size
+
     def _sliceloop1(self, start, stop, step, source, dest):
         i = start
         j = 0
@@ -297,7 +656,7 @@ class BaseArray(Wrappable):
             slice_driver1.jit_merge_point(signature=source.signature,
                     step=step, stop=stop, i=i, j=j, source=source,
                     dest=dest)
-            dest.storage[i] = source.eval(j)
+            dest._setitem_from(i, source, j)
             j += 1
             i += step
 
@@ -308,10 +667,19 @@ class BaseArray(Wrappable):
             slice_driver2.jit_merge_point(signature=source.signature,
                     step=step, stop=stop, i=i, j=j, source=source,
                     dest=dest)
-            dest.storage[i] = source.eval(j)
+            dest._setitem_from(i, source, j)
             j += 1
             i += step
 
+    def _viewloop(self, view, source, dest):
+        i = 0
+        size = view.size
+        while i < size:
+            view_driver.jit_merge_point(signature=source.signature,
+                    i=i, size=size, source=source, view=view, dest=dest)
+            dest._setitem_from(view.calc_index(i), source, i)
+            i += 1
+
 def convert_to_array (space, w_obj):
     if isinstance(w_obj, BaseArray):
         return w_obj
@@ -320,30 +688,47 @@ def convert_to_array (space, w_obj):
         return new_numarray(space, w_obj)
     else:
         # If it's a scalar
-        return FloatWrapper(space.float_w(w_obj))
+        dtype = find_scalar_dtype(space, w_obj)
+        if dtype.is_float_type():
+            return FloatWrapper(space.float_w(space.float(w_obj)), dtype)
+        value = space.int_w(space.int(w_obj))
+        return FloatWrapper(float(value), dtype, value)
+
+def find_scalar_dtype(space, w_obj):
+    if space.isinstance_w(w_obj, space.w_bool):
+        return bool_dtype
+    if (space.isinstance_w(w_obj, space.w_int) or
+        space.isinstance_w(w_obj, space.w_long)):
+        return long_dtype
+    return float64_dtype
 
 class FloatWrapper(BaseArray):
     """
-    Intermediate class representing a float literal.
+    Intermediate class representing a scalar operand.  The value is kept
+    as a float and, for the integer and bool dtypes, as a Signed; the dtype
+    only matters for the type of the result.
     """
     signature = Signature()
 
-    def __init__(self, float_value):
-        BaseArray.__init__(self)
+    def __init__(self, float_value, dtype=float64_dtype, int_value=0):
+        BaseArray.__init__(self, [], dtype)
         self.float_value = float_value
-
-    def find_size(self):
-        raise ValueError
+        self.int_value = int_value
 
     def eval(self, i):
         return self.float_value
 
+    def eval_int(self, i):
+        if self.dtype.is_float_type():
+            return float_to_int(self.float_value)
+        return self.int_value
+
 class VirtualArray(BaseArray):
     """
     Class for representing virtual arrays, such as binary ops or ufuncs
     """
-    def __init__(self, signature):
-        BaseArray.__init__(self)
+    def __init__(self, signature, shape, res_dtype, calc_dtype=None):
+        BaseArray.__init__(self, shape, res_dtype, calc_dtype)
         self.forced_result = None
         self.signature = signature
 
@@ -351,21 +736,31 @@ class VirtualArray(BaseArray):
         # Function for deleting references to source arrays, to allow garbage-collecting them
         raise NotImplementedError
 
+    def _update_sources(self):
+        raise NotImplementedError
+
+    def update_storage(self):
+        if self.forced_result is not None:
+            self.forced_result.update_storage()
+        else:
+            self._update_sources()
+
     def compute(self):
         i = 0
         signature = self.signature
         result_size = self.find_size()
-        result = SingleDimArray(result_size)
+        result = NDimArray(self.shape, self.dtype)
         while i < result_size:
             numpy_driver.jit_merge_point(signature=signature,
                                          result_size=result_size, i=i,
                                          self=self, result=result)
-            result.storage[i] = self.eval(i)
+            result._setitem_from(i, self, i)
             i += 1
         return result
 
     def force_if_needed(self):
         if self.forced_result is None:
+            self._update_sources()
             self.forced_result = self.compute()
             self._del_sources()
 
@@ -376,37 +771,52 @@ class VirtualArray(BaseArray):
     def eval(self, i):
         if self.forced_result is not None:
             return self.forced_result.eval(i)
-        return self._eval(i)
+        if self.calc_dtype.is_float_type():
+            return self._eval(i)
+        return float(self._eval_int(i))
 
-    def find_size(self):
+    def eval_int(self, i):
         if self.forced_result is not None:
-            # The result has been computed and sources may be unavailable
-            return self.forced_result.find_size()
-        return self._find_size()
+            return self.forced_result.eval_int(i)
+        if self.calc_dtype.is_float_type():
+            return float_to_int(self._eval(i))
+        return self._eval_int(i)
+
+    def _eval(self, i):
+        raise NotImplementedError
+
+    def _eval_int(self, i):
+        raise NotImplementedError
 
 
 class Call1(VirtualArray):
-    def __init__(self, function, values, signature):
-        VirtualArray.__init__(self, signature)
-        self.function = function
+    def __init__(self, ufunc, values, signature, res_dtype):
+        VirtualArray.__init__(self, signature, values.shape, res_dtype)
+        self.ufunc = ufunc
         self.values = values
 
     def _del_sources(self):
         self.values = None
 
-    def _find_size(self):
-        return self.values.find_size()
+    def _update_sources(self):
+        self.values.update_storage()
 
     def _eval(self, i):
-        return self.function(self.values.eval(i))
+        return self.ufunc.func(self.values.eval(i))
+
+    def _eval_int(self, i):
+        value = self.ufunc.int_func(self.values.eval_int(i))
+        return self.dtype.coerce_int(value)
 
 class Call2(VirtualArray):
     """
-    Intermediate class for performing binary operations.
+    Intermediate class for performing binary operations.  Both operands
+    are scalars or already broadcast to 'shape'.
     """
-    def __init__(self, function, left, right, signature):
-        VirtualArray.__init__(self, signature)
-        self.function = function
+    def __init__(self, ufunc, left, right, signature, shape, res_dtype,
+                 calc_dtype=None):
+        VirtualArray.__init__(self, signature, shape, res_dtype, calc_dtype)
+        self.ufunc = ufunc
         self.left = left
         self.right = right
 
@@ -414,24 +824,146 @@ class Call2(VirtualArray):
         self.left = None
         self.right = None
 
-    def _find_size(self):
-        try:
-            return self.left.find_size()
-        except ValueError:
-            pass
-        return self.right.find_size()
+    def _update_sources(self):
+        self.left.update_storage()
+        self.right.update_storage()
 
     def _eval(self, i):
         lhs, rhs = self.left.eval(i), self.right.eval(i)
-        return self.function(lhs, rhs)
+        return self.ufunc.func(lhs, rhs)
+
+    def _eval_int(self, i):
+        lhs, rhs = self.left.eval_int(i), self.right.eval_int(i)
+        return self.dtype.coerce_int(self.ufunc.int_func(lhs, rhs))
+
+class AxisReduce(VirtualArray):
+    """
+    Base class of the reductions of 'values' along one axis, whose length
+    is 'dim'.  'inner' is the number of items between two consecutive
+    items along that axis.  Unlike Call1 and Call2, the items are not
+    computed one by one: a single loop walks 'values' in their flat order.
+    """
+    def __init__(self, ufunc, values, signature, shape, res_dtype,
+                 calc_dtype, dim, inner):
+        VirtualArray.__init__(self, signature, shape, res_dtype, calc_dtype)
+        self.ufunc = ufunc
+        self.values = values
+        self.dim = dim
+        self.inner = inner
+
+    def _del_sources(self):
+        self.values = None
+
+    def _update_sources(self):
+        self.values.update_storage()
+
+    def _eval(self, i):
+        return self.get_concrete().eval(i)
+
+    def _eval_int(self, i):
+        return self.get_concrete().eval_int(i)
+
+    def _combine(self, result, index, prev, i):
+        """Store in the item 'index' of 'result' the item 'i' of the values,
+        combined with the item 'prev' of 'result' unless 'prev' is -1."""
+        if self.calc_dtype.is_float_type():
+            value = self.values.eval(i)
+            if prev >= 0:
+                value = self.ufunc.func(result.eval(prev), value)
+            result._setitem(index, value)
+        else:
+            int_value = self.values.eval_int(i)
+            if prev >= 0:
+                int_value = self.dtype.coerce_int(
+                    self.ufunc.int_func(result.eval_int(prev), int_value))
+            result._setitem_int(index, int_value)
+
+class Reduce(AxisReduce):
+    def __init__(self, ufunc, values, signature, shape, res_dtype,
+                 calc_dtype, dim, inner, identity):
+        AxisReduce.__init__(self, ufunc, values, signature, shape,
+                            res_dtype, calc_dtype, dim, inner)
+        self.identity = identity
+
+    def compute(self):
+        result = NDimArray(self.shape, self.dtype)
+        if self.dim == 0:
+            for i in range(result.size):
+                result._setitem(i, self.identity)
+            return result
+        signature = self.signature
+        values = self.values
+        size = values.find_size()
+        dim = self.dim
+        inner = self.inner
+        i = 0
+        while i < size:
+            axis_reduce_driver.jit_merge_point(signature=signature, i=i,
+                    size=size, dim=dim, inner=inner, self=self,
+                    values=values, result=result)
+            index = (i // (dim * inner)) * inner + i % inner
+            if (i // inner) % dim != 0:
+                self._combine(result, index, index, i)
+            else:
+                self._combine(result, index, -1, i)
+            i += 1
+        return result
+
+class Accumulate(AxisReduce):
+    def compute(self):
+        result = NDimArray(self.shape, self.dtype)
+        signature = self.signature
+        values = self.values
+        size = values.find_size()
+        dim = self.dim
+        inner = self.inner
+        i = 0
+        while i < size:
+            accumulate_driver.jit_merge_point(signature=signature, i=i,
+                    size=size, dim=dim, inner=inner, self=self,
+                    values=values, result=result)
+            if (i // inner) % dim != 0:
+                self._combine(result, i, i - inner, i)
+            else:
+                self._combine(result, i, -1, i)
+            i += 1
+        return result
+
+def reduce_flat(function, values, signature):
+    """Reduce all the items of 'values', which must not be empty."""
+    values.update_storage()
+    size = values.find_size()
+    result = values.eval(0)
+    i = 1
+    while i < size:
+        flat_reduce_driver.jit_merge_point(signature=signature, i=i,
+                size=size, function=function, values=values, result=result)
+        result = function(result, values.eval(i))
+        i += 1
+    return result
+
+def reduce_flat_int(function, values, signature, dtype):
+    """Like reduce_flat(), but on the items of 'values' as integers, each
+    intermediate result being truncated to 'dtype'."""
+    values.update_storage()
+    size = values.find_size()
+    result = values.eval_int(0)
+    i = 1
+    while i < size:
+        flat_int_reduce_driver.jit_merge_point(signature=signature, i=i,
+                size=size, function=function, values=values, dtype=dtype,
+                result=result)
+        result = dtype.coerce_int(function(result, values.eval_int(i)))
+        i += 1
+    return result
 
 class ViewArray(BaseArray):
     """
     Class for representing views of arrays, they will reflect changes of parent
     arrays. Example: slices
     """
-    def __init__(self, parent, signature):
-        BaseArray.__init__(self)
+    def __init__(self, parent, signature, shape):
+        BaseArray.__init__(self, shape, parent.dtype, parent.calc_dtype)
         self.signature = signature
         self.parent = parent
         self.invalidates = parent.invalidates
@@ -443,15 +975,23 @@ class ViewArray(BaseArray):
         self.parent.get_concrete()
         return self
 
+    def update_storage(self):
+        self.parent.update_storage()
+
     def eval(self, i):
         return self.parent.eval(self.calc_index(i))
 
-    @unwrap_spec(item=int, value=float)
+    def eval_int(self, i):
+        return self.parent.eval_int(self.calc_index(i))
+
     def setitem(self, item, value):
-        return self.parent.setitem(self.calc_index(item), value)
+        return self.parent.get_concrete().setitem(self.calc_index(item), value)
 
-    def descr_len(self, space):
-        return space.wrap(self.find_size())
+    def setitem_int(self, item, value):
+        self.parent.get_concrete().setitem_int(self.calc_index(item), value)
+
+    def is_readonly(self):
+        return self.parent.get_concrete().is_readonly()
 
     def calc_index(self, item):
         raise NotImplementedError
@@ -459,100 +999,286 @@ class ViewArray(BaseArray):
 class SingleDimSlice(ViewArray):
     static_signature = Signature()
 
-    def __init__(self, start, stop, step, slice_length, parent, signature):
-        ViewArray.__init__(self, parent, signature)
-        if isinstance(parent, SingleDimSlice):
-            self.start = parent.calc_index(start)
-            self.stop = parent.calc_index(stop)
-            self.step = parent.step * step
-            self.parent = parent.parent
-        else:
-            self.start = start
-            self.stop = stop
-            self.step = step
-            self.parent = parent
-        self.size = slice_length
-
-    def get_root_storage(self):
-        return self.parent.storage
+    def __init__(self, parent, signature, start, step, slice_length):
+        ViewArray.__init__(self, parent, signature, [slice_length])
+        self.start = start
+        self.step = step
 
-    def find_size(self):
-        return self.size
-
-    def setslice(self, space, start, stop, step, slice_length, arr):
-        start = self.calc_index(start)
-        if stop != -1:
-            stop = self.calc_index(stop)
-        step = self.step * step
-        if step > 0:
-            self._sliceloop1(start, stop, step, arr, self.parent)
-        else:
-            self._sliceloop2(start, stop, step, arr, self.parent)
+    def get_root_info(self):
+        return self.parent, self.start, [self.step]
 
     def calc_index(self, item):
         return (self.start + item * self.step)
 
+class NDimSlice(ViewArray):
+    """
+    A strided view of an array with more than one dimension.
+    """
+    static_signature = Signature()
 
-class SingleDimArray(BaseArray):
-    signature = Signature()
+    def __init__(self, parent, signature, start, strides, shape):
+        ViewArray.__init__(self, parent, signature, shape)
+        self.start = start
+        self.strides = strides
 
-    def __init__(self, size):
-        BaseArray.__init__(self)
-        self.size = size
-        self.storage = lltype.malloc(TP, size, zero=True,
-                                     flavor='raw', track_allocation=False,
-                                     add_memory_pressure=True)
-        # XXX find out why test_zjit explodes with trackign of allocations
+    def get_root_info(self):
+        return self.parent, self.start, self.strides
+
+    @jit.unroll_safe
+    def calc_index(self, item):
+        index = self.start
+        for i in range(len(self.shape) - 1, -1, -1):
+            dim = self.shape[i]
+            index += (item % dim) * self.strides[i]
+            item = item // dim
+        return index
+
+def create_slice(root, start, strides, shape):
+    """A view of the items of 'root' (never a view itself) starting at
+    'start', with the given strides and shape.  Broadcasting uses views
+    with strides of 0."""
+    if len(shape) == 1:
+        return SingleDimSlice(root,
+            root.signature.transition(SingleDimSlice.static_signature),
+            start, strides[0], shape[0])
+    return NDimSlice(root,
+        root.signature.transition(NDimSlice.static_signature),
+        start, strides, shape)
+
+
+NULL_STORAGE = lltype.nullptr(rffi.CCHARP.TO)
+
+class NDimArray(BaseArray):
+    """
+    An array that owns its items, stored in C order with the given dtype.
+    If 'buffer' is given, the items are not allocated but stored in the raw
+    memory of the buffer, starting 'offset' bytes from its start.
+    """
+    def __init__(self, shape, dtype, buffer=None, offset=0, space=None):
+        BaseArray.__init__(self, shape, dtype)
+        self.signature = dtype.signature
+        self.buffer = buffer
+        if buffer is None:
+            self.storage = dtype.malloc(self.size)
+            self.readonly = False
+        else:
+            self.storage = NULL_STORAGE
+            self.buffer_offset = offset
+            self.space = space
+            self.readonly = not isinstance(buffer, RWBuffer)
 
     def get_concrete(self):
         return self
 
-    def get_root_storage(self):
-        return self.storage
-
-    def find_size(self):
-        return self.size
+    def update_storage(self):
+        if self.buffer is not None:
+            self.storage = self.get_buffer_storage()
+
+    def get_buffer_storage(self):
+        # the memory of the buffer can move or go away between two
+        # operations (when an array.array is resized or an mmap is closed)
+        buf = self.buffer
+        raw = buf.get_raw_address()
+        end = self.buffer_offset + self.size * self.dtype.itemsize
+        if buf.getlength() < end:
+            space = self.space
+            raise OperationError(space.w_ValueError, space.wrap(
+                "the buffer of the array became too small"))
+        return rffi.ptradd(raw, self.buffer_offset)
 
     def eval(self, i):
-        return self.storage[i]
+        return self.dtype.getitem(self.storage, i)
 
-    def descr_len(self, space):
-        return space.wrap(self.size)
+    def eval_int(self, i):
+        return self.dtype.getitem_int(self.storage, i)
+
+    def _setitem(self, item, value):
+        self.dtype.setitem(self.storage, item, value)
+
+    def _setitem_int(self, item, value):
+        self.dtype.setitem_int(self.storage, item, value)
+
+    def _setitem_from(self, item, source, i):
+        """Store the item 'i' of 'source' as the item 'item'.  It is
+        copied as a float if either array holds floats, except that the
+        floats stored into integers are truncated."""
+        dtype = self.dtype
+        if dtype.is_float_type() or (dtype.is_bool_type() and
+                                     source.calc_dtype.is_float_type()):
+            self._setitem(item, source.eval(i))
+        else:
+            self._setitem_int(item, source.eval_int(i))
 
     def setitem(self, item, value):
         self.invalidated()
-        self.storage[item] = value
+        self._setitem(item, value)
 
-    def setslice(self, space, start, stop, step, slice_length, arr):
-        if step > 0:
-            self._sliceloop1(start, stop, step, arr, self)
+    def setitem_int(self, item, value):
+        self.invalidated()
+        self._setitem_int(item, value)
+
+    def setitem_w(self, space, item, w_value):
+        # the conversion can run app-level code, so the storage is only
+        # updated after it
+        if self.dtype.is_int_type():
+            value = space.int_w(space.int(w_value))
+            self.update_storage()
+            self.setitem_int(item, value)
         else:
-            self._sliceloop2(start, stop, step, arr, self)
+            float_value = space.float_w(space.float(w_value))
+            self.update_storage()
+            self.setitem(item, float_value)
+
+    def overlaps(self, other):
+        """Tell if the items of 'self' and 'other' share some memory, as
+        can the arrays made by frombuffer() on the same buffer."""
+        assert isinstance(other, NDimArray)
+        start = rffi.cast(lltype.Signed, self.storage)
+        other_start = rffi.cast(lltype.Signed, other.storage)
+        return (start < other_start + other.size * other.dtype.itemsize and
+                other_start < start + self.size * self.dtype.itemsize)
+
+    def setslice(self, space, start, strides, shape, arr):
+        """Store 'arr', broadcast to 'shape', into the items selected by
+        'start', 'strides' and 'shape'."""
+        self.update_storage()
+        arr.update_storage()
+        arr = broadcast(space, arr, shape)
+        try:
+            if len(shape) == 1:
+                step = strides[0]
+                stop = start + shape[0] * step
+                if step > 0:
+                    self._sliceloop1(start, stop, step, arr, self)
+                else:
+                    self._sliceloop2(start, stop, step, arr, self)
+            else:
+                view = create_slice(self, start, strides, shape)
+                self._viewloop(view, arr, self)
+        except OverflowError:
+            raise float_overflow_error(space)
+
+    def is_readonly(self):
+        return self.readonly
 
     def __del__(self):
-        lltype.free(self.storage, flavor='raw', track_allocation=False)
+        if self.buffer is None:
+            lltype.free(self.storage, flavor='raw', track_allocation=False)
+
+class NDimArrayBuffer(RawBufferMixin, RWBuffer):
+    def __init__(self, array):
+        self.array = array
+
+    def getlength(self):
+        return self.array.size * self.array.dtype.itemsize
 
-def new_numarray(space, w_size_or_iterable):
-    l = space.listview(w_size_or_iterable)
-    arr = SingleDimArray(len(l))
+    def get_raw_address(self):
+        self.array.update_storage()
+        return self.array.storage
+
+def readonly_error(space):
+    return OperationError(space.w_ValueError,
+                          space.wrap("array is read-only"))
+
+def float_overflow_error(space):
+    return OperationError(space.w_OverflowError, space.wrap(
+        "cannot convert float to integer: out of range"))
+
+def copy_array(arr):
+    arr.update_storage()
+    res = NDimArray(arr.shape[:], arr.dtype)
+    size = res.size
+    i = 0
+    while i < size:
+        res._setitem_from(i, arr, i)
+        i += 1
+    return res
+
+def _is_sequence(space, w_obj):
+    # strings are sequences, but numpy treats them as single values
+    return (space.issequence_w(w_obj) and
+            not space.isinstance_w(w_obj, space.w_str))
+
+def find_shape_and_elems(space, w_iterable):
+    """Walk nested sequences, returning the shape they describe and the
+    flat list of their items."""
+    items_w = space.listview(w_iterable)
+    shape = [len(items_w)]
+    while True:
+        if not items_w or not _is_sequence(space, items_w[0]):
+            for w_item in items_w:
+                if _is_sequence(space, w_item):
+                    raise OperationError(space.w_ValueError, space.wrap(
+                        "setting an array element with a sequence"))
+            return shape, items_w
+        size = space.len_w(items_w[0])
+        new_items_w = []
+        for w_item in items_w:
+            if not _is_sequence(space, w_item) or space.len_w(w_item) != size:
+                raise OperationError(space.w_ValueError, space.wrap(
+                    "setting an array element with a sequence"))
+            new_items_w.extend(space.listview(w_item))
+        shape.append(size)
+        items_w = new_items_w
+
+def find_dtype_for_items(space, items_w):
+    dtype = bool_dtype
+    for w_item in items_w:
+        item_dtype = find_scalar_dtype(space, w_item)
+        if interp_dtype.kind_order(item_dtype) > interp_dtype.kind_order(dtype):
+            dtype = item_dtype
+            if dtype is float64_dtype:
+                break
+    return dtype
+
+def new_numarray(space, w_iterable, dtype=None):
+    if isinstance(w_iterable, BaseArray):
+        if dtype is None or dtype is w_iterable.dtype:
+            return copy_array(w_iterable)
+        w_iterable.update_storage()
+        arr = NDimArray(w_iterable.shape[:], dtype)
+        try:
+            for i in range(arr.size):
+                arr._setitem_from(i, w_iterable, i)
+        except OverflowError:
+            raise float_overflow_error(space)
+        return arr
+    shape, items_w = find_shape_and_elems(space, w_iterable)
+    if dtype is None:
+        dtype = find_dtype_for_items(space, items_w)
+    arr = NDimArray(shape, dtype)
     i = 0
-    for w_elem in l:
-        arr.storage[i] = space.float_w(space.float(w_elem))
+    for w_elem in items_w:
+        arr.setitem_w(space, i, w_elem)
         i += 1
     return arr
 
-def descr_new_numarray(space, w_type, w_size_or_iterable):
-    return space.wrap(new_numarray(space, w_size_or_iterable))
-
-@unwrap_spec(size=int)
-def zeros(space, size):
-    return space.wrap(SingleDimArray(size))
+def descr_new_numarray(space, w_type, w_size_or_iterable, w_dtype=None):
+    dtype = None
+    if w_dtype is not None and not space.is_w(w_dtype, space.w_None):
+        dtype = interp_dtype.get_dtype(space, w_dtype)
+    return space.wrap(new_numarray(space, w_size_or_iterable, dtype))
 
-@unwrap_spec(size=int)
-def ones(space, size):
-    arr = SingleDimArray(size)
-    for i in xrange(size):
-        arr.storage[i] = 1.0
+def unwrap_shape(space, w_shape):
+    if space.isinstance_w(w_shape, space.w_int):
+        shape = [space.int_w(w_shape)]
+    else:
+        shape = [space.int_w(w_dim) for w_dim in space.fixedview(w_shape)]
+    for dim in shape:
+        if dim < 0:
+            raise OperationError(space.w_ValueError,
+                                 space.wrap("negative dimensions are not allowed"))
+    return shape
+
+def zeros(space, w_shape, w_dtype=None):
+    dtype = interp_dtype.get_dtype(space, w_dtype)
+    return space.wrap(NDimArray(unwrap_shape(space, w_shape), dtype))
+
+def ones(space, w_shape, w_dtype=None):
+    dtype = interp_dtype.get_dtype(space, w_dtype)
+    arr = NDimArray(unwrap_shape(space, w_shape), dtype)
+    for i in xrange(arr.size):
+        arr._setitem(i, 1.0)
     return space.wrap(arr)
 
 BaseArray.typedef = TypeDef(
@@ -561,6 +1287,9 @@ BaseArray.typedef = TypeDef(
 
     copy = interp2app(BaseArray.descr_copy),
     shape = GetSetProperty(BaseArray.descr_get_shape),
+    ndim = GetSetProperty(BaseArray.descr_get_ndim),
+    size = GetSetProperty(BaseArray.descr_get_size),
+    dtype = GetSetProperty(BaseArray.descr_get_dtype),
 
     __len__ = interp2app(BaseArray.descr_len),
     __getitem__ = interp2app(BaseArray.descr_getitem),
@@ -581,8 +1310,17 @@ BaseArray.typedef = TypeDef(
     __rdiv__ = interp2app(BaseArray.descr_rdiv),
     __rpow__ = interp2app(BaseArray.descr_rpow),
     __rmod__ = interp2app(BaseArray.descr_rmod),
+
+    __eq__ = interp2app(BaseArray.descr_eq),
+    __ne__ = interp2app(BaseArray.descr_ne),
+    __lt__ = interp2app(BaseArray.descr_lt),
+    __le__ = interp2app(BaseArray.descr_le),
+    __gt__ = interp2app(BaseArray.descr_gt),
+    __ge__ = interp2app(BaseArray.descr_ge),
+
     __repr__ = interp2app(BaseArray.descr_repr),
     __str__ = interp2app(BaseArray.descr_str),
+    __buffer__ = interp2app(BaseArray.descr_buffer),
 
     mean = interp2app(BaseArray.descr_mean),
     sum = interp2app(BaseArray.descr_sum),
@@ -593,6 +1331,8 @@ BaseArray.typedef = TypeDef(
     argmin = interp2app(BaseArray.descr_argmin),
     all = interp2app(BaseArray.descr_all),
     any = interp2app(BaseArray.descr_any),
+    cumsum = interp2app(BaseArray.descr_cumsum),
+    cumprod = interp2app(BaseArray.descr_cumprod),
     dot = interp2app(BaseArray.descr_dot),
     sort = interp2app(BaseArray.descr_sort),
 )
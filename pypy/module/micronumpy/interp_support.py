@@ -1,6 +1,6 @@
 from pypy.rlib.rstruct.runpack import runpack
 from pypy.rpython.lltypesystem import lltype, rffi
-from pypy.interpreter.error import OperationError
+from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter.gateway import unwrap_spec
 
 
@@ -8,7 +8,8 @@ FLOAT_SIZE = rffi.sizeof(lltype.Float)
 
 @unwrap_spec(s=str)
 def fromstring(space, s):
-    from pypy.module.micronumpy.interp_numarray import SingleDimArray
+    from pypy.module.micronumpy.interp_numarray import NDimArray
+    from pypy.module.micronumpy.interp_dtype import float64_dtype
     length = len(s)
 
     if length % FLOAT_SIZE == 0:
@@ -17,20 +18,56 @@ def fromstring(space, s):
         raise OperationError(space.w_ValueError, space.wrap(
             "string length %d not divisable by %d" % (length, FLOAT_SIZE)))
 
-    a = SingleDimArray(number)
+    a = NDimArray([number], float64_dtype)
 
     start = 0
     end = FLOAT_SIZE
     i = 0
     while i < number:
         part = s[start:end]
-        a.storage[i] = runpack('d', part)
+        a._setitem(i, runpack('d', part))
         i += 1
         start += FLOAT_SIZE
         end += FLOAT_SIZE
 
     return space.wrap(a)
 
+@unwrap_spec(count=int, offset=int)
+def frombuffer(space, w_buffer, w_dtype=None, count=-1, offset=0):
+    """Make a one-dimensional array of the content of a buffer.  If the
+    buffer is backed by raw memory (like the buffers of array.array, mmap
+    and numpy arrays), the array shares this memory instead of copying it;
+    it is read-only if the buffer is."""
+    from pypy.module.micronumpy.interp_numarray import NDimArray
+    from pypy.module.micronumpy.interp_dtype import get_dtype
+    dtype = get_dtype(space, w_dtype)
+    buf = space.buffer_w(w_buffer)
+    length = buf.getlength()
+    if offset < 0 or offset > length:
+        raise operationerrfmt(space.w_ValueError,
+            "offset must be non-negative and no greater than buffer "
+            "length (%d)", length)
+    itemsize = dtype.itemsize
+    if count < 0:
+        if (length - offset) % itemsize != 0:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "buffer size must be a multiple of element size"))
+        count = (length - offset) // itemsize
+    elif count * itemsize > length - offset:
+        raise OperationError(space.w_ValueError, space.wrap(
+            "buffer is smaller than requested size"))
+    try:
+        buf.get_raw_address()
+    except ValueError:
+        # the content is not in raw memory (e.g. a string or a bytearray)
+        nbytes = count * itemsize
+        data = buf.getslice(offset, offset + nbytes, 1, nbytes)
+        a = NDimArray([count], dtype)
+        for i in range(nbytes):
+            a.storage[i] = data[i]
+        return space.wrap(a)
+    return space.wrap(NDimArray([count], dtype, buf, offset, space))
+
 class Signature(object):
     def __init__(self):
         self.transitions = {}
@@ -1,62 +1,305 @@
 import math
 
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.gateway import interp2app, NoneNotWrapped
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.module.micronumpy.interp_dtype import find_binop_result_dtype, \
+     find_scalar_result_dtype, find_unaryop_result_dtype, bool_dtype, \
+     long_dtype
 from pypy.module.micronumpy.interp_support import Signature
 from pypy.rlib import rfloat
+from pypy.rlib.rarithmetic import intmask
+from pypy.rlib.objectmodel import specialize
 from pypy.tool.sourcetools import func_with_new_name
 
-def ufunc(func):
-    signature = Signature()
-    def impl(space, w_obj):
-        from pypy.module.micronumpy.interp_numarray import Call1, convert_to_array
-        if space.issequence_w(w_obj):
-            w_obj_arr = convert_to_array(space, w_obj)
-            w_res = Call1(func, w_obj_arr, w_obj_arr.signature.transition(signature))
-            w_obj_arr.invalidates.append(w_res)
-            return w_res
+class W_Ufunc(Wrappable):
+    """A universal function: an elementwise operation on arrays, whose
+    result is a lazy virtual array.  'func' computes on floats and
+    'int_func' on the Signed values of the integer and bool dtypes."""
+    _immutable_fields_ = ["name", "argcount", "promote_to_float",
+                          "signature", "has_identity", "identity"]
+
+    argcount = 0
+
+    def __init__(self, name, promote_to_float, identity=None):
+        self.name = name
+        self.promote_to_float = promote_to_float
+        self.signature = Signature()
+        self.has_identity = identity is not None
+        self.identity = 0.0
+        if identity is not None:
+            self.identity = float(identity)
+
+    def descr_repr(self, space):
+        return space.wrap("<ufunc '%s'>" % self.name)
+
+    def descr_get_name(self, space):
+        return space.wrap(self.name)
+
+    def descr_get_nin(self, space):
+        return space.wrap(self.argcount)
+
+    def descr_get_identity(self, space):
+        if not self.has_identity:
+            return space.w_None
+        return space.wrap(int(self.identity))
+
+    def descr_call(self, space, __args__):
+        args_w, kwds_w = __args__.unpack()
+        if kwds_w or len(args_w) != self.argcount:
+            raise operationerrfmt(space.w_TypeError,
+                "%s() takes exactly %d arguments", self.name, self.argcount)
+        return self.call_args(space, args_w)
+
+    def call_args(self, space, args_w):
+        raise NotImplementedError
+
+    def descr_reduce(self, space, w_obj, w_axis=NoneNotWrapped):
+        if self.argcount != 2:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "reduce only supported for binary functions"))
+        # like numpy, the first axis is reduced by default
+        if w_axis is None:
+            w_axis = space.wrap(0)
+        return self.reduce(space, w_obj, w_axis, False)
+
+    def descr_accumulate(self, space, w_obj, w_axis=NoneNotWrapped):
+        if self.argcount != 2:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "accumulate only supported for binary functions"))
+        if w_axis is None:
+            w_axis = space.wrap(0)
+        return self.reduce(space, w_obj, w_axis, True)
+
+    def reduce(self, space, w_obj, w_axis, cumulative):
+        raise NotImplementedError
+
+class W_Ufunc1(W_Ufunc):
+    _immutable_fields_ = ["func", "int_func"]
+
+    argcount = 1
+
+    def __init__(self, func, int_func, name, promote_to_float=False):
+        W_Ufunc.__init__(self, name, promote_to_float)
+        self.func = func
+        self.int_func = int_func
+
+    def call_args(self, space, args_w):
+        [w_obj] = args_w
+        return self.call(space, w_obj)
+
+    def call(self, space, w_obj):
+        from pypy.module.micronumpy.interp_numarray import (Call1,
+            convert_to_array)
+        w_obj_arr = convert_to_array(space, w_obj)
+        res_dtype = find_unaryop_result_dtype(w_obj_arr.dtype,
+                                              self.promote_to_float)
+        new_sig = w_obj_arr.signature.transition(self.signature).transition(
+            res_dtype.signature)
+        w_res = Call1(self, w_obj_arr, new_sig, res_dtype)
+        if not space.issequence_w(w_obj):
+            return w_res.wrap_item(space, 0)
+        w_obj_arr.invalidates.append(w_res)
+        return w_res
+
+class W_Ufunc2(W_Ufunc):
+    """A binary ufunc.  Those with an identity value can reduce empty
+    arrays; 'promote_bools' makes reductions of booleans give integers and
+    'comparison_func' makes the result an array of booleans."""
+    _immutable_fields_ = ["func", "int_func", "promote_bools",
+                          "comparison_func"]
+
+    argcount = 2
+
+    def __init__(self, func, int_func, name, promote_to_float=False,
+                 identity=None, promote_bools=False, comparison_func=False):
+        W_Ufunc.__init__(self, name, promote_to_float, identity)
+        self.func = func
+        self.int_func = int_func
+        self.promote_bools = promote_bools
+        self.comparison_func = comparison_func
+        self.reduce_signature = Signature()
+        self.accumulate_signature = Signature()
+
+    def call_args(self, space, args_w):
+        [w_lhs, w_rhs] = args_w
+        return self.call(space, w_lhs, w_rhs)
+
+    def call(self, space, w_lhs, w_rhs):
+        from pypy.module.micronumpy.interp_numarray import (Call2,
+            convert_to_array, shape_agreement, broadcast)
+        w_lhs_arr = convert_to_array(space, w_lhs)
+        w_rhs_arr = convert_to_array(space, w_rhs)
+        calc_dtype = self.find_calc_dtype(w_lhs_arr, w_rhs_arr)
+        res_dtype = calc_dtype
+        if self.comparison_func:
+            res_dtype = bool_dtype
+        shape = shape_agreement(space, w_lhs_arr.shape, w_rhs_arr.shape)
+        w_lhs_arr = broadcast(space, w_lhs_arr, shape)
+        w_rhs_arr = broadcast(space, w_rhs_arr, shape)
+        new_sig = w_lhs_arr.signature.transition(self.signature).transition(
+            w_rhs_arr.signature).transition(calc_dtype.signature)
+        w_res = Call2(self, w_lhs_arr, w_rhs_arr, new_sig, shape, res_dtype,
+                      calc_dtype)
+        if not space.issequence_w(w_lhs) and not space.issequence_w(w_rhs):
+            return w_res.wrap_item(space, 0)
+        w_lhs_arr.invalidates.append(w_res)
+        w_rhs_arr.invalidates.append(w_res)
+        return w_res
+
+    def find_calc_dtype(self, w_lhs_arr, w_rhs_arr):
+        """The dtype in which the operation is computed.  It is also the
+        dtype of the result, except for comparisons which give bools."""
+        # scalars have no shape, they only win if they are of a higher kind
+        if not w_lhs_arr.shape and w_rhs_arr.shape:
+            dtype = find_scalar_result_dtype(w_rhs_arr.dtype, w_lhs_arr.dtype)
+        elif not w_rhs_arr.shape and w_lhs_arr.shape:
+            dtype = find_scalar_result_dtype(w_lhs_arr.dtype, w_rhs_arr.dtype)
         else:
-            return space.wrap(func(space.float_w(w_obj)))
-    return func_with_new_name(impl, "%s_dispatcher" % func.__name__)
-
-def ufunc2(func):
-    signature = Signature()
-    def impl(space, w_lhs, w_rhs):
-        from pypy.module.micronumpy.interp_numarray import Call2, convert_to_array
-        if space.issequence_w(w_lhs) or space.issequence_w(w_rhs):
-            w_lhs_arr = convert_to_array(space, w_lhs)
-            w_rhs_arr = convert_to_array(space, w_rhs)
-            new_sig = w_lhs_arr.signature.transition(signature).transition(w_rhs_arr.signature)
-            w_res = Call2(func, w_lhs_arr, w_rhs_arr, new_sig)
-            w_lhs_arr.invalidates.append(w_res)
-            w_rhs_arr.invalidates.append(w_res)
-            return w_res
+            dtype = find_binop_result_dtype(w_lhs_arr.dtype, w_rhs_arr.dtype)
+        return find_unaryop_result_dtype(dtype, self.promote_to_float)
+
+    def find_reduce_dtype(self, dtype):
+        if self.promote_bools and dtype.is_bool_type():
+            return long_dtype
+        return find_unaryop_result_dtype(dtype, self.promote_to_float)
+
+    def reduce(self, space, w_obj, w_axis, cumulative):
+        """Reduce 'w_obj' along the axis 'w_axis', or along all of them
+        if 'w_axis' is None.  With 'cumulative', the intermediate results
+        are kept, as for accumulate()."""
+        from pypy.module.micronumpy.interp_numarray import (Reduce,
+            Accumulate, convert_to_array, calc_size, reduce_flat,
+            reduce_flat_int)
+        values = convert_to_array(space, w_obj)
+        if not values.shape:
+            raise operationerrfmt(space.w_TypeError,
+                "cannot %s on a scalar", "accumulate" if cumulative
+                                         else "reduce")
+        calc_dtype = self.find_reduce_dtype(values.dtype)
+        dtype = calc_dtype
+        if self.comparison_func:
+            dtype = bool_dtype
+        if space.is_w(w_axis, space.w_None):
+            # reduce the items in their flat order
+            dim = values.size
+            inner = 1
+            shape = []
+            res_shape = [values.size]
         else:
-            return space.wrap(func(space.float_w(w_lhs), space.float_w(w_rhs)))
-    return func_with_new_name(impl, "%s_dispatcher" % func.__name__)
+            axis = space.int_w(w_axis)
+            ndim = len(values.shape)
+            if axis < 0:
+                axis += ndim
+            if axis < 0 or axis >= ndim:
+                raise operationerrfmt(space.w_ValueError,
+                    "axis(=%d) out of bounds", space.int_w(w_axis))
+            dim = values.shape[axis]
+            inner = calc_size(values.shape[axis + 1:])
+            shape = values.shape[:axis] + values.shape[axis + 1:]
+            res_shape = values.shape
+        if cumulative:
+            new_sig = values.signature.transition(
+                self.accumulate_signature).transition(calc_dtype.signature)
+            w_res = Accumulate(self, values, new_sig, res_shape, dtype,
+                               calc_dtype, dim, inner)
+            values.invalidates.append(w_res)
+            return w_res
+        if dim == 0 and not self.has_identity:
+            raise operationerrfmt(space.w_ValueError,
+                "zero-size array to reduction operation %s which has no "
+                "identity", self.name)
+        if not shape:
+            # the result is a single value
+            if dim == 0:
+                return dtype.wrap(space, self.identity)
+            sig = values.signature.transition(self.reduce_signature)
+            if calc_dtype.is_float_type():
+                return dtype.wrap(space, reduce_flat(self.func, values, sig))
+            return dtype.wrap_int(space, reduce_flat_int(self.int_func,
+                                                         values, sig,
+                                                         calc_dtype))
+        new_sig = values.signature.transition(
+            self.reduce_signature).transition(calc_dtype.signature)
+        w_res = Reduce(self, values, new_sig, shape, dtype, calc_dtype, dim,
+                       inner, self.identity)
+        values.invalidates.append(w_res)
+        return w_res
+
+# the ufuncs that promote to float never compute on integers
+def _no_int_func1(value):
+    raise NotImplementedError
+
+def _no_int_func2(lvalue, rvalue):
+    raise NotImplementedError
+
+def _int_version(func, int_func, promote_to_float, no_int_func):
+    if promote_to_float:
+        return no_int_func
+    if int_func is None:
+        # the same operation, but a separate function for the annotator
+        int_func = func_with_new_name(func, func.__name__ + "_int")
+    return int_func
+
+def ufunc(func=None, promote_to_float=False, int_func=None):
+    if func is None:
+        return lambda func: ufunc(func, promote_to_float, int_func)
+    int_func = _int_version(func, int_func, promote_to_float, _no_int_func1)
+    return W_Ufunc1(func, int_func, func.__name__, promote_to_float)
+
+def ufunc2(func=None, promote_to_float=False, identity=None,
+           promote_bools=False, comparison_func=False, int_func=None):
+    if func is None:
+        return lambda func: ufunc2(func, promote_to_float, identity,
+                                   promote_bools, comparison_func, int_func)
+    name = func.__name__
+    if comparison_func:
+        # 'func' returns a bool, which becomes 1.0 or 1 in the result
+        float_compare = func
+        int_compare = func_with_new_name(func, name + "_int")
+        def func(lvalue, rvalue):
+            return float(float_compare(lvalue, rvalue))
+        def int_func(lvalue, rvalue):
+            return int(int_compare(lvalue, rvalue))
+    int_func = _int_version(func, int_func, promote_to_float, _no_int_func2)
+    return W_Ufunc2(func, int_func, name, promote_to_float, identity,
+                    promote_bools, comparison_func)
 
 @ufunc
 def absolute(value):
     return abs(value)
 
-@ufunc2
+@ufunc2(identity=0, promote_bools=True)
 def add(lvalue, rvalue):
     return lvalue + rvalue
 
-@ufunc2
+@ufunc2(promote_to_float=True)
 def copysign(lvalue, rvalue):
     return rfloat.copysign(lvalue, rvalue)
 
-@ufunc2
+def _int_divide(lvalue, rvalue):
+    # like numpy, integers give the floor of the quotient, and 0 when
+    # dividing by 0
+    if rvalue == 0:
+        return 0
+    if rvalue == -1:
+        # -sys.maxint - 1 // -1 overflows
+        return intmask(-lvalue)
+    return lvalue // rvalue
+
+@ufunc2(int_func=_int_divide)
 def divide(lvalue, rvalue):
     return lvalue / rvalue
 
-@ufunc
+@ufunc(promote_to_float=True)
 def exp(value):
     try:
         return math.exp(value)
     except OverflowError:
         return rfloat.INFINITY
 
-@ufunc
+@ufunc(promote_to_float=True)
 def fabs(value):
     return math.fabs(value)
 
@@ -68,7 +311,7 @@ def maximum(lvalue, rvalue):
 def minimum(lvalue, rvalue):
     return min(lvalue, rvalue)
 
-@ufunc2
+@ufunc2(identity=1, promote_bools=True)
 def multiply(lvalue, rvalue):
     return lvalue * rvalue
 
@@ -81,7 +324,7 @@ def positive(value):
 def negative(value):
     return -value
 
-@ufunc
+@ufunc(promote_to_float=True)
 def reciprocal(value):
     if value == 0.0:
         return rfloat.copysign(rfloat.INFINITY, value)
@@ -91,49 +334,205 @@ def reciprocal(value):
 def subtract(lvalue, rvalue):
     return lvalue - rvalue
 
-@ufunc
+@ufunc(promote_to_float=True)
 def floor(value):
     return math.floor(value)
 
-@ufunc
+def _int_sign(value):
+    if value > 0:
+        return 1
+    if value < 0:
+        return -1
+    return 0
+
+@ufunc(int_func=_int_sign)
 def sign(value):
     if value == 0.0:
         return 0.0
     return rfloat.copysign(1.0, value)
 
-@ufunc
+@ufunc(promote_to_float=True)
 def sin(value):
     return math.sin(value)
 
-@ufunc
+@ufunc(promote_to_float=True)
 def cos(value):
     return math.cos(value)
 
-@ufunc
+@ufunc(promote_to_float=True)
 def tan(value):
     return math.tan(value)
 
-@ufunc2
+def _int_power(lvalue, rvalue):
+    if rvalue < 0:
+        # the exact result is only an integer for 1 and -1
+        if lvalue == 1 or (lvalue == -1 and rvalue % 2 == 0):
+            return 1
+        if lvalue == -1:
+            return -1
+        return 0
+    result = 1
+    while rvalue > 0:
+        if rvalue & 1:
+            result = intmask(result * lvalue)
+        lvalue = intmask(lvalue * lvalue)
+        rvalue >>= 1
+    return result
+
+@ufunc2(int_func=_int_power)
 def power(lvalue, rvalue):
     return math.pow(lvalue, rvalue)
 
-@ufunc2
+def _int_mod(lvalue, rvalue):
+    # the sign of the divisor, like Python and numpy, and 0 for a modulo 0
+    if rvalue == 0 or rvalue == -1:
+        return 0
+    return lvalue % rvalue
+
+@ufunc2(int_func=_int_mod)
 def mod(lvalue, rvalue):
     return math.fmod(lvalue, rvalue)
 
 
-@ufunc
+@ufunc(promote_to_float=True)
 def arcsin(value):
     if value < -1.0 or  value > 1.0:
         return rfloat.NAN
     return math.asin(value)
 
-@ufunc
+@ufunc(promote_to_float=True)
 def arccos(value):
     if value < -1.0 or  value > 1.0:
         return rfloat.NAN
     return math.acos(value)
 
-@ufunc
+@ufunc(promote_to_float=True)
 def arctan(value):
     return math.atan(value)
+
+@ufunc(promote_to_float=True)
+def sqrt(value):
+    if value < 0.0:
+        return rfloat.NAN
+    return math.sqrt(value)
+
+@specialize.arg(1)
+def _log(value, log_func):
+    # numpy gives -inf for 0 and nan for negative numbers, without errors
+    if value == 0.0:
+        return -rfloat.INFINITY
+    if value < 0.0:
+        return rfloat.NAN
+    return log_func(value)
+
+@ufunc(promote_to_float=True)
+def log(value):
+    return _log(value, math.log)
+
+@ufunc(promote_to_float=True)
+def log10(value):
+    return _log(value, math.log10)
+
+@ufunc(promote_to_float=True)
+def log2(value):
+    return _log(value, math.log) / math.log(2.0)
+
+@ufunc(promote_to_float=True)
+def log1p(value):
+    if value == -1.0:
+        return -rfloat.INFINITY
+    if value < -1.0:
+        return rfloat.NAN
+    return math.log1p(value)
+
+@ufunc(promote_to_float=True)
+def expm1(value):
+    try:
+        return math.expm1(value)
+    except OverflowError:
+        return rfloat.INFINITY
+
+@ufunc(promote_to_float=True)
+def sinh(value):
+    try:
+        return math.sinh(value)
+    except OverflowError:
+        return rfloat.copysign(rfloat.INFINITY, value)
+
+@ufunc(promote_to_float=True)
+def cosh(value):
+    try:
+        return math.cosh(value)
+    except OverflowError:
+        return rfloat.INFINITY
+
+@ufunc(promote_to_float=True)
+def tanh(value):
+    return math.tanh(value)
+
+@ufunc(promote_to_float=True)
+def arcsinh(value):
+    return math.asinh(value)
+
+@ufunc(promote_to_float=True)
+def arccosh(value):
+    if value < 1.0:
+        return rfloat.NAN
+    return math.acosh(value)
+
+@ufunc(promote_to_float=True)
+def arctanh(value):
+    if value == 1.0 or value == -1.0:
+        return rfloat.copysign(rfloat.INFINITY, value)
+    if value < -1.0 or value > 1.0:
+        return rfloat.NAN
+    return math.atanh(value)
+
+@ufunc2(promote_to_float=True)
+def arctan2(lvalue, rvalue):
+    return math.atan2(lvalue, rvalue)
+
+@ufunc2(promote_to_float=True)
+def hypot(lvalue, rvalue):
+    return math.hypot(lvalue, rvalue)
+
+
+@ufunc2(comparison_func=True)
+def equal(lvalue, rvalue):
+    return lvalue == rvalue
+
+@ufunc2(comparison_func=True)
+def not_equal(lvalue, rvalue):
+    return lvalue != rvalue
+
+@ufunc2(comparison_func=True)
+def less(lvalue, rvalue):
+    return lvalue < rvalue
+
+@ufunc2(comparison_func=True)
+def less_equal(lvalue, rvalue):
+    return lvalue <= rvalue
+
+@ufunc2(comparison_func=True)
+def greater(lvalue, rvalue):
+    return lvalue > rvalue
+
+@ufunc2(comparison_func=True)
+def greater_equal(lvalue, rvalue):
+    return lvalue >= rvalue
+
+
+W_Ufunc.typedef = TypeDef("ufunc",
+    __module__ = "numpy",
+
+    __call__ = interp2app(W_Ufunc.descr_call),
+    __repr__ = interp2app(W_Ufunc.descr_repr),
+
+    name = GetSetProperty(W_Ufunc.descr_get_name),
+    nin = GetSetProperty(W_Ufunc.descr_get_nin),
+    identity = GetSetProperty(W_Ufunc.descr_get_identity),
+
+    reduce = interp2app(W_Ufunc.descr_reduce),
+    accumulate = interp2app(W_Ufunc.descr_accumulate),
+)
+W_Ufunc.typedef.acceptable_as_base_class = False
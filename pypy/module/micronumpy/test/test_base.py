@@ -1,5 +1,6 @@
 from pypy.conftest import gettestobjspace
-from pypy.module.micronumpy.interp_numarray import SingleDimArray, FloatWrapper
+from pypy.module.micronumpy.interp_dtype import float64_dtype
+from pypy.module.micronumpy.interp_numarray import NDimArray, FloatWrapper
 
 class BaseNumpyAppTest(object):
     def setup_class(cls):
@@ -7,7 +8,7 @@ class BaseNumpyAppTest(object):
 
 class TestSignature(object):
     def test_binop_signature(self, space):
-        ar = SingleDimArray(10)
+        ar = NDimArray([10], float64_dtype)
         v1 = ar.descr_add(space, ar)
         v2 = ar.descr_add(space, FloatWrapper(2.0))
         assert v1.signature is not v2.signature
@@ -17,11 +18,11 @@ class TestSignature(object):
         assert v1.signature is v4.signature
 
     def test_slice_signature(self, space):
-        ar = SingleDimArray(10)
+        ar = NDimArray([10], float64_dtype)
         v1 = ar.descr_getitem(space, space.wrap(slice(1, 5, 1)))
         v2 = ar.descr_getitem(space, space.wrap(slice(4, 6, 1)))
         assert v1.signature is v2.signature
 
-        v3 = ar.descr_add(space, v1)
-        v4 = ar.descr_add(space, v2)
+        v3 = NDimArray([4], float64_dtype).descr_add(space, v1)
+        v4 = NDimArray([2], float64_dtype).descr_add(space, v2)
         assert v3.signature is v4.signature
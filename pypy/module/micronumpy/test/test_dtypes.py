@@ -0,0 +1,134 @@
+from pypy.module.micronumpy.test.test_base import BaseNumpyAppTest
+
+
+class AppTestDtypes(BaseNumpyAppTest):
+    def test_dtype(self):
+        from numpy import dtype
+
+        d = dtype('?')
+        assert d.num == 0
+        assert d.kind == 'b'
+        assert dtype('int8').num == 1
+        assert dtype(d) is d
+        assert dtype(None) is dtype(float)
+        assert dtype(int).kind == 'i'
+        assert dtype('float32').itemsize == 4
+        assert dtype('d') == 'float64'
+        assert dtype('d') != dtype('f')
+        raises(TypeError, dtype, 1042)
+        raises(TypeError, dtype, 'xyz')
+
+    def test_repr_str(self):
+        from numpy import dtype
+
+        assert repr(dtype(float)) == "dtype('float64')"
+        assert str(dtype('int16')) == "int16"
+
+    def test_array_dtype_attr(self):
+        from numpy import array, dtype
+
+        a = array(range(5))
+        assert a.dtype is dtype(int)
+        assert array([True, False]).dtype is dtype(bool)
+        assert array([1, 2.5]).dtype is dtype(float)
+        assert array([True, 2]).dtype is dtype(int)
+        assert array([]).dtype is dtype(bool)
+
+    def test_array_with_dtype(self):
+        from numpy import array, dtype
+
+        a = array([1.5, 2.7, -3.2], 'int32')
+        assert a.dtype is dtype('int32')
+        assert a[0] == 1 and a[1] == 2 and a[2] == -3
+        assert isinstance(a[0], int)
+        a = array([0, 1, 2], dtype=bool)
+        assert a[0] is False and a[1] is True and a[2] is True
+        a = array([0.1], dtype='f')
+        assert a[0] != 0.1
+        assert abs(a[0] - 0.1) < 1e-7
+
+    def test_zeros_ones(self):
+        from numpy import zeros, ones, dtype
+
+        assert zeros(3).dtype is dtype(float)
+        a = zeros(3, 'int8')
+        assert a.dtype is dtype('int8')
+        assert a[1] == 0
+        a = ones((2, 2), dtype=bool)
+        assert a[1, 1] is True
+
+    def test_overflow(self):
+        from numpy import array
+
+        a = array([0], 'int8')
+        a[0] = 127
+        assert a[0] == 127
+        a[0] = 128
+        assert a[0] == -128
+        a = array([0], 'int16')
+        a[0] = 32768
+        assert a[0] == -32768
+
+    def test_result_dtypes(self):
+        from numpy import array, dtype
+
+        a = array(range(5))
+        b = array([True, False])
+        assert (a + a).dtype is dtype(int)
+        assert (a + 1).dtype is dtype(int)
+        assert (a + 1.5).dtype is dtype(float)
+        assert (a / 2).dtype is dtype(int)
+        assert (b + b).dtype is dtype(bool)
+        assert (b + 1).dtype is dtype(int)
+        assert (array([1], 'int8') + 5).dtype is dtype('int8')
+        assert (array([1], 'int8') + array([1], 'int16')).dtype is dtype('int16')
+        assert (array([1], 'f') + array([1], 'int8')).dtype is dtype('float32')
+        assert (array([1], 'f') + array([1], 'int32')).dtype is dtype(float)
+
+    def test_int_operations(self):
+        from numpy import array
+
+        a = array([3, 4])
+        b = a * 2
+        assert b[0] == 6
+        assert isinstance(b[0], int)
+        assert (a / 2)[0] == 1
+        assert a.sum() == 7
+        assert isinstance(a.sum(), int)
+
+        a = array([-7, 7, 0])
+        assert list(a / 2) == [-4, 3, 0]
+        assert list(a % 3) == [2, 1, 0]
+        assert list(a / 0) == [0, 0, 0]
+        assert list(a ** 2) == [49, 49, 0]
+        assert list(array([2, -1, 0]) ** -1) == [0, -1, 0]
+        assert list(-a) == [7, -7, 0]
+
+    def test_int_precision(self):
+        from numpy import array
+
+        a = array([2**53 + 1], dtype=int)
+        assert a[0] == 2**53 + 1
+        assert (a + 1)[0] == 2**53 + 2
+        assert a.sum() == 2**53 + 1
+        a[0] = 2**53 + 3
+        assert a[0] == 2**53 + 3
+
+    def test_float_to_int_overflow(self):
+        from numpy import array
+
+        raises(OverflowError, array, [1e30], dtype=int)
+        a = array([0])
+        raises(OverflowError, "a[0] = 1e30")
+        raises(OverflowError, "a[:] = array([1e30])")
+        a[0] = 2.5
+        assert a[0] == 2
+
+    def test_bool_operations(self):
+        from numpy import array
+
+        a = array([True, False, True])
+        assert (a + a)[0] is True
+        assert a.sum() == 2
+        assert isinstance(a.sum(), int)
+        assert a.max() is True
@@ -2,6 +2,7 @@ import py
 
 from pypy.module.micronumpy.test.test_base import BaseNumpyAppTest
 from pypy.conftest import gettestobjspace
+from pypy.tool.udir import udir
 
 
 class AppTestNumArray(BaseNumpyAppTest):
@@ -52,14 +53,18 @@ class AppTestNumArray(BaseNumpyAppTest):
 
     def test_repr(self):
         from numpy import array, zeros
-        a = array(range(5))
+        a = array(range(5), float)
         assert repr(a) == "array([0.0, 1.0, 2.0, 3.0, 4.0])"
+        a = array(range(5))
+        assert repr(a) == "array([0, 1, 2, 3, 4])"
+        a = array([True, False])
+        assert repr(a) == "array([True, False])"
         a = zeros(1001)
         assert repr(a) == "array([0.0, 0.0, 0.0, ..., 0.0, 0.0, 0.0])"
 
     def test_repr_slice(self):
         from numpy import array, zeros
-        a = array(range(5))
+        a = array(range(5), float)
         b = a[1::2]
         assert repr(b) == "array([1.0, 3.0])"
         a = zeros(2002)
@@ -68,15 +73,17 @@ class AppTestNumArray(BaseNumpyAppTest):
 
     def test_str(self):
         from numpy import array, zeros
-        a = array(range(5))
+        a = array(range(5), float)
         assert str(a) == "[0.0 1.0 2.0 3.0 4.0]"
         assert str((2*a)[:]) == "[0.0 2.0 4.0 6.0 8.0]"
+        a = array(range(5))
+        assert str(a) == "[0 1 2 3 4]"
         a = zeros(1001)
         assert str(a) == "[0.0 0.0 0.0 ..., 0.0 0.0 0.0]"
 
     def test_str_slice(self):
         from numpy import array, zeros
-        a = array(range(5))
+        a = array(range(5), float)
         b = a[1::2]
         assert str(b) == "[1.0 3.0]"
         a = zeros(2002)
@@ -246,7 +253,7 @@ class AppTestNumArray(BaseNumpyAppTest):
         b = array([2, 2, 2, 2, 2])
         c = a / b
         for i in range(5):
-            assert c[i] == i / 2.0
+            assert c[i] == i // 2
 
     def test_div_constant(self):
         from numpy import array
@@ -473,6 +480,201 @@ class AppTestNumArray(BaseNumpyAppTest):
         for i in xrange(5):
             assert b[i] == 2.5*a[i]
 
+    def test_dot_not_aligned(self):
+        from numpy import array
+        raises(ValueError, array(range(5)).dot, array(range(4)))
+        raises(ValueError, array([[1, 2], [3, 4]]).dot, array(range(3)))
+
+    def test_dot_3d(self):
+        from numpy import zeros
+        a = zeros((2, 2, 2))
+        raises(ValueError, a.dot, a)
+
+
+class AppTestMultiDim(BaseNumpyAppTest):
+    def test_dot_matrix_matrix(self):
+        from numpy import array
+        a = array([[1, 2, 3], [4, 5, 6]])
+        b = array([[1, 2], [3, 4], [5, 6]])
+        c = a.dot(b)
+        assert c.shape == (2, 2)
+        assert c.dtype is a.dtype
+        assert c[0, 0] == 22 and c[0, 1] == 28
+        assert c[1, 0] == 49 and c[1, 1] == 64
+        c = b.dot(a)
+        assert c.shape == (3, 3)
+        assert c[2, 1] == 5 * 2 + 6 * 5
+
+    def test_dot_matrix_vector(self):
+        from numpy import array
+        a = array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        c = a.dot(array([1.0, 0.5, 2.0]))
+        assert c.shape == (2,)
+        assert c[0] == 8.0 and c[1] == 18.5
+        c = array([2.0, 1.0]).dot(a)
+        assert c.shape == (3,)
+        assert c[0] == 6.0 and c[1] == 9.0 and c[2] == 12.0
+        # views and lazy operands
+        c = (a + 1).dot(a[0])
+        assert c[0] == 2 + 6 + 12 and c[1] == 5 + 12 + 21
+        c = a[:, 1:].dot(array([1.0, 1.0]))
+        assert c[0] == 5.0 and c[1] == 11.0
+
+    def test_init(self):
+        from numpy import array, zeros
+        a = zeros((2, 3))
+        assert a.shape == (2, 3)
+        assert a.ndim == 2
+        assert a.size == 6
+        assert len(a) == 2
+        a = array([[1, 2], [3, 4], [5, 6]])
+        assert a.shape == (3, 2)
+        assert a[1, 1] == 4
+        a = array([[[1], [2]], [[3], [4]]])
+        assert a.shape == (2, 2, 1)
+        assert a[1, 0, 0] == 3
+        raises(ValueError, array, [[1, 2], [3]])
+        raises(ValueError, array, [[1, 2], 3])
+        raises(ValueError, zeros, (2, -1))
+
+    def test_getitem(self):
+        from numpy import array
+        a = array([[1, 2, 3], [4, 5, 6]])
+        assert a[0, 2] == 3
+        assert a[-1, -1] == 6
+        raises(IndexError, "a[2, 0]")
+        raises(IndexError, "a[0, 0, 0]")
+        b = a[1]
+        assert b.shape == (3,)
+        assert b[0] == 4
+        c = a[:, 1]
+        assert c.shape == (2,)
+        assert c[0] == 2 and c[1] == 5
+        d = a[::-1, 1:]
+        assert d.shape == (2, 2)
+        assert d[0, 0] == 5
+        assert d[1, 1] == 3
+        assert d[1][0] == 2
+
+    def test_setitem(self):
+        from numpy import zeros, array
+        a = zeros((2, 3))
+        a[1, 2] = 5
+        assert a[1, 2] == 5
+        a[0] = 1
+        assert a[0, 0] == 1 and a[0, 2] == 1
+        assert a[1, 0] == 0
+        a[:, 1] = [7, 8]
+        assert a[0, 1] == 7 and a[1, 1] == 8
+        a[:] = array([1, 2, 3])
+        assert a[1, 0] == 1 and a[1, 2] == 3
+        b = zeros((2, 2))
+        b[:, :] = a[:, 1:]
+        assert b[0, 0] == 2 and b[1, 1] == 3
+        a[:, ::2] = a[:, :2]
+        assert a[0, 0] == 1 and a[0, 2] == 2
+        raises(ValueError, "a[:] = [1, 2]")
+
+    def test_operations(self):
+        from numpy import array
+        a = array([[1, 2], [3, 4]])
+        b = a + a * a
+        assert b.shape == (2, 2)
+        assert b[1, 0] == 12
+        assert (-a)[0, 1] == -2
+        assert a[1].sum() == 7
+        assert a.sum() == 10
+        assert a.max() == 4
+
+    def test_broadcast(self):
+        from numpy import array, ones
+        a = array([[1, 2, 3], [4, 5, 6]])
+        b = a + array([10, 20, 30])
+        assert b.shape == (2, 3)
+        assert b[0, 0] == 11 and b[1, 2] == 36
+        c = a * array([[2], [3]])
+        assert c.shape == (2, 3)
+        assert c[0, 2] == 6 and c[1, 0] == 12
+        d = array([1, 2]) + ones((3, 1))
+        assert d.shape == (3, 2)
+        assert d[2, 1] == 3
+        e = 10 - a
+        assert e[1, 2] == 4
+        raises(ValueError, "a + array([1, 2])")
+        raises(ValueError, "a + ones((3, 3))")
+
+    def test_repr(self):
+        from numpy import array, zeros
+        a = array([[1, 2], [3, 4]])
+        assert repr(a) == "array([[1, 2],\n       [3, 4]])"
+        assert str(a) == "[[1 2]\n [3 4]]"
+        a = zeros((2, 1, 2))
+        assert str(a) == "[[[0.0 0.0]]\n\n [[0.0 0.0]]]"
+        a = array([[1, 2], [3, 4]])[:, 1]
+        assert repr(a) == "array([2, 4])"
+
+    def test_sort(self):
+        from numpy import array
+        a = array([[3, 1, 2], [9, 7, 8]])
+        a.sort()
+        assert a[0, 0] == 1 and a[0, 2] == 3
+        assert a[1, 0] == 7 and a[1, 2] == 9
+        b = array([5, 1, 4])
+        b[::2].sort()
+        assert b[0] == 4 and b[1] == 1 and b[2] == 5
+
+    def test_copy(self):
+        from numpy import array
+        a = array([[1, 2], [3, 4]])
+        b = a.copy()
+        a[0, 0] = 10
+        assert b.shape == (2, 2)
+        assert b[0, 0] == 1
+        c = array(a[:, 1])
+        assert c.shape == (2,)
+        assert c[0] == 2 and c[1] == 4
+
+    def test_reduce_axis(self):
+        from numpy import array
+        a = array([[1, 2, 3], [4, 5, 6]])
+        b = a.sum(0)
+        assert b.shape == (3,)
+        assert b[0] == 5 and b[2] == 9
+        b = a.sum(axis=1)
+        assert b[0] == 6 and b[1] == 15
+        assert a.sum(None) == 21
+        assert a.prod(1)[1] == 120
+        assert a.max(0)[1] == 5
+        assert a.min(1)[1] == 4
+        assert array([True, True]).sum(0) == 2
+
+    def test_cumsum_cumprod(self):
+        from numpy import array
+        a = array([[1, 2], [3, 4]])
+        b = a.cumsum()
+        assert b.shape == (4,)
+        assert [b[i] for i in range(4)] == [1, 3, 6, 10]
+        b = a.cumsum(0)
+        assert b.shape == (2, 2)
+        assert b[1, 0] == 4 and b[1, 1] == 6
+        b = a.cumprod(1)
+        assert b[1, 1] == 12
+
+    def test_comparison(self):
+        from numpy import array, dtype
+        a = array([1, 2, 3])
+        b = a > 1
+        assert b.dtype is dtype(bool)
+        assert not b[0] and b[1] and b[2]
+        b = a == array([1, 0, 3])
+        assert b[0] and not b[1] and b[2]
+        b = a <= 2
+        assert b[1] and not b[2]
+        b = 2 < a
+        assert not b[1] and b[2]
+        assert (a != 2)[0]
+        assert not (a >= 3)[1]
+
 
 class AppTestSupport(object):
     def setup_class(cls):
@@ -487,3 +689,105 @@ class AppTestSupport(object):
             assert a[i] == i + 1
         raises(ValueError, fromstring, "abc")
 
+
+class AppTestBuffer(object):
+    def setup_class(cls):
+        import struct
+        cls.space = gettestobjspace(usemodules=('micronumpy', 'array',
+                                                'mmap'))
+        cls.w_data = cls.space.wrap(struct.pack('dddd', 1, 2, 3, 4))
+        cls.w_tmpname = cls.space.wrap(str(udir.join('numpy-mmap')))
+
+    def test_frombuffer_copies_strings(self):
+        from numpy import frombuffer, dtype
+        a = frombuffer(self.data)
+        assert a.shape == (4,)
+        assert a[3] == 4
+        a = frombuffer(self.data, 'd', 2, 8)
+        assert a[0] == 2 and a[1] == 3
+        assert frombuffer(bytearray('\x01\x02'), 'int8')[1] == 2
+        assert frombuffer('\x01\x00\x00\x00', 'i').dtype is dtype('i')
+        raises(ValueError, frombuffer, "abc")
+        raises(ValueError, frombuffer, self.data, 'd', 5)
+        raises(ValueError, frombuffer, self.data, 'd', -1, 40)
+
+    def test_frombuffer_array(self):
+        import array
+        from numpy import frombuffer
+        b = array.array('d', [1.5, 2.5, 3.5])
+        a = frombuffer(b)
+        assert a[1] == 2.5
+        # the memory is shared, not copied
+        b[1] = 10
+        assert a[1] == 10
+        a[2] = -1
+        assert b[2] == -1
+        assert (a + a)[1] == 20
+        c = frombuffer(array.array('i', [1, 2, 3]), 'i', 2, 4)
+        assert c[0] == 2 and c[1] == 3
+
+    def test_frombuffer_array_resized(self):
+        import array
+        from numpy import frombuffer
+        b = array.array('d', [1.5, 2.5, 3.5])
+        a = frombuffer(b)
+        # the array follows the memory of 'b' when it moves
+        b.extend(range(1000))
+        assert a[2] == 3.5
+        b[2] = 4.5
+        assert a[2] == 4.5
+        del b[1:]
+        raises(ValueError, "a[2]")
+        raises(ValueError, "a[0] = 1")
+
+    def test_frombuffer_overlapping(self):
+        import array
+        from numpy import frombuffer
+        b = array.array('d', range(6))
+        a1 = frombuffer(b, 'd', 4, 0)
+        a2 = frombuffer(b, 'd', 4, 16)
+        # the items are copied first, as they share memory
+        a2[:] = a1
+        assert list(b) == [0, 1, 0, 1, 2, 3]
+        a1[1:] = a2[:3]
+        assert list(b) == [0, 0, 1, 2, 2, 3]
+
+    def test_frombuffer_mmap(self):
+        import mmap, array
+        from numpy import frombuffer
+        f = open(self.tmpname, "w+b")
+        f.write(array.array('l', [1, 2, 3, 4]).tostring())
+        f.flush()
+        m = mmap.mmap(f.fileno(), 0)
+        a = frombuffer(m, int)
+        assert a.sum() == 10
+        a[0] = 5
+        assert array.array('l', m[:a.dtype.itemsize])[0] == 5
+        m.close()
+        raises(ValueError, "a[0]")
+        raises(ValueError, a.sum)
+        raises(ValueError, frombuffer, m)
+        m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        a = frombuffer(m, int)
+        assert a[0] == 5
+        raises(ValueError, "a[0] = 2")
+        raises(ValueError, "a[1:][0] = 2")
+        raises(ValueError, a.sort)
+        b = a + 1
+        b[0] = 2
+        raises(TypeError, "buffer(a)[0] = 'x'")
+        m.close()
+        f.close()
+
+    def test_array_buffer(self):
+        from numpy import array, frombuffer
+        a = array([1.0, 2.0, 3.0])
+        buf = buffer(a)
+        assert len(buf) == 24
+        assert buf[:] == self.data[:24]
+        b = frombuffer(a)
+        b[0] = 7
+        assert a[0] == 7
+        buf[8:16] = buffer(array([5.0]))[:]
+        assert a[1] == 5
+        raises(ValueError, buffer, a[::2])
@@ -249,3 +249,141 @@ class AppTestUfuncs(BaseNumpyAppTest):
         b = arctan(a)
         assert math.isnan(b[0])
 
+
+    def test_result_dtype(self):
+        from numpy import array, dtype, exp, negative, floor, divide
+
+        a = array([1, 2])
+        assert negative(a).dtype is dtype(int)
+        assert exp(a).dtype is dtype(float)
+        assert floor(a).dtype is dtype(float)
+        assert divide(a, a).dtype is dtype(int)
+        assert exp(array([1], 'f')).dtype is dtype('f')
+
+    def test_multidim(self):
+        from numpy import array, add, negative
+
+        a = array([[1, 2], [3, 4]])
+        b = negative(a)
+        assert b.shape == (2, 2)
+        assert b[1, 0] == -3
+        c = add(a, [10, 20])
+        assert c[1, 1] == 24
+
+    def test_ufunc_attributes(self):
+        from numpy import add, negative, ufunc
+
+        assert isinstance(add, ufunc)
+        assert repr(add) == "<ufunc 'add'>"
+        assert add.name == "add"
+        assert add.nin == 2
+        assert negative.nin == 1
+        assert add.identity == 0
+        assert negative.identity is None
+
+    def test_transcendental(self):
+        import math
+        from numpy import (array, sqrt, log, log10, log2, log1p, expm1, sinh,
+            cosh, tanh, arcsinh, arccosh, arctanh)
+
+        a = array([0.5, 1, 2, 10])
+        for ufunc, func in [(sqrt, math.sqrt), (log, math.log),
+                            (log10, math.log10), (log1p, math.log1p),
+                            (sinh, math.sinh), (cosh, math.cosh),
+                            (tanh, math.tanh), (arcsinh, math.asinh)]:
+            b = ufunc(a)
+            for i in range(len(a)):
+                assert abs(b[i] - func(a[i])) < 1e-12
+        assert log2(array([8]))[0] == 3.0
+        assert abs(expm1(array([1e-10]))[0] - 1e-10) < 1e-20
+        assert arccosh(array([1]))[0] == 0.0
+        assert arctanh(array([0]))[0] == 0.0
+        assert math.isnan(sqrt(-1))
+        assert math.isnan(log(array([-1]))[0])
+        assert log(0) == float('-inf')
+        assert math.isnan(arccosh(0.5))
+        assert arctanh(1) == float('inf')
+        assert sqrt(array([1, 4, 9])).dtype.kind == 'f'
+
+    def test_arctan2_hypot(self):
+        import math
+        from numpy import array, arctan2, hypot
+
+        assert arctan2(1, 1) == math.atan2(1, 1)
+        b = hypot(array([3, 5]), array([4, 12]))
+        assert b[0] == 5
+        assert b[1] == 13
+
+    def test_comparison(self):
+        from numpy import array, dtype, equal, not_equal, less, less_equal
+        from numpy import greater, greater_equal
+
+        a = array([1, 2, 3])
+        b = array([3, 2, 1])
+        for ufunc, expected in [(equal, [False, True, False]),
+                                (not_equal, [True, False, True]),
+                                (less, [True, False, False]),
+                                (less_equal, [True, True, False]),
+                                (greater, [False, False, True]),
+                                (greater_equal, [False, True, True])]:
+            c = ufunc(a, b)
+            assert c.dtype is dtype(bool)
+            assert [c[i] for i in range(3)] == expected
+        assert less(1, 2) is True
+
+    def test_reduce(self):
+        from numpy import add, multiply, maximum, negative, array
+
+        assert add.reduce([1, 2, 3]) == 6
+        assert multiply.reduce(array([1, 2, 3, 4])) == 24
+        assert maximum.reduce([1, 5, 3]) == 5
+        assert add.reduce([]) == 0
+        raises(ValueError, maximum.reduce, [])
+        raises(ValueError, negative.reduce, [1, 2])
+        raises(TypeError, add.reduce, 1)
+
+        a = array([[1, 2, 3], [4, 5, 6]])
+        b = add.reduce(a)
+        assert b.shape == (3,)
+        assert [b[i] for i in range(3)] == [5, 7, 9]
+        b = add.reduce(a, 1)
+        assert [b[i] for i in range(2)] == [6, 15]
+        b = add.reduce(a, -1)
+        assert [b[i] for i in range(2)] == [6, 15]
+        assert add.reduce(a, None) == 21
+        raises(ValueError, add.reduce, a, 2)
+
+    def test_reduce_3d(self):
+        from numpy import add, zeros
+
+        a = zeros((2, 3, 4))
+        for i in range(2):
+            for j in range(3):
+                for k in range(4):
+                    a[i, j, k] = i * 100 + j * 10 + k
+        b = add.reduce(a, 1)
+        assert b.shape == (2, 4)
+        assert b[1, 2] == 100 * 3 + 10 + 20 + 2 * 3
+        b = add.reduce(a, 2)
+        assert b.shape == (2, 3)
+        assert b[1, 2] == 4 * 120 + 6
+
+    def test_reduce_lazy(self):
+        from numpy import add, array
+
+        a = array([[1, 2], [3, 4]])
+        b = add.reduce(a + a, 0)
+        a[0, 0] = 10
+        assert b[0] == 8
+
+    def test_accumulate(self):
+        from numpy import add, multiply, array
+
+        b = add.accumulate([1, 2, 3, 4])
+        assert [b[i] for i in range(4)] == [1, 3, 6, 10]
+        a = array([[1, 2], [3, 4]])
+        b = multiply.accumulate(a)
+        assert b.shape == (2, 2)
+        assert [b[1, 0], b[1, 1]] == [3, 8]
+        b = add.accumulate(a, 1)
+        assert [b[0, 1], b[1, 1]] == [3, 7]
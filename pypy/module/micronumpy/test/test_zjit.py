@@ -1,14 +1,16 @@
 from pypy.jit.metainterp.test.support import LLJitMixin
 from pypy.rpython.test.test_llinterp import interpret
-from pypy.module.micronumpy.interp_numarray import (SingleDimArray, Signature,
-    FloatWrapper, Call2, SingleDimSlice, add, mul, Call1)
-from pypy.module.micronumpy.interp_ufuncs import negative
+from pypy.module.micronumpy.interp_dtype import float64_dtype, int32_dtype
+from pypy.module.micronumpy.interp_numarray import (NDimArray, Signature,
+    FloatWrapper, Call2, SingleDimSlice, Call1, Reduce)
+from pypy.module.micronumpy.interp_ufuncs import add, multiply, negative
 from pypy.module.micronumpy.compile import numpy_compile
 from pypy.rlib.objectmodel import specialize
 from pypy.rlib.nonconst import NonConstant
 
 class FakeSpace(object):
     w_ValueError = None
+    w_OverflowError = None
 
     def issequence_w(self, w_obj):
         return True
@@ -17,6 +19,9 @@ class FakeSpace(object):
     def wrap(self, w_obj):
         return w_obj
 
+    def newbool(self, b):
+        return b
+
     def float_w(self, w_obj):
         return float(w_obj)
 
@@ -26,9 +31,9 @@ class TestNumpyJIt(LLJitMixin):
 
     def test_add(self):
         def f(i):
-            ar = SingleDimArray(i)
-            v = Call2(add, ar, ar, Signature())
-            return v.get_concrete().storage[3]
+            ar = NDimArray([i], float64_dtype)
+            v = Call2(add, ar, ar, Signature(), ar.shape, float64_dtype)
+            return v.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({'getarrayitem_raw': 2, 'float_add': 1,
@@ -38,9 +43,9 @@ class TestNumpyJIt(LLJitMixin):
 
     def test_floatadd(self):
         def f(i):
-            ar = SingleDimArray(i)
-            v = Call2(add, ar, FloatWrapper(4.5), Signature())
-            return v.get_concrete().storage[3]
+            ar = NDimArray([i], float64_dtype)
+            v = Call2(add, ar, FloatWrapper(4.5), Signature(), ar.shape, float64_dtype)
+            return v.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({"getarrayitem_raw": 1, "float_add": 1,
@@ -48,11 +53,31 @@ class TestNumpyJIt(LLJitMixin):
                           "int_lt": 1, "guard_true": 1, "jump": 1})
         assert result == f(5)
 
+    def test_add_vectorized(self):
+        def f(i):
+            ar = NDimArray([i], float64_dtype)
+            for j in range(i):
+                ar.setitem(j, float(j))
+            v = Call2(add, ar, ar, Signature(), ar.shape, float64_dtype)
+            c = v.get_concrete()
+            return c.eval(i - 2) + c.eval(i - 1)
+
+        result = self.meta_interp(f, [31], listops=True, backendopt=True,
+                                  enable_opts='all:vectorize')
+        # two items per iteration, after checking that there are two
+        # items left and that the result does not overlap the arguments
+        self.check_loops({'vec_getarrayitem_raw': 2, 'vec_float_add': 1,
+                          'vec_setarrayitem_raw': 1, 'int_add': 4,
+                          'int_lt': 2, 'guard_true': 2, 'int_sub': 2,
+                          'uint_lt': 2, 'int_ne': 2, 'int_and': 2,
+                          'guard_false': 2, 'jump': 1})
+        assert result == f(31)
+
     def test_sum(self):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             return ar.descr_add(space, ar).descr_sum(space)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
@@ -65,7 +90,7 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             return ar.descr_add(space, ar).descr_prod(space)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
@@ -78,10 +103,10 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             j = 0
             while j < i:
-                ar.get_concrete().storage[j] = float(j)
+                ar.get_concrete()._setitem(j, float(j))
                 j += 1
             return ar.descr_add(space, ar).descr_max(space)
 
@@ -96,10 +121,10 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             j = 0
             while j < i:
-                ar.get_concrete().storage[j] = float(j)
+                ar.get_concrete()._setitem(j, float(j))
                 j += 1
             return ar.descr_add(space, ar).descr_min(space)
 
@@ -114,10 +139,10 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             j = 0
             while j < i:
-                ar.get_concrete().storage[j] = float(j)
+                ar.get_concrete()._setitem(j, float(j))
                 j += 1
             return ar.descr_add(space, ar).descr_argmin(space)
 
@@ -132,10 +157,10 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             j = 0
             while j < i:
-                ar.get_concrete().storage[j] = 1.0
+                ar.get_concrete()._setitem(j, 1.0)
                 j += 1
             return ar.descr_add(space, ar).descr_all(space)
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
@@ -148,7 +173,7 @@ class TestNumpyJIt(LLJitMixin):
         space = self.space
 
         def f(i):
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
             return ar.descr_add(space, ar).descr_any(space)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
@@ -159,11 +184,11 @@ class TestNumpyJIt(LLJitMixin):
 
     def test_already_forecd(self):
         def f(i):
-            ar = SingleDimArray(i)
-            v1 = Call2(add, ar, FloatWrapper(4.5), Signature())
-            v2 = Call2(mul, v1, FloatWrapper(4.5), Signature())
+            ar = NDimArray([i], float64_dtype)
+            v1 = Call2(add, ar, FloatWrapper(4.5), Signature(), ar.shape, float64_dtype)
+            v2 = Call2(multiply, v1, FloatWrapper(4.5), Signature(), ar.shape, float64_dtype)
             v1.force_if_needed()
-            return v2.get_concrete().storage[3]
+            return v2.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         # This is the sum of the ops for both loops, however if you remove the
@@ -177,10 +202,10 @@ class TestNumpyJIt(LLJitMixin):
     def test_ufunc(self):
         space = self.space
         def f(i):
-            ar = SingleDimArray(i)
-            v1 = Call2(add, ar, ar, Signature())
-            v2 = negative(space, v1)
-            return v2.get_concrete().storage[3]
+            ar = NDimArray([i], float64_dtype)
+            v1 = Call2(add, ar, ar, Signature(), ar.shape, float64_dtype)
+            v2 = negative.call(space, v1)
+            return v2.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({"getarrayitem_raw": 2, "float_add": 1, "float_neg": 1,
@@ -194,15 +219,15 @@ class TestNumpyJIt(LLJitMixin):
         def f(i):
             add_sig = Signature()
             mul_sig = Signature()
-            ar = SingleDimArray(i)
+            ar = NDimArray([i], float64_dtype)
 
-            v1 = Call2(add, ar, ar, ar.signature.transition(add_sig))
-            v2 = negative(space, v1)
+            v1 = Call2(add, ar, ar, ar.signature.transition(add_sig), ar.shape, float64_dtype)
+            v2 = negative.call(space, v1)
             v2.get_concrete()
 
             for i in xrange(5):
-                v1 = Call2(mul, ar, ar, ar.signature.transition(mul_sig))
-                v2 = negative(space, v1)
+                v1 = Call2(multiply, ar, ar, ar.signature.transition(mul_sig), ar.shape, float64_dtype)
+                v2 = negative.call(space, v1)
                 v2.get_concrete()
 
         self.meta_interp(f, [5], listops=True, backendopt=True)
@@ -212,10 +237,10 @@ class TestNumpyJIt(LLJitMixin):
     def test_slice(self):
         def f(i):
             step = 3
-            ar = SingleDimArray(step*i)
-            s = SingleDimSlice(0, step*i, step, i, ar, ar.signature.transition(SingleDimSlice.static_signature))
-            v = Call2(add, s, s, Signature())
-            return v.get_concrete().storage[3]
+            ar = NDimArray([step*i], float64_dtype)
+            s = SingleDimSlice(ar, ar.signature.transition(SingleDimSlice.static_signature), 0, step, i)
+            v = Call2(add, s, s, Signature(), s.shape, float64_dtype)
+            return v.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({'int_mul': 1, 'getarrayitem_raw': 2, 'float_add': 1,
@@ -227,11 +252,11 @@ class TestNumpyJIt(LLJitMixin):
         def f(i):
             step1 = 2
             step2 = 3
-            ar = SingleDimArray(step2*i)
-            s1 = SingleDimSlice(0, step1*i, step1, i, ar, ar.signature.transition(SingleDimSlice.static_signature))
-            s2 = SingleDimSlice(0, step2*i, step2, i, ar, ar.signature.transition(SingleDimSlice.static_signature))
-            v = Call2(add, s1, s2, Signature())
-            return v.get_concrete().storage[3]
+            ar = NDimArray([step2*i], float64_dtype)
+            s1 = SingleDimSlice(ar, ar.signature.transition(SingleDimSlice.static_signature), 0, step1, i)
+            s2 = SingleDimSlice(ar, ar.signature.transition(SingleDimSlice.static_signature), 0, step2, i)
+            v = Call2(add, s1, s2, Signature(), s1.shape, float64_dtype)
+            return v.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({'int_mul': 2, 'getarrayitem_raw': 2, 'float_add': 1,
@@ -244,15 +269,15 @@ class TestNumpyJIt(LLJitMixin):
 
         def f(i):
             step = NonConstant(3)
-            ar = SingleDimArray(step*i)
-            ar2 = SingleDimArray(i)
-            ar2.storage[1] = 5.5
+            ar = NDimArray([step*i], float64_dtype)
+            ar2 = NDimArray([i], float64_dtype)
+            ar2._setitem(1, 5.5)
             if NonConstant(False):
                 arg = ar2
             else:
                 arg = ar2.descr_add(space, ar2)
-            ar.setslice(space, 0, step*i, step, i, arg)
-            return ar.get_concrete().storage[3]
+            ar.setslice(space, 0, [step], [i], arg)
+            return ar.get_concrete().eval(3)
 
         result = self.meta_interp(f, [5], listops=True, backendopt=True)
         self.check_loops({'getarrayitem_raw': 2,
@@ -261,14 +286,63 @@ class TestNumpyJIt(LLJitMixin):
                           'int_lt': 1, 'guard_true': 1, 'jump': 1})
         assert result == 11.0
 
+    def test_multidim(self):
+        space = self.space
+
+        def f(i):
+            ar = NDimArray([i, 3], float64_dtype)
+            v = ar.descr_add(space, ar.descr_mul(space, ar))
+            return v.get_concrete().eval(3)
+
+        result = self.meta_interp(f, [5], listops=True, backendopt=True)
+        # a single loop over all the items, as for one dimension
+        self.check_loops({"getarrayitem_raw": 3, "float_add": 1,
+                          "float_mul": 1, "setarrayitem_raw": 1,
+                          "int_add": 1, "int_lt": 1, "guard_true": 1,
+                          "jump": 1})
+        assert result == f(5)
+
+    def test_int32(self):
+        space = self.space
+
+        def f(i):
+            ar = NDimArray([i], int32_dtype)
+            v = ar.descr_add(space, ar)
+            return v.get_concrete().eval(3)
+
+        result = self.meta_interp(f, [5], listops=True, backendopt=True)
+        # the addition is done on machine integers, without going
+        # through floats; the sum is truncated to 32 bits
+        self.check_loops({"getarrayitem_raw": 2, "int_add": 4,
+                          "int_and": 2, "int_sub": 1,
+                          "setarrayitem_raw": 1, "int_lt": 1,
+                          "guard_true": 1, "jump": 1})
+        assert result == f(5)
+
+    def test_reduce_axis(self):
+        space = self.space
+
+        def f(i):
+            ar = NDimArray([i, i], float64_dtype)
+            v = ar.descr_add(space, ar)
+            r = Reduce(add, v, Signature(), [i], float64_dtype, float64_dtype,
+                       i, i, 0.0)
+            return r.get_concrete().eval(1)
+
+        result = self.meta_interp(f, [5], listops=True, backendopt=True)
+        # the addition is fused in the loop doing the reduction: no
+        # residual calls and no intermediate array
+        self.check_loops(call=0, new_with_vtable=0, everywhere=True)
+        assert result == f(5)
+
 class TestTranslation(object):
     def test_compile(self):
         x = numpy_compile('aa+f*f/a-', 10)
         x = x.compute()
-        assert isinstance(x, SingleDimArray)
+        assert isinstance(x, NDimArray)
         assert x.size == 10
-        assert x.storage[0] == 0
-        assert x.storage[1] == ((1 + 1) * 1.2) / 1.2 - 1
+        assert x.eval(0) == 0
+        assert x.eval(1) == ((1 + 1) * 1.2) / 1.2 - 1
     
     def test_translation(self):
         # we import main to check if the target compiles
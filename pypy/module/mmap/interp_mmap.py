@@ -1,17 +1,28 @@
-from pypy.interpreter.error import OperationError, wrap_oserror
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.error import wrap_oserror
 from pypy.interpreter.baseobjspace import Wrappable
 from pypy.interpreter.typedef import TypeDef
 from pypy.interpreter.gateway import interp2app, unwrap_spec, NoneNotWrapped
+from pypy.interpreter.buffer import Buffer, RWBuffer, RawBufferMixin
 from pypy.rlib import rmmap
 from pypy.rlib.rmmap import RValueError, RTypeError, ROverflowError
 
 
 class W_MMap(Wrappable):
+    exports = 0      # number of raw addresses locked by the buffers
+
     def __init__(self, space, mmap_obj):
         self.space = space
         self.mmap = mmap_obj
 
+    def check_not_exported(self, action):
+        if self.exports > 0:
+            raise operationerrfmt(self.space.w_BufferError,
+                                  "cannot %s mmap: exported pointers exist",
+                                  action)
+
     def close(self):
+        self.check_not_exported("close")
         self.mmap.close()
 
     def read_byte(self):
@@ -114,6 +125,7 @@ class W_MMap(Wrappable):
     def resize(self, newsize):
         self.check_valid()
         self.check_resizeable()
+        self.check_not_exported("resize")
         try:
             self.mmap.resize(newsize)
         except OSError, e:
@@ -189,10 +201,41 @@ class W_MMap(Wrappable):
                 start += step
 
     def descr_buffer(self):
-        # XXX improve to work directly on the low-level address
-        from pypy.interpreter.buffer import StringLikeBuffer
-        space = self.space
-        return space.wrap(StringLikeBuffer(space, space.wrap(self)))
+        if self.mmap.access == rmmap.ACCESS_READ:
+            buf = MMapBuffer(self)
+        else:
+            buf = RWMMapBuffer(self)
+        return self.space.wrap(buf)
+
+
+class MMapBufferMixin(object):
+    """The buffers of mmaps work directly on the mapped memory, which
+    other objects (like numpy arrays) can then share without copying."""
+    _mixin_ = True
+
+    def __init__(self, w_mmap):
+        self.w_mmap = w_mmap
+
+    def getlength(self):
+        return self.w_mmap.mmap.size
+
+    def get_raw_address(self):
+        self.w_mmap.check_valid()
+        return self.w_mmap.mmap.data
+
+    def lock_raw_address(self):
+        self.w_mmap.check_valid()
+        self.w_mmap.exports += 1
+        return self.w_mmap.mmap.data
+
+    def unlock_raw_address(self):
+        self.w_mmap.exports -= 1
+
+class MMapBuffer(MMapBufferMixin, RawBufferMixin, Buffer):
+    pass
+
+class RWMMapBuffer(MMapBufferMixin, RawBufferMixin, RWBuffer):
+    pass
 
 if rmmap._POSIX:
 
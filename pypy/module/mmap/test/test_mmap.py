@@ -8,6 +8,13 @@ class AppTestMMap:
         space = gettestobjspace(usemodules=('mmap',))
         cls.space = space
         cls.w_tmpname = space.wrap(str(udir.join('mmap-')))
+        from pypy.interpreter.gateway import interp2app
+        def lock_buffer(space, w_obj):
+            space.buffer_w(w_obj).lock_raw_address()
+        def unlock_buffer(space, w_obj):
+            space.buffer_w(w_obj).unlock_raw_address()
+        cls.w_lock_buffer = space.wrap(interp2app(lock_buffer))
+        cls.w_unlock_buffer = space.wrap(interp2app(unlock_buffer))
     
     def test_page_size(self):
         import mmap
@@ -541,6 +548,19 @@ class AppTestMMap:
         assert b[3] == "b"
         assert b[:] == "foobar"
 
+    def test_locked_buffer_prevents_close(self):
+        from mmap import mmap
+        f = open(self.tmpname + "y", "w+")
+        f.write("foobar")
+        f.flush()
+        m = mmap(f.fileno(), 6)
+        self.lock_buffer(m)
+        raises(BufferError, m.close)
+        assert m[:] == "foobar"
+        self.unlock_buffer(m)
+        m.close()
+        f.close()
+
     def test_offset(self):
         from mmap import mmap, ALLOCATIONGRANULARITY
         f = open(self.tmpname + "y", "w+")
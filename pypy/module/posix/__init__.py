@@ -1,6 +1,7 @@
 # Package initialisation
 from pypy.interpreter.mixedmodule import MixedModule
 from pypy.rpython.module.ll_os import RegisterOs
+from pypy.rlib import rposix
 
 import os, sys
 exec 'import %s as posix' % os.name
@@ -15,7 +16,8 @@ lltype_only_defs = [
     'getsid', 'getuid', 'kill', 'killpg', 'lchown', 'link', 'lseek', 'major',
     'makedev', 'minor', 'mkfifo', 'mknod', 'nice', 'openpty', 'pathconf', 'pathconf_names',
     'pipe', 'readlink', 'setegid', 'seteuid', 'setgid', 'setgroups', 'setpgid', 'setpgrp',
-    'setregid', 'setreuid', 'setsid', 'setuid', 'stat_float_times', 'statvfs',
+    'sendfile', 'setregid', 'setreuid', 'setsid', 'setuid', 'stat_float_times',
+    'statvfs',
     'statvfs_result', 'symlink', 'sysconf', 'sysconf_names', 'tcgetpgrp', 'tcsetpgrp',
     'ttyname', 'uname', 'wait', 'wait3', 'wait4'
     ]
@@ -106,6 +108,8 @@ corresponding Unix manual entries for more information on calls."""
         interpleveldefs['fdatasync'] = 'interp_posix.fdatasync'
     if hasattr(os, 'fchdir'):
         interpleveldefs['fchdir'] = 'interp_posix.fchdir'
+    if hasattr(rposix, 'sendfile'):
+        interpleveldefs['sendfile'] = 'interp_posix.sendfile'
     if hasattr(os, 'putenv'):
         interpleveldefs['putenv'] = 'interp_posix.putenv'
     if hasattr(posix, 'unsetenv'): # note: emulated in os
@@ -195,6 +195,18 @@ Does not force update of metadata."""
     except OSError, e:
         raise wrap_oserror(space, e)
 
+@unwrap_spec(out_fd=c_int, in_fd=c_int, offset=r_longlong, count='nonnegint')
+def sendfile(space, out_fd, in_fd, offset, count):
+    """Copy count bytes from file descriptor in_fd to file descriptor out_fd,
+starting at offset in in_fd, without copying them through user space.
+The position of in_fd is not changed.  Return the number of bytes sent,
+0 at the end of the file."""
+    try:
+        res = rposix.sendfile(out_fd, in_fd, offset, count)
+    except OSError, e:
+        raise wrap_oserror(space, e)
+    return space.wrap(res)
+
 def fchdir(space, w_fd):
     """Change to the directory of the given file descriptor.  fildes must be
 opened on a directory, not a file."""
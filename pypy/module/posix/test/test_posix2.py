@@ -625,6 +625,27 @@ class AppTestPosix:
             raises(OSError, os.fdatasync, fd)
             raises(ValueError, os.fdatasync, -1)
 
+    if sys.platform.startswith('linux'):
+        def test_sendfile(self):
+            os = self.posix
+            f = open(self.path2, "w+")
+            try:
+                f.write("0123456789")
+                f.flush()
+                fd = f.fileno()
+                r, w = os.pipe()
+                try:
+                    assert os.sendfile(w, fd, 3, 4) == 4
+                    assert os.read(r, 10) == "3456"
+                    assert os.sendfile(w, fd, 10, 4) == 0
+                    assert os.lseek(fd, 0, 1) == 10
+                finally:
+                    os.close(r)
+                    os.close(w)
+                raises(OSError, os.sendfile, w, fd, 0, 1)
+            finally:
+                f.close()
+
     if hasattr(os, 'fchdir'):
         def test_fchdir(self):
             os = self.posix
@@ -195,17 +195,16 @@ def set_param(space, __args__):
             raise OperationError(space.w_ValueError,
                                  space.wrap("error in JIT parameters string"))
     for key, w_value in kwds_w.items():
-        if key == 'enable_opts':
-            pypyjitdriver.set_param('enable_opts', space.str_w(w_value))
+        for name, default in unroll_parameters:
+            if name == key:
+                if isinstance(default, str):
+                    pypyjitdriver.set_param(name, space.str_w(w_value))
+                else:
+                    pypyjitdriver.set_param(name, space.int_w(w_value))
+                break
         else:
-            intval = space.int_w(w_value)
-            for name, _ in unroll_parameters:
-                if name == key and name != 'enable_opts':
-                    pypyjitdriver.set_param(name, intval)
-                    break
-            else:
-                raise operationerrfmt(space.w_TypeError,
-                                      "no JIT parameter '%s'", key)
+            raise operationerrfmt(space.w_TypeError,
+                                  "no JIT parameter '%s'", key)
 
 @dont_look_inside
 def residual_call(space, w_callable, __args__):
@@ -51,5 +51,9 @@ def test_pypy_module():
         assert pypypolicy.look_inside_pypy_module(modname)
         assert pypypolicy.look_inside_pypy_module(modname + '.foo')
 
+def test_struct():
+    from pypy.module.struct.interp_struct import W_Struct
+    assert pypypolicy.look_inside_function(W_Struct.descr_unpack.im_func)
+
 def test_see_jit_module():
     assert pypypolicy.look_inside_pypy_module('pypyjit.interp_jit')
@@ -12,7 +12,8 @@ class Module(MixedModule):
     interpleveldefs = {
         'poll'  : 'interp_select.poll',
         'select': 'interp_select.select',
-        'error' : 'space.fromcache(interp_select.Cache).w_error'
+        'error' : 'space.fromcache(interp_select.Cache).w_error',
+        'reactor': 'interp_reactor.W_Reactor',
     }
 
     # TODO: this doesn't feel right...
@@ -0,0 +1,487 @@
+from __future__ import with_statement
+
+import errno
+import math
+import os
+import select
+import time
+
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.error import wrap_oserror
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.typedef import interp_attrproperty
+from pypy.rlib import rpoll
+from pypy.rlib.rposix import get_errno
+from pypy.rpython.lltypesystem import lltype, rffi
+
+HAVE_EPOLL = hasattr(select, "epoll")
+HAVE_POLL = hasattr(rpoll, "poll")
+
+if HAVE_EPOLL:
+    from pypy.module.select.interp_epoll import (epoll_event, epoll_create,
+        epoll_ctl, epoll_wait, EPOLL_CTL_ADD, EPOLL_CTL_MOD, EPOLL_CTL_DEL)
+
+MAXEVENTS = 1024          # maximum number of events per system call
+MAX_TIMEOUT_MS = 1000000000
+
+
+class Backend(object):
+    """The part of a reactor that waits for the events.  The methods raise
+    OSError.  After wait() returned n, get_fd(i) and get_events(i) give the
+    file descriptor and the events of the n ready file descriptors."""
+
+    name = '?'
+
+    def register(self, fd, events):
+        raise NotImplementedError
+
+    def modify(self, fd, events):
+        raise NotImplementedError
+
+    def unregister(self, fd):
+        raise NotImplementedError
+
+    def wait(self, timeout_ms):
+        raise NotImplementedError
+
+    def get_fd(self, i):
+        raise NotImplementedError
+
+    def get_events(self, i):
+        raise NotImplementedError
+
+    def fileno(self):
+        return -1
+
+    def close(self):
+        pass
+
+
+if HAVE_EPOLL:
+    class EpollBackend(Backend):
+        """Edge-triggered notifications are available by adding EPOLLET to
+        the events.  The events are read into a preallocated raw array."""
+
+        name = 'epoll'
+
+        def __init__(self):
+            self.epfd = epoll_create(MAXEVENTS)
+            if self.epfd < 0:
+                raise OSError(get_errno(), "epoll_create failed")
+            self.evs = lltype.malloc(rffi.CArray(epoll_event), MAXEVENTS,
+                                     flavor='raw')
+
+        def __del__(self):
+            self.close()
+
+        def _ctl(self, ctl, fd, events):
+            with lltype.scoped_alloc(epoll_event) as ev:
+                ev.c_events = rffi.cast(rffi.UINT, events)
+                rffi.setintfield(ev.c_data, 'c_fd', fd)
+                if epoll_ctl(self.epfd, ctl, fd, ev) < 0:
+                    return get_errno()
+            return 0
+
+        def register(self, fd, events):
+            err = self._ctl(EPOLL_CTL_ADD, fd, events)
+            if err:
+                raise OSError(err, "epoll_ctl failed")
+
+        def modify(self, fd, events):
+            err = self._ctl(EPOLL_CTL_MOD, fd, events)
+            if err:
+                raise OSError(err, "epoll_ctl failed")
+
+        def unregister(self, fd):
+            err = self._ctl(EPOLL_CTL_DEL, fd, 0)
+            if err and err != errno.EBADF:    # the fd was already closed
+                raise OSError(err, "epoll_ctl failed")
+
+        def wait(self, timeout_ms):
+            n = epoll_wait(self.epfd, self.evs, MAXEVENTS, timeout_ms)
+            if n < 0:
+                raise OSError(get_errno(), "epoll_wait failed")
+            return n
+
+        def get_fd(self, i):
+            event = self.evs[i]
+            return rffi.getintfield(event.c_data, 'c_fd')
+
+        def get_events(self, i):
+            return rffi.cast(lltype.Signed, self.evs[i].c_events)
+
+        def fileno(self):
+            return self.epfd
+
+        def close(self):
+            if self.epfd >= 0:
+                try:
+                    os.close(self.epfd)
+                except OSError:
+                    pass
+                self.epfd = -1
+                lltype.free(self.evs, flavor='raw')
+
+
+if HAVE_POLL:
+    class PollBackend(Backend):
+        """Portable, level-triggered only."""
+
+        name = 'poll'
+
+        def __init__(self):
+            self.fddict = {}
+            self.ready = []
+
+        def register(self, fd, events):
+            if fd in self.fddict:
+                raise OSError(errno.EEXIST, "fd already registered")
+            self.fddict[fd] = events
+
+        def modify(self, fd, events):
+            if fd not in self.fddict:
+                raise OSError(errno.ENOENT, "fd not registered")
+            self.fddict[fd] = events
+
+        def unregister(self, fd):
+            if fd not in self.fddict:
+                raise OSError(errno.ENOENT, "fd not registered")
+            del self.fddict[fd]
+
+        def wait(self, timeout_ms):
+            try:
+                self.ready = rpoll.poll(self.fddict, timeout_ms)
+            except rpoll.PollError, e:
+                raise OSError(e.errno, "poll failed")
+            return len(self.ready)
+
+        def get_fd(self, i):
+            return self.ready[i][0]
+
+        def get_events(self, i):
+            return self.ready[i][1]
+
+        def close(self):
+            self.fddict.clear()
+            self.ready = []
+
+# ____________________________________________________________
+
+class W_Timer(Wrappable):
+    """A call scheduled by reactor.call_later()."""
+
+    def __init__(self, reactor, when, seq, w_callback, args_w):
+        self.reactor = reactor
+        self.when = when
+        self.seq = seq
+        self.w_callback = w_callback
+        self.args_w = args_w
+        self.active = True
+
+    def lt(self, other):
+        if self.when != other.when:
+            return self.when < other.when
+        return self.seq < other.seq
+
+    def deactivate(self):
+        if self.active:
+            self.active = False
+            self.reactor.active_timers -= 1
+
+    def descr_cancel(self, space):
+        self.deactivate()
+
+W_Timer.typedef = TypeDef("select.reactor_timer",
+    when = interp_attrproperty('when', W_Timer),
+    active = interp_attrproperty('active', W_Timer),
+    cancel = interp2app(W_Timer.descr_cancel),
+)
+W_Timer.typedef.acceptable_as_base_class = False
+
+def heappush(heap, timer):
+    heap.append(timer)
+    pos = len(heap) - 1
+    while pos > 0:
+        parentpos = (pos - 1) >> 1
+        parent = heap[parentpos]
+        if not timer.lt(parent):
+            break
+        heap[pos] = parent
+        pos = parentpos
+    heap[pos] = timer
+
+def heappop(heap):
+    last = heap.pop()
+    if not heap:
+        return last
+    result = heap[0]
+    end = len(heap)
+    pos = 0
+    while True:
+        childpos = 2 * pos + 1
+        if childpos >= end:
+            break
+        if childpos + 1 < end and heap[childpos + 1].lt(heap[childpos]):
+            childpos += 1
+        child = heap[childpos]
+        if not child.lt(last):
+            break
+        heap[pos] = child
+        pos = childpos
+    heap[pos] = last
+    return result
+
+# ____________________________________________________________
+
+class W_Reactor(Wrappable):
+    def __init__(self, space, backend):
+        self.space = space
+        self.backend = backend
+        self.callbacks_w = {}        # {fd: callback}
+        self.timers = []             # heap of W_Timers
+        self.timer_seq = 0
+        self.active_timers = 0
+        # the events of the last wait() that are not dispatched yet
+        self.ready_index = 0
+        self.ready_count = 0
+        self.running = False
+        self.closed = False
+
+    @unwrap_spec(backend='str_or_None')
+    def descr__new__(space, w_subtype, backend=None):
+        if backend is None:
+            if HAVE_EPOLL:
+                backend = 'epoll'
+            else:
+                backend = 'poll'
+        try:
+            if HAVE_EPOLL and backend == 'epoll':
+                b = EpollBackend()
+            elif HAVE_POLL and backend == 'poll':
+                b = PollBackend()
+            else:
+                raise operationerrfmt(space.w_ValueError,
+                    "reactor backend not available: '%s'", backend)
+        except OSError, e:
+            raise wrap_oserror(space, e, exception_name='w_IOError')
+        return space.wrap(W_Reactor(space, b))
+
+    def check_closed(self, space):
+        if self.closed:
+            raise OperationError(space.w_ValueError,
+                space.wrap("I/O operation on closed reactor"))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.running = False
+            self.ready_index = self.ready_count = 0
+            self.backend.close()
+            self.callbacks_w.clear()
+            for timer in self.timers:
+                timer.active = False
+            self.timers = []
+            self.active_timers = 0
+
+    # ____________________________________________________________
+    # the file descriptors
+
+    @unwrap_spec(eventmask=int)
+    def descr_register(self, space, w_fd, eventmask, w_callback):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        try:
+            self.backend.register(fd, eventmask)
+        except OSError, e:
+            raise wrap_oserror(space, e, exception_name='w_IOError')
+        self.callbacks_w[fd] = w_callback
+
+    @unwrap_spec(eventmask=int)
+    def descr_modify(self, space, w_fd, eventmask, w_callback=None):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        try:
+            self.backend.modify(fd, eventmask)
+        except OSError, e:
+            raise wrap_oserror(space, e, exception_name='w_IOError')
+        if not space.is_w(w_callback, space.w_None):
+            self.callbacks_w[fd] = w_callback
+
+    def descr_unregister(self, space, w_fd):
+        self.check_closed(space)
+        fd = space.c_filedescriptor_w(w_fd)
+        try:
+            self.backend.unregister(fd)
+        except OSError, e:
+            raise wrap_oserror(space, e, exception_name='w_IOError')
+        if fd in self.callbacks_w:
+            del self.callbacks_w[fd]
+
+    # ____________________________________________________________
+    # the timers
+
+    @unwrap_spec(delay=float)
+    def descr_call_later(self, space, delay, w_callback, args_w):
+        self.check_closed(space)
+        # a copy, because newtuple() needs a list that is never resized
+        n = len(args_w)
+        callargs_w = [None] * n
+        for i in range(n):
+            callargs_w[i] = args_w[i]
+        timer = W_Timer(self, time.time() + delay, self.timer_seq,
+                        w_callback, callargs_w)
+        self.timer_seq += 1
+        heappush(self.timers, timer)
+        self.active_timers += 1
+        return space.wrap(timer)
+
+    def discard_cancelled_timers(self):
+        while self.timers and not self.timers[0].active:
+            heappop(self.timers)
+
+    def run_timers(self):
+        space = self.space
+        count = 0
+        now = time.time()
+        # the timers added by the callbacks wait for the next round
+        last_seq = self.timer_seq
+        while self.timers:
+            timer = self.timers[0]
+            if timer.active and (timer.when > now or timer.seq >= last_seq):
+                break
+            heappop(self.timers)
+            if timer.active:
+                timer.deactivate()
+                space.call(timer.w_callback, space.newtuple(timer.args_w))
+                count += 1
+        return count
+
+    # ____________________________________________________________
+    # the loop
+
+    def wait(self, timeout):
+        self.discard_cancelled_timers()
+        if self.timers:
+            delay = self.timers[0].when - time.time()
+            if delay < 0.0:
+                delay = 0.0
+            if timeout < 0.0 or delay < timeout:
+                timeout = delay
+        elif not self.callbacks_w and timeout < 0.0:
+            return      # nothing could ever happen
+        if timeout < 0.0:
+            timeout_ms = -1
+        elif timeout * 1000.0 >= MAX_TIMEOUT_MS:
+            timeout_ms = MAX_TIMEOUT_MS
+        else:
+            # round up, not to wake up just before the next timer is due
+            timeout_ms = int(math.ceil(timeout * 1000.0))
+        self.ready_index = 0
+        self.ready_count = 0
+        try:
+            n = self.backend.wait(timeout_ms)
+        except OSError, e:
+            if e.errno != errno.EINTR:
+                raise wrap_oserror(self.space, e, exception_name='w_IOError')
+            # run the signal handlers now; they may raise
+            self.space.getexecutioncontext().checksignals()
+            return
+        self.ready_count = n
+
+    def dispatch_events(self):
+        # the callbacks are called directly from the backend's buffer; the
+        # fields are re-read at each iteration, in case a callback calls
+        # run_once() or close()
+        space = self.space
+        count = 0
+        while self.ready_index < self.ready_count:
+            i = self.ready_index
+            self.ready_index = i + 1
+            fd = self.backend.get_fd(i)
+            w_callback = self.callbacks_w.get(fd, None)
+            if w_callback is None:
+                continue      # unregistered by a previous callback
+            events = self.backend.get_events(i)
+            space.call_function(w_callback, space.wrap(fd),
+                                space.wrap(events))
+            count += 1
+        return count
+
+    def run_once(self, timeout):
+        if self.ready_index >= self.ready_count:
+            self.wait(timeout)
+        count = self.dispatch_events()
+        if not self.closed:
+            count += self.run_timers()
+        return count
+
+    @unwrap_spec(timeout=float)
+    def descr_run_once(self, space, timeout=-1.0):
+        """run_once(timeout=-1) -> number of callbacks called
+
+Wait until a registered file descriptor is ready, a timer is due, or the
+timeout (in seconds) expires, then call the callbacks.  If a callback
+raises, the events that are not dispatched yet are kept for the next
+call."""
+        self.check_closed(space)
+        return space.wrap(self.run_once(timeout))
+
+    def descr_run(self, space):
+        """run()
+
+Call run_once() until stop() or close() is called, or until there is no
+registered file descriptor and no pending timer left."""
+        self.check_closed(space)
+        self.running = True
+        try:
+            while (self.running and
+                   (self.callbacks_w or self.active_timers > 0 or
+                    self.ready_index < self.ready_count)):
+                self.run_once(-1.0)
+        finally:
+            self.running = False
+
+    def descr_stop(self, space):
+        self.running = False
+
+    def descr_fileno(self, space):
+        self.check_closed(space)
+        fd = self.backend.fileno()
+        if fd < 0:
+            raise operationerrfmt(space.w_ValueError,
+                "the '%s' backend has no file descriptor", self.backend.name)
+        return space.wrap(fd)
+
+    def descr_close(self, space):
+        self.close()
+
+    def descr_get_closed(self, space):
+        return space.wrap(self.closed)
+
+    def descr_get_backend(self, space):
+        return space.wrap(self.backend.name)
+
+
+W_Reactor.typedef = TypeDef("select.reactor",
+    __doc__ = """reactor(backend=None)
+
+An event loop: calls callback(fd, events) when a registered file descriptor
+is ready, and the callbacks given to call_later() when they are due.  The
+backend is 'epoll' (the default, where available) or 'poll'.""",
+    __new__ = interp2app(W_Reactor.descr__new__.im_func),
+    register = interp2app(W_Reactor.descr_register),
+    modify = interp2app(W_Reactor.descr_modify),
+    unregister = interp2app(W_Reactor.descr_unregister),
+    call_later = interp2app(W_Reactor.descr_call_later),
+    run_once = interp2app(W_Reactor.descr_run_once),
+    run = interp2app(W_Reactor.descr_run),
+    stop = interp2app(W_Reactor.descr_stop),
+    fileno = interp2app(W_Reactor.descr_fileno),
+    close = interp2app(W_Reactor.descr_close),
+    closed = GetSetProperty(W_Reactor.descr_get_closed),
+    running = interp_attrproperty('running', W_Reactor),
+    backend = GetSetProperty(W_Reactor.descr_get_backend),
+)
+W_Reactor.typedef.acceptable_as_base_class = False
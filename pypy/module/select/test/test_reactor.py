@@ -0,0 +1,184 @@
+import py
+
+from pypy.conftest import gettestobjspace
+
+
+class AppTestReactor(object):
+    def setup_class(cls):
+        cls.space = gettestobjspace(usemodules=["select", "posix"])
+        import select
+        backends = []
+        if hasattr(select, "epoll"):
+            backends.append("epoll")
+        if hasattr(select, "poll"):
+            backends.append("poll")
+        if not backends:
+            py.test.skip("no epoll or poll")
+        cls.w_backends = cls.space.wrap(backends)
+
+    def test_create(self):
+        import select
+        for backend in self.backends:
+            r = select.reactor(backend)
+            assert r.backend == backend
+            assert not r.closed
+            r.close()
+            assert r.closed
+            raises(ValueError, r.run_once, 0)
+            raises(ValueError, r.register, 0, select.POLLIN, None)
+            r.close()
+        r = select.reactor()
+        assert r.backend == self.backends[0]
+        r.close()
+        raises(ValueError, select.reactor, "foo")
+
+    def test_fd_callbacks(self):
+        import select, os
+        for backend in self.backends:
+            r = select.reactor(backend)
+            rd, wr = os.pipe()
+            try:
+                got = []
+                def callback(fd, events):
+                    got.append((fd, events))
+                    os.read(fd, 1)
+                r.register(rd, select.POLLIN, callback)
+                raises(IOError, r.register, rd, select.POLLIN, callback)
+                assert r.run_once(0) == 0
+                assert got == []
+                os.write(wr, "ab")
+                assert r.run_once(1.0) == 1
+                assert got == [(rd, select.POLLIN)]
+                got2 = []
+                r.modify(rd, select.POLLIN, lambda fd, ev: got2.append(fd))
+                assert r.run_once(1.0) == 1
+                assert got2 == [rd]
+                assert len(got) == 1
+                r.unregister(rd)
+                raises(IOError, r.unregister, rd)
+                raises(IOError, r.modify, rd, select.POLLIN)
+                os.write(wr, "c")
+                assert r.run_once(0) == 0
+            finally:
+                r.close()
+                os.close(rd)
+                os.close(wr)
+
+    def test_timers(self):
+        import select, time
+        for backend in self.backends:
+            r = select.reactor(backend)
+            got = []
+            r.call_later(0.05, got.append, 2)
+            r.call_later(0.01, got.append, 1)
+            t = r.call_later(0.02, got.append, 'cancelled')
+            assert t.active
+            t.cancel()
+            assert not t.active
+            def add_timer():
+                got.append(3)
+                r.call_later(0, got.append, 4)
+            r.call_later(0.06, add_timer)
+            start = time.time()
+            r.run()
+            assert time.time() - start >= 0.05
+            assert got == [1, 2, 3, 4]
+            assert r.run_once() == 0
+            r.close()
+
+    def test_stop(self):
+        import select, os
+        for backend in self.backends:
+            r = select.reactor(backend)
+            rd, wr = os.pipe()
+            try:
+                count = []
+                def callback(fd, events):
+                    count.append(fd)
+                    if len(count) == 3:
+                        r.stop()
+                r.register(wr, select.POLLOUT, callback)
+                r.run()
+                assert len(count) == 3
+                assert not r.running
+            finally:
+                r.close()
+                os.close(rd)
+                os.close(wr)
+
+    def test_callback_raises(self):
+        import select, os
+        for backend in self.backends:
+            r = select.reactor(backend)
+            rd1, wr1 = os.pipe()
+            rd2, wr2 = os.pipe()
+            try:
+                got = []
+                def callback(fd, events):
+                    got.append(fd)
+                    if len(got) == 1:
+                        raise KeyError(fd)
+                r.register(wr1, select.POLLOUT, callback)
+                r.register(wr2, select.POLLOUT, callback)
+                raises(KeyError, r.run_once, 1.0)
+                # the other event is still pending, and dispatched first
+                assert r.run_once(1.0) == 1
+                assert sorted(got) == sorted([wr1, wr2])
+            finally:
+                r.close()
+                for fd in (rd1, wr1, rd2, wr2):
+                    os.close(fd)
+
+    def test_epoll_edge_triggered(self):
+        import select, os
+        if "epoll" not in self.backends:
+            skip("no epoll")
+        r = select.reactor("epoll")
+        rd, wr = os.pipe()
+        try:
+            assert isinstance(r.fileno(), int)
+            got = []
+            r.register(rd, select.EPOLLIN | select.EPOLLET,
+                       lambda fd, events: got.append(events))
+            os.write(wr, "xyz")
+            assert r.run_once(1.0) == 1
+            # nothing was read, but the edge is not reported again
+            assert r.run_once(0) == 0
+            assert got == [select.EPOLLIN]
+        finally:
+            r.close()
+            os.close(rd)
+            os.close(wr)
+
+
+class AppTestReactorSignals(object):
+    def setup_class(cls):
+        cls.space = gettestobjspace(usemodules=["select", "signal", "posix"])
+        import select
+        if not hasattr(select, "poll"):
+            py.test.skip("no poll")
+
+    def test_alarm_raise(self):
+        try:
+            from signal import alarm, signal, SIG_DFL, SIGALRM
+        except ImportError:
+            skip("no SIGALRM on this platform")
+        import select, os
+        class Alarm(Exception):
+            pass
+        def handler(*a):
+            raise Alarm()
+
+        r = select.reactor()
+        rd, wr = os.pipe()
+        try:
+            r.register(rd, select.POLLIN, lambda fd, events: None)
+            signal(SIGALRM, handler)
+            alarm(1)
+            raises(Alarm, r.run_once, 5.0)
+        finally:
+            alarm(0)
+            signal(SIGALRM, SIG_DFL)
+            r.close()
+            os.close(rd)
+            os.close(wr)
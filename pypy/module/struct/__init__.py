@@ -49,11 +49,12 @@ The variable struct.error is an exception raised on errors."""
         'calcsize': 'interp_struct.calcsize',
         'pack': 'interp_struct.pack',
         'unpack': 'interp_struct.unpack',
+        'pack_into': 'interp_struct.pack_into',
+        'unpack_from': 'interp_struct.unpack_from',
+        'iter_unpack': 'interp_struct.iter_unpack',
+        'Struct': 'interp_struct.W_Struct',
         }
 
     appleveldefs = {
         'error': 'app_struct.error',
-        'pack_into': 'app_struct.pack_into',
-        'unpack_from': 'app_struct.unpack_from',
-        'Struct': 'app_struct.Struct',
         }
@@ -123,11 +123,15 @@ class PackFormatIterator(FormatIterator):
 
 
 class UnpackFormatIterator(FormatIterator):
+    """Unpacks the bytes between 'start' and 'stop' of an interp-level
+    Buffer.  Only the bytes of each field are copied out of the buffer."""
 
-    def __init__(self, space, input):
+    def __init__(self, space, buf, start, stop):
         self.space = space
-        self.input = input
-        self.inputpos = 0
+        self.buf = buf
+        self.inputstart = start
+        self.inputpos = start
+        self.inputstop = stop
         self.result_w = []     # list of wrapped objects
 
     def operate(self, fmtdesc, repetitions):
@@ -140,17 +144,20 @@ class UnpackFormatIterator(FormatIterator):
     _operate_is_specialized_ = True
 
     def align(self, mask):
-        self.inputpos = (self.inputpos + mask) & ~mask
+        # the alignment is relative to the start of the data
+        pos = self.inputpos - self.inputstart
+        self.inputpos = self.inputstart + ((pos + mask) & ~mask)
 
     def finished(self):
-        if self.inputpos != len(self.input):
+        if self.inputpos != self.inputstop:
             raise StructError("unpack str size too long for format")
 
     def read(self, count):
-        end = self.inputpos + count
-        if end > len(self.input):
+        start = self.inputpos
+        end = start + count
+        if end > self.inputstop:
             raise StructError("unpack str size too short for format")
-        s = self.input[self.inputpos : end]
+        s = self.buf.getslice(start, end, 1, count)
         self.inputpos = end
         return s
 
@@ -1,34 +1,214 @@
-from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.baseobjspace import Wrappable
+from pypy.interpreter.buffer import StringBuffer
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef, GetSetProperty
+from pypy.interpreter.typedef import interp_attrproperty
 from pypy.module.struct.formatiterator import PackFormatIterator, UnpackFormatIterator
+from pypy.rlib import jit
 from pypy.rlib.rstruct.error import StructError
-from pypy.rlib.rstruct.formatiterator import CalcSizeFormatIterator
+from pypy.rlib.rstruct.formatiterator import compile_format
 
-@unwrap_spec(format=str)
-def calcsize(space, format):
-    fmtiter = CalcSizeFormatIterator()
+
+# Parsed format strings, so that the module-level functions don't parse
+# the same format again at every call.  Like CPython, we simply forget
+# everything when there are too many of them.
+MAXCACHE = 100
+
+class Cache:
+    def __init__(self, space):
+        self.formats = {}
+
+@jit.elidable
+def get_compiled_format(space, format):
+    cache = space.fromcache(Cache)
+    try:
+        return cache.formats[format]
+    except KeyError:
+        pass
     try:
-        fmtiter.interpret(format)
+        compiled = compile_format(format)
     except StructError, e:
         raise e.at_applevel(space)
-    return space.wrap(fmtiter.totalsize)
+    if len(cache.formats) >= MAXCACHE:
+        cache.formats.clear()
+    cache.formats[format] = compiled
+    return compiled
 
+def struct_error(space, msg):
+    return StructError(msg).at_applevel(space)
 
-@unwrap_spec(format=str)
-def pack(space, format, args_w):
+
+def _pack(space, compiled, args_w):
     fmtiter = PackFormatIterator(space, args_w)
     try:
-        fmtiter.interpret(format)
+        fmtiter.interpret_compiled(compiled)
     except StructError, e:
         raise e.at_applevel(space)
-    result = ''.join(fmtiter.result)
-    return space.wrap(result)
+    return fmtiter.result
 
-
-@unwrap_spec(format=str, input='bufferstr')
-def unpack(space, format, input):
-    fmtiter = UnpackFormatIterator(space, input)
+def _unpack(space, compiled, buf, start, stop):
+    fmtiter = UnpackFormatIterator(space, buf, start, stop)
     try:
-        fmtiter.interpret(format)
+        fmtiter.interpret_compiled(compiled)
     except StructError, e:
         raise e.at_applevel(space)
     return space.newtuple(fmtiter.result_w[:])
+
+def _pack_into(space, compiled, w_buffer, offset, args_w):
+    buf = space.rwbuffer_w(w_buffer)
+    buflen = buf.getlength()
+    if offset < 0:
+        offset += buflen
+    if offset < 0 or buflen - offset < compiled.size:
+        raise struct_error(space, "pack_into requires a buffer of at least "
+                                  "%d bytes" % (compiled.size,))
+    # write the characters directly into the buffer
+    result = _pack(space, compiled, args_w)
+    for i in range(len(result)):
+        buf.setitem(offset + i, result[i])
+
+def _unpack_from(space, compiled, w_buffer, offset):
+    buf = space.buffer_w(w_buffer)
+    buflen = buf.getlength()
+    if offset < 0:
+        offset += buflen
+    if offset < 0 or buflen - offset < compiled.size:
+        raise struct_error(space, "unpack_from requires a buffer of at "
+                                  "least %d bytes" % (compiled.size,))
+    return _unpack(space, compiled, buf, offset, offset + compiled.size)
+
+def _iter_unpack(space, compiled, w_buffer):
+    buf = space.buffer_w(w_buffer)
+    size = compiled.size
+    if size == 0:
+        raise struct_error(space, "cannot iteratively unpack with a struct "
+                                  "of length 0")
+    if buf.getlength() % size != 0:
+        raise struct_error(space, "iterative unpacking requires a buffer "
+                                  "of a multiple of %d bytes" % (size,))
+    return space.wrap(W_UnpackIter(compiled, buf))
+
+
+@unwrap_spec(format=str)
+def calcsize(space, format):
+    return space.wrap(get_compiled_format(space, format).size)
+
+
+@unwrap_spec(format=str)
+def pack(space, format, args_w):
+    result = _pack(space, get_compiled_format(space, format), args_w)
+    return space.wrap(''.join(result))
+
+
+@unwrap_spec(format=str, input='bufferstr')
+def unpack(space, format, input):
+    return _unpack(space, get_compiled_format(space, format),
+                   StringBuffer(input), 0, len(input))
+
+
+@unwrap_spec(format=str, offset=int)
+def pack_into(space, format, w_buffer, offset, args_w):
+    _pack_into(space, get_compiled_format(space, format), w_buffer, offset,
+               args_w)
+
+
+@unwrap_spec(format=str, offset=int)
+def unpack_from(space, format, w_buffer, offset=0):
+    return _unpack_from(space, get_compiled_format(space, format), w_buffer,
+                        offset)
+
+
+@unwrap_spec(format=str)
+def iter_unpack(space, format, w_buffer):
+    return _iter_unpack(space, get_compiled_format(space, format), w_buffer)
+
+# ____________________________________________________________
+
+class W_Struct(Wrappable):
+    """A compiled format: the format string is parsed only once, when
+    the Struct is created."""
+    _immutable_fields_ = ['format', 'compiled']
+
+    def __init__(self, space, format):
+        self.format = format
+        self.compiled = get_compiled_format(space, format)
+
+    def descr_get_size(self, space):
+        return space.wrap(self.compiled.size)
+
+    def descr_pack(self, space, args_w):
+        compiled = jit.promote(self.compiled)
+        return space.wrap(''.join(_pack(space, compiled, args_w)))
+
+    @unwrap_spec(input='bufferstr')
+    def descr_unpack(self, space, input):
+        compiled = jit.promote(self.compiled)
+        return _unpack(space, compiled, StringBuffer(input), 0, len(input))
+
+    @unwrap_spec(offset=int)
+    def descr_pack_into(self, space, w_buffer, offset, args_w):
+        compiled = jit.promote(self.compiled)
+        _pack_into(space, compiled, w_buffer, offset, args_w)
+
+    @unwrap_spec(offset=int)
+    def descr_unpack_from(self, space, w_buffer, offset=0):
+        compiled = jit.promote(self.compiled)
+        return _unpack_from(space, compiled, w_buffer, offset)
+
+    def descr_iter_unpack(self, space, w_buffer):
+        return _iter_unpack(space, self.compiled, w_buffer)
+
+@unwrap_spec(format=str)
+def descr_new_struct(space, w_subtype, format):
+    w_struct = space.allocate_instance(W_Struct, w_subtype)
+    W_Struct.__init__(space.interp_w(W_Struct, w_struct), space, format)
+    return w_struct
+
+W_Struct.typedef = TypeDef("Struct",
+    __doc__ = """Struct(fmt) --> compiled struct object
+
+Return a new Struct object which writes and reads binary data according to
+the format string fmt.  See help(struct) for more on format strings.""",
+    __module__ = "struct",
+    __new__ = interp2app(descr_new_struct),
+    format = interp_attrproperty("format", cls=W_Struct),
+    size = GetSetProperty(W_Struct.descr_get_size, cls=W_Struct),
+    pack = interp2app(W_Struct.descr_pack),
+    unpack = interp2app(W_Struct.descr_unpack),
+    pack_into = interp2app(W_Struct.descr_pack_into),
+    unpack_from = interp2app(W_Struct.descr_unpack_from),
+    iter_unpack = interp2app(W_Struct.descr_iter_unpack),
+)
+
+
+class W_UnpackIter(Wrappable):
+    """The iterator returned by iter_unpack()."""
+
+    def __init__(self, compiled, buf):
+        self.compiled = compiled
+        self.buf = buf
+        self.index = 0
+
+    def descr_iter(self, space):
+        return space.wrap(self)
+
+    def descr_next(self, space):
+        compiled = jit.promote(self.compiled)
+        start = self.index
+        if start >= self.buf.getlength():
+            raise OperationError(space.w_StopIteration, space.w_None)
+        self.index = start + compiled.size
+        return _unpack(space, compiled, self.buf, start, self.index)
+
+    def descr_length_hint(self, space):
+        remaining = self.buf.getlength() - self.index
+        return space.wrap(remaining // self.compiled.size)
+
+W_UnpackIter.typedef = TypeDef("unpack_iterator",
+    __module__ = "struct",
+    __iter__ = interp2app(W_UnpackIter.descr_iter),
+    next = interp2app(W_UnpackIter.descr_next),
+    __length_hint__ = interp2app(W_UnpackIter.descr_length_hint),
+)
+W_UnpackIter.typedef.acceptable_as_base_class = False
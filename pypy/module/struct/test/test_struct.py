@@ -417,3 +417,59 @@ class AppTestStructBuffer(object):
         assert self.struct.unpack_from("ii", b, 2) == (17, 42)
         b[:sz] = self.struct.pack("ii", 18, 43)
         assert self.struct.unpack_from("ii", b) == (18, 43)
+
+    def test_pack_into_errors(self):
+        b = self.bytebuffer(10)
+        self.struct.pack_into("ii", b, -8, 17, 42)
+        assert self.struct.unpack_from("ii", b, 2) == (17, 42)
+        raises(self.struct.error, self.struct.pack_into, "ii", b, 3, 1, 2)
+        raises(self.struct.error, self.struct.pack_into, "ii", b, -11, 1, 2)
+        raises(TypeError, self.struct.pack_into, "ii", "read-only", 0, 1, 2)
+
+    def test_unpack_from_errors(self):
+        data = self.struct.pack("ii", 17, 42)
+        assert self.struct.unpack_from("i", data, -4) == (42,)
+        raises(self.struct.error, self.struct.unpack_from, "ii", data, 1)
+        raises(self.struct.error, self.struct.unpack_from, "i", data, -9)
+
+    def test_unpack_from_alignment(self):
+        # the native alignment is relative to the offset, not to the
+        # start of the buffer
+        data = 'X' + self.struct.pack("bi", 5, 12345)
+        assert self.struct.unpack_from("bi", data, 1) == (5, 12345)
+
+    def test_iter_unpack(self):
+        data = self.struct.pack("<hh", 1, 2) + self.struct.pack("<hh", 3, 4)
+        it = self.struct.iter_unpack("<hh", data)
+        assert iter(it) is it
+        assert it.__length_hint__() == 2
+        assert list(it) == [(1, 2), (3, 4)]
+        assert list(it) == []
+        b = self.bytebuffer(4)
+        b[:] = self.struct.pack("<hh", 5, 6)
+        assert list(self.struct.iter_unpack("<hh", b)) == [(5, 6)]
+        raises(self.struct.error, self.struct.iter_unpack, "<hh", data[1:])
+        raises(self.struct.error, self.struct.iter_unpack, "", data)
+
+    def test_struct_object(self):
+        s = self.struct.Struct("<iH")
+        assert s.format == "<iH"
+        assert s.size == 6
+        data = s.pack(-5, 7)
+        assert data == self.struct.pack("<iH", -5, 7)
+        assert s.unpack(data) == (-5, 7)
+        assert s.unpack(buffer(data)) == (-5, 7)
+        raises(self.struct.error, s.unpack, data + 'x')
+        b = self.bytebuffer(8)
+        s.pack_into(b, 2, 3, 4)
+        assert s.unpack_from(b, 2) == (3, 4)
+        assert s.unpack_from(b[:]) == (3 << 16, 0)
+        assert list(s.iter_unpack(data * 3)) == [(-5, 7)] * 3
+        raises(self.struct.error, self.struct.Struct, "z")
+
+    def test_struct_subclass(self):
+        class S(self.struct.Struct):
+            pass
+        s = S("2h")
+        assert s.size == 4
+        assert s.unpack(s.pack(1, 2)) == (1, 2)
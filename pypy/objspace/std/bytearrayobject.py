@@ -655,6 +655,9 @@ def _strip(space, w_bytearray, u_chars, left, right):
 # Buffer interface
 
 class BytearrayBuffer(RWBuffer):
+    # the items of a bytearray are in a resizable GC list, not in raw
+    # memory, so get_raw_address() is not supported and other objects
+    # must copy them
     def __init__(self, data):
         self.data = data
 
@@ -664,9 +667,21 @@ class BytearrayBuffer(RWBuffer):
     def getitem(self, index):
         return self.data[index]
 
+    def getslice(self, start, stop, step, size):
+        if size == 0:
+            return ""
+        if step == 1:
+            assert 0 <= start <= stop
+            return "".join(self.data[start:stop])
+        return "".join([self.data[start + i*step] for i in xrange(size)])
+
     def setitem(self, index, char):
         self.data[index] = char
 
+    def setslice(self, start, string):
+        for i in range(len(string)):
+            self.data[start + i] = string[i]
+
 def buffer__Bytearray(space, self):
     b = BytearrayBuffer(self.data)
     return space.wrap(b)
@@ -1,36 +1,647 @@
+import sys
 from pypy.objspace.std.model import registerimplementation, W_Object
 from pypy.objspace.std.register_all import register_all
 from pypy.objspace.std.multimethod import FailedToImplement
 from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.objspace.std.inttype import wrapint
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.floatobject import W_FloatObject
 from pypy.objspace.std.listtype import get_list_index
 from pypy.objspace.std.sliceobject import W_SliceObject, normalize_simple_slice
 
 from pypy.objspace.std import slicetype
 from pypy.interpreter import gateway, baseobjspace
-from pypy.rlib.listsort import TimSort
+from pypy.rlib.objectmodel import instantiate
+from pypy.rlib.listsort import make_timsort_class
+from pypy.rlib.rfloat import isnan
+from pypy.rlib.debug import make_sure_not_resized
+from pypy.rlib import rerased
 from pypy.interpreter.argument import Signature
 
+def get_strategy_from_list_objects(space, list_w):
+    if not list_w:
+        return space.fromcache(EmptyListStrategy)
+
+    # check for ints
+    for w_obj in list_w:
+        if not is_W_IntObject(w_obj):
+            break
+    else:
+        return space.fromcache(IntegerListStrategy)
+
+    # check for strings
+    for w_obj in list_w:
+        if not is_W_StringObject(space, w_obj):
+            break
+    else:
+        return space.fromcache(StringListStrategy)
+
+    # check for floats
+    for w_obj in list_w:
+        if not is_W_FloatObject(w_obj):
+            break
+    else:
+        return space.fromcache(FloatListStrategy)
+
+    return space.fromcache(ObjectListStrategy)
+
+def is_W_IntObject(w_object):
+    return type(w_object) is W_IntObject
+
+def is_W_StringObject(space, w_object):
+    return type(w_object) is space.StringObjectCls
+
+def is_W_FloatObject(w_object):
+    # NaNs are kept boxed: they are only equal to themselves by identity,
+    # which an unboxed storage cannot preserve
+    return type(w_object) is W_FloatObject and not isnan(w_object.floatval)
+
+
 class W_ListObject(W_Object):
     from pypy.objspace.std.listtype import list_typedef as typedef
 
-    def __init__(w_self, wrappeditems):
-        w_self.wrappeditems = wrappeditems
+    def __init__(w_self, space, wrappeditems):
+        assert isinstance(wrappeditems, list)
+        w_self.space = space
+        w_self.init_from_list_w(wrappeditems)
+
+    @staticmethod
+    def from_storage_and_strategy(space, storage, strategy):
+        w_self = instantiate(W_ListObject)
+        w_self.space = space
+        w_self.strategy = strategy
+        w_self.lstorage = storage
+        return w_self
 
     def __repr__(w_self):
         """ representation for debugging purposes """
-        return "%s(%s)" % (w_self.__class__.__name__, w_self.wrappeditems)
+        return "%s(%s, %s)" % (w_self.__class__.__name__, w_self.strategy,
+                               w_self.getitems())
 
     def unwrap(w_list, space):
-        items = [space.unwrap(w_item) for w_item in w_list.wrappeditems]# XXX generic mixed types unwrap
+        # XXX generic mixed types unwrap
+        items = [space.unwrap(w_item) for w_item in w_list.getitems()]
         return list(items)
 
-    def append(w_list, w_item):
-        w_list.wrappeditems.append(w_item)
+    def init_from_list_w(w_self, list_w):
+        """Replace the content of the list with the wrapped items in
+        'list_w', picking the most specialized strategy able to hold them.
+        """
+        w_self.strategy = get_strategy_from_list_objects(w_self.space, list_w)
+        w_self.strategy.init_from_list_w(w_self, list_w)
+
+    def clear(w_self):
+        strategy = w_self.space.fromcache(EmptyListStrategy)
+        w_self.strategy = strategy
+        w_self.lstorage = strategy.get_empty_storage()
+
+    def switch_to_object_strategy(w_self):
+        list_w = w_self.getitems()
+        w_self.strategy = w_self.space.fromcache(ObjectListStrategy)
+        w_self.strategy.init_from_list_w(w_self, list_w)
+
+    def ensure_object_strategy(w_self):
+        """Make sure the items are stored as wrapped objects, e.g. because
+        references to them must stay valid (cpyext borrowed references)."""
+        if w_self.strategy is not w_self.space.fromcache(ObjectListStrategy):
+            w_self.switch_to_object_strategy()
+
+    def _temporarily_as_objects(w_self):
+        """Return a list with the same items using the ObjectListStrategy.
+        This is w_self if it already uses it, or a new list otherwise."""
+        space = w_self.space
+        strategy = space.fromcache(ObjectListStrategy)
+        if w_self.strategy is strategy:
+            return w_self
+        storage = strategy.erase(w_self.getitems_copy())
+        return W_ListObject.from_storage_and_strategy(space, storage, strategy)
+
+def _add_indirections():
+    list_methods = "clone copy_into length getitem getslice \
+                    getitems getitems_copy getitems_fixedsize \
+                    getitems_int getitems_str \
+                    append extend insert inplace_mul mul \
+                    setitem setslice deleteitem deleteslice \
+                    pop pop_end reverse sort find eq".split()
+
+    def make_method(method):
+        def f(self, *args):
+            return getattr(self.strategy, method)(self, *args)
+        f.func_name = method
+        return f
+
+    for method in list_methods:
+        setattr(W_ListObject, method, make_method(method))
+
+_add_indirections()
 
 registerimplementation(W_ListObject)
 
 
+class ListStrategy(object):
+    """Base class of the storage strategies of W_ListObject.  A strategy
+    is a per-space singleton that knows how to interpret the 'lstorage'
+    of the lists using it; lists switch to the most general
+    ObjectListStrategy as soon as an item cannot be stored unboxed.
+    """
+
+    def __init__(self, space):
+        self.space = space
+
+    def get_empty_storage(self):
+        raise NotImplementedError
+
+    def init_from_list_w(self, w_list, list_w):
+        raise NotImplementedError
+
+    def getitems_int(self, w_list):
+        return None
+
+    def getitems_str(self, w_list):
+        return None
+
+    def find(self, w_list, w_item, start, stop):
+        # needs to be safe against eq_w() mutating the w_list behind our back
+        space = self.space
+        i = start
+        while i < stop and i < w_list.length(): # intentionally always calling length!
+            if space.eq_w(w_list.getitem(i), w_item):
+                return i
+            i += 1
+        raise ValueError
+
+    def eq(self, w_list, w_other):
+        # the lengths are known to be equal.
+        # needs to be safe against eq_w() mutating the w_lists behind our back
+        space = self.space
+        i = 0
+        while i < w_list.length() and i < w_other.length():
+            if not space.eq_w(w_list.getitem(i), w_other.getitem(i)):
+                return False
+            i += 1
+        return True
+
+
+class EmptyListStrategy(ListStrategy):
+
+    erase, unerase = rerased.new_erasing_pair("empty")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def get_empty_storage(self):
+        return self.erase(None)
+
+    def init_from_list_w(self, w_list, list_w):
+        assert len(list_w) == 0
+        w_list.lstorage = self.get_empty_storage()
+
+    def clone(self, w_list):
+        return W_ListObject.from_storage_and_strategy(
+            self.space, self.get_empty_storage(), self)
+
+    def copy_into(self, w_list, w_other):
+        w_other.clear()
+
+    def length(self, w_list):
+        return 0
+
+    def getitem(self, w_list, index):
+        raise IndexError
+
+    def getslice(self, w_list, start, stop, step, length):
+        return W_ListObject(self.space, [])
+
+    def getitems(self, w_list):
+        return []
+
+    def getitems_copy(self, w_list):
+        return []
+
+    def getitems_fixedsize(self, w_list):
+        return []
+
+    def getitems_int(self, w_list):
+        return []
+
+    def getitems_str(self, w_list):
+        return []
+
+    def append(self, w_list, w_item):
+        w_list.init_from_list_w([w_item])
+
+    def extend(self, w_list, w_other):
+        w_other.copy_into(w_list)
+
+    def insert(self, w_list, index, w_item):
+        assert index == 0
+        self.append(w_list, w_item)
+
+    def inplace_mul(self, w_list, times):
+        return
+
+    def mul(self, w_list, times):
+        return w_list.clone()
+
+    def setitem(self, w_list, index, w_item):
+        raise IndexError
+
+    def setslice(self, w_list, start, step, slicelength, w_other):
+        if w_other.length() == 0:
+            return
+        # switch to the strategy of w_other, which knows how to do the rest
+        strategy = w_other.strategy
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.get_empty_storage()
+        w_list.setslice(start, step, slicelength, w_other)
+
+    def deleteitem(self, w_list, index):
+        raise IndexError
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        return
+
+    def pop(self, w_list, index):
+        raise IndexError
+
+    def pop_end(self, w_list):
+        raise IndexError
+
+    def reverse(self, w_list):
+        return
+
+    def sort(self, w_list, reverse):
+        return
+
+    def find(self, w_list, w_item, start, stop):
+        raise ValueError
+
+    def eq(self, w_list, w_other):
+        return True
+
+
+class AbstractUnwrappedStrategy(object):
+    _mixin_ = True
+
+    # the item used to pad the storage when it needs to grow
+    _none_value = None
+
+    @staticmethod
+    def erase(storage):
+        raise NotImplementedError("abstract base class")
+
+    @staticmethod
+    def unerase(obj):
+        raise NotImplementedError("abstract base class")
+
+    def wrap(self, unwrapped):
+        raise NotImplementedError
+
+    def unwrap(self, wrapped):
+        raise NotImplementedError
+
+    def is_correct_type(self, w_obj):
+        raise NotImplementedError("abstract base class")
+
+    def list_is_correct_type(self, w_list):
+        return w_list.strategy is self
+
+    def get_empty_storage(self):
+        return self.erase([])
+
+    def init_from_list_w(self, w_list, list_w):
+        l = [self.unwrap(w_item) for w_item in list_w]
+        w_list.lstorage = self.erase(l)
+
+    def get_storage_copy(self, w_list):
+        items = self.unerase(w_list.lstorage)[:]
+        return self.erase(items)
+
+    def clone(self, w_list):
+        storage = self.get_storage_copy(w_list)
+        return W_ListObject.from_storage_and_strategy(self.space, storage,
+                                                      self)
+
+    def copy_into(self, w_list, w_other):
+        w_other.strategy = self
+        w_other.lstorage = self.get_storage_copy(w_list)
+
+    def length(self, w_list):
+        return len(self.unerase(w_list.lstorage))
+
+    def getitem(self, w_list, index):
+        l = self.unerase(w_list.lstorage)
+        try:
+            r = l[index]
+        except IndexError: # make RPython raise the exception
+            raise
+        return self.wrap(r)
+
+    def getitems(self, w_list):
+        return [self.wrap(item) for item in self.unerase(w_list.lstorage)]
+
+    def getitems_copy(self, w_list):
+        return [self.wrap(item) for item in self.unerase(w_list.lstorage)]
+
+    def getitems_fixedsize(self, w_list):
+        l = [self.wrap(item) for item in self.unerase(w_list.lstorage)]
+        return make_sure_not_resized(l)
+
+    def getslice(self, w_list, start, stop, step, length):
+        l = self.unerase(w_list.lstorage)
+        if step == 1 and 0 <= start <= stop:
+            assert start >= 0
+            assert stop >= 0
+            sublist = l[start:stop]
+        else:
+            sublist = [self._none_value] * length
+            for i in range(length):
+                sublist[i] = l[start]
+                start += step
+        storage = self.erase(sublist)
+        return W_ListObject.from_storage_and_strategy(self.space, storage,
+                                                      self)
+
+    def append(self, w_list, w_item):
+        if self.is_correct_type(w_item):
+            self.unerase(w_list.lstorage).append(self.unwrap(w_item))
+            return
+        w_list.switch_to_object_strategy()
+        w_list.append(w_item)
+
+    def insert(self, w_list, index, w_item):
+        l = self.unerase(w_list.lstorage)
+        if self.is_correct_type(w_item):
+            l.insert(index, self.unwrap(w_item))
+            return
+        w_list.switch_to_object_strategy()
+        w_list.insert(index, w_item)
+
+    def extend(self, w_list, w_other):
+        l = self.unerase(w_list.lstorage)
+        if self.list_is_correct_type(w_other):
+            l += self.unerase(w_other.lstorage)
+            return
+        elif w_other.length() == 0:
+            return
+        w_list.switch_to_object_strategy()
+        w_list.extend(w_other)
+
+    def inplace_mul(self, w_list, times):
+        l = self.unerase(w_list.lstorage)
+        l *= times
+
+    def mul(self, w_list, times):
+        l = self.unerase(w_list.lstorage)
+        return W_ListObject.from_storage_and_strategy(
+            self.space, self.erase(l * times), self)
+
+    def setitem(self, w_list, index, w_item):
+        l = self.unerase(w_list.lstorage)
+        if self.is_correct_type(w_item):
+            try:
+                l[index] = self.unwrap(w_item)
+            except IndexError:
+                raise
+            return
+        w_list.switch_to_object_strategy()
+        w_list.setitem(index, w_item)
+
+    def setslice(self, w_list, start, step, slicelength, w_other):
+        assert slicelength >= 0
+        items = self.unerase(w_list.lstorage)
+
+        if self is self.space.fromcache(ObjectListStrategy):
+            w_other = w_other._temporarily_as_objects()
+        elif (not self.list_is_correct_type(w_other) and
+              w_other.length() != 0):
+            w_list.switch_to_object_strategy()
+            w_list.setslice(start, step, slicelength, w_other)
+            return
+
+        if w_other.length() == 0:
+            other_items = []
+        else:
+            other_items = self.unerase(w_other.lstorage)
+            if other_items is items:
+                # assigning a list to a slice of itself
+                other_items = items[:]
+        oldsize = len(items)
+        len2 = len(other_items)
+        if step == 1:  # Support list resizing for non-extended slices
+            delta = slicelength - len2
+            if delta < 0:
+                delta = -delta
+                newsize = oldsize + delta
+                # XXX support this in rlist!
+                items += [self._none_value] * delta
+                lim = start+len2
+                i = newsize - 1
+                while i >= lim:
+                    items[i] = items[i-delta]
+                    i -= 1
+            elif start >= 0:
+                del items[start:start+delta]
+            else:
+                assert delta==0   # start<0 is only possible with slicelength==0
+        elif len2 != slicelength:  # No resize for extended slices
+            raise operationerrfmt(self.space.w_ValueError, "attempt to "
+                  "assign sequence of size %d to extended slice of size %d",
+                  len2, slicelength)
+        for i in range(len2):
+            items[start] = other_items[i]
+            start += step
+
+    def deleteitem(self, w_list, index):
+        l = self.unerase(w_list.lstorage)
+        try:
+            del l[index]
+        except IndexError:
+            raise
+
+    def deleteslice(self, w_list, start, step, slicelength):
+        items = self.unerase(w_list.lstorage)
+        if slicelength==0:
+            return
+
+        if step < 0:
+            start = start + step * (slicelength-1)
+            step = -step
+
+        if step == 1:
+            assert start >= 0
+            assert slicelength >= 0
+            del items[start:start+slicelength]
+        else:
+            n = len(items)
+            i = start
+
+            for discard in range(1, slicelength):
+                j = i+1
+                i += step
+                while j < i:
+                    items[j-discard] = items[j]
+                    j += 1
+
+            j = i+1
+            while j < n:
+                items[j-slicelength] = items[j]
+                j += 1
+            start = n - slicelength
+            assert start >= 0 # annotator hint
+            del items[start:]
+
+    def pop_end(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        return self.wrap(l.pop())
+
+    def pop(self, w_list, index):
+        l = self.unerase(w_list.lstorage)
+        try:
+            item = l.pop(index)
+        except IndexError:
+            raise
+        return self.wrap(item)
+
+    def reverse(self, w_list):
+        self.unerase(w_list.lstorage).reverse()
+
+    def sort(self, w_list, reverse):
+        # the items are unboxed, so sorting them cannot call back into
+        # app-level code: there is no need to protect against mutations
+        l = self.unerase(w_list.lstorage)
+        sorter = self.sorterclass(l, len(l))
+        # Reverse sort stability achieved by initially reversing the list,
+        # applying a stable forward sort, then reversing the final result.
+        if reverse:
+            l.reverse()
+        sorter.sort()
+        if reverse:
+            l.reverse()
+
+    def find(self, w_list, w_item, start, stop):
+        if self.is_correct_type(w_item):
+            # fast path: compare unboxed values, which cannot mutate the list
+            item = self.unwrap(w_item)
+            l = self.unerase(w_list.lstorage)
+            if stop > len(l):
+                stop = len(l)
+            i = start
+            while i < stop:
+                if l[i] == item:
+                    return i
+                i += 1
+            raise ValueError
+        return ListStrategy.find(self, w_list, w_item, start, stop)
+
+    def eq(self, w_list, w_other):
+        if self.list_is_correct_type(w_other):
+            return self.unerase(w_list.lstorage) == self.unerase(w_other.lstorage)
+        return ListStrategy.eq(self, w_list, w_other)
+
+
+class ObjectListStrategy(AbstractUnwrappedStrategy, ListStrategy):
+    _none_value = None
+
+    erase, unerase = rerased.new_erasing_pair("object")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def unwrap(self, w_obj):
+        return w_obj
+
+    def wrap(self, item):
+        return item
+
+    def is_correct_type(self, w_obj):
+        return True
+
+    def init_from_list_w(self, w_list, list_w):
+        w_list.lstorage = self.erase(list_w)
+
+    def getitems(self, w_list):
+        return self.unerase(w_list.lstorage)
+
+    def getitems_copy(self, w_list):
+        return self.unerase(w_list.lstorage)[:]
+
+    def getitems_fixedsize(self, w_list):
+        return make_sure_not_resized(self.unerase(w_list.lstorage)[:])
+
+    def extend(self, w_list, w_other):
+        self.unerase(w_list.lstorage).extend(w_other.getitems())
+
+    def sort(self, w_list, reverse):
+        # sorting wrapped objects needs app-level comparisons; it is done
+        # by list_sort__List_ANY_ANY_ANY
+        raise NotImplementedError
+
+    def find(self, w_list, w_item, start, stop):
+        return ListStrategy.find(self, w_list, w_item, start, stop)
+
+    def eq(self, w_list, w_other):
+        return ListStrategy.eq(self, w_list, w_other)
+
+
+class IntegerListStrategy(AbstractUnwrappedStrategy, ListStrategy):
+    _none_value = 0
+
+    erase, unerase = rerased.new_erasing_pair("integer")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, intval):
+        return wrapint(self.space, intval)
+
+    def unwrap(self, w_int):
+        assert isinstance(w_int, W_IntObject)
+        return w_int.intval
+
+    def is_correct_type(self, w_obj):
+        return is_W_IntObject(w_obj)
+
+    def getitems_int(self, w_list):
+        return self.unerase(w_list.lstorage)
+
+
+class FloatListStrategy(AbstractUnwrappedStrategy, ListStrategy):
+    _none_value = 0.0
+
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, floatval):
+        return self.space.wrap(floatval)
+
+    def unwrap(self, w_float):
+        assert isinstance(w_float, W_FloatObject)
+        return w_float.floatval
+
+    def is_correct_type(self, w_obj):
+        return is_W_FloatObject(w_obj)
+
+
+class StringListStrategy(AbstractUnwrappedStrategy, ListStrategy):
+    _none_value = None
+
+    erase, unerase = rerased.new_erasing_pair("string")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, stringval):
+        return self.space.wrap(stringval)
+
+    def unwrap(self, w_string):
+        return self.space.str_w(w_string)
+
+    def is_correct_type(self, w_obj):
+        return is_W_StringObject(self.space, w_obj)
+
+    def getitems_str(self, w_list):
+        return self.unerase(w_list.lstorage)
+
+# _______________________________________________________
+
 init_signature = Signature(['sequence'], None, None)
 init_defaults = [None]
 
@@ -39,20 +650,16 @@ def init__List(space, w_list, __args__):
     # this is on the silly side
     w_iterable, = __args__.parse_obj(
             None, 'list', init_signature, init_defaults)
-    items_w = w_list.wrappeditems
-    del items_w[:]
+    w_list.clear()
     if w_iterable is not None:
-        # unfortunately this is duplicating space.unpackiterable to avoid
-        # assigning a new RPython list to 'wrappeditems', which defeats the
-        # W_FastSeqIterObject optimization.
         if isinstance(w_iterable, W_ListObject):
-            items_w.extend(w_iterable.wrappeditems)
+            w_list.extend(w_iterable)
         elif isinstance(w_iterable, W_TupleObject):
-            items_w.extend(w_iterable.wrappeditems)
+            w_list.init_from_list_w(w_iterable.wrappeditems[:])
         else:
-            _init_from_iterable(space, items_w, w_iterable)
+            _init_from_iterable(space, w_list, w_iterable)
 
-def _init_from_iterable(space, items_w, w_iterable):
+def _init_from_iterable(space, w_list, w_iterable):
     # in its own function to make the JIT look into init__List
     # XXX this would need a JIT driver somehow?
     w_iterator = space.iter(w_iterable)
@@ -63,69 +670,67 @@ def _init_from_iterable(space, items_w, w_iterable):
             if not e.match(space, space.w_StopIteration):
                 raise
             break  # done
-        items_w.append(w_item)
+        w_list.append(w_item)
 
 def len__List(space, w_list):
-    result = len(w_list.wrappeditems)
+    result = w_list.length()
     return wrapint(space, result)
 
 def getitem__List_ANY(space, w_list, w_index):
     try:
-        return w_list.wrappeditems[get_list_index(space, w_index)]
+        return w_list.getitem(get_list_index(space, w_index))
     except IndexError:
         raise OperationError(space.w_IndexError,
                              space.wrap("list index out of range"))
 
 def getitem__List_Slice(space, w_list, w_slice):
     # XXX consider to extend rlist's functionality?
-    length = len(w_list.wrappeditems)
+    length = w_list.length()
     start, stop, step, slicelength = w_slice.indices4(space, length)
     assert slicelength >= 0
-    if step == 1 and 0 <= start <= stop:
-        return W_ListObject(w_list.wrappeditems[start:stop])
-    w_res = W_ListObject([None] * slicelength)
-    items_w = w_list.wrappeditems
-    subitems_w = w_res.wrappeditems
-    for i in range(slicelength):
-        subitems_w[i] = items_w[start]
-        start += step
-    return w_res
+    if slicelength == 0:
+        return W_ListObject(space, [])
+    return w_list.getslice(start, stop, step, slicelength)
 
 def getslice__List_ANY_ANY(space, w_list, w_start, w_stop):
-    length = len(w_list.wrappeditems)
+    length = w_list.length()
     start, stop = normalize_simple_slice(space, length, w_start, w_stop)
-    return W_ListObject(w_list.wrappeditems[start:stop])
+    slicelength = stop - start
+    if slicelength == 0:
+        return W_ListObject(space, [])
+    return w_list.getslice(start, stop, 1, slicelength)
 
-def setslice__List_ANY_ANY_ANY(space, w_list, w_start, w_stop, w_sequence):
-    length = len(w_list.wrappeditems)
+def setslice__List_ANY_ANY_ANY(space, w_list, w_start, w_stop, w_iterable):
+    length = w_list.length()
     start, stop = normalize_simple_slice(space, length, w_start, w_stop)
-
-    sequence2 = space.listview(w_sequence)
-    items = w_list.wrappeditems
-    _setitem_slice_helper(space, items, start, 1, stop-start, sequence2,
-                          empty_elem=None)
+    w_other = _as_list_object(space, w_iterable)
+    w_list.setslice(start, 1, stop-start, w_other)
 
 def delslice__List_ANY_ANY(space, w_list, w_start, w_stop):
-    length = len(w_list.wrappeditems)
+    length = w_list.length()
     start, stop = normalize_simple_slice(space, length, w_start, w_stop)
-    _delitem_slice_helper(space, w_list.wrappeditems, start, 1, stop-start)
+    w_list.deleteslice(start, 1, stop-start)
+
+def _as_list_object(space, w_iterable):
+    if isinstance(w_iterable, W_ListObject):
+        return w_iterable
+    return W_ListObject(space, space.listview(w_iterable))
 
 def contains__List_ANY(space, w_list, w_obj):
-    # needs to be safe against eq_w() mutating the w_list behind our back
-    i = 0
-    items_w = w_list.wrappeditems
-    while i < len(items_w): # intentionally always calling len!
-        if space.eq_w(items_w[i], w_obj):
-            return space.w_True
-        i += 1
-    return space.w_False
+    try:
+        w_list.find(w_obj, 0, sys.maxint)
+    except ValueError:
+        return space.w_False
+    return space.w_True
 
 def iter__List(space, w_list):
     from pypy.objspace.std import iterobject
-    return iterobject.W_FastListIterObject(w_list, w_list.wrappeditems)
+    return iterobject.W_FastListIterObject(w_list)
 
 def add__List_List(space, w_list1, w_list2):
-    return W_ListObject(w_list1.wrappeditems + w_list2.wrappeditems)
+    w_clone = w_list1.clone()
+    w_clone.extend(w_list2)
+    return w_clone
 
 
 def inplace_add__List_ANY(space, w_list1, w_iterable2):
@@ -148,7 +753,7 @@ def mul_list_times(space, w_list, w_times):
         if e.match(space, space.w_TypeError):
             raise FailedToImplement
         raise
-    return W_ListObject(w_list.wrappeditems * times)
+    return w_list.mul(times)
 
 def mul__List_ANY(space, w_list, w_times):
     return mul_list_times(space, w_list, w_times)
@@ -163,63 +768,50 @@ def inplace_mul__List_ANY(space, w_list, w_times):
         if e.match(space, space.w_TypeError):
             raise FailedToImplement
         raise
-    w_list.wrappeditems *= times
+    w_list.inplace_mul(times)
     return w_list
 
 def eq__List_List(space, w_list1, w_list2):
-    # needs to be safe against eq_w() mutating the w_lists behind our back
-    items1_w = w_list1.wrappeditems
-    items2_w = w_list2.wrappeditems
-    return equal_wrappeditems(space, items1_w, items2_w)
-
-def equal_wrappeditems(space, items1_w, items2_w):
-    if len(items1_w) != len(items2_w):
+    if w_list1.length() != w_list2.length():
         return space.w_False
-    i = 0
-    while i < len(items1_w) and i < len(items2_w):
-        if not space.eq_w(items1_w[i], items2_w[i]):
-            return space.w_False
-        i += 1
-    return space.w_True
+    return space.newbool(w_list1.eq(w_list2))
 
-def lessthan_unwrappeditems(space, items1_w, items2_w):
+def lessthan_unwrappeditems(space, w_list1, w_list2):
     # needs to be safe against eq_w() mutating the w_lists behind our back
     # Search for the first index where items are different
     i = 0
-    while i < len(items1_w) and i < len(items2_w):
-        w_item1 = items1_w[i]
-        w_item2 = items2_w[i]
+    while i < w_list1.length() and i < w_list2.length():
+        w_item1 = w_list1.getitem(i)
+        w_item2 = w_list2.getitem(i)
         if not space.eq_w(w_item1, w_item2):
             return space.lt(w_item1, w_item2)
         i += 1
     # No more items to compare -- compare sizes
-    return space.newbool(len(items1_w) < len(items2_w))
+    return space.newbool(w_list1.length() < w_list2.length())
 
-def greaterthan_unwrappeditems(space, items1_w, items2_w):
+def greaterthan_unwrappeditems(space, w_list1, w_list2):
     # needs to be safe against eq_w() mutating the w_lists behind our back
     # Search for the first index where items are different
     i = 0
-    while i < len(items1_w) and i < len(items2_w):
-        w_item1 = items1_w[i]
-        w_item2 = items2_w[i]
+    while i < w_list1.length() and i < w_list2.length():
+        w_item1 = w_list1.getitem(i)
+        w_item2 = w_list2.getitem(i)
         if not space.eq_w(w_item1, w_item2):
             return space.gt(w_item1, w_item2)
         i += 1
     # No more items to compare -- compare sizes
-    return space.newbool(len(items1_w) > len(items2_w))
+    return space.newbool(w_list1.length() > w_list2.length())
 
 def lt__List_List(space, w_list1, w_list2):
-    return lessthan_unwrappeditems(space, w_list1.wrappeditems,
-        w_list2.wrappeditems)
+    return lessthan_unwrappeditems(space, w_list1, w_list2)
 
 def gt__List_List(space, w_list1, w_list2):
-    return greaterthan_unwrappeditems(space, w_list1.wrappeditems,
-        w_list2.wrappeditems)
+    return greaterthan_unwrappeditems(space, w_list1, w_list2)
 
 def delitem__List_ANY(space, w_list, w_idx):
     idx = get_list_index(space, w_idx)
     try:
-        del w_list.wrappeditems[idx]
+        w_list.deleteitem(idx)
     except IndexError:
         raise OperationError(space.w_IndexError,
                              space.wrap("list deletion index out of range"))
@@ -228,8 +820,8 @@ def delitem__List_ANY(space, w_list, w_idx):
 
 def delitem__List_Slice(space, w_list, w_slice):
     start, stop, step, slicelength = w_slice.indices4(space,
-                                                      len(w_list.wrappeditems))
-    _delitem_slice_helper(space, w_list.wrappeditems, start, step, slicelength)
+                                                      w_list.length())
+    w_list.deleteslice(start, step, slicelength)
 
 def _delitem_slice_helper(space, items, start, step, slicelength):
     if slicelength==0:
@@ -265,20 +857,17 @@ def _delitem_slice_helper(space, items, start, step, slicelength):
 def setitem__List_ANY_ANY(space, w_list, w_index, w_any):
     idx = get_list_index(space, w_index)
     try:
-        w_list.wrappeditems[idx] = w_any
+        w_list.setitem(idx, w_any)
     except IndexError:
         raise OperationError(space.w_IndexError,
                              space.wrap("list index out of range"))
     return space.w_None
 
 def setitem__List_Slice_ANY(space, w_list, w_slice, w_iterable):
-    oldsize = len(w_list.wrappeditems)
+    oldsize = w_list.length()
     start, stop, step, slicelength = w_slice.indices4(space, oldsize)
-
-    sequence2 = space.listview(w_iterable)
-    items = w_list.wrappeditems
-    _setitem_slice_helper(space, items, start, step, slicelength, sequence2,
-                          empty_elem=None)
+    w_other = _as_list_object(space, w_iterable)
+    w_list.setslice(start, step, slicelength, w_other)
 
 def _setitem_slice_helper(space, items, start, step, slicelength, sequence2,
                           empty_elem):
@@ -344,7 +933,7 @@ app = gateway.applevel("""
 listrepr = app.interphook("listrepr")
 
 def repr__List(space, w_list):
-    if len(w_list.wrappeditems) == 0:
+    if w_list.length() == 0:
         return space.wrap('[]')
     ec = space.getexecutioncontext()
     w_currently_in_repr = ec._py_repr
@@ -354,9 +943,9 @@ def repr__List(space, w_list):
 
 def list_insert__List_ANY_ANY(space, w_list, w_where, w_any):
     where = space.int_w(w_where)
-    length = len(w_list.wrappeditems)
+    length = w_list.length()
     index = get_positive_index(where, length)
-    w_list.wrappeditems.insert(index, w_any)
+    w_list.insert(index, w_any)
     return space.w_None
 
 def get_positive_index(where, length):
@@ -369,69 +958,72 @@ def get_positive_index(where, length):
     return where
 
 def list_append__List_ANY(space, w_list, w_any):
-    w_list.wrappeditems.append(w_any)
+    w_list.append(w_any)
     return space.w_None
 
 def list_extend__List_List(space, w_list, w_other):
-    w_list.wrappeditems += w_other.wrappeditems
+    w_list.extend(w_other)
     return space.w_None
 
 def list_extend__List_ANY(space, w_list, w_any):
-    w_list.wrappeditems += space.listview(w_any)
+    w_other = W_ListObject(space, space.listview(w_any))
+    w_list.extend(w_other)
     return space.w_None
 
 # note that the default value will come back wrapped!!!
 def list_pop__List_ANY(space, w_list, w_idx=-1):
-    items = w_list.wrappeditems
-    if len(items)== 0:
+    length = w_list.length()
+    if length == 0:
         raise OperationError(space.w_IndexError,
                              space.wrap("pop from empty list"))
     idx = space.int_w(w_idx)
-    try:
-        return items.pop(idx)
-    except IndexError:
+    if idx < 0:
+        idx += length
+    if idx < 0 or idx >= length:
         raise OperationError(space.w_IndexError,
                              space.wrap("pop index out of range"))
+    if idx == length - 1:
+        return w_list.pop_end()
+    return w_list.pop(idx)
 
 def list_remove__List_ANY(space, w_list, w_any):
     # needs to be safe against eq_w() mutating the w_list behind our back
-    items = w_list.wrappeditems
-    i = 0
-    while i < len(items):
-        if space.eq_w(items[i], w_any):
-            if i < len(items): # if this is wrong the list was changed
-                del items[i]
-            return space.w_None
-        i += 1
-    raise OperationError(space.w_ValueError,
-                         space.wrap("list.remove(x): x not in list"))
+    try:
+        i = w_list.find(w_any, 0, sys.maxint)
+    except ValueError:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("list.remove(x): x not in list"))
+    if i < w_list.length(): # otherwise list was mutated
+        w_list.deleteitem(i)
+    return space.w_None
 
 def list_index__List_ANY_ANY_ANY(space, w_list, w_any, w_start, w_stop):
     # needs to be safe against eq_w() mutating the w_list behind our back
-    items = w_list.wrappeditems
-    size = len(items)
+    size = w_list.length()
     i = slicetype.adapt_bound(space, size, w_start)
     stop = slicetype.adapt_bound(space, size, w_stop)
-    while i < stop and i < len(items):
-        if space.eq_w(items[i], w_any):
-            return space.wrap(i)
-        i += 1
-    raise OperationError(space.w_ValueError,
-                         space.wrap("list.index(x): x not in list"))
+    try:
+        i = w_list.find(w_any, i, stop)
+    except ValueError:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("list.index(x): x not in list"))
+    return space.wrap(i)
 
 def list_count__List_ANY(space, w_list, w_any):
     # needs to be safe against eq_w() mutating the w_list behind our back
     count = 0
     i = 0
-    items = w_list.wrappeditems
-    while i < len(items):
-        if space.eq_w(items[i], w_any):
-            count += 1
+    while True:
+        try:
+            i = w_list.find(w_any, i, sys.maxint)
+        except ValueError:
+            break
+        count += 1
         i += 1
     return space.wrap(count)
 
 def list_reverse__List(space, w_list):
-    w_list.wrappeditems.reverse()
+    w_list.reverse()
     return space.w_None
 
 # ____________________________________________________________
@@ -440,6 +1032,11 @@ def list_reverse__List(space, w_list):
 # Reverse a slice of a list in place, from lo up to (exclusive) hi.
 # (used in sort)
 
+TimSort = make_timsort_class()
+IntBaseTimSort = make_timsort_class()
+FloatBaseTimSort = make_timsort_class()
+StringBaseTimSort = make_timsort_class()
+
 class KeyContainer(baseobjspace.W_Root):
     def __init__(self, w_key, w_item):
         self.w_key = w_key
@@ -454,6 +1051,22 @@ class SimpleSort(TimSort):
         space = self.space
         return space.is_true(space.lt(a, b))
 
+class IntSort(IntBaseTimSort):
+    def lt(self, a, b):
+        return a < b
+
+class FloatSort(FloatBaseTimSort):
+    def lt(self, a, b):
+        return a < b
+
+class StringSort(StringBaseTimSort):
+    def lt(self, a, b):
+        return a < b
+
+IntegerListStrategy.sorterclass = IntSort
+FloatListStrategy.sorterclass = FloatSort
+StringListStrategy.sorterclass = StringSort
+
 class CustomCompareSort(SimpleSort):
     def lt(self, a, b):
         space = self.space
@@ -486,6 +1099,12 @@ def list_sort__List_ANY_ANY_ANY(space, w_list, w_cmp, w_keyfunc, w_reverse):
     has_key = not space.is_w(w_keyfunc, space.w_None)
     has_reverse = space.is_true(w_reverse)
 
+    if (not has_cmp and not has_key and
+            w_list.strategy is not space.fromcache(ObjectListStrategy)):
+        # fast path: the items are unboxed and compared directly
+        w_list.sort(has_reverse)
+        return space.w_None
+
     # create and setup a TimSort instance
     if has_cmp:
         if has_key:
@@ -497,7 +1116,7 @@ def list_sort__List_ANY_ANY_ANY(space, w_list, w_cmp, w_keyfunc, w_reverse):
             sorterclass = CustomKeySort
         else:
             sorterclass = SimpleSort
-    items = w_list.wrappeditems
+    items = w_list.getitems()
     sorter = sorterclass(items, len(items))
     sorter.space = space
     sorter.w_cmp = w_cmp
@@ -506,8 +1125,8 @@ def list_sort__List_ANY_ANY_ANY(space, w_list, w_cmp, w_keyfunc, w_reverse):
         # The list is temporarily made empty, so that mutations performed
         # by comparison functions can't affect the slice of memory we're
         # sorting (allowing mutations during sorting is an IndexError or
-        # core-dump factory, since wrappeditems may change).
-        w_list.wrappeditems = []
+        # core-dump factory, since the storage may change).
+        w_list.clear()
 
         # wrap each item in a KeyContainer if needed
         if has_key:
@@ -537,10 +1156,10 @@ def list_sort__List_ANY_ANY_ANY(space, w_list, w_cmp, w_keyfunc, w_reverse):
                     sorter.list[i] = w_obj.w_item
 
         # check if the user mucked with the list during the sort
-        mucked = len(w_list.wrappeditems) > 0
+        mucked = w_list.length() > 0
 
         # put the items back into the list
-        w_list.wrappeditems = sorter.list
+        w_list.init_from_list_w(sorter.list)
 
     if mucked:
         raise OperationError(space.w_ValueError,
@@ -28,6 +28,7 @@ from pypy.objspace.std.objectobject import W_ObjectObject
 from pypy.objspace.std.ropeobject import W_RopeObject
 from pypy.objspace.std.iterobject import W_SeqIterObject
 from pypy.objspace.std.setobject import W_SetObject, W_FrozensetObject
+from pypy.objspace.std.setobject import W_BaseSetObject
 from pypy.objspace.std.sliceobject import W_SliceObject
 from pypy.objspace.std.smallintobject import W_SmallIntObject
 from pypy.objspace.std.stringobject import W_StringObject
@@ -232,15 +233,12 @@ class StdObjSpace(ObjSpace, DescrOperation):
             return W_ComplexObject(x.real, x.imag)
 
         if isinstance(x, set):
-            rdict_w = r_dict(self.eq_w, self.hash_w)
-            for item in x:
-                rdict_w[self.wrap(item)] = None
-            res = W_SetObject(self, rdict_w)
-            return res
+            wrappeditems = [self.wrap(item) for item in x]
+            return W_SetObject(self, self.newlist(wrappeditems))
 
         if isinstance(x, frozenset):
             wrappeditems = [self.wrap(item) for item in x]
-            return W_FrozensetObject(self, wrappeditems)
+            return W_FrozensetObject(self, self.newlist(wrappeditems))
 
         if x is __builtin__.Ellipsis:
             # '__builtin__.Ellipsis' avoids confusion with special.Ellipsis
@@ -301,7 +299,7 @@ class StdObjSpace(ObjSpace, DescrOperation):
         return wraptuple(self, list_w)
 
     def newlist(self, list_w):
-        return W_ListObject(list_w)
+        return W_ListObject(self, list_w)
 
     def newdict(self, module=False, instance=False, classofinstance=None,
                 strdict=False):
@@ -311,8 +309,7 @@ class StdObjSpace(ObjSpace, DescrOperation):
                 strdict=strdict)
 
     def newset(self):
-        from pypy.objspace.std.setobject import newset
-        return W_SetObject(self, newset(self))
+        return W_SetObject(self, None)
 
     def newslice(self, w_start, w_end, w_step):
         return W_SliceObject(w_start, w_end, w_step)
@@ -391,7 +388,7 @@ class StdObjSpace(ObjSpace, DescrOperation):
         if isinstance(w_obj, W_TupleObject):
             t = w_obj.wrappeditems[:]
         elif isinstance(w_obj, W_ListObject):
-            t = w_obj.wrappeditems[:]
+            t = w_obj.getitems_copy()
         else:
             return ObjSpace.unpackiterable(self, w_obj, expected_length)
         if expected_length != -1 and len(t) != expected_length:
@@ -405,7 +402,7 @@ class StdObjSpace(ObjSpace, DescrOperation):
         if isinstance(w_obj, W_TupleObject):
             t = w_obj.wrappeditems
         elif isinstance(w_obj, W_ListObject):
-            t = w_obj.wrappeditems[:]
+            t = w_obj.getitems_fixedsize()
         else:
             if unroll:
                 return make_sure_not_resized(ObjSpace.unpackiterable_unroll(
@@ -422,7 +419,7 @@ class StdObjSpace(ObjSpace, DescrOperation):
 
     def listview(self, w_obj, expected_length=-1):
         if isinstance(w_obj, W_ListObject):
-            t = w_obj.wrappeditems
+            t = w_obj.getitems()
         elif isinstance(w_obj, W_TupleObject):
             t = w_obj.wrappeditems[:]
         else:
@@ -431,6 +428,20 @@ class StdObjSpace(ObjSpace, DescrOperation):
             raise self._wrap_expected_length(expected_length, len(t))
         return t
 
+    def listview_str(self, w_obj):
+        if isinstance(w_obj, W_ListObject):
+            return w_obj.getitems_str()
+        if isinstance(w_obj, W_BaseSetObject):
+            return w_obj.listview_str()
+        return None
+
+    def listview_int(self, w_obj):
+        if isinstance(w_obj, W_ListObject):
+            return w_obj.getitems_int()
+        if isinstance(w_obj, W_BaseSetObject):
+            return w_obj.listview_int()
+        return None
+
     def sliceindices(self, w_slice, w_length):
         if isinstance(w_slice, W_SliceObject):
             a, b, c = w_slice.indices3(self, self.int_w(w_length))
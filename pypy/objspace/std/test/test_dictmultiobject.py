@@ -578,15 +578,17 @@ class AppTest_DictMultiObject(AppTest_DictObject):
         assert getattr(a, s) == 42
 
     def test_setattr_string_identify(self):
-        attrs = []
+        # the items of a list of strings are stored unboxed, so record
+        # the attribute name in a dict value to check its identity
+        attrs = {}
         class A(object):
             def __setattr__(self, attr, value):
-                attrs.append(attr)
+                attrs['attr'] = attr
 
         a = A()
         s = "abc"
         setattr(a, s, 123)
-        assert attrs[0] is s
+        assert attrs['attr'] is s
 
 class AppTestDictViews:
     def test_dictview(self):
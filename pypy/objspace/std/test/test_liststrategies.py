@@ -0,0 +1,247 @@
+from pypy.objspace.std.listobject import W_ListObject, EmptyListStrategy, \
+     ObjectListStrategy, IntegerListStrategy, FloatListStrategy, \
+     StringListStrategy
+
+
+class TestW_ListStrategies(object):
+
+    def test_check_strategy(self):
+        space = self.space
+        w = space.wrap
+        assert isinstance(W_ListObject(space, []).strategy,
+                          EmptyListStrategy)
+        assert isinstance(W_ListObject(space, [w(1), w('a')]).strategy,
+                          ObjectListStrategy)
+        assert isinstance(W_ListObject(space, [w(1), w(2), w(3)]).strategy,
+                          IntegerListStrategy)
+        assert isinstance(W_ListObject(space, [w('a'), w('b')]).strategy,
+                          StringListStrategy)
+        assert isinstance(W_ListObject(space, [w(1.5), w(2.5)]).strategy,
+                          FloatListStrategy)
+        assert isinstance(W_ListObject(space, [w(1), w(2.5)]).strategy,
+                          ObjectListStrategy)
+
+    def test_nan_is_not_unboxed(self):
+        space = self.space
+        w = space.wrap
+        w_l = W_ListObject(space, [w(1.5), w(float('nan'))])
+        assert isinstance(w_l.strategy, ObjectListStrategy)
+
+    def test_bool_and_subclass_are_not_unboxed(self):
+        space = self.space
+        w = space.wrap
+        w_l = W_ListObject(space, [w(1), space.w_True])
+        assert isinstance(w_l.strategy, ObjectListStrategy)
+
+    def test_empty_to_any(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [])
+        assert isinstance(l.strategy, EmptyListStrategy)
+        l.append(w((1,3)))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+        l = W_ListObject(space, [])
+        l.append(w(1))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        l = W_ListObject(space, [])
+        l.append(w('a'))
+        assert isinstance(l.strategy, StringListStrategy)
+
+        l = W_ListObject(space, [])
+        l.append(w(1.2))
+        assert isinstance(l.strategy, FloatListStrategy)
+
+    def test_int_to_any(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.append(w(4))
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.append(w('a'))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.eq_w(l.getitem(3), w(4))
+        assert space.eq_w(l.getitem(4), w('a'))
+
+    def test_string_to_any(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w('a'), w('b'), w('c')])
+        assert isinstance(l.strategy, StringListStrategy)
+        l.append(w('d'))
+        assert isinstance(l.strategy, StringListStrategy)
+        l.append(w(3))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_float_to_any(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1.1), w(2.2), w(3.3)])
+        assert isinstance(l.strategy, FloatListStrategy)
+        l.append(w(4.4))
+        assert isinstance(l.strategy, FloatListStrategy)
+        l.append(w("a"))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_setitem(self):
+        space = self.space
+        w = space.wrap
+        # This should work if test_listobject.py passes
+        l = W_ListObject(space, [w('a'), w('b'), w('c')])
+        assert space.eq_w(l.getitem(0), w('a'))
+        l.setitem(0, w('d'))
+        assert space.eq_w(l.getitem(0), w('d'))
+        assert isinstance(l.strategy, StringListStrategy)
+
+        # IntStrategy to ObjectStrategy
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.setitem(0, w('d'))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+        # FloatStrategy to ObjectStrategy
+        l = W_ListObject(space, [w(1.2), w(2.3), w(3.4)])
+        assert isinstance(l.strategy, FloatListStrategy)
+        l.setitem(0, w("a"))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_insert(self):
+        space = self.space
+        w = space.wrap
+        # no change
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.insert(3, w(4))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        # StringStrategy
+        l = W_ListObject(space, [w('a'), w('b'), w('c')])
+        assert isinstance(l.strategy, StringListStrategy)
+        l.insert(3, w(2))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+        # EmptyStrategy
+        l = W_ListObject(space, [])
+        assert isinstance(l.strategy, EmptyListStrategy)
+        l.insert(0, w('a'))
+        assert isinstance(l.strategy, StringListStrategy)
+
+    def test_list_empty_after_delete(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.deleteitem(0)
+        assert isinstance(l.strategy, IntegerListStrategy)
+        assert l.length() == 0
+        l.append(w(5))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+    def test_setslice(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [])
+        assert isinstance(l.strategy, EmptyListStrategy)
+        l.setslice(0, 1, 0, W_ListObject(space, [w(1), w(2), w(3)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.setslice(0, 1, 2, W_ListObject(space, [w(4), w(5), w(6)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        l = W_ListObject(space, [w(1), w('b'), w(3)])
+        assert isinstance(l.strategy, ObjectListStrategy)
+        l.setslice(0, 1, 2, W_ListObject(space, [w(1), w(2), w(3)]))
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert isinstance(l.strategy, IntegerListStrategy)
+        l.setslice(0, 1, 2, W_ListObject(space, [w('a'), w('b'), w('c')]))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == ['a', 'b', 'c', 3]
+
+    def test_setslice_to_itself(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.setslice(1, 1, 1, l)
+        assert space.unwrap(l) == [1, 1, 2, 3, 3]
+
+    def test_extend(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [])
+        assert isinstance(l.strategy, EmptyListStrategy)
+        l.extend(W_ListObject(space, [w(1), w(2), w(3)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.extend(W_ListObject(space, [w('a'), w('b'), w('c')]))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.unwrap(l) == [1, 2, 3, 'a', 'b', 'c']
+
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        l.extend(W_ListObject(space, [w(4), w(5), w(6)]))
+        assert isinstance(l.strategy, IntegerListStrategy)
+
+        l = W_ListObject(space, [w(1.5), w(2.5)])
+        l.extend(W_ListObject(space, []))
+        assert isinstance(l.strategy, FloatListStrategy)
+
+    def test_clone_is_independent(self):
+        space = self.space
+        w = space.wrap
+        l1 = W_ListObject(space, [w(1), w(2), w(3)])
+        l2 = l1.clone()
+        l2.append(w(4))
+        assert l1.length() == 3
+        assert l2.length() == 4
+        l2.append(w('a'))
+        assert isinstance(l1.strategy, IntegerListStrategy)
+
+    def test_find(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2), w(3)])
+        assert l.find(w(2), 0, 3) == 1
+        # an int list can contain a float or a long comparing equal
+        assert l.find(w(3.0), 0, 3) == 2
+        assert l.find(space.newlong(1), 0, 3) == 0
+        raises(ValueError, l.find, w(2), 2, 3)
+        raises(ValueError, l.find, w('a'), 0, 3)
+
+    def test_unboxed_sort(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(3), w(-1), w(2)])
+        l.sort(False)
+        assert space.unwrap(l) == [-1, 2, 3]
+        l.sort(True)
+        assert space.unwrap(l) == [3, 2, -1]
+        l = W_ListObject(space, [w('b'), w('c'), w('a')])
+        l.sort(False)
+        assert space.unwrap(l) == ['a', 'b', 'c']
+
+    def test_getitems_int_str(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        assert l.getitems_int() == [1, 2]
+        assert l.getitems_str() is None
+        l = W_ListObject(space, [w('a')])
+        assert l.getitems_str() == ['a']
+        assert l.getitems_int() is None
+        l = W_ListObject(space, [w('a'), w(1)])
+        assert l.getitems_str() is None
+        assert l.getitems_int() is None
+
+    def test_ensure_object_strategy(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        l.ensure_object_strategy()
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert l.getitem(1) is l.getitem(1)
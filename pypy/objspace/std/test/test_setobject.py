@@ -10,7 +10,6 @@ is not too wrong.
 import py.test
 from pypy.objspace.std.setobject import W_SetObject, W_FrozensetObject
 from pypy.objspace.std.setobject import _initialize_set
-from pypy.objspace.std.setobject import newset, make_setdata_from_w_iterable
 from pypy.objspace.std.setobject import and__Set_Set
 from pypy.objspace.std.setobject import set_intersection__Set
 from pypy.objspace.std.setobject import eq__Set_Set
@@ -29,12 +28,11 @@ class TestW_SetObject:
         self.false = self.space.w_False
 
     def test_and(self):
-        s = W_SetObject(self.space, newset(self.space))
+        s = W_SetObject(self.space)
         _initialize_set(self.space, s, self.word)
-        t0 = W_SetObject(self.space, newset(self.space))
+        t0 = W_SetObject(self.space)
         _initialize_set(self.space, t0, self.otherword)
-        t1 = W_FrozensetObject(self.space,
-                make_setdata_from_w_iterable(self.space, self.otherword))
+        t1 = W_FrozensetObject(self.space, self.otherword)
         r0 = and__Set_Set(self.space, s, t0)
         r1 = and__Set_Set(self.space, s, t1)
         assert eq__Set_Set(self.space, r0, r1) == self.true
@@ -42,9 +40,9 @@ class TestW_SetObject:
         assert eq__Set_Set(self.space, r0, sr) == self.true
 
     def test_compare(self):
-        s = W_SetObject(self.space, newset(self.space))
+        s = W_SetObject(self.space)
         _initialize_set(self.space, s, self.word)
-        t = W_SetObject(self.space, newset(self.space))
+        t = W_SetObject(self.space)
         _initialize_set(self.space, t, self.word)
         assert self.space.eq_w(s,t)
         u = self.space.wrap(set('simsalabim'))
@@ -381,3 +379,79 @@ class AppTestAppSetTest:
         assert s == set([2,3])
         s.difference_update(s)
         assert s == set([])
+
+    def test_mixed_types(self):
+        s = set([1, 2, 3])
+        s.add("a")
+        assert s == set([1, 2, 3, "a"])
+        assert 2 in s and "a" in s
+        s = set(["a", "b"])
+        s.add(1.5)
+        assert s == set(["a", "b", 1.5])
+
+    def test_int_set_lookup_with_equal_numbers(self):
+        s = set([1, 2, 3])
+        assert 2.0 in s
+        assert 2L in s
+        assert True in s
+        assert "2" not in s
+        s.remove(3.0)
+        assert s == set([1, 2])
+        raises(TypeError, s.__contains__, [])
+        raises(TypeError, set().__contains__, [])
+        raises(TypeError, set().remove, [])
+
+    def test_operations_mixed_strategies(self):
+        ints = set([1, 2, 3])
+        strs = set(["a", "b"])
+        objs = set([2.0, "a", (1,)])
+        assert ints | strs == set([1, 2, 3, "a", "b"])
+        assert ints & strs == set()
+        assert ints - strs == ints
+        assert ints ^ strs == set([1, 2, 3, "a", "b"])
+        assert ints & objs == set([2])
+        assert ints - objs == set([1, 3])
+        assert strs - objs == set(["b"])
+        assert objs - ints == set(["a", (1,)])
+        assert ints ^ objs == set([1, 3, "a", (1,)])
+        assert ints.isdisjoint(strs)
+        assert not ints.isdisjoint(objs)
+        assert set([2]) <= ints
+        assert set([2.0]) <= ints
+        assert not strs <= ints
+        assert set() <= strs
+        assert frozenset([1, 2]) == set([1.0, 2.0])
+        assert set() == frozenset()
+
+    def test_inplace_mixed_strategies(self):
+        s = set([1, 2, 3])
+        s |= set(["a"])
+        assert s == set([1, 2, 3, "a"])
+        s -= set([1.0])
+        assert s == set([2, 3, "a"])
+        s &= set([2, "a", "b"])
+        assert s == set([2, "a"])
+        s ^= set([2, 7])
+        assert s == set(["a", 7])
+
+    def test_pop_and_iter_unboxed(self):
+        s = set([1, 2, 3])
+        assert sorted(s) == [1, 2, 3]
+        items = [s.pop(), s.pop(), s.pop()]
+        assert sorted(items) == [1, 2, 3]
+        raises(KeyError, s.pop)
+        s = set(["a", "b"])
+        assert sorted(s) == ["a", "b"]
+
+    def test_changed_size_during_iteration(self):
+        s = set([1, 2, 3])
+        it = iter(s)
+        it.next()
+        s.add("a")
+        raises(RuntimeError, it.next)
+
+    def test_frozenset_hash_independent_of_strategy(self):
+        assert hash(frozenset([1, 2, 3])) == hash(frozenset([3, 2, 1.0]))
+        assert hash(frozenset("abc")) == hash(frozenset(["a", "b", "c"]))
+        d = {frozenset([1, 2]): 5}
+        assert d[frozenset([1.0, 2])] == 5
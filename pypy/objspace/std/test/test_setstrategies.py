@@ -0,0 +1,163 @@
+from pypy.objspace.std.setobject import W_SetObject, W_FrozensetObject
+from pypy.objspace.std.setobject import EmptySetStrategy, ObjectSetStrategy, \
+     IntegerSetStrategy, StringSetStrategy
+
+
+class TestW_SetStrategies:
+
+    def wrapped(self, l):
+        return self.space.newlist([self.space.wrap(x) for x in l])
+
+    def test_from_list(self):
+        s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        assert s.strategy is self.space.fromcache(IntegerSetStrategy)
+
+        s = W_SetObject(self.space, self.wrapped([1,"two",3,"four",5]))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+
+        s = W_SetObject(self.space, self.wrapped(["one", "two"]))
+        assert s.strategy is self.space.fromcache(StringSetStrategy)
+
+        s = W_SetObject(self.space)
+        assert s.strategy is self.space.fromcache(EmptySetStrategy)
+
+        s = W_SetObject(self.space, self.wrapped([]))
+        assert s.strategy is self.space.fromcache(EmptySetStrategy)
+
+        s = W_SetObject(self.space, self.space.wrap((1, 2)))
+        assert s.strategy is self.space.fromcache(IntegerSetStrategy)
+
+    def test_bool_is_not_unboxed(self):
+        space = self.space
+        s = W_SetObject(space, space.newlist([space.w_True, space.wrap(2)]))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+
+    def test_switch_to_object(self):
+        s = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s.add(self.space.wrap("six"))
+        assert s.strategy is self.space.fromcache(ObjectSetStrategy)
+        assert s.length() == 6
+
+        s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s2 = W_SetObject(self.space, self.wrapped(["six", "seven"]))
+        s1.update(s2)
+        assert s1.strategy is self.space.fromcache(ObjectSetStrategy)
+        assert s1.length() == 7
+
+    def test_empty_to_typed(self):
+        space = self.space
+        s = W_SetObject(space)
+        s.add(space.wrap(1))
+        assert s.strategy is space.fromcache(IntegerSetStrategy)
+        s = W_SetObject(space)
+        s.add(space.wrap("a"))
+        assert s.strategy is space.fromcache(StringSetStrategy)
+        s = W_SetObject(space)
+        s.add(space.wrap(1.5))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+        s = W_SetObject(space)
+        s.update(W_SetObject(space, self.wrapped([1, 2])))
+        assert s.strategy is space.fromcache(IntegerSetStrategy)
+
+    def test_clear_goes_back_to_empty(self):
+        s = W_SetObject(self.space, self.wrapped([1, "a"]))
+        s.clear()
+        assert s.strategy is self.space.fromcache(EmptySetStrategy)
+        s.add(self.space.wrap(1))
+        assert s.strategy is self.space.fromcache(IntegerSetStrategy)
+
+    def test_lookup_of_other_types(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([1, 2, 3]))
+        # strings are never equal to ints: no need to switch
+        assert not s.has_key(space.wrap("a"))
+        assert not s.remove(space.wrap("a"))
+        assert s.strategy is space.fromcache(IntegerSetStrategy)
+        # but floats can be
+        assert s.has_key(space.wrap(2.0))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+
+    def test_symmetric_difference(self):
+        s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s2 = W_SetObject(self.space, self.wrapped([4,5,6,7]))
+        s3 = s1.symmetric_difference(s2)
+        assert s3.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert self.space.unwrap(s3) == set([1, 2, 3, 6, 7])
+
+        s1.symmetric_difference_update(s2)
+        assert s1.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert s1.equals(s3)
+
+    def test_intersection(self):
+        s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s2 = W_SetObject(self.space, self.wrapped([4,5,"six","seven"]))
+        s3 = s1.intersect(s2)
+        assert self.space.unwrap(s3) == set([4, 5])
+
+        s4 = W_SetObject(self.space, self.wrapped([4,5,6,7]))
+        s5 = s1.intersect(s4)
+        assert s5.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert self.space.unwrap(s5) == set([4, 5])
+
+        s6 = W_SetObject(self.space, self.wrapped(["a", "b"]))
+        s7 = s1.intersect(s6)
+        assert s7.length() == 0
+
+        s1.intersect_update(s4)
+        assert s1.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert self.space.unwrap(s1) == set([4, 5])
+
+    def test_difference(self):
+        s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s2 = W_SetObject(self.space, self.wrapped([4,5,6,7]))
+        s3 = s1.difference(s2)
+        assert s3.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert self.space.unwrap(s3) == set([1, 2, 3])
+
+        s1.difference_update(s2)
+        assert s1.strategy is self.space.fromcache(IntegerSetStrategy)
+        assert self.space.unwrap(s1) == set([1, 2, 3])
+
+        s4 = W_SetObject(self.space, self.wrapped(["a", "b"]))
+        s5 = s4.difference(s1)
+        assert s5.strategy is self.space.fromcache(StringSetStrategy)
+        assert s5.equals(s4)
+
+    def test_subset_and_disjoint(self):
+        s1 = W_SetObject(self.space, self.wrapped([1,2,3,4,5]))
+        s2 = W_SetObject(self.space, self.wrapped([1,2]))
+        s3 = W_SetObject(self.space, self.wrapped(["a", "b"]))
+        assert s2.issubset(s1)
+        assert not s1.issubset(s2)
+        assert not s3.issubset(s1)
+        assert s1.isdisjoint(s3)
+        assert not s1.isdisjoint(s2)
+        assert s1.strategy is self.space.fromcache(IntegerSetStrategy)
+
+    def test_copy_is_independent(self):
+        s1 = W_SetObject(self.space, self.wrapped([1, 2]))
+        s2 = s1.copy_real()
+        s2.add(self.space.wrap(3))
+        assert s1.length() == 2
+        assert s2.length() == 3
+        f = W_FrozensetObject(self.space, s1)
+        assert f.strategy is s1.strategy
+        s1.add(self.space.wrap("a"))
+        assert f.length() == 2
+        assert f.strategy is self.space.fromcache(IntegerSetStrategy)
+
+    def test_listview(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped(["a", "b"]))
+        assert sorted(space.listview_str(s)) == ["a", "b"]
+        assert space.listview_int(s) is None
+        s = W_SetObject(space, self.wrapped([2, 1]))
+        assert sorted(space.listview_int(s)) == [1, 2]
+        assert space.listview_str(s) is None
+
+    def test_iter(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([1, 2]))
+        w_iter = space.iter(s)
+        items = [space.int_w(space.next(w_iter)), space.int_w(space.next(w_iter))]
+        assert sorted(items) == [1, 2]
@@ -495,7 +495,8 @@ class AppTestStringObject:
         assert "".join([]) == ""
         assert "-".join(['a', 'b']) == 'a-b'
         text = 'text'
-        assert "".join([text]) is text
+        assert "".join([text]) == text
+        assert "".join((text,)) is text
         raises(TypeError, ''.join, 1)
         raises(TypeError, ''.join, [1])
         raises(TypeError, ''.join, [[1]])
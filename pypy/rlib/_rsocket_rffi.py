@@ -16,6 +16,7 @@ _MSVC  = target_platform.name == "msvc"
 _MINGW = target_platform.name == "mingw32"
 _SOLARIS = sys.platform == "sunos5"
 _MACOSX = sys.platform == "darwin"
+_LINUX = sys.platform.startswith("linux")
 
 if _POSIX:
     includes = ('sys/types.h',
@@ -24,6 +25,7 @@ if _POSIX:
                 'sys/poll.h',
                 'sys/select.h',
                 'sys/types.h',
+                'sys/uio.h',
                 'netinet/in.h',
                 'netinet/tcp.h',
                 'unistd.h',
@@ -320,6 +322,19 @@ if _POSIX:
                                              ('events', rffi.SHORT),
                                              ('revents', rffi.SHORT)])
 
+    CConfig.iovec = platform.Struct('struct iovec',
+                                    [('iov_base', rffi.VOIDP),
+                                     ('iov_len', rffi.SIZE_T)])
+    CConfig.msghdr = platform.Struct('struct msghdr',
+                                     [('msg_name', rffi.VOIDP),
+                                      ('msg_namelen', rffi.INT),
+                                      ('msg_iov', rffi.VOIDP),
+                                      ('msg_iovlen', rffi.SIZE_T),
+                                      ('msg_control', rffi.VOIDP),
+                                      ('msg_controllen', rffi.SIZE_T),
+                                      ('msg_flags', rffi.INT)])
+    CConfig.off_t = platform.SimpleType('off_t', rffi.LONG)
+
     CConfig.sockaddr_ll = platform.Struct('struct sockaddr_ll',
                               [('sll_ifindex', rffi.INT),
                                ('sll_protocol', rffi.INT),
@@ -439,6 +454,9 @@ addrinfo = cConfig.addrinfo
 if _POSIX:
     nfds_t = cConfig.nfds_t
     pollfd = cConfig.pollfd
+    iovec = cConfig.iovec
+    msghdr = cConfig.msghdr
+    off_t = cConfig.off_t
     if cConfig.sockaddr_ll is not None:
         sockaddr_ll = cConfig.sockaddr_ll
     ifreq = cConfig.ifreq
@@ -547,6 +565,11 @@ if _POSIX:
     if ifreq is not None:
         ioctl = external('ioctl', [socketfd_type, rffi.INT, lltype.Ptr(ifreq)],
                          rffi.INT)
+    iovecarray = rffi.CArray(iovec)
+    sendmsg = external('sendmsg', [socketfd_type, lltype.Ptr(msghdr),
+                                   rffi.INT], ssize_t)
+    recvmsg = external('recvmsg', [socketfd_type, lltype.Ptr(msghdr),
+                                   rffi.INT], ssize_t)
 
 if _WIN32:
     ioctlsocket = external('ioctlsocket',
@@ -300,8 +300,13 @@ PARAMETERS = {'threshold': 1032, # just above 1024
               'retrace_limit': 5,
               'max_retrace_guards': 15,
               'enable_opts': 'all',
+              'defer_compile': 0,
+              'warmup_cache': '',   # file remembering the hot loops
               }
 unroll_parameters = unrolling_iterable(PARAMETERS.items())
+
+def is_string_parameter(name):
+    return isinstance(PARAMETERS[name], str)
 DEFAULT = object()
 
 # ____________________________________________________________
@@ -392,15 +397,12 @@ class JitDriver(object):
                 raise ValueError
             name = parts[0]
             value = parts[1]
-            if name == 'enable_opts':
-                self.set_param('enable_opts', value)
-            else:
-                for name1, _ in unroll_parameters:
-                    if name1 == name and name1 != 'enable_opts':
-                        try:
-                            self.set_param(name1, int(value))
-                        except ValueError:
-                            raise
+            for name1, default in unroll_parameters:
+                if name1 == name:
+                    if isinstance(default, str):
+                        self.set_param(name1, value)
+                    else:
+                        self.set_param(name1, int(value))
     set_user_param._annspecialcase_ = 'specialize:arg(0)'
 
 
@@ -615,7 +617,7 @@ class ExtSetParam(ExtRegistryEntry):
         from pypy.annotation import model as annmodel
         assert s_name.is_constant()
         if not self.bookkeeper.immutablevalue(DEFAULT).contains(s_value):
-            if s_name.const == 'enable_opts':
+            if is_string_parameter(s_name.const):
                 assert annmodel.SomeString(can_be_None=True).contains(s_value)
             else:
                 assert annmodel.SomeInteger().contains(s_value)
@@ -629,7 +631,7 @@ class ExtSetParam(ExtRegistryEntry):
         hop.exception_cannot_occur()
         driver = self.instance.im_self
         name = hop.args_s[0].const
-        if name == 'enable_opts':
+        if is_string_parameter(name):
             repr = string_repr
         else:
             repr = lltype.Signed
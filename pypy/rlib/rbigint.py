@@ -4,6 +4,7 @@ from pypy.rlib.rarithmetic import most_neg_value_of_same_type
 from pypy.rlib.rfloat import isfinite
 from pypy.rlib.debug import make_sure_not_resized, check_regular_int
 from pypy.rlib.objectmodel import we_are_translated, specialize
+from pypy.rlib.rstring import StringBuilder
 from pypy.rlib import jit
 from pypy.rpython.lltypesystem import lltype, rffi
 from pypy.rpython import extregistry
@@ -42,6 +43,27 @@ KARATSUBA_SQUARE_CUTOFF = 2 * KARATSUBA_CUTOFF
 
 ## FIVEARY_CUTOFF = 8   disabled for now
 
+# For even larger numbers, Toom-Cook 3-way multiplication replaces
+# Karatsuba when both operands contain more than TOOMCOOK_CUTOFF digits.
+
+USE_TOOMCOOK = True # set to False for comparison
+TOOMCOOK_CUTOFF = 300
+
+# For long division, use the recursive algorithm of Burnikel and Ziegler
+# when both the divisor and the quotient have more than DIVISION_CUTOFF
+# digits.  It is only faster than the school algorithm because of the
+# subquadratic multiplications above.
+
+DIVISION_CUTOFF = 2 * KARATSUBA_CUTOFF
+
+# Conversions to and from strings in a base which is not a power of 2
+# are done by divide-and-conquer for numbers of more than FORMAT_CUTOFF
+# digits, respectively strings of more than PARSE_CUTOFF groups of
+# digits (each group is turned into one digit of the intermediate base).
+
+FORMAT_CUTOFF = 2 * DIVISION_CUTOFF
+PARSE_CUTOFF = KARATSUBA_CUTOFF
+
 
 def _mask_digit(x):
     if not we_are_translated():
@@ -916,6 +938,9 @@ def _k_mul(a, b):
     if 2 * asize <= bsize:
         return _k_lopsided_mul(a, b)
 
+    if USE_TOOMCOOK and asize > TOOMCOOK_CUTOFF:
+        return _tc_mul(a, b)
+
     # Split a & b into hi & lo pieces.
     shift = bsize >> 1
     ah, al = _kmul_split(a, shift)
@@ -1094,6 +1119,100 @@ def _k_lopsided_mul(a, b):
     return ret
 
 
+def _tcmul_split(n, size):
+    """
+    A helper for Toom-Cook multiplication (_tc_mul).
+    Splits the bigint "n" in three pieces such that
+    abs(n) == (hi << 2*size) + (mid << size) + lo, viewing the shifts as
+    being by digits.  The sign bit is ignored, and the return values are
+    >= 0.
+    """
+    size_n = n.numdigits()
+    size_lo = min(size_n, size)
+    size_mid = min(size_n, 2 * size)
+
+    lo = rbigint(n._digits[:size_lo], 1)
+    mid = rbigint(n._digits[size_lo:size_mid], 1)
+    hi = rbigint(n._digits[size_mid:], 1)
+    lo._normalize()
+    mid._normalize()
+    hi._normalize()
+    return hi, mid, lo
+
+def _divexact3(n):
+    """ Divide n by 3, knowing that the remainder is zero. """
+    z, rem = _divrem1(n, 3)
+    assert rem == 0
+    z.sign *= n.sign
+    return z
+
+def _tc_mul(a, b):
+    """
+    Toom-Cook 3-way multiplication.  Ignores the input signs, and returns
+    the absolute value of the product.  The operands must have balanced
+    sizes, as in _k_mul().
+    """
+    asize = a.numdigits()
+    bsize = b.numdigits()
+    # a and b are seen as the values at X of the polynomials
+    # a2*x**2 + a1*x + a0 and b2*x**2 + b1*x + b0, where X is a power of
+    # 2.  The product polynomial, of degree 4, is computed from its values
+    # at the points 0, 1, -1, -2 and infinity, which takes 5 multiplies of
+    # numbers of a third of the size.  The evaluation and interpolation
+    # sequences are the ones of Marco Bodrato.
+    if asize > bsize:
+        a, b, asize, bsize = b, a, bsize, asize
+    shift = (bsize + 2) // 3
+    a2, a1, a0 = _tcmul_split(a, shift)
+    if a is b:
+        b2, b1, b0 = a2, a1, a0
+    else:
+        b2, b1, b0 = _tcmul_split(b, shift)
+
+    # 1. Evaluation.  The values at -1 and -2 can be negative.
+    t = a0.add(a2)
+    pa1 = t.add(a1)
+    pam1 = t.sub(a1)
+    pam2 = pam1.add(a2).lshift(1).sub(a0)
+    if a is b:
+        pb1, pbm1, pbm2 = pa1, pam1, pam2
+    else:
+        t = b0.add(b2)
+        pb1 = t.add(b1)
+        pbm1 = t.sub(b1)
+        pbm2 = pbm1.add(b2).lshift(1).sub(b0)
+    del t
+
+    # 2. Pointwise multiplication.
+    r0 = a0.mul(b0)
+    r1 = pa1.mul(pb1)
+    rm1 = pam1.mul(pbm1)
+    rm2 = pam2.mul(pbm2)
+    rinf = a2.mul(b2)
+
+    # 3. Interpolation.  All the divisions are exact.
+    r3 = _divexact3(rm2.sub(r1))
+    r1 = r1.sub(rm1).rshift(1)
+    r2 = rm1.sub(r0)
+    r3 = r2.sub(r3).rshift(1).add(rinf.lshift(1))
+    r2 = r2.add(r1).sub(rinf)
+    r1 = r1.sub(r3)
+
+    # 4. Recomposition: the coefficients r0...rinf are >= 0 and add up to
+    # the product, which fits in asize + bsize digits.
+    ret = rbigint([NULLDIGIT] * (asize + bsize), 1)
+    size = ret.numdigits()
+    for i, r in [(0, r0), (1, r1), (2, r2), (3, r3), (4, rinf)]:
+        assert r.sign >= 0
+        if r.sign == 0:
+            continue
+        ofs = i * shift
+        carry = _v_iadd(ret, ofs, size - ofs, r, r.numdigits())
+        assert carry == 0
+    ret._normalize()
+    return ret
+
+
 def _inplace_divrem1(pout, pin, n, size=0):
     """
     Divide bigint pin by non-zero digit n, storing quotient
@@ -1291,6 +1410,8 @@ def _divrem(a, b):
     if size_b == 1:
         z, urem = _divrem1(a, b.digit(0))
         rem = rbigint([_store_digit(urem)], int(urem != 0))
+    elif size_b > DIVISION_CUTOFF and size_a - size_b > DIVISION_CUTOFF:
+        z, rem = _divrem_recursive(a, b)
     else:
         z, rem = _x_divrem(a, b)
     # Set the signs.
@@ -1303,6 +1424,100 @@ def _divrem(a, b):
         rem.sign = - rem.sign
     return z, rem
 
+# Helpers for the recursive division.  The numbers are >= 0, and all the
+# shifts are by whole digits.
+
+def _digits_hi(x, n):
+    """ Return x >> (n*SHIFT). """
+    if n >= x.numdigits():
+        return rbigint()
+    z = rbigint(x._digits[n:], 1)
+    z._normalize()
+    return z
+
+def _digits_lo(x, n):
+    """ Return x & ((1 << (n*SHIFT)) - 1). """
+    if n >= x.numdigits():
+        return x
+    z = rbigint(x._digits[:n], 1)
+    z._normalize()
+    return z
+
+def _digits_join(hi, lo, n):
+    """ Return (hi << (n*SHIFT)) + lo, where lo < (1 << (n*SHIFT)). """
+    if hi.sign == 0:
+        return lo
+    size_hi = hi.numdigits()
+    z = rbigint([NULLDIGIT] * (n + size_hi), 1)
+    z._digits[:lo.numdigits()] = lo._digits
+    z._digits[n:n + size_hi] = hi._digits
+    return z
+
+def _div2n1n(a, b, n):
+    """
+    Divide a by b, where b has n digits and is normalized (the highest bit
+    of its top digit is set), and a < (b << (n*SHIFT)).  Returns the
+    quotient and the remainder.
+    """
+    if a.numdigits() - n <= DIVISION_CUTOFF:
+        return _divrem(a, b)
+    pad = n & 1
+    if pad:
+        a = _digits_join(a, rbigint(), 1)
+        b = _digits_join(b, rbigint(), 1)
+        n += 1
+    half = n >> 1
+    b1 = _digits_hi(b, half)
+    b2 = _digits_lo(b, half)
+    q1, r = _div3n2n(_digits_hi(a, n), _digits_lo(_digits_hi(a, half), half),
+                     b, b1, b2, half)
+    q2, r = _div3n2n(r, _digits_lo(a, half), b, b1, b2, half)
+    if pad:
+        r = _digits_hi(r, 1)
+    return _digits_join(q1, q2, half), r
+
+def _div3n2n(a12, a3, b, b1, b2, n):
+    """ Helper for _div2n1n(): divide (a12 << (n*SHIFT)) + a3 by b, where
+    b == (b1 << (n*SHIFT)) + b2. """
+    if _digits_hi(a12, n).eq(b1):
+        # the quotient would not fit in n digits: use the largest one
+        q = rbigint([_store_digit(MASK)] * n, 1)
+        r = a12.sub(_digits_join(b1, rbigint(), n)).add(b1)
+    else:
+        q, r = _div2n1n(a12, b1, n)
+    r = _digits_join(r, a3, n).sub(q.mul(b2))
+    # the estimation of q can be too large by at most 2
+    while r.sign < 0:
+        q = q.sub(rbigint([ONEDIGIT], 1))
+        r = r.add(b)
+    return q, r
+
+def _divrem_recursive(a, b):
+    """
+    Unsigned bigint division with remainder, using the recursive algorithm
+    of Burnikel and Ziegler.  The school algorithm is applied to a seen as
+    a sequence of "big digits" of the size of b, and each of these steps
+    is done recursively by _div2n1n().
+    """
+    # normalize: the highest bit of the top digit of b must be set
+    shift = SHIFT - bits_in_digit(b.digit(b.numdigits() - 1))
+    a = rbigint(a._digits, 1).lshift(shift)
+    b = rbigint(b._digits, 1).lshift(shift)
+    n = b.numdigits()
+    size_a = a.numdigits()
+    z = rbigint([NULLDIGIT] * size_a, 1)
+    rem = rbigint()
+    i = (size_a - 1) // n * n
+    while i >= 0:
+        # here rem < b, so that the division below fits in n digits
+        chunk = rbigint(a._digits[i:min(i + n, size_a)], 1)
+        chunk._normalize()
+        q, rem = _div2n1n(_digits_join(rem, chunk, n), b, n)
+        z._digits[i:i + q.numdigits()] = q._digits
+        i -= n
+    z._normalize()
+    return z, rem.rshift(shift)
+
 # ______________ conversions to double _______________
 
 def _AsScaledDouble(v):
@@ -1583,6 +1798,8 @@ def _format(a, digits, prefix='', suffix=''):
 
     base = len(digits)
     assert base >= 2 and base <= 36
+    if size_a > FORMAT_CUTOFF and (base & (base - 1)) != 0:
+        return _format_big(a, digits, prefix, suffix)
 
     # Compute a rough upper bound for the length of the string
     i = base
@@ -1691,6 +1908,59 @@ def _format(a, digits, prefix='', suffix=''):
     return ''.join(s[p:])
 
 
+def _format_big(a, digits, prefix, suffix):
+    """
+    Divide-and-conquer version of _format(), for huge numbers and a base
+    which is not a power of 2.  The number is split by divmod() with
+    pts[i] == base ** (leaf_len * 2**i), recursively, until the pieces
+    are small enough for _format().
+    """
+    base = len(digits)
+    # powbase <- largest power of base that fits in a digit.
+    powbase = base
+    power = 1
+    while powbase <= MASK // base:
+        powbase *= base
+        power += 1
+    leaf = FORMAT_CUTOFF // 2
+    leaf_len = power * leaf
+    pts = [rbigint.fromint(powbase).pow(rbigint.fromint(leaf))]
+    # a < pts[-1] ** 2 when the loop stops
+    size_a = a.numdigits()
+    while 2 * pts[-1].numdigits() - 2 < size_a:
+        pts.append(pts[-1].mul(pts[-1]))
+
+    output = StringBuilder(size_a * SHIFT // 3 + len(prefix) + len(suffix))
+    if a.sign < 0:
+        output.append('-')
+    output.append(prefix)
+    _format_recursive(rbigint(a._digits, 1), len(pts) - 1, output, pts,
+                      digits, leaf_len, True)
+    output.append(suffix)
+    return output.build()
+
+def _format_recursive(x, i, output, pts, digits, leaf_len, leading):
+    # x < pts[i + 1]; if 'leading' is False, x is padded with zeroes to
+    # leaf_len * 2**(i + 1) characters
+    if i < 0:
+        if x.sign == 0:
+            # _format() would give '0' instead of digits[0]
+            assert not leading
+            output.append_multiple_char(digits[0], leaf_len)
+            return
+        s = _format(x, digits)
+        if not leading:
+            output.append_multiple_char(digits[0], leaf_len - len(s))
+        output.append(s)
+        return
+    top, bot = x.divmod(pts[i])
+    if leading and top.sign == 0:
+        _format_recursive(bot, i - 1, output, pts, digits, leaf_len, True)
+    else:
+        _format_recursive(top, i - 1, output, pts, digits, leaf_len, leading)
+        _format_recursive(bot, i - 1, output, pts, digits, leaf_len, False)
+
+
 def _bitwise(a, op, b): # '&', '|', '^'
     """ Bitwise and/or/xor operations """
 
@@ -1869,7 +2139,7 @@ def _decimalstr_to_bigint(s):
     elif s[p] == '+':
         p += 1
 
-    a = rbigint()
+    chunks = []
     tens = 1
     dig = 0
     ord0 = ord('0')
@@ -1877,30 +2147,63 @@ def _decimalstr_to_bigint(s):
         dig = dig * 10 + ord(s[p]) - ord0
         p += 1
         tens *= 10
-        if tens == DEC_MAX or p == lim:
-            a = _muladd1(a, tens, dig)
+        if tens == DEC_MAX:
+            chunks.append(dig)
             tens = 1
             dig = 0
+    a = _chunks_to_bigint(chunks, 0, len(chunks), DEC_MAX, [])
+    a = _muladd1(a, tens, dig)
     if sign and a.sign == 1:
         a.sign = -1
     return a
 
 def parse_digit_string(parser):
     # helper for objspace.std.strutil
-    a = rbigint()
     base = parser.base
     digitmax = BASE_MAX[base]
+    chunks = []
     tens, dig = 1, 0
     while True:
         digit = parser.next_digit()
-        if tens == digitmax or digit < 0:
-            a = _muladd1(a, tens, dig)
-            if digit < 0:
-                break
+        if digit < 0:
+            break
+        if tens == digitmax:
+            chunks.append(dig)
             dig = digit
             tens = base
         else:
             dig = dig * base + digit
             tens *= base
+    a = _chunks_to_bigint(chunks, 0, len(chunks), digitmax, [])
+    a = _muladd1(a, tens, dig)
     a.sign *= parser.sign
     return a
+
+def _chunks_to_bigint(chunks, start, stop, chunkmax, powers):
+    """
+    Turn chunks[start:stop], the digits of a number in base 'chunkmax'
+    (most significant first), into a bigint.  Long sequences are split in
+    two halves which are combined with one multiplication, so that the
+    fast multiplications are used.  powers[k] caches the value of
+    chunkmax ** (PARSE_CUTOFF * 2**k).
+    """
+    n = stop - start
+    if n <= PARSE_CUTOFF:
+        a = rbigint()
+        for i in range(start, stop):
+            a = _muladd1(a, chunkmax, chunks[i])
+        return a
+    # the low half has PARSE_CUTOFF * 2**k chunks
+    k = 0
+    size_lo = PARSE_CUTOFF
+    while 2 * size_lo < n:
+        size_lo *= 2
+        k += 1
+    if not powers:
+        powers.append(rbigint.fromint(chunkmax).pow(
+                          rbigint.fromint(PARSE_CUTOFF)))
+    while len(powers) <= k:
+        powers.append(powers[-1].mul(powers[-1]))
+    hi = _chunks_to_bigint(chunks, start, stop - size_lo, chunkmax, powers)
+    lo = _chunks_to_bigint(chunks, stop - size_lo, stop, chunkmax, powers)
+    return hi.mul(powers[k]).add(lo)
@@ -14,6 +14,14 @@ def set_max_heap_size(nbytes):
     """
     pass
 
+def freeze():
+    """Make all the objects that are currently alive immortal, and avoid
+    writing to them in the future collections, so that the memory they
+    use can stay shared with the processes forked afterwards.
+    So far only implemented by the minimark GC.
+    """
+    pass
+
 # ____________________________________________________________
 # Framework GC features
 
@@ -157,6 +165,17 @@ class CollectEntry(ExtRegistryEntry):
             args_v = hop.inputargs(lltype.Signed)
         return hop.genop('gc__collect', args_v, resulttype=hop.r_result)
     
+class FreezeEntry(ExtRegistryEntry):
+    _about_ = freeze
+
+    def compute_result_annotation(self):
+        from pypy.annotation import model as annmodel
+        return annmodel.s_None
+
+    def specialize_call(self, hop):
+        hop.exception_cannot_occur()
+        return hop.genop('gc_freeze', [], resulttype=hop.r_result)
+
 class SetMaxHeapSizeEntry(ExtRegistryEntry):
     _about_ = set_max_heap_size
 
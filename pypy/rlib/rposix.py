@@ -1,4 +1,4 @@
-import os
+import os, sys
 from pypy.rpython.lltypesystem.rffi import CConstant, CExternVariable, INT
 from pypy.rpython.lltypesystem import lltype, ll2ctypes, rffi
 from pypy.translator.tool.cbuild import ExternalCompilationInfo
@@ -44,6 +44,27 @@ def closerange(fd_low, fd_high):
         except OSError:
             pass
 
+if sys.platform.startswith('linux'):
+    # sendfile64() takes a 64-bit offset whatever the size of off_t
+    _sendfile_eci = ExternalCompilationInfo(includes=['sys/sendfile.h'])
+    c_sendfile = rffi.llexternal('sendfile64',
+                                 [INT, INT, rffi.CArrayPtr(rffi.LONGLONG),
+                                  rffi.SIZE_T], rffi.SSIZE_T,
+                                 compilation_info=_sendfile_eci)
+
+    def sendfile(out_fd, in_fd, offset, count):
+        """Copy up to 'count' bytes from the file 'in_fd', starting at
+        'offset', to 'out_fd' inside the kernel.  Return the number of
+        bytes copied."""
+        with lltype.scoped_alloc(rffi.CArray(rffi.LONGLONG), 1) as offset_p:
+            offset_p[0] = rffi.cast(rffi.LONGLONG, offset)
+            res = c_sendfile(rffi.cast(INT, out_fd), rffi.cast(INT, in_fd),
+                             offset_p, rffi.cast(rffi.SIZE_T, count))
+        res = intmask(res)
+        if res < 0:
+            raise OSError(get_errno(), "sendfile failed")
+        return res
+
 #___________________________________________________________________
 # Wrappers around posix functions, that accept either strings, or
 # instances with a "as_bytes()" method.
@@ -15,7 +15,7 @@ a drop-in replacement for the 'socket' module.
 # app-level code for PyPy.
 
 from pypy.rlib.objectmodel import instantiate, keepalive_until_here
-from pypy.rlib import _rsocket_rffi as _c
+from pypy.rlib import _rsocket_rffi as _c, rposix
 from pypy.rlib.rarithmetic import intmask
 from pypy.rpython.lltypesystem import lltype, rffi
 from pypy.rpython.lltypesystem.rffi import sizeof, offsetof
@@ -938,10 +938,33 @@ class RSocket(object):
                 rffi.keep_buffer_alive_until_here(raw_buf, gc_buf)
         raise self.error_handler()
 
+    def recv_raw(self, dataptr, nbytes, flags=0):
+        """Receive up to nbytes bytes into a raw CCHARP buffer."""
+        res = -1
+        timeout = self._select(False)
+        if timeout == 1:
+            raise SocketTimeout
+        elif timeout == 0:
+            res = _c.socketrecv(self.fd, dataptr, nbytes, flags)
+        if res < 0:
+            raise self.error_handler()
+        return res
+
     def recvinto(self, rwbuffer, nbytes, flags=0):
-        buf = self.recv(nbytes, flags)
-        rwbuffer.setslice(0, buf)
-        return len(buf)
+        try:
+            # the memory must stay valid while the GIL is released
+            rawbuf = rwbuffer.lock_raw_address()
+        except ValueError:
+            buf = self.recv(nbytes, flags)
+            rwbuffer.setslice(0, buf)
+            return len(buf)
+        # receive directly into the memory of the buffer
+        try:
+            res = self.recv_raw(rawbuf, nbytes, flags)
+        finally:
+            rwbuffer.unlock_raw_address()
+        keepalive_until_here(rwbuffer)
+        return res
 
     def recvfrom(self, buffersize, flags=0):
         """Like recv(buffersize, flags) but also return the sender's
@@ -1006,21 +1029,25 @@ class RSocket(object):
         to tell how much data has been sent."""
         dataptr = rffi.get_nonmovingbuffer(data)
         try:
-            remaining = len(data)
-            p = dataptr
-            while remaining > 0:
-                try:
-                    res = self.send_raw(p, remaining, flags)
-                    p = rffi.ptradd(p, res)
-                    remaining -= res
-                except CSocketError, e:
-                    if e.errno != _c.EINTR:
-                        raise
-                if signal_checker:
-                    signal_checker.check()
+            self.sendall_raw(dataptr, len(data), flags, signal_checker)
         finally:
             rffi.free_nonmovingbuffer(data, dataptr)
 
+    def sendall_raw(self, dataptr, length, flags=0, signal_checker=None):
+        """Send 'length' bytes from a CCHARP buffer, calling send_raw()
+        repeatedly with an offset into the buffer."""
+        offset = 0
+        while offset < length:
+            try:
+                res = self.send_raw(rffi.ptradd(dataptr, offset),
+                                    length - offset, flags)
+                offset += res
+            except CSocketError, e:
+                if e.errno != _c.EINTR:
+                    raise
+            if signal_checker:
+                signal_checker.check()
+
     def sendto(self, data, flags, address):
         """Like send(data, flags) but allows specifying the destination
         address.  (Note that 'flags' is mandatory here.)"""
@@ -1037,6 +1064,123 @@ class RSocket(object):
             raise self.error_handler()
         return res
 
+    if hasattr(_c, 'sendmsg'):
+        def sendmsg_raw(self, dataptrs, lengths, flags=0, address=None):
+            """Send the data of several CCHARP buffers with a single
+            sendmsg() call, optionally to the given address.  Return the
+            number of bytes sent."""
+            res = -1
+            timeout = self._select(True)
+            if timeout == 1:
+                raise SocketTimeout
+            elif timeout == 0:
+                n = len(dataptrs)
+                iov = lltype.malloc(_c.iovecarray, n, flavor='raw')
+                msg = lltype.malloc(_c.msghdr, flavor='raw', zero=True)
+                try:
+                    _fill_iovec(iov, dataptrs, lengths)
+                    msg.c_msg_iov = rffi.cast(rffi.VOIDP, iov)
+                    rffi.setintfield(msg, 'c_msg_iovlen', n)
+                    if address is not None:
+                        addr = address.lock()
+                        msg.c_msg_name = rffi.cast(rffi.VOIDP, addr)
+                        rffi.setintfield(msg, 'c_msg_namelen',
+                                         address.addrlen)
+                        try:
+                            res = _c.sendmsg(self.fd, msg, flags)
+                        finally:
+                            address.unlock()
+                    else:
+                        res = _c.sendmsg(self.fd, msg, flags)
+                finally:
+                    lltype.free(msg, flavor='raw')
+                    lltype.free(iov, flavor='raw')
+            if res < 0:
+                raise self.error_handler()
+            return res
+
+        def sendmsg(self, messages, flags=0, address=None):
+            """Send a list of strings with a single sendmsg() call,
+            without concatenating them first.  Return the number of bytes
+            sent; like send(), this may be less than the total length."""
+            n = len(messages)
+            dataptrs = [lltype.nullptr(rffi.CCHARP.TO)] * n
+            lengths = [0] * n
+            try:
+                for i in range(n):
+                    dataptrs[i] = rffi.get_nonmovingbuffer(messages[i])
+                    lengths[i] = len(messages[i])
+                return self.sendmsg_raw(dataptrs, lengths, flags, address)
+            finally:
+                for i in range(n):
+                    if dataptrs[i]:
+                        rffi.free_nonmovingbuffer(messages[i], dataptrs[i])
+
+    if hasattr(_c, 'recvmsg'):
+        def recvmsg_raw(self, dataptrs, lengths, flags=0):
+            """Receive data into several CCHARP buffers with a single
+            recvmsg() call.  Return (number of bytes received, msg_flags,
+            sender's address or None)."""
+            read_bytes = -1
+            timeout = self._select(False)
+            if timeout == 1:
+                raise SocketTimeout
+            elif timeout == 0:
+                n = len(dataptrs)
+                iov = lltype.malloc(_c.iovecarray, n, flavor='raw')
+                msg = lltype.malloc(_c.msghdr, flavor='raw', zero=True)
+                address, addr_p, addrlen_p = self._addrbuf()
+                try:
+                    _fill_iovec(iov, dataptrs, lengths)
+                    msg.c_msg_iov = rffi.cast(rffi.VOIDP, iov)
+                    rffi.setintfield(msg, 'c_msg_iovlen', n)
+                    msg.c_msg_name = rffi.cast(rffi.VOIDP, addr_p)
+                    rffi.setintfield(msg, 'c_msg_namelen',
+                                     rffi.cast(lltype.Signed, addrlen_p[0]))
+                    read_bytes = _c.recvmsg(self.fd, msg, flags)
+                    addrlen = rffi.getintfield(msg, 'c_msg_namelen')
+                    msg_flags = rffi.getintfield(msg, 'c_msg_flags')
+                finally:
+                    lltype.free(addrlen_p, flavor='raw')
+                    address.unlock()
+                    lltype.free(msg, flavor='raw')
+                    lltype.free(iov, flavor='raw')
+                if read_bytes >= 0:
+                    if addrlen:
+                        address.addrlen = addrlen
+                    else:
+                        address = None
+                    return (read_bytes, msg_flags, address)
+            raise self.error_handler()
+
+        def recvmsg(self, buffersize, flags=0):
+            """Like recvfrom(), but with recvmsg(): return (data,
+            msg_flags, sender's address or None)."""
+            raw_buf, gc_buf = rffi.alloc_buffer(buffersize)
+            try:
+                read_bytes, msg_flags, address = self.recvmsg_raw(
+                    [raw_buf], [buffersize], flags)
+                data = rffi.str_from_buffer(raw_buf, gc_buf, buffersize,
+                                            read_bytes)
+            finally:
+                rffi.keep_buffer_alive_until_here(raw_buf, gc_buf)
+            return (data, msg_flags, address)
+
+    if hasattr(rposix, 'sendfile'):
+        def sendfile(self, in_fd, offset, count):
+            """Send up to 'count' bytes of the file 'in_fd', starting at
+            'offset', without copying them through user space.  Return
+            the number of bytes sent."""
+            timeout = self._select(True)
+            if timeout == 1:
+                raise SocketTimeout
+            elif timeout == -1:
+                raise self.error_handler()
+            try:
+                return rposix.sendfile(self.fd, in_fd, offset, count)
+            except OSError, e:
+                raise CSocketError(e.errno)
+
     def setblocking(self, block):
         if block:
             timeout = -1.0
@@ -1090,6 +1234,13 @@ def make_socket(fd, family, type, proto, SocketClass=RSocket):
     return result
 make_socket._annspecialcase_ = 'specialize:arg(4)'
 
+if hasattr(_c, 'iovecarray'):
+    def _fill_iovec(iov, dataptrs, lengths):
+        for i in range(len(dataptrs)):
+            v = iov[i]
+            v.c_iov_base = rffi.cast(rffi.VOIDP, dataptrs[i])
+            rffi.setintfield(v, 'c_iov_len', lengths[i])
+
 class SocketError(Exception):
     applevelerrcls = 'error'
     def __init__(self):
@@ -1,6 +1,7 @@
 
 from pypy.rlib.rstruct.nativefmttable import native_is_bigendian
 from pypy.rlib.unroll import unrolling_iterable
+from pypy.rlib import jit
 from pypy.rlib.rarithmetic import ovfcheck
 from pypy.rlib.rstruct.error import StructError
 from pypy.rlib.rstruct.standardfmttable import standard_fmttable
@@ -78,6 +79,37 @@ class FormatIterator(object):
                 self.operate(fmtdesc, repetitions)
         self.finished()
 
+    @jit.unroll_safe
+    def interpret_compiled(self, compiled):
+        # same as interpret(), but with a format string already parsed by
+        # compile_format().  If 'compiled' is a constant, the JIT unrolls
+        # the loop completely.
+        if compiled.native:
+            table = unroll_native_fmtdescs
+        else:
+            table = unroll_standard_fmtdescs
+        self.bigendian = compiled.bigendian
+        fmtchars = compiled.fmtchars
+        i = 0
+        while i < len(fmtchars):
+            c = fmtchars[i]
+            repetitions = compiled.repetitions[i]
+            i += 1
+            for fmtdesc in table:
+                if c == fmtdesc.fmtchar:
+                    if self._operate_is_specialized_:
+                        if fmtdesc.alignment > 1:
+                            self.align(fmtdesc.mask)
+                        self.operate(fmtdesc, repetitions)
+                    break
+            else:
+                raise StructError("bad char in struct format")
+            if not self._operate_is_specialized_:
+                if fmtdesc.alignment > 1:
+                    self.align(fmtdesc.mask)
+                self.operate(fmtdesc, repetitions)
+        self.finished()
+
     def finished(self):
         pass
 
@@ -99,6 +131,46 @@ class CalcSizeFormatIterator(FormatIterator):
             raise StructError("total struct size too long")
 
 
+class CompileFormatIterator(CalcSizeFormatIterator):
+
+    def __init__(self):
+        self.fmtchars = []
+        self.repetitions = []
+
+    def operate(self, fmtdesc, repetitions):
+        CalcSizeFormatIterator.operate(self, fmtdesc, repetitions)
+        self.fmtchars.append(fmtdesc.fmtchar)
+        self.repetitions.append(repetitions)
+
+
+class CompiledFormat(object):
+    """A format string parsed once and for all, for
+    FormatIterator.interpret_compiled(): the format characters with their
+    repetition counts, the byte order and the total size."""
+    _immutable_fields_ = ['native', 'bigendian', 'fmtchars',
+                          'repetitions[*]', 'size']
+
+    def __init__(self, native, bigendian, fmtchars, repetitions, size):
+        self.native = native
+        self.bigendian = bigendian
+        self.fmtchars = fmtchars
+        self.repetitions = repetitions
+        self.size = size
+
+def compile_format(fmt):
+    """Parse a format string into a CompiledFormat.  Raises StructError
+    if it is invalid."""
+    fmtiter = CompileFormatIterator()
+    fmtiter.interpret(fmt)
+    native = not (len(fmt) > 0 and fmt[0] in '=<>!')
+    repetitions = [0] * len(fmtiter.repetitions)
+    for i in range(len(repetitions)):
+        repetitions[i] = fmtiter.repetitions[i]
+    fmtchars = ''.join(fmtiter.fmtchars)
+    return CompiledFormat(native, fmtiter.bigendian, fmtchars, repetitions,
+                          fmtiter.totalsize)
+
+
 class FmtDesc(object):
     def __init__(self, fmtchar, attrs):
         self.fmtchar = fmtchar
@@ -569,6 +569,62 @@ class TestInternalFunctions(object):
         ret = lobj._k_lopsided_mul(f1, f2)
         assert ret.tolong() == f1.tolong() * f2.tolong()
 
+    def test__tc_mul(self):
+        digs = lobj.TOOMCOOK_CUTOFF + 5
+        f1 = bigint([lobj.MASK] * digs, 1)
+        f2 = lobj._x_add(f1, bigint([1], 1))
+        ret = lobj._tc_mul(f1, f2)
+        assert ret.tolong() == f1.tolong() * f2.tolong()
+        ret = lobj._tc_mul(f1, f1)
+        assert ret.tolong() == f1.tolong() ** 2
+
+    def test__tc_mul_random(self, monkeypatch):
+        monkeypatch.setattr(lobj, "KARATSUBA_CUTOFF", 3)
+        monkeypatch.setattr(lobj, "KARATSUBA_SQUARE_CUTOFF", 6)
+        monkeypatch.setattr(lobj, "TOOMCOOK_CUTOFF", 5)
+        for i in range(20):
+            x = long(randint(0, 1 << randint(1, 1500)))
+            y = long(randint(0, 1 << randint(750, 1500)))
+            f1 = rbigint.fromlong(x)
+            f2 = rbigint.fromlong(-y)
+            assert f1.mul(f2).tolong() == -x * y
+            assert f2.mul(f2).tolong() == y * y
+
+    def test__divrem_recursive(self, monkeypatch):
+        monkeypatch.setattr(lobj, "DIVISION_CUTOFF", 3)
+        for i in range(30):
+            x = long(randint(1, 1 << randint(1, 3000)))
+            y = long(randint(1, 1 << randint(1, 1500)))
+            for sx, sy in (1, 1), (1, -1), (-1, -1), (-1, 1):
+                f1 = rbigint.fromlong(sx * x)
+                f2 = rbigint.fromlong(sy * y)
+                div, rem = f1.divmod(f2)
+                assert (div.tolong(), rem.tolong()) == divmod(sx * x, sy * y)
+        # the quotient digits which need the correction in _div3n2n()
+        x = (1L << (SHIFT * 40)) - 1
+        y = (1L << (SHIFT * 8)) - 1
+        div, rem = lobj._divrem_recursive(rbigint.fromlong(x),
+                                          rbigint.fromlong(y))
+        assert (div.tolong(), rem.tolong()) == divmod(x, y)
+
+    def test_format_big(self, monkeypatch):
+        monkeypatch.setattr(lobj, "DIVISION_CUTOFF", 3)
+        monkeypatch.setattr(lobj, "FORMAT_CUTOFF", 6)
+        for x in [10L ** 300, 10L ** 300 - 1, 7L ** 500 + 10 ** 100,
+                  -(3L ** 777)]:
+            f1 = rbigint.fromlong(x)
+            assert f1.str() == str(x)
+            assert f1.repr() == repr(x)
+        x = rbigint.fromlong(-(12L ** 400))
+        assert x.format('abcdefghijkl', '<<', '>>') == (
+            '-<<b' + 'a' * 400 + '>>')
+
+    def test_fromdecimalstr_big(self, monkeypatch):
+        monkeypatch.setattr(lobj, "PARSE_CUTOFF", 2)
+        for x in [10L ** 300, 10L ** 300 - 1, 7L ** 500 + 10 ** 100,
+                  -(3L ** 777)]:
+            assert rbigint.fromdecimalstr(str(x)).tolong() == x
+
     def test_longlong(self):
         max = 1L << (r_longlong.BITS-1)
         f1 = rbigint.fromlong(max-1)    # fits in r_longlong
@@ -626,6 +682,19 @@ class TestInternalFunctions(object):
         x = parse_digit_string(Parser(7, -1, [0, 0, 0]))
         assert x.tobool() is False
 
+    def test_parse_digit_string_big(self, monkeypatch):
+        from pypy.rlib.rbigint import parse_digit_string
+        class Parser:
+            def __init__(self, base, sign, digits):
+                self.base = base
+                self.sign = sign
+                self.next_digit = iter(digits + [-1]).next
+        monkeypatch.setattr(lobj, "PARSE_CUTOFF", 2)
+        x = parse_digit_string(Parser(16, -1, range(15,-1,-1)*99))
+        assert x.eq(rbigint.fromlong(long('-0x' + 'FEDCBA9876543210'*99, 16)))
+        x = parse_digit_string(Parser(7, 1, [6] * 1000))
+        assert x.eq(rbigint.fromlong(7L ** 1000 - 1))
+
 
 BASE = 2 ** SHIFT
 
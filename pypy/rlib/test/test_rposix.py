@@ -131,3 +131,21 @@ class TestPosixUnicode:
                 os.rmdir(self.ufilename)
             except Exception:
                 pass
+
+def test_sendfile():
+    if not hasattr(rposix, 'sendfile'):
+        py.test.skip("no sendfile")
+    f = udir.join('test_rposix_sendfile').open('w+')
+    f.write('0123456789')
+    f.flush()
+    r, w = os.pipe()
+    try:
+        assert rposix.sendfile(w, f.fileno(), 2, 5) == 5
+        assert os.read(r, 100) == '23456'
+        assert rposix.sendfile(w, f.fileno(), 10, 5) == 0
+        assert f.tell() == 10
+        py.test.raises(OSError, rposix.sendfile, w, -1, 0, 1)
+    finally:
+        os.close(r)
+        os.close(w)
+        f.close()
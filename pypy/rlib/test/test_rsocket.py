@@ -1,6 +1,7 @@
 import py, errno, sys
 from pypy.rlib import rsocket
 from pypy.rlib.rsocket import *
+from pypy.rpython.lltypesystem import lltype, rffi
 from pypy.rpython.test.tool import BaseRtypingTest, LLRtypeMixin, OORtypeMixin
 import socket as cpy_socket
 
@@ -124,6 +125,9 @@ def test_socketpair_recvinto():
 
         def as_str(self):
             return self.x
+
+        def lock_raw_address(self):
+            raise ValueError
     
     if sys.platform == "win32":
         py.test.skip('No socketpair on Windows')
@@ -139,6 +143,67 @@ def test_socketpair_recvinto():
     s1.close()
     s2.close()
 
+def test_socketpair_recvinto_raw():
+    class RawBuffer:
+        def __init__(self, size):
+            self.raw = lltype.malloc(rffi.CCHARP.TO, size, flavor='raw')
+
+        def lock_raw_address(self):
+            self.locked = True
+            return self.raw
+
+        def unlock_raw_address(self):
+            self.locked = False
+
+    if sys.platform == "win32":
+        py.test.skip('No socketpair on Windows')
+    s1, s2 = socketpair()
+    buf = RawBuffer(10)
+    try:
+        s1.sendall('abc')
+        assert s2.recvinto(buf, 10) == 3
+        assert buf.locked is False
+        assert rffi.charpsize2str(buf.raw, 3) == 'abc'
+    finally:
+        lltype.free(buf.raw, flavor='raw')
+    s1.close()
+    s2.close()
+
+def test_socketpair_sendmsg_recvmsg():
+    if not hasattr(RSocket, 'sendmsg'):
+        py.test.skip('No sendmsg')
+    s1, s2 = socketpair()
+    assert s1.sendmsg(['abc', '', 'de', 'f']) == 6
+    data, flags, addr = s2.recvmsg(100)
+    assert data == 'abcdef'
+    assert flags == 0
+    s2.sendmsg(['xyz'])
+    bufs = [lltype.malloc(rffi.CCHARP.TO, 2, flavor='raw') for i in range(2)]
+    try:
+        nbytes, flags, addr = s1.recvmsg_raw(bufs, [2, 2])
+        assert nbytes == 3
+        assert rffi.charpsize2str(bufs[0], 2) == 'xy'
+        assert rffi.charpsize2str(bufs[1], 1) == 'z'
+    finally:
+        for buf in bufs:
+            lltype.free(buf, flavor='raw')
+    s1.close()
+    s2.close()
+
+def test_sendfile():
+    if not hasattr(RSocket, 'sendfile'):
+        py.test.skip('No sendfile')
+    from pypy.tool.udir import udir
+    f = udir.join('test_rsocket_sendfile').open('w+')
+    f.write('0123456789')
+    f.flush()
+    s1, s2 = socketpair()
+    assert s1.sendfile(f.fileno(), 2, 5) == 5
+    assert s2.recv(100) == '23456'
+    assert s1.sendfile(f.fileno(), 10, 5) == 0
+    f.close()
+    s1.close()
+    s2.close()
 
 def test_simple_tcp():
     import thread
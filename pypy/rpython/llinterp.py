@@ -799,6 +799,9 @@ class LLFrame(object):
     def op_gc__collect(self, *gen):
         self.heap.collect(*gen)
 
+    def op_gc_freeze(self):
+        self.heap.freeze()
+
     def op_gc_heap_stats(self):
         raise NotImplementedError
 
@@ -462,6 +462,7 @@ LL_OPERATIONS = {
                                  # allocating non-GC structures only
     'gc_obtain_free_space': LLOp(),
     'gc_set_max_heap_size': LLOp(),
+    'gc_freeze':            LLOp(canunwindgc=True),
     'gc_can_move'         : LLOp(sideeffects=False),
     'gc_thread_prepare'   : LLOp(canraise=(MemoryError,)),
                                  # ^^^ but canunwindgc=False, as it is
@@ -3,7 +3,7 @@ from pypy.annotation import model as annmodel
 from pypy.objspace.flow.model import Constant
 from pypy.rpython.rdict import AbstractDictRepr, AbstractDictIteratorRepr,\
      rtype_newdict
-from pypy.rpython.lltypesystem import lltype
+from pypy.rpython.lltypesystem import lltype, rstr
 from pypy.rlib.rarithmetic import r_uint, intmask, LONG_BIT
 from pypy.rlib.objectmodel import hlinvoke
 from pypy.rpython import robject
@@ -250,6 +250,11 @@ class DictRepr(AbstractDictRepr):
                                         l_dict.keyhash(llkey))
                 return l_dict
 
+    def has_string_keys(self):
+        # such dicts use the ll_strdict_xxx() helpers, known to the JIT
+        return (not self.custom_eq_hash and
+                self.DICTKEY == lltype.Ptr(rstr.STR))
+
     def rtype_len(self, hop):
         v_dict, = hop.inputargs(self)
         return hop.gendirectcall(ll_dict_len, v_dict)
@@ -265,7 +270,11 @@ class DictRepr(AbstractDictRepr):
         v_dict, v_key, v_default = hop.inputargs(self, self.key_repr,
                                                  self.value_repr)
         hop.exception_cannot_occur()
-        v_res = hop.gendirectcall(ll_get, v_dict, v_key, v_default)
+        if self.has_string_keys():
+            ll_func = ll_strdict_get
+        else:
+            ll_func = ll_get
+        v_res = hop.gendirectcall(ll_func, v_dict, v_key, v_default)
         return self.recast_value(hop.llops, v_res)
 
     def rtype_method_setdefault(self, hop):
@@ -332,7 +341,11 @@ class __extend__(pairtype(DictRepr, rmodel.Repr)):
         if not r_dict.custom_eq_hash:
             hop.has_implicit_exception(KeyError)   # record that we know about it
         hop.exception_is_here()
-        v_res = hop.gendirectcall(ll_dict_getitem, v_dict, v_key)
+        if r_dict.has_string_keys():
+            ll_func = ll_strdict_getitem
+        else:
+            ll_func = ll_dict_getitem
+        v_res = hop.gendirectcall(ll_func, v_dict, v_key)
         return r_dict.recast_value(hop.llops, v_res)
 
     def rtype_delitem((r_dict, r_key), hop):
@@ -348,12 +361,20 @@ class __extend__(pairtype(DictRepr, rmodel.Repr)):
             hop.exception_is_here()
         else:
             hop.exception_cannot_occur()
-        hop.gendirectcall(ll_dict_setitem, v_dict, v_key, v_value)
+        if r_dict.has_string_keys():
+            ll_func = ll_strdict_setitem
+        else:
+            ll_func = ll_dict_setitem
+        hop.gendirectcall(ll_func, v_dict, v_key, v_value)
 
     def rtype_contains((r_dict, r_key), hop):
         v_dict, v_key = hop.inputargs(r_dict, r_dict.key_repr)
         hop.exception_is_here()
-        return hop.gendirectcall(ll_contains, v_dict, v_key)
+        if r_dict.has_string_keys():
+            ll_func = ll_strdict_contains
+        else:
+            ll_func = ll_contains
+        return hop.gendirectcall(ll_func, v_dict, v_key)
 
 class __extend__(pairtype(DictRepr, DictRepr)):
     def convert_from_to((r_dict1, r_dict2), v, llops):
@@ -838,6 +859,27 @@ def ll_contains(d, key):
     i = ll_dict_lookup(d, key, d.keyhash(key))
     return not i & HIGHEST_BIT
 
+# The dicts with string keys use the following variants, whose oopspecs
+# let the JIT keep small dicts virtual (see jit/codewriter/jtransform.py).
+# The other dicts keep the plain helpers, in which the JIT can trace the
+# computation of the hash.
+
+def ll_strdict_getitem(d, key):
+    return ll_dict_getitem(d, key)
+ll_strdict_getitem.oopspec = 'dict.getitem(d, key)'
+
+def ll_strdict_setitem(d, key, value):
+    ll_dict_setitem(d, key, value)
+ll_strdict_setitem.oopspec = 'dict.setitem(d, key, value)'
+
+def ll_strdict_contains(d, key):
+    return ll_contains(d, key)
+ll_strdict_contains.oopspec = 'dict.contains(d, key)'
+
+def ll_strdict_get(d, key, default):
+    return ll_get(d, key, default)
+ll_strdict_get.oopspec = 'dict.get(d, key, default)'
+
 POPITEMINDEX = lltype.Struct('PopItemIndex', ('nextindex', lltype.Signed))
 global_popitem_index = lltype.malloc(POPITEMINDEX, zero=True, immortal=True)
 
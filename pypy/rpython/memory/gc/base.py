@@ -168,6 +168,12 @@ class GCBase(object):
     def set_max_heap_size(self, size):
         raise NotImplementedError
 
+    def freeze(self):
+        """Make the objects currently alive immortal, and avoid writing
+        to them during the following collections.  Only a hint: by
+        default, does nothing."""
+        pass
+
     def x_swap_pool(self, newpool):
         return newpool
 
@@ -6,6 +6,16 @@ Environment variables can be used to fine-tune the following parameters:
                         the L2 cache.  Try values like '1.2MB'.  Small values
                         (like 1 or 1KB) are useful for debugging.
 
+ PYPY_GC_NURSERY_MAX    The max size of the nursery.  The nursery starts
+                        at PYPY_GC_NURSERY and is resized after each minor
+                        collection that found it full: it grows (doubling,
+                        up to this size) while a large fraction of its
+                        objects survive or while minor collections take a
+                        large fraction of the run time, and it shrinks
+                        back when both are low.  Defaults to 4 times
+                        PYPY_GC_NURSERY.  Set it to PYPY_GC_NURSERY to get
+                        a fixed-size nursery.
+
  PYPY_GC_MAJOR_COLLECT  Major collection memory factor.  Default is '1.82',
                         which means trigger a major collection when the
                         memory consumed equals 1.82 times the memory
@@ -23,6 +33,13 @@ Environment variables can be used to fine-tune the following parameters:
                         crash the program with a fatal error.  Try values
                         like '1.6GB'.
 
+ PYPY_GC_TARGET         A soft target for the heap size.  When the next
+                        major collection would be triggered above it, the
+                        major collection factor is lowered to stay at the
+                        target, down to a factor of 1.1; unlike
+                        PYPY_GC_MAX, the heap can still grow past it, and
+                        no MemoryError is raised.  Try values like '1GB'.
+
  PYPY_GC_MAX_DELTA      The major collection threshold will never be set
                         to more than PYPY_GC_MAX_DELTA the amount really
                         used after a collection.  Defaults to 1/8th of the
@@ -38,6 +55,13 @@ Environment variables can be used to fine-tune the following parameters:
                         too slow for normal use.  Values are 0 (off),
                         1 (on major collections) or 2 (also on minor
                         collections).
+
+ PYPY_GC_SWEEP_STEP     Sweep the small objects incrementally after a major
+                        collection: the pages are swept this many at a
+                        time, after each of the following minor
+                        collections.  Reduces the pause times of major
+                        collections on large heaps.  Defaults to 0, which
+                        means that the whole heap is swept at once.
 """
 # XXX Should find a way to bound the major collection threshold by the
 # XXX total addressable size.  Maybe by keeping some minimarkpage arenas
@@ -54,14 +78,16 @@ from pypy.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
 from pypy.rlib.rarithmetic import LONG_BIT_SHIFT
 from pypy.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
 from pypy.rlib.objectmodel import we_are_translated
+from pypy.rlib.rtimer import read_timestamp
 from pypy.tool.sourcetools import func_with_new_name
 
 #
 # Handles the objects in 2 generations:
 #
 #  * young objects: allocated in the nursery if they are not too large, or
-#    raw-malloced otherwise.  The nursery is a fixed-size memory buffer of
-#    half the size of the L2 cache.  When full, we do a minor collection;
+#    raw-malloced otherwise.  The nursery is a memory buffer of initially
+#    half the size of the L2 cache, which can be resized between minor
+#    collections (see PYPY_GC_NURSERY_MAX).  When full, we do a minor collection;
 #    the surviving objects from the nursery are moved outside, and the
 #    non-surviving raw-malloced objects are freed.  All surviving objects
 #    become old.
@@ -69,6 +95,9 @@ from pypy.tool.sourcetools import func_with_new_name
 #  * old objects: never move again.  These objects are either allocated by
 #    minimarkpage.py (if they are small), or raw-malloced (if they are not
 #    small).  Collected by regular mark-n-sweep during major collections.
+#    The marking is always done in one go; the sweeping of the small
+#    objects can be spread over the following minor collections (see
+#    PYPY_GC_SWEEP_STEP).
 #
 
 WORD = LONG_BIT // 8
@@ -91,7 +120,8 @@ GCFLAG_TRACK_YOUNG_PTRS = first_gcflag << 0
 # unless the object is already listed in 'prebuilt_root_objects'.
 # When a pointer is written inside an object with GCFLAG_NO_HEAP_PTRS
 # set, the write_barrier clears the flag and adds the object to
-# 'prebuilt_root_objects'.
+# 'prebuilt_root_objects'.  It is also set by freeze() on all the objects
+# that are alive at that point, which are then handled like prebuilt ones.
 GCFLAG_NO_HEAP_PTRS = first_gcflag << 1
 
 # The following flag is set on surviving objects during a major collection,
@@ -118,6 +148,21 @@ GCFLAG_CARDS_SET    = first_gcflag << 6     # <- at least one card bit is set
 TID_MASK            = (first_gcflag << 7) - 1
 
 
+# Policy for resizing the nursery after a minor collection that found it
+# full.  The 'survival' is the fraction of the bytes of the nursery that
+# were copied out, and the 'overhead' is the fraction of the time spent in
+# the minor collection since the end of the previous one.  The nursery
+# doubles if either is above the GROW value, and halves if both are below
+# the SHRINK value.
+NURSERY_GROW_SURVIVAL   = 0.10
+NURSERY_SHRINK_SURVIVAL = 0.02
+NURSERY_GROW_OVERHEAD   = 0.05
+NURSERY_SHRINK_OVERHEAD = 0.01
+
+# The lowest major collection factor that PYPY_GC_TARGET can lead to.
+MIN_MAJOR_COLLECTION_THRESHOLD = 1.1
+
+
 FORWARDSTUB = lltype.GcStruct('forwarding_stub',
                               ('forw', llmemory.Address))
 FORWARDSTUBPTR = lltype.Ptr(FORWARDSTUB)
@@ -209,19 +254,24 @@ class MiniMarkGC(MovingGCBase):
     def __init__(self, config,
                  read_from_env=False,
                  nursery_size=32*WORD,
+                 nursery_size_max=0,
                  page_size=16*WORD,
                  arena_size=64*WORD,
                  small_request_threshold=5*WORD,
                  major_collection_threshold=2.5,
                  growth_rate_max=2.5,   # for tests
+                 target_heap_size=0.0,
                  card_page_indices=0,
                  large_object=8*WORD,
+                 sweep_step=0,
                  ArenaCollectionClass=None,
                  **kwds):
         MovingGCBase.__init__(self, config, **kwds)
         assert small_request_threshold % WORD == 0
         self.read_from_env = read_from_env
         self.nursery_size = nursery_size
+        self.nursery_size_min = nursery_size
+        self.nursery_size_max = nursery_size_max
         self.small_request_threshold = small_request_threshold
         self.major_collection_threshold = major_collection_threshold
         self.growth_rate_max = growth_rate_max
@@ -229,8 +279,15 @@ class MiniMarkGC(MovingGCBase):
         self.min_heap_size = 0.0
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
+        self.target_heap_size = target_heap_size
         self.max_delta = float(r_uint(-1))
         #
+        # incremental sweeping: the number of pages swept after each minor
+        # collection, or 0 to sweep everything in major_collection()
+        self.sweep_step = sweep_step
+        self.sweeping_pages = False
+        self.sweep_reserving_size = 0
+        #
         self.card_page_indices = card_page_indices
         if self.card_page_indices > 0:
             self.card_page_shift = 0
@@ -247,6 +304,12 @@ class MiniMarkGC(MovingGCBase):
         self.debug_tiny_nursery = -1
         self.debug_rotating_nurseries = None
         #
+        # Measurements used to resize the nursery: the number of bytes
+        # copied out of the nursery by the current minor collection, and
+        # the timestamp at the end of the previous one.
+        self.nursery_surviving_size = 0
+        self.minor_collection_end = 0.0
+        #
         # The ArenaCollection() handles the nonmovable objects allocation.
         if ArenaCollectionClass is None:
             ArenaCollectionClass = minimarkpage.ArenaCollection
@@ -334,6 +397,12 @@ class MiniMarkGC(MovingGCBase):
                 self.debug_tiny_nursery = newsize & ~(WORD-1)
                 newsize = minsize
             #
+            maxsize = env.read_from_env('PYPY_GC_NURSERY_MAX')
+            if maxsize <= 0:
+                maxsize = newsize * 4
+            if self.debug_tiny_nursery >= 0:
+                maxsize = newsize    # don't resize a debugging nursery
+            #
             major_coll = env.read_float_from_env('PYPY_GC_MAJOR_COLLECT')
             if major_coll > 1.0:
                 self.major_collection_threshold = major_coll
@@ -353,21 +422,30 @@ class MiniMarkGC(MovingGCBase):
             if max_heap_size > 0:
                 self.max_heap_size = float(max_heap_size)
             #
+            target_heap_size = env.read_uint_from_env('PYPY_GC_TARGET')
+            if target_heap_size > 0:
+                self.target_heap_size = float(target_heap_size)
+            #
             max_delta = env.read_uint_from_env('PYPY_GC_MAX_DELTA')
             if max_delta > 0:
                 self.max_delta = float(max_delta)
             else:
                 self.max_delta = 0.125 * env.get_total_memory()
             #
+            sweep_step = env.read_from_env('PYPY_GC_SWEEP_STEP')
+            if sweep_step > 0:
+                self.sweep_step = sweep_step
+            #
             self.minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
+            self.nursery_size_max = maxsize
             self.allocate_nursery()
 
 
     def _nursery_memory_size(self):
         extra = self.nonlarge_max + 1
-        return self.nursery_size + extra
+        return self.nursery_size_max + extra
 
     def _alloc_nursery(self):
         # the start of the nursery: we actually allocate a bit more for
@@ -382,6 +460,12 @@ class MiniMarkGC(MovingGCBase):
     def allocate_nursery(self):
         debug_start("gc-set-nursery-size")
         debug_print("nursery size:", self.nursery_size)
+        # the nursery is allocated with its max size, but only the first
+        # 'nursery_size' bytes are used; see adapt_nursery_size()
+        self.nursery_size_min = self.nursery_size
+        if self.nursery_size_max < self.nursery_size:
+            self.nursery_size_max = self.nursery_size
+        debug_print("nursery max size:", self.nursery_size_max)
         self.nursery = self._alloc_nursery()
         # the current position in the nursery:
         self.nursery_free = self.nursery
@@ -568,6 +652,91 @@ class MiniMarkGC(MovingGCBase):
         self.minor_collection()
         if gen > 0:
             self.major_collection()
+            # an explicit collection frees all the memory it can right now
+            # (the finalizers may have allocated in the nursery meanwhile)
+            if self.sweeping_pages:
+                self.minor_collection()
+                self.sweep_pages(-1)
+
+    def freeze(self):
+        """Make all the objects that are currently alive immortal.  From
+        now on they are handled like prebuilt objects: they get the flag
+        GCFLAG_NO_HEAP_PTRS, and major collections neither mark nor sweep
+        them.  The memory pages that contain them are then only written to
+        if the objects themselves are modified, which lets these pages
+        stay shared after a fork().  The objects with a finalizer that are
+        alive now will never see their finalizer called.
+        """
+        self.collect()
+        self.minor_collection()   # the finalizers may have allocated
+        #
+        debug_start("gc-freeze")
+        self.objects_to_trace = self.AddressStack()
+        # The objects already in 'prebuilt_root_objects' stay there.
+        # They get GCFLAG_VISITED, which is removed again at the end.
+        self.prebuilt_root_objects.foreach(self._visit_root, None)
+        # Freeze all the objects that are alive, including the ones that
+        # are only reachable from objects with a finalizer.
+        self.collect_roots()
+        self.objects_with_finalizers.foreach(self._collect_obj,
+                                             self.objects_to_trace)
+        self.freeze_all_objects()
+        self.objects_to_trace.delete()
+        #
+        # All the objects with a finalizer are now immortal.  So are the
+        # weakrefs and the objects they point to, if they are still alive.
+        self.objects_with_finalizers.delete()
+        self.objects_with_finalizers = self.AddressDeque()
+        while self.old_objects_with_weakrefs.non_empty():
+            obj = self.old_objects_with_weakrefs.pop()
+            if self.header(obj).tid & (GCFLAG_VISITED |
+                                       GCFLAG_NO_HEAP_PTRS) == 0:
+                continue # weakref itself dies
+            offset = self.weakpointer_offset(self.get_type_id(obj))
+            pointing_to = (obj + offset).address[0]
+            if self.header(pointing_to).tid & (GCFLAG_VISITED |
+                                               GCFLAG_NO_HEAP_PTRS) == 0:
+                (obj + offset).address[0] = llmemory.NULL
+        #
+        # Forget about the frozen raw-malloced objects, and free the others.
+        list = self.old_rawmalloced_objects
+        self.old_rawmalloced_objects = self.AddressStack()
+        while list.non_empty():
+            obj = list.pop()
+            if self.header(obj).tid & (GCFLAG_VISITED |
+                                       GCFLAG_NO_HEAP_PTRS) == 0:
+                self.free_rawmalloced_object_if_unvisited(obj)
+        list.delete()
+        #
+        self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
+        #
+        # Ask the ArenaCollection to forget about all the pages that are
+        # currently in use.  The few objects in them that are not alive
+        # (allocated by the finalizers since collect()) are never freed.
+        self.ac.freeze()
+        debug_print("frozen:", self.get_total_memory_used(), "bytes")
+        debug_stop("gc-freeze")
+        #
+        self.debug_check_consistency()
+
+    def _visit_root(self, obj, ignored):
+        self.visit(obj)
+
+    def freeze_all_objects(self):
+        pending = self.objects_to_trace
+        while pending.non_empty():
+            obj = pending.pop()
+            hdr = self.header(obj)
+            if hdr.tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
+                continue
+            if hdr.tid & GCFLAG_HAS_CARDS:
+                # the write barrier doesn't remove GCFLAG_NO_HEAP_PTRS from
+                # arrays with cards, so we make them roots instead
+                hdr.tid |= GCFLAG_VISITED
+                self.prebuilt_root_objects.append(obj)
+            else:
+                hdr.tid |= GCFLAG_NO_HEAP_PTRS
+            self.trace(obj, self._collect_ref_rec, None)
 
     def collect_and_reserve(self, totalsize):
         """To call when nursery_free overflows nursery_top.
@@ -577,7 +746,11 @@ class MiniMarkGC(MovingGCBase):
         """
         self.minor_collection()
         #
-        if self.get_total_memory_used() > self.next_major_collection_threshold:
+        if self.sweeping_pages:
+            # the previous major collection is not fully swept yet
+            self.sweep_pages(self.sweep_step)
+        elif (self.get_total_memory_used() >
+              self.next_major_collection_threshold):
             self.major_collection()
             #
             # The nursery might not be empty now, because of
@@ -1228,6 +1401,13 @@ class MiniMarkGC(MovingGCBase):
         #
         debug_start("gc-minor")
         #
+        # Measure what is needed to resize the nursery afterwards.
+        nursery_used = self.nursery_free - self.nursery
+        if nursery_used > self.nursery_size:   # overflowed by a malloc
+            nursery_used = self.nursery_size
+        minor_collection_start = float(read_timestamp())
+        self.nursery_surviving_size = 0
+        #
         # Before everything else, remove from 'old_objects_pointing_to_young'
         # the young arrays.
         if self.young_rawmalloced_objects:
@@ -1279,16 +1459,55 @@ class MiniMarkGC(MovingGCBase):
         # All live nursery objects are out, and the rest dies.  Fill
         # the whole nursery with zero and reset the current nursery pointer.
         llarena.arena_reset(self.nursery, self.nursery_size, 2)
+        #
+        # Resize the nursery, if it was full.  Minor collections done
+        # with a partially filled nursery, e.g. by gc.collect(), don't
+        # say much about the program and are ignored.
+        minor_collection_end = float(read_timestamp())
+        if (self.nursery_size_max > self.nursery_size_min and
+                nursery_used >= self.nursery_size // 2):
+            self.adapt_nursery_size(
+                nursery_used, self.nursery_surviving_size,
+                minor_collection_end - minor_collection_start,
+                minor_collection_start - self.minor_collection_end)
+        self.minor_collection_end = minor_collection_end
+        #
+        self.nursery_top = self.nursery + self.nursery_size
         self.debug_rotate_nursery()
         self.nursery_free = self.nursery
         #
         debug_print("minor collect, total memory used:",
                     self.get_total_memory_used())
-        if self.DEBUG >= 2:
+        if self.DEBUG >= 2 and not self.sweeping_pages:
             self.debug_check_consistency()     # expensive!
         debug_stop("gc-minor")
 
 
+    def adapt_nursery_size(self, used, surviving, pause, running):
+        """Resize the nursery after a minor collection, which found
+        'surviving' bytes out of the 'used' bytes in the nursery and took
+        'pause' timestamp units after 'running' units of running the
+        program.  The part of the nursery after 'nursery_size' is kept
+        zero-filled, so it can be reused directly.
+        """
+        survival = float(surviving) / float(used)
+        if pause + running > 0.0:
+            overhead = pause / (pause + running)
+        else:
+            overhead = 0.0
+        newsize = self.nursery_size
+        if (survival > NURSERY_GROW_SURVIVAL or
+                overhead > NURSERY_GROW_OVERHEAD):
+            newsize = min(newsize * 2, self.nursery_size_max)
+        elif (survival < NURSERY_SHRINK_SURVIVAL and
+                overhead < NURSERY_SHRINK_OVERHEAD):
+            newsize = max(newsize // 2, self.nursery_size_min)
+        if newsize != self.nursery_size:
+            debug_print("resizing the nursery from", self.nursery_size,
+                        "to", newsize, "bytes")
+            self.nursery_size = newsize
+
+
     def collect_roots_in_nursery(self):
         # we don't need to trace prebuilt GcStructs during a minor collect:
         # if a prebuilt GcStruct contains a pointer to a young object,
@@ -1423,6 +1642,7 @@ class MiniMarkGC(MovingGCBase):
         size_gc_header = self.gcheaderbuilder.size_gc_header
         size = self.get_size(obj)
         totalsize = size_gc_header + size
+        self.nursery_surviving_size += raw_malloc_usage(totalsize)
         #
         if self.header(obj).tid & GCFLAG_HAS_SHADOW == 0:
             #
@@ -1549,6 +1769,11 @@ class MiniMarkGC(MovingGCBase):
     def major_collection(self, reserving_size=0):
         """Do a major collection.  Only for when the nursery is empty."""
         #
+        # The objects that are not swept yet still have GCFLAG_VISITED:
+        # finish sweeping them before marking again.
+        if self.sweeping_pages:
+            self.sweep_pages(-1)
+        #
         debug_start("gc-collect")
         debug_print()
         debug_print(".----------- Full collection ------------------")
@@ -1588,17 +1813,36 @@ class MiniMarkGC(MovingGCBase):
         # have the GCFLAG_VISITED flag.
         self.free_unvisited_rawmalloc_objects()
         #
+        # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
+        self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
+        #
+        self.num_major_collects += 1
+        #
+        if self.sweep_step > 0:
+            # Incremental sweeping: the ArenaCollection is only told which
+            # pages to sweep now; the following calls to sweep_pages()
+            # free the objects that have not been visited above, and
+            # reset GCFLAG_VISITED on the others.  The new objects are
+            # allocated in other pages in the meantime.
+            self.ac.mass_free_prepare()
+            self.sweeping_pages = True
+            self.sweep_reserving_size = reserving_size
+            self.set_provisional_threshold(reserving_size)
+            debug_print("| sweeping incrementally, pages per step: ",
+                        self.sweep_step)
+            debug_print("`----------------------------------------------")
+            debug_stop("gc-collect")
+            #
+            self.execute_finalizers()
+            return
+        #
         # Ask the ArenaCollection to visit all objects.  Free the ones
         # that have not been visited above, and reset GCFLAG_VISITED on
         # the others.
         self.ac.mass_free(self._free_if_unvisited)
         #
-        # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
-        self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
-        #
         self.debug_check_consistency()
         #
-        self.num_major_collects += 1
         debug_print("| used after collection:")
         debug_print("|          in ArenaCollection:     ",
                     self.ac.total_memory_used, "bytes")
@@ -1609,15 +1853,68 @@ class MiniMarkGC(MovingGCBase):
         debug_print("`----------------------------------------------")
         debug_stop("gc-collect")
         #
+        self.set_threshold_after_major_collection(reserving_size)
+        #
+        # At the end, we can execute the finalizers of the objects
+        # listed in 'run_finalizers'.  Note that this will typically do
+        # more allocations.
+        self.execute_finalizers()
+
+
+    def sweep_pages(self, max_pages):
+        """Continue the sweeping of the ArenaCollection after a major
+        collection, for at most 'max_pages' pages (all of them if
+        negative).  When it is done, set the threshold for the next
+        major collection."""
+        ll_assert(self.nursery_free == self.nursery,
+                  "nursery not empty in sweep_pages()")
+        if not self.ac.mass_free_incremental(self._free_if_unvisited,
+                                             max_pages):
+            return
+        self.sweeping_pages = False
+        #
+        debug_start("gc-collect-sweep")
+        debug_print("used after incremental sweeping:")
+        debug_print("          in ArenaCollection:     ",
+                    self.ac.total_memory_used, "bytes")
+        debug_print("          raw_malloced:           ",
+                    self.rawmalloced_total_size, "bytes")
+        debug_stop("gc-collect-sweep")
+        #
+        self.debug_check_consistency()
+        self.set_threshold_after_major_collection(self.sweep_reserving_size)
+
+
+    def set_provisional_threshold(self, reserving_size):
+        # Until the incremental sweeping is done, the total memory used
+        # still includes the objects that are about to be freed.  Use it
+        # as an upper bound to set a provisional threshold, so that the
+        # check in external_malloc() does not immediately start another
+        # major collection.  The real threshold is set by sweep_pages()
+        # when it is done.
+        total_memory_used = float(self.get_total_memory_used())
+        threshold = min(total_memory_used * self.major_collection_threshold,
+                        total_memory_used + self.max_delta)
+        if self.max_heap_size > 0.0 and threshold > self.max_heap_size:
+            threshold = self.max_heap_size
+        self.next_major_collection_threshold = threshold + reserving_size
+
+
+    def set_threshold_after_major_collection(self, reserving_size):
         # Set the threshold for the next major collection to be when we
         # have allocated 'major_collection_threshold' times more than
         # we currently have -- but no more than 'max_delta' more than
         # we currently have.
         total_memory_used = float(self.get_total_memory_used())
-        bounded = self.set_major_threshold_from(
-            min(total_memory_used * self.major_collection_threshold,
-                total_memory_used + self.max_delta),
-            reserving_size)
+        threshold = min(total_memory_used * self.major_collection_threshold,
+                        total_memory_used + self.max_delta)
+        #
+        # Target heap size: lower the factor to stay at the target if we
+        # would go above it, but not below MIN_MAJOR_COLLECTION_THRESHOLD.
+        if self.target_heap_size > 0.0 and threshold > self.target_heap_size:
+            threshold = max(self.target_heap_size, total_memory_used *
+                            MIN_MAJOR_COLLECTION_THRESHOLD)
+        bounded = self.set_major_threshold_from(threshold, reserving_size)
         #
         # Max heap size: gives an upper bound on the threshold.  If we
         # already have at least this much allocated, raise MemoryError.
@@ -1635,11 +1932,6 @@ class MiniMarkGC(MovingGCBase):
                                       "Using too much memory, aborting")
             self.max_heap_size_already_raised = True
             raise MemoryError
-        #
-        # At the end, we can execute the finalizers of the objects
-        # listed in 'run_finalizers'.  Note that this will typically do
-        # more allocations.
-        self.execute_finalizers()
 
 
     def _free_if_unvisited(self, hdr):
@@ -1883,7 +2175,9 @@ class MiniMarkGC(MovingGCBase):
 
     def _finalization_state(self, obj):
         tid = self.header(obj).tid
-        if tid & GCFLAG_VISITED:
+        # objects with GCFLAG_NO_HEAP_PTRS are prebuilt or frozen, and
+        # never die: they are always in state 3
+        if tid & (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS):
             if tid & GCFLAG_FINALIZATION_ORDERING:
                 return 2
             else:
@@ -1970,7 +2264,9 @@ class MiniMarkGC(MovingGCBase):
                 continue # weakref itself dies
             offset = self.weakpointer_offset(self.get_type_id(obj))
             pointing_to = (obj + offset).address[0]
-            if self.header(pointing_to).tid & GCFLAG_VISITED:
+            # (prebuilt and frozen objects with GCFLAG_NO_HEAP_PTRS survive)
+            if (self.header(pointing_to).tid &
+                    (GCFLAG_VISITED | GCFLAG_NO_HEAP_PTRS)):
                 new_with_weakref.append(obj)
             else:
                 (obj + offset).address[0] = llmemory.NULL
@@ -1992,6 +2288,7 @@ class SimpleArenaCollection(object):
         self.page_size = page_size
         self.small_request_threshold = small_request_threshold
         self.all_objects = []
+        self.old_objects = []
         self.total_memory_used = 0
 
     def malloc(self, size):
@@ -2007,12 +2304,26 @@ class SimpleArenaCollection(object):
         return result
 
     def mass_free(self, ok_to_free_func):
-        objs = self.all_objects
+        self.mass_free_prepare()
+        self.mass_free_incremental(ok_to_free_func, -1)
+
+    def freeze(self):
         self.all_objects = []
-        self.total_memory_used = 0
-        for rawobj, nsize in objs:
+
+    def mass_free_prepare(self):
+        # here, every object counts as a page
+        self.old_objects = self.all_objects
+        self.all_objects = []
+
+    def mass_free_incremental(self, ok_to_free_func, max_pages):
+        while self.old_objects:
+            if max_pages == 0:
+                return False
+            max_pages -= 1
+            rawobj, nsize = self.old_objects.pop()
             if ok_to_free_func(rawobj):
                 llarena.arena_free(rawobj)
+                self.total_memory_used -= nsize
             else:
                 self.all_objects.append((rawobj, nsize))
-                self.total_memory_used += nsize
+        return True
@@ -125,6 +125,17 @@ class ArenaCollection(object):
                                               flavor='raw', zero=True,
                                               immortal=True)
         #
+        # these are used by mass_free_incremental() only: the pages that
+        # still have to be swept, and the size class of the pages that are
+        # swept next (or 0 if there is no sweeping in progress).
+        self.old_page_for_size = lltype.malloc(rffi.CArray(PAGE_PTR), length,
+                                               flavor='raw', zero=True,
+                                               immortal=True)
+        self.old_full_page_for_size = lltype.malloc(rffi.CArray(PAGE_PTR),
+                                                    length, flavor='raw',
+                                                    zero=True, immortal=True)
+        self.size_class_with_old_pages = 0
+        #
         # the arena currently consumed; it must have at least one page
         # available, or be NULL.  The arena object that we point to is
         # not in any 'arenas_lists'.  We will consume all its pages before
@@ -268,7 +279,9 @@ class ArenaCollection(object):
             self.min_empty_nfreepages = i
         #
         # No more arena with any free page.  We must allocate a new arena.
-        if not we_are_translated():
+        # (While sweeping, the arenas are not yet in the correct
+        # 'arenas_lists[i]', so some of them might have free pages.)
+        if not we_are_translated() and self.size_class_with_old_pages == 0:
             for a in self._all_arenas():
                 assert a.nfreepages == 0
         #
@@ -301,22 +314,55 @@ class ArenaCollection(object):
         """For each object, if ok_to_free_func(obj) returns True, then free
         the object.
         """
-        self.total_memory_used = r_uint(0)
-        #
-        # For each size class:
+        self.mass_free_prepare()
+        self.mass_free_incremental(ok_to_free_func, -1)
+
+
+    def mass_free_prepare(self):
+        """Start an incremental mass_free().  All the pages in use are moved
+        to the 'old_*page_for_size' lists, from where they are swept by
+        mass_free_incremental().  Until then they are not used by malloc(),
+        which allocates new objects in other pages: these new objects are
+        not seen by the sweeping.
+        """
+        ll_assert(self.size_class_with_old_pages == 0,
+                  "mass_free_prepare() called while already sweeping")
         size_class = self.small_request_threshold >> WORD_POWER_2
+        self.size_class_with_old_pages = size_class
         while size_class >= 1:
+            self.old_page_for_size[size_class] = (
+                self.page_for_size[size_class])
+            self.old_full_page_for_size[size_class] = (
+                self.full_page_for_size[size_class])
+            self.page_for_size[size_class] = PAGE_NULL
+            self.full_page_for_size[size_class] = PAGE_NULL
+            size_class -= 1
+
+
+    def mass_free_incremental(self, ok_to_free_func, max_pages):
+        """Sweep at most 'max_pages' of the pages listed by
+        mass_free_prepare(), or all of them if 'max_pages' is negative.
+        Returns True if the sweeping is complete.
+        """
+        while self.size_class_with_old_pages > 0:
             #
-            # Walk the pages in 'page_for_size[size_class]' and
-            # 'full_page_for_size[size_class]' and free some objects.
+            # Walk the pages in 'old_full_page_for_size[size_class]' and
+            # 'old_page_for_size[size_class]' and free some objects.
             # Pages completely freed are added to 'page.arena.freepages',
             # and become available for reuse by any size class.  Pages
             # not completely freed are re-chained either in
             # 'full_page_for_size[]' or 'page_for_size[]'.
-            self.mass_free_in_pages(size_class, ok_to_free_func)
-            #
-            size_class -= 1
+            max_pages = self.mass_free_in_pages(self.size_class_with_old_pages,
+                                                ok_to_free_func, max_pages)
+            if max_pages == 0:
+                return False
+            self.size_class_with_old_pages -= 1
         #
+        self.rehash_arenas_lists()
+        return True
+
+
+    def rehash_arenas_lists(self):
         # Rehash arenas into the correct arenas_lists[i].  If
         # 'self.current_arena' contains an arena too, it remains there.
         (self.old_arenas_lists, self.arenas_lists) = (
@@ -353,51 +399,65 @@ class ArenaCollection(object):
         self.min_empty_nfreepages = 1
 
 
-    def mass_free_in_pages(self, size_class, ok_to_free_func):
+    def freeze(self):
+        """Forget all the pages currently in use.  The objects they contain
+        stay there forever, and these pages are never walked again by
+        mass_free(), nor used to allocate new objects.  The free blocks
+        that remain in them are lost.
+        """
+        ll_assert(self.size_class_with_old_pages == 0,
+                  "freeze() called while sweeping")
+        size_class = self.small_request_threshold >> WORD_POWER_2
+        while size_class >= 1:
+            self.page_for_size[size_class] = PAGE_NULL
+            self.full_page_for_size[size_class] = PAGE_NULL
+            size_class -= 1
+
+
+    def mass_free_in_pages(self, size_class, ok_to_free_func, max_pages):
         nblocks = self.nblocks_for_size[size_class]
         block_size = size_class * WORD
-        remaining_partial_pages = PAGE_NULL
-        remaining_full_pages = PAGE_NULL
         #
         step = 0
         while step < 2:
             if step == 0:
-                page = self.full_page_for_size[size_class]
+                old_pages = self.old_full_page_for_size
             else:
-                page = self.page_for_size[size_class]
+                old_pages = self.old_page_for_size
             #
-            while page != PAGE_NULL:
+            while old_pages[size_class] != PAGE_NULL:
+                if max_pages == 0:
+                    return 0
+                max_pages -= 1
                 #
                 # Collect the page.
+                page = old_pages[size_class]
+                old_pages[size_class] = page.nextpage
                 surviving = self.walk_page(page, block_size, ok_to_free_func)
-                nextpage = page.nextpage
                 #
                 if surviving == nblocks:
                     #
                     # The page is still full.  Re-insert it in the
-                    # 'remaining_full_pages' chained list.
+                    # 'full_page_for_size' chained list.
                     ll_assert(step == 0,
                               "A non-full page became full while freeing")
-                    page.nextpage = remaining_full_pages
-                    remaining_full_pages = page
+                    page.nextpage = self.full_page_for_size[size_class]
+                    self.full_page_for_size[size_class] = page
                     #
                 elif surviving > 0:
                     #
                     # There is at least 1 object surviving.  Re-insert
-                    # the page in the 'remaining_partial_pages' chained list.
-                    page.nextpage = remaining_partial_pages
-                    remaining_partial_pages = page
+                    # the page in the 'page_for_size' chained list.
+                    page.nextpage = self.page_for_size[size_class]
+                    self.page_for_size[size_class] = page
                     #
                 else:
                     # No object survives; free the page.
                     self.free_page(page)
-
-                page = nextpage
             #
             step += 1
         #
-        self.page_for_size[size_class] = remaining_partial_pages
-        self.full_page_for_size[size_class] = remaining_full_pages
+        return max_pages
 
 
     def free_page(self, page):
@@ -429,6 +489,7 @@ class ArenaCollection(object):
         obj = llarena.getfakearenaaddress(llmemory.cast_ptr_to_adr(page))
         obj += self.hdrsize
         surviving = 0    # initially
+        freed = 0
         skip_free_blocks = page.nfree
         #
         while True:
@@ -466,6 +527,7 @@ class ArenaCollection(object):
                     #
                     # Update the number of free objects in the page.
                     page.nfree += 1
+                    freed += 1
                     #
                 else:
                     # The object survives.
@@ -474,7 +536,7 @@ class ArenaCollection(object):
             obj += block_size
         #
         # Update the global total size of objects.
-        self.total_memory_used += surviving * block_size
+        self.total_memory_used -= r_uint(freed * block_size)
         #
         # Return the number of surviving objects.
         return surviving
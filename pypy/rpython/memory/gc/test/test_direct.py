@@ -596,6 +596,167 @@ class TestMiniMarkGCSimple(DirectGCTest):
     test_writebarrier_before_copy_preserving_cards.GC_PARAMS = {
         "card_page_indices": 4}
 
+    def test_freeze(self):
+        from pypy.rpython.memory.gc import minimark
+        p = self.malloc(S)
+        p.x = 42
+        self.write(p, 'next', self.malloc(S))
+        p.next.x = 43
+        self.stackroots.append(p)
+        self.malloc(S)                       # garbage
+        self.gc.freeze()
+        p = self.stackroots.pop()
+        assert p.x == 42 and p.next.x == 43
+        used = self.gc.get_total_memory_used()
+        for q in [p, p.next]:
+            hdr = self.gc.header(llmemory.cast_ptr_to_adr(q))
+            assert hdr.tid & minimark.GCFLAG_NO_HEAP_PTRS
+        #
+        # frozen objects are immortal, and not written to by collections
+        hdr = self.gc.header(llmemory.cast_ptr_to_adr(p.next))
+        tid = hdr.tid
+        self.gc.collect()
+        assert p.x == 42 and p.next.x == 43
+        assert hdr.tid == tid
+        assert self.gc.get_total_memory_used() == used
+        #
+        # writing into a frozen object makes it a root
+        self.stackroots.append(p)
+        self.write(p.next, 'next', self.malloc(S))
+        p.next.next.x = 44
+        self.stackroots.pop()
+        self.gc.collect()
+        self.gc.collect()
+        assert p.next.next.x == 44
+        assert hdr.tid & minimark.GCFLAG_NO_HEAP_PTRS == 0
+
+    def test_freeze_card_marker(self):
+        from pypy.rpython.memory.gc import minimark
+        largeobj_size = self.gc.nonlarge_max + 1
+        a = self.malloc(VAR, largeobj_size)
+        self.stackroots.append(a)
+        self.gc.freeze()
+        a = self.stackroots.pop()
+        hdr = self.gc.header(llmemory.cast_ptr_to_adr(a))
+        assert hdr.tid & minimark.GCFLAG_HAS_CARDS
+        assert hdr.tid & minimark.GCFLAG_NO_HEAP_PTRS == 0
+        for i in range(5):
+            p = self.malloc(S)
+            p.x = i
+            self.writearray(a, i, p)
+            self.gc.collect()
+        assert [a[i].x for i in range(5)] == range(5)
+    test_freeze_card_marker.GC_PARAMS = {"card_page_indices": 4}
+
+    def test_adapt_nursery_size(self):
+        gc = self.gc
+        assert gc.nursery_size == gc.nursery_size_min == 32*WORD
+        assert gc.nursery_size_max == 128*WORD
+        gc.adapt_nursery_size(32*WORD, 8*WORD, 0.0, 100.0)  # high survival
+        assert gc.nursery_size == 64*WORD
+        gc.adapt_nursery_size(64*WORD, 0, 10.0, 90.0)   # high overhead
+        assert gc.nursery_size == 128*WORD
+        gc.adapt_nursery_size(128*WORD, 64*WORD, 50.0, 50.0)
+        assert gc.nursery_size == 128*WORD              # max size reached
+        gc.adapt_nursery_size(128*WORD, 2*WORD, 3.0, 97.0)
+        assert gc.nursery_size == 128*WORD              # in-between
+        gc.adapt_nursery_size(128*WORD, 0, 0.0, 100.0)
+        assert gc.nursery_size == 64*WORD
+        gc.adapt_nursery_size(64*WORD, 0, 0.0, 0.0)
+        assert gc.nursery_size == 32*WORD
+        gc.adapt_nursery_size(32*WORD, 0, 0.0, 100.0)
+        assert gc.nursery_size == 32*WORD               # min size reached
+    test_adapt_nursery_size.GC_PARAMS = {"nursery_size_max": 128*WORD}
+
+    def test_nursery_grows(self):
+        # all objects survive: the nursery grows up to its max size
+        for i in range(100):
+            p = self.malloc(S)
+            p.x = i
+            if self.stackroots:
+                self.write(p, 'next', self.stackroots.pop())
+            self.stackroots.append(p)
+        assert self.gc.nursery_size == 128*WORD
+        assert self.gc.nursery_top == self.gc.nursery + 128*WORD
+        p = self.stackroots[0]
+        for i in range(99, -1, -1):
+            assert p.x == i
+            p = p.next
+        #
+        # a minor collection of a nursery that is not full does not count
+        self.gc.collect()
+        self.gc.adapt_nursery_size(128*WORD, 0, 0.0, 100.0)
+        assert self.gc.nursery_size == 64*WORD
+        self.gc.collect()
+        assert self.gc.nursery_size == 64*WORD
+        assert self.gc.nursery_top == self.gc.nursery + 64*WORD
+    test_nursery_grows.GC_PARAMS = {"nursery_size_max": 128*WORD}
+
+    def test_target_heap_size(self):
+        gc = self.gc
+        for i in range(50):
+            p = self.malloc(S)
+            if self.stackroots:
+                self.write(p, 'next', self.stackroots.pop())
+            self.stackroots.append(p)
+        gc.collect()
+        used = float(gc.get_total_memory_used())
+        gc.min_heap_size = 0.0
+        gc.set_threshold_after_major_collection(0)
+        assert gc.next_major_collection_threshold == used * 2.5
+        gc.target_heap_size = used * 2.0
+        gc.set_threshold_after_major_collection(0)
+        assert gc.next_major_collection_threshold == used * 2.0
+        gc.target_heap_size = used
+        gc.set_threshold_after_major_collection(0)
+        assert gc.next_major_collection_threshold == used * 1.1
+
 
 class TestMiniMarkGCFull(DirectGCTest):
     from pypy.rpython.memory.gc.minimark import MiniMarkGC as GCClass
+
+
+class TestMiniMarkGCIncrementalSweep(TestMiniMarkGCFull):
+    GC_PARAMS = {'sweep_step': 1}
+
+    def test_sweeping_is_incremental(self):
+        self.gc.next_major_collection_threshold = 99999.0
+        for i in range(20):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.minor_collection()      # make them old
+        # keep only every other object alive
+        self.stackroots[:] = self.stackroots[1::2]
+        used_before = self.gc.get_total_memory_used()
+        self.gc.major_collection()
+        assert self.gc.sweeping_pages
+        assert self.gc.get_total_memory_used() == used_before
+        #
+        steps = 0
+        while self.gc.sweeping_pages:
+            p = self.malloc(S)
+            p.x = 100 + steps
+            self.gc.minor_collection()
+            self.gc.sweep_pages(self.gc.sweep_step)
+            steps += 1
+        assert steps > 1
+        assert self.gc.get_total_memory_used() < used_before
+        assert [p.x for p in self.stackroots] == range(1, 20, 2)
+
+    def test_external_malloc_while_sweeping(self):
+        largeobj_size = self.gc.nonlarge_max + 1
+        for i in range(20):
+            self.stackroots.append(self.malloc(S))
+        self.gc.minor_collection()      # make them old
+        del self.stackroots[:]
+        # a major collection is due
+        self.gc.next_major_collection_threshold = 1.0
+        self.gc.collect_and_reserve(0)
+        assert self.gc.num_major_collects == 1
+        assert self.gc.sweeping_pages
+        # the threshold is only provisional, but it must not start
+        # another major collection before the sweeping is done
+        p = self.malloc(VAR, largeobj_size)
+        assert self.gc.num_major_collects == 1
+        assert self.gc.sweeping_pages
@@ -87,6 +87,7 @@ def arena_collection_for_test(pagesize, pagelayout, fill_with_objects=False):
         page.arena = ac.current_arena
         chainedlists[size_class] = page
         if fill_with_objects:
+            ac.total_memory_used += nusedblocks * size_block
             for i in range(0, nusedblocks*step, step):
                 objaddr = pageaddr + hdrsize + i * size_block
                 llarena.arena_reserve(objaddr, _dummy_size(size_block))
@@ -400,6 +401,53 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_mass_free_incremental():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "2#2 ", fill_with_objects=2)
+    assert ac.total_memory_used == 7*2*WORD
+    ok_to_free = OkToFree(ac, True)
+    ac.mass_free_prepare()
+    assert ac.page_for_size[2] == PAGE_NULL
+    assert ac.full_page_for_size[2] == PAGE_NULL
+    #
+    # objects allocated during the sweeping go to a new page, and are
+    # not seen by ok_to_free()
+    arena = ac.current_arena
+    obj = ac.malloc(2*WORD); chkob(ac, 3, 0*WORD, obj)
+    assert ac.current_arena == lltype.nullptr(lltype.typeOf(arena).TO)
+    #
+    # first sweep the full page
+    assert not ac.mass_free_incremental(ok_to_free, 1)
+    assert ok_to_free.seen == {pagesize + hdrsize + 0*WORD: True,
+                               pagesize + hdrsize + 2*WORD: True,
+                               pagesize + hdrsize + 4*WORD: True}
+    assert arena.freepages == pagenum(ac, 1)
+    assert arena.nfreepages == 1
+    assert ac.total_memory_used == 5*2*WORD
+    #
+    # then the rest
+    assert ac.mass_free_incremental(ok_to_free, 5)
+    assert len(ok_to_free.seen) == 7
+    assert arena.nfreepages == 3
+    assert ac.total_memory_used == 2*WORD
+    checkpage(ac, ac.page_for_size[2], 3)
+    assert ac.page_for_size[2].nextpage == PAGE_NULL
+    assert ac.full_page_for_size[2] == PAGE_NULL
+
+def test_freeze():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "2#2 ", fill_with_objects=2)
+    ac.freeze()
+    assert ac.total_memory_used == 7*2*WORD
+    # new objects go to a new page, even though there is a free block
+    # in the partially used pages
+    obj = ac.malloc(2*WORD); chkob(ac, 3, 0*WORD, obj)
+    # the frozen pages are not seen by mass_free() any more
+    ok_to_free = OkToFree(ac, True)
+    ac.mass_free(ok_to_free)
+    assert ok_to_free.seen == {3*pagesize + hdrsize + 0*WORD: True}
+    assert ac.total_memory_used == 7*2*WORD
+
 # ____________________________________________________________
 
 def test_random():
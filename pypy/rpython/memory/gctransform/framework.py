@@ -291,6 +291,8 @@ class FrameworkGCTransformer(GCTransformer):
             + [annmodel.SomeBool()], s_gcref)
         self.collect_ptr = getfn(GCClass.collect.im_func,
             [s_gc, annmodel.SomeInteger()], annmodel.s_None)
+        self.freeze_ptr = getfn(GCClass.freeze.im_func,
+            [s_gc], annmodel.s_None)
         self.can_move_ptr = getfn(GCClass.can_move.im_func,
                                   [s_gc, annmodel.SomeAddress()],
                                   annmodel.SomeBool())
@@ -749,6 +751,12 @@ class FrameworkGCTransformer(GCTransformer):
                   resultvar=op.result)
         self.pop_roots(hop, livevars)
 
+    def gct_gc_freeze(self, hop):
+        livevars = self.push_roots(hop)
+        hop.genop("direct_call", [self.freeze_ptr, self.c_const_gc],
+                  resultvar=hop.spaceop.result)
+        self.pop_roots(hop, livevars)
+
     def gct_gc_can_move(self, hop):
         op = hop.spaceop
         v_addr = hop.genop('cast_ptr_to_adr',
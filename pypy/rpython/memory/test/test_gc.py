@@ -258,6 +258,33 @@ class GCTest(object):
         res = self.interpret(f, [])
         assert res
 
+    def test_freeze(self):
+        import weakref
+        class A(object):
+            pass
+        def make(n):
+            a = A()
+            a.n = n
+            return a
+        def g():
+            return weakref.ref(make(-1))
+        def f():
+            frozen = [make(i) for i in range(10)]
+            ref1 = g()
+            rgc.freeze()
+            frozen.append(make(10))
+            ref2 = weakref.ref(frozen[0])
+            llop.gc__collect(lltype.Void)
+            frozen[5].n = 55
+            llop.gc__collect(lltype.Void)
+            result = ref1() is None and ref2() is frozen[0]
+            total = 0
+            for a in frozen:
+                total += a.n
+            return result and total
+        res = self.interpret(f, [])
+        assert res == 105
+
     def test_weakref_to_object_with_finalizer(self):
         import weakref, gc
         class A(object):
@@ -886,3 +913,6 @@ class TestMiniMarkGC(TestSemiSpaceGC):
 
 class TestMiniMarkGCCardMarking(TestMiniMarkGC):
     GC_PARAMS = {'card_page_indices': 4}
+
+class TestMiniMarkGCIncrementalSweep(TestMiniMarkGC):
+    GC_PARAMS = {'sweep_step': 1}
@@ -502,6 +502,37 @@ class GenericGCTests(GCTest):
         res = run([4, 42]) #XXX pure lazyness here too
         assert res == 12
 
+    def define_freeze(cls):
+        import weakref
+        class A(object):
+            pass
+        def make(n):
+            a = A()
+            a.n = n
+            return a
+        def g():
+            return weakref.ref(make(-1))
+        def f():
+            frozen = [make(i) for i in range(10)]
+            ref1 = g()
+            rgc.freeze()
+            frozen.append(make(10))
+            ref2 = weakref.ref(frozen[0])
+            llop.gc__collect(lltype.Void)
+            frozen[5].n = 55
+            llop.gc__collect(lltype.Void)
+            result = ref1() is None and ref2() is frozen[0]
+            total = 0
+            for a in frozen:
+                total += a.n
+            return result and total
+        return f
+
+    def test_freeze(self):
+        run = self.runner("freeze")
+        res = run([])
+        assert res == 105
+
     def define_collect_0(cls):
         def concat(j, dummy):
             lst = []
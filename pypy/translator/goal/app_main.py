@@ -14,6 +14,10 @@ options:
   -E             ignore environment variables (such as PYTHONPATH)
   --version      print the PyPy version
   --info         print translation information about this PyPy executable
+  --fork-server N
+                 run the program in N worker processes forked from this
+                 one after the warmup, sharing its memory and JIT code
+  --warmup file  with --fork-server, script run before forking the workers
 """
 
 import sys
@@ -298,7 +302,9 @@ default_options = dict.fromkeys(
     "run_module",
     "run_stdin",
     "warnoptions",
-    "unbuffered"), 0)
+    "unbuffered",
+    "fork_server",
+    "warmup"), 0)
 
 
 PYTHON26 = True
@@ -327,6 +333,18 @@ def m_option(options, runmodule, iterargv):
 def W_option(options, warnoption, iterargv):
     options["warnoptions"].append(warnoption)
 
+def fork_server_option(options, numworkers, iterargv):
+    try:
+        numworkers = int(numworkers)
+    except ValueError:
+        numworkers = 0
+    if numworkers <= 0:
+        raise CommandLineError("--fork-server expects a number of workers")
+    options["fork_server"] = numworkers
+
+def warmup_option(options, filename, iterargv):
+    options["warmup"] = filename
+
 def end_options(options, _, iterargv):
     return list(iterargv)
 
@@ -352,6 +370,8 @@ cmdline_options = {
     'h':         (print_help,      None),
     '--help':    (print_help,      None),
     '--jit':     (set_jit_option,  Ellipsis),
+    '--fork-server': (fork_server_option, Ellipsis),
+    '--warmup':  (warmup_option,   Ellipsis),
     '--':        (end_options,     None),
     }
 
@@ -428,6 +448,9 @@ def parse_command_line(argv):
         if os.getenv('PYTHONDONTWRITEBYTECODE'):
             options["dont_write_bytecode"] = True
 
+    if options["warmup"] and not options["fork_server"]:
+        raise CommandLineError("--warmup requires --fork-server")
+
     if (options["interactive"] or
         (not options["ignore_environment"] and os.getenv('PYTHONINSPECT'))):
         options["inspect"] = True
@@ -458,6 +481,8 @@ def run_command_line(interactive,
                      warnoptions,
                      unbuffered,
                      ignore_environment,
+                     fork_server,
+                     warmup,
                      **ignored):
     # with PyPy in top of CPython we can only have around 100 
     # but we need more in the translated PyPy for the compiler package
@@ -506,6 +531,11 @@ def run_command_line(interactive,
         if hasattr(signal, 'SIGXFSZ'):
             signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
 
+    if fork_server:
+        status = run_fork_server(fork_server, warmup)
+        if status is not None:
+            return status     # in the parent process, after the workers
+
     def inspect_requested():
         # We get an interactive prompt in one of the following three cases:
         #
@@ -625,6 +655,46 @@ def run_command_line(interactive,
 
     return status
 
+def run_fork_server(numworkers, warmup):
+    """Run the 'warmup' script, if any, then freeze the GC heap and fork
+    'numworkers' processes.  Returns None in the worker processes, which
+    go on running the main program, and the exit status in the parent,
+    after all workers finished.  Each worker finds its number in the
+    environment variable PYPY_FORK_SERVER_WORKER.
+    """
+    import os, gc
+    if warmup:
+        def run_it():
+            execfile(warmup, {'__name__': '__warmup__',
+                              '__file__': warmup})
+        if not run_toplevel(run_it):
+            return 1
+    # make the memory of this process as shareable as possible
+    try:
+        freeze = gc.freeze
+    except AttributeError:    # e.g. when running on top of CPython
+        gc.collect()
+    else:
+        freeze()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pids = []
+    for i in range(numworkers):
+        pid = os.fork()
+        if pid == 0:
+            os.environ['PYPY_FORK_SERVER_WORKER'] = str(i)
+            return None
+        pids.append(pid)
+    status = 0
+    for pid in pids:
+        pid, exitstatus = os.waitpid(pid, 0)
+        if exitstatus and not status:
+            if os.WIFEXITED(exitstatus):
+                status = os.WEXITSTATUS(exitstatus)
+            else:
+                status = 1
+    return status
+
 def resolvedirof(filename):
     try:
         filename = os.path.abspath(filename)
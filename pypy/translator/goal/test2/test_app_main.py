@@ -157,6 +157,10 @@ class TestParseCommandLine:
         self.check(['-Wbog'], sys_argv=[''], warnoptions=['bog'], run_stdin=True)
         self.check(['-W', 'ab', '-SWc'], sys_argv=[''], warnoptions=['ab', 'c'],
                    run_stdin=True, no_site=1)
+        self.check(['--fork-server', '4', 'foo'], sys_argv=['foo'],
+                   fork_server=4)
+        self.check(['--fork-server', '2', '--warmup', 'w.py', 'foo'],
+                   sys_argv=['foo'], fork_server=2, warmup='w.py')
 
     def test_sysflags(self):
         flags = (
@@ -773,6 +777,39 @@ class TestNonInteractive:
         assert status == 1
         assert data.startswith("15\xe2\x82\xac")
 
+    def test_fork_server(self):
+        if not hasattr(os, 'fork'):
+            py.test.skip("no os.fork()")
+        warmup = getscript("""
+        import sys
+        sys.warmed_up = True
+        print 'warming up'
+        """)
+        p = getscript("""
+        import os, sys
+        print 'worker %s %s' % (os.environ['PYPY_FORK_SERVER_WORKER'],
+                                getattr(sys, 'warmed_up', False))
+        """)
+        data = self.run('--fork-server 3 --warmup "%s" "%s"' % (warmup, p))
+        assert data.count('warming up') == 1
+        for i in range(3):
+            assert ('worker %d True' % i) in data
+
+    def test_fork_server_status(self):
+        if not hasattr(os, 'fork'):
+            py.test.skip("no os.fork()")
+        p = getscript("""
+        import os, sys
+        if os.environ['PYPY_FORK_SERVER_WORKER'] == '1':
+            sys.exit(5)
+        """)
+        data, status = self.run_with_status_code('--fork-server 2 "%s"' % p)
+        assert status == 5
+        data = self.run('--fork-server 0 "%s"' % p)
+        assert '--fork-server expects a number of workers' in data
+        data = self.run('--warmup "%s" "%s"' % (p, p))
+        assert '--warmup requires --fork-server' in data
+
 
 class AppTestAppMain:
 
@@ -0,0 +1,86 @@
+# A CPU-bound multi-threaded benchmark, to measure how the throughput
+# scales with the number of threads.  Each thread runs the same amount
+# of pure Python work, without any I/O, so with a GIL the total time
+# grows linearly with the number of threads and the speedup stays at
+# about 1.0.  An interpreter running threads in parallel would show a
+# speedup close to the number of threads, up to the number of cores.
+#
+# Runs unmodified on top of CPython and PyPy.
+import time, thread
+
+USAGE = """threadbench [--threads=N,N,N..] [--work=N]"""
+
+DEFAULT_THREADS = [1, 2, 4, 8]
+DEFAULT_WORK = 300000
+
+
+def work(n):
+    "Some pure Python work: arithmetic, attribute and dict accesses"
+    d = {}
+    total = 0
+    for i in xrange(n):
+        key = i & 1023
+        total += d.get(key, 0) ^ (i * 7)
+        d[key] = total & 0xffff
+    return total
+
+def run_threads(numthreads, n):
+    lock = thread.allocate_lock()
+    finished = []
+    def bootstrap():
+        work(n)
+        lock.acquire()
+        finished.append(None)
+        lock.release()
+    t0 = time.time()
+    for i in range(numthreads):
+        thread.start_new_thread(bootstrap, ())
+    while True:
+        lock.acquire()
+        done = len(finished)
+        lock.release()
+        if done == numthreads:
+            break
+        time.sleep(0.001)
+    return time.time() - t0
+
+def main(threads, n):
+    work(n)     # warm up, e.g. the JIT
+    base = run_threads(1, n)
+    print "%8s %10s %10s" % ("threads", "time (s)", "speedup")
+    for numthreads in threads:
+        elapsed = run_threads(numthreads, n)
+        # 'numthreads' times the work of the single-threaded run
+        speedup = base * numthreads / elapsed
+        print "%8d %10.3f %10.2f" % (numthreads, elapsed, speedup)
+
+
+def argerror():
+    print "Usage:"
+    print "   ", USAGE
+    return 2
+
+def entry_point(argv):
+    threads = DEFAULT_THREADS
+    n = DEFAULT_WORK
+    for arg in argv[1:]:
+        if arg.startswith('--threads='):
+            arg = arg[len('--threads='):].split(',')
+            try:
+                threads = [int(s) for s in arg]
+            except ValueError:
+                return argerror()
+        elif arg.startswith('--work='):
+            try:
+                n = int(arg[len('--work='):])
+            except ValueError:
+                return argerror()
+        else:
+            return argerror()
+    main(threads, n)
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(entry_point(sys.argv))